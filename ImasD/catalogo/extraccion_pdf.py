@@ -0,0 +1,56 @@
+"""
+ImasD\catalogo\extraccion_pdf.py
+
+Descripcion: Funciones que corren dentro de los procesos de extracción de cargar_normas.
+
+Nota: Este archivo NO importa Django a propósito. En Windows los procesos hijos arrancan
+desde cero (spawn) e importan este módulo sin que Django esté configurado.
+"""
+import hashlib
+
+import pdfplumber
+
+# Cada proceso de extracción abre el PDF una sola vez (ver abrir_pdf)
+_pdf_del_proceso = None
+
+
+def hash_pdf(ruta, bloque=1024 * 1024):
+    """
+    SHA-256 del archivo, leído por bloques para no cargarlo completo en memoria
+    """
+    resumen = hashlib.sha256()
+    with open(ruta, 'rb') as archivo:
+        for parte in iter(lambda: archivo.read(bloque), b''):
+            resumen.update(parte)
+    return resumen.hexdigest()
+
+
+def abrir_pdf(ruta):
+    """
+    Inicializador de cada proceso de extracción
+    """
+    global _pdf_del_proceso
+    _pdf_del_proceso = pdfplumber.open(ruta)
+
+
+def cerrar_pdf():
+    global _pdf_del_proceso
+    if _pdf_del_proceso is not None:
+        _pdf_del_proceso.close()
+        _pdf_del_proceso = None
+
+
+def extraer_pagina(numero):
+    """
+    return (numero, filas crudas de todas las tablas de la página)
+    """
+    pagina = _pdf_del_proceso.pages[numero]
+    filas = [fila for tabla in pagina.extract_tables() for fila in tabla]
+    # Libera los objetos que pdfplumber guarda de la página
+    pagina.close()
+    return numero, filas
+
+
+def contar_paginas(ruta):
+    with pdfplumber.open(ruta) as pdf:
+        return len(pdf.pages)
@@ -1,98 +1,52 @@
-import pdfplumber
-import re
-from decimal import Decimal, InvalidOperation
+"""
+ImasD\catalogo\management\commands\cargar_normas.py
+
+Este archivo carga los límites normativos desde el PDF del Codex (CXS 192-1995)
+
+Nota: La lógica vive en catalogo/normas.py. Las páginas ya extraídas quedan en caché
+(por hash del PDF): volver a correr el comando con el mismo archivo no las vuelve a leer.
+"""
 from django.core.management.base import BaseCommand
-from catalogo.models import LimiteNormativo
+
+from catalogo.normas import CargaNormas, CACHE_NORMAS
+
 
 class Command(BaseCommand):
     help = 'Carga normas desde el PDF CXS 192-1995 usando pdfplumber'
 
     def add_arguments(self, parser):
         parser.add_argument('pdf_path', type=str, help='Ruta al archivo PDF')
+        parser.add_argument('--procesos', type=int, default=None, help='Procesos de extracción (por defecto: núcleos del equipo)')
+        parser.add_argument('--lote', type=int, default=1000, help='Filas por lote de guardado')
+        parser.add_argument('--cache', type=str, default=str(CACHE_NORMAS), help='Carpeta de la caché de páginas')
+        parser.add_argument('--sin-cache', action='store_true', help='Extrae todas las páginas sin usar ni escribir la caché')
 
     def handle(self, *args, **options):
         pdf_path = options['pdf_path']
-        
+
         self.stdout.write(self.style.WARNING(f'Iniciando lectura de: {pdf_path}'))
-        
-        # Contadores para el reporte final
-        total_creados = 0
-        errores = 0
 
         try:
-            with pdfplumber.open(pdf_path) as pdf:
-                # Iteramos por cada página
-                for i, page in enumerate(pdf.pages):
-                    self.stdout.write(f"Procesando página {i+1}...")
-                    
-                    # Extraemos la tabla de la página
-                    # pdfplumber intenta detectar las líneas de la tabla automáticamente
-                    tables = page.extract_tables()
-
-                    for table in tables:
-                        for row in table:
-                            # VALIDACIÓN 1: Ignorar filas vacías o encabezados repetidos
-                            if not row or row[0] == "Aditivo" or row[0] is None:
-                                continue
-                            
-                            # NOTA: La estructura de columnas depende EXACTAMENTE del PDF.
-                            # Asumimos una estructura común del Codex:
-                            # Col 0: Aditivo / Col 1: INS / Col 2: Max Level / Col 3: Notas
-                            # Esto puede variar, tendrás que ajustar los índices [0], [1] si el PDF es distinto.
-                            
-                            try:
-                                # Limpieza de datos básica
-                                nombre_aditivo = row[0].replace('\n', ' ').strip()
-                                codigo_ins = row[1].replace('\n', ' ').strip() if len(row) > 1 and row[1] else "S/N"
-                                limite_raw = row[2].replace('\n', ' ').strip() if len(row) > 2 and row[2] else "0"
-                                categoria = "General" # El Codex a veces pone la categoría en un título aparte, esto es complejo de extraer.
-
-                                # Lógica para convertir "2 000 mg/kg" a número 2000.00
-                                limite_decimal = self.limpiar_numero(limite_raw)
-
-                                # Si el límite es -1, significa que es BPF (Buenas Prácticas) o GMP
-                                # Tú decides si guardas null o -1.
-                                
-                                # Guardar en Base de Datos
-                                LimiteNormativo.objects.update_or_create(
-                                    codigo_ins=codigo_ins,
-                                    nombre_aditivo=nombre_aditivo,
-                                    defaults={
-                                        'limite_maximo_ppm': limite_decimal if limite_decimal >= 0 else None,
-                                        'categoria_alimento': categoria,
-                                        'fuente': 'CXS 192-1995 (Importado)'
-                                    }
-                                )
-                                total_creados += 1
-
-                            except Exception as e:
-                                # Si falla una fila, no detenemos todo, solo la reportamos
-                                # self.stdout.write(self.style.ERROR(f"Error en fila: {row} - {e}"))
-                                errores += 1
-
+            carga = CargaNormas(
+                pdf_path,
+                procesos=options['procesos'],
+                lote=options['lote'],
+                cache=options['cache'],
+                usar_cache=not options['sin_cache'],
+                progreso=self.progreso,
+            )
+            resumen = carga.ejecutar()
         except FileNotFoundError:
             self.stdout.write(self.style.ERROR("No se encontró el archivo PDF."))
             return
 
-        self.stdout.write(self.style.SUCCESS(f'PROCESO TERMINADO.'))
-        self.stdout.write(self.style.SUCCESS(f'Registros creados/actualizados: {total_creados}'))
-        self.stdout.write(self.style.WARNING(f'Filas ignoradas/errores: {errores}'))
+        self.stdout.write(self.style.SUCCESS('PROCESO TERMINADO.'))
+        self.stdout.write(f'Páginas: {resumen.paginas} ({resumen.paginas_en_cache} desde la caché)')
+        self.stdout.write(self.style.SUCCESS(f'Registros creados: {resumen.creados} / actualizados: {resumen.actualizados}'))
+        self.stdout.write(self.style.WARNING(f'Filas ignoradas: {resumen.ignoradas} / errores: {resumen.errores}'))
+        self.stdout.write(f'{resumen.filas} filas en {resumen.segundos:.2f}s ({resumen.filas_por_segundo:,.0f} filas/s)')
 
-    def limpiar_numero(self, texto):
-        """
-        Convierte textos como '2 000 mg/kg' o 'GMP' a Decimal.
-        Retorna -1 si es GMP/BPF.
-        """
-        texto = texto.upper()
-        if "GMP" in texto or "BPF" in texto or "BUENAS PRÁCTICAS" in texto:
-            return Decimal("-1")
-        
-        # Extraer solo dígitos y puntos
-        # Regex: Busca números que pueden tener espacios o puntos
-        # Ej: "2 000" -> "2000"
-        solo_numeros = re.sub(r'[^\d\.]', '', texto.replace(' ', ''))
-        
-        try:
-            return Decimal(solo_numeros)
-        except InvalidOperation:
-            return Decimal("0")
\ No newline at end of file
+    def progreso(self, listas, total):
+        # Un aviso cada 50 páginas para no llenar la consola
+        if listas % 50 == 0 or listas == total:
+            self.stdout.write(f"Procesadas {listas}/{total} páginas...")
@@ -0,0 +1,232 @@
+"""
+ImasD\catalogo\normas.py
+
+Descripcion: Carga de los límites normativos desde el PDF del Codex (CXS 192-1995).
+
+El PDF tiene cientos de páginas; la carga es una tubería:
+
+1. Extracción: las páginas se reparten entre varios procesos (pdfplumber es lento y
+   usa solo un núcleo). Cada página extraída se guarda en una caché en disco identificada
+   por el hash SHA-256 del PDF: volver a cargar el mismo archivo (o retomar una carga
+   interrumpida) no vuelve a extraer esas páginas.
+2. Normalización: cada fila se limpia a medida que llegan las páginas (en orden).
+3. Guardado: las filas se guardan por lotes (una consulta para buscar las existentes,
+   un bulk_update y un bulk_create por lote).
+
+Responsabilidad: Solo la lógica de la carga; el comando cargar_normas la usa y reporta.
+"""
+import json
+import os
+import re
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from decimal import Decimal, InvalidOperation
+from pathlib import Path
+
+from django.db import transaction
+from django.utils import timezone
+
+from .extraccion_pdf import hash_pdf, abrir_pdf, cerrar_pdf, extraer_pagina, contar_paginas
+from .models import LimiteNormativo
+
+# Donde se guardan las páginas ya extraídas: <CACHE>/<hash del PDF>/<página>.json
+CACHE_NORMAS = Path(tempfile.gettempdir()) / 'imasd_cache_normas'
+FUENTE_IMPORTADA = 'CXS 192-1995 (Importado)'
+# limite_maximo_ppm es DecimalField(max_digits=10, decimal_places=2)
+LIMITE_MAXIMO_PERMITIDO = Decimal('99999999.99')
+
+
+def limpiar_numero(texto):
+    """
+    Convierte textos como '2 000 mg/kg' o 'GMP' a Decimal.
+    Retorna -1 si es GMP/BPF y 0 si no hay número.
+    """
+    texto = texto.upper()
+    if "GMP" in texto or "BPF" in texto or "BUENAS PRÁCTICAS" in texto:
+        return Decimal("-1")
+
+    # Extraer solo dígitos y puntos. Ej: "2 000" -> "2000"
+    solo_numeros = re.sub(r'[^\d\.]', '', texto.replace(' ', ''))
+    try:
+        return Decimal(solo_numeros)
+    except InvalidOperation:
+        return Decimal("0")
+
+
+def normalizar_fila(fila):
+    """
+    Convierte una fila cruda de la tabla en los campos de LimiteNormativo.
+
+    NOTA: La estructura de columnas depende EXACTAMENTE del PDF.
+    Col 0: Aditivo / Col 1: INS / Col 2: Max Level / Col 3: Notas
+
+    return dict, o None si la fila se ignora (vacía o encabezado repetido).
+    Lanza ValueError si la fila no se puede interpretar.
+    """
+    if not fila or fila[0] is None or fila[0] == "Aditivo":
+        return None
+
+    def celda(i, defecto):
+        return fila[i].replace('\n', ' ').strip() if len(fila) > i and fila[i] else defecto
+
+    nombre_aditivo = celda(0, '')
+    if not nombre_aditivo:
+        return None
+    limite = limpiar_numero(celda(2, "0"))
+    if limite > LIMITE_MAXIMO_PERMITIDO:
+        raise ValueError(f"Límite fuera de rango: {limite}")
+
+    return {
+        'codigo_ins': celda(1, "S/N")[:20],
+        'nombre_aditivo': nombre_aditivo[:255],
+        # El Codex a veces pone la categoría en un título aparte, esto es complejo de extraer.
+        'categoria_alimento': "General",
+        # -1 significa BPF (Buenas Prácticas): no hay límite numérico
+        'limite_maximo_ppm': limite if limite >= 0 else None,
+        'fuente': FUENTE_IMPORTADA,
+    }
+
+
+@dataclass
+class ResumenCarga:
+    paginas: int = 0
+    paginas_en_cache: int = 0
+    filas: int = 0
+    creados: int = 0
+    actualizados: int = 0
+    ignoradas: int = 0
+    errores: int = 0
+    segundos: float = 0.0
+
+    @property
+    def filas_por_segundo(self):
+        return self.filas / self.segundos if self.segundos else 0.0
+
+
+class CargaNormas:
+    """
+    Tubería de carga: extracción en paralelo -> normalización -> guardado por lotes
+    """
+    def __init__(self, ruta, procesos=None, lote=1000, cache=CACHE_NORMAS, usar_cache=True, progreso=None):
+        self.ruta = str(ruta)
+        self.procesos = max(1, procesos or os.cpu_count() or 1)
+        self.lote = lote
+        self.usar_cache = usar_cache
+        self.cache = Path(cache) / hash_pdf(self.ruta) if usar_cache else None
+        # Función opcional que recibe (páginas listas, total de páginas)
+        self.progreso = progreso
+
+    def ejecutar(self):
+        inicio = time.perf_counter()
+        resumen = ResumenCarga()
+        pendientes = []
+        for filas in self.paginas(resumen):
+            for fila in filas:
+                resumen.filas += 1
+                try:
+                    datos = normalizar_fila(fila)
+                except Exception:
+                    # Si falla una fila, no detenemos todo, solo la contamos
+                    resumen.errores += 1
+                    continue
+                if datos is None:
+                    resumen.ignoradas += 1
+                    continue
+                pendientes.append(datos)
+                if len(pendientes) >= self.lote:
+                    self.guardar(pendientes, resumen)
+                    pendientes = []
+        if pendientes:
+            self.guardar(pendientes, resumen)
+        resumen.segundos = time.perf_counter() - inicio
+        return resumen
+
+    def paginas(self, resumen):
+        """
+        Genera las filas crudas de cada página en orden, extrayendo en paralelo solo las
+        que no están en la caché
+        """
+        resumen.paginas = contar_paginas(self.ruta)
+
+        en_cache = {}
+        if self.cache is not None:
+            self.cache.mkdir(parents=True, exist_ok=True)
+            for numero in range(resumen.paginas):
+                archivo = self.cache / f'{numero}.json'
+                if archivo.exists():
+                    en_cache[numero] = archivo
+        resumen.paginas_en_cache = len(en_cache)
+        faltantes = [n for n in range(resumen.paginas) if n not in en_cache]
+
+        extraidas = self._extraer(faltantes)
+        for numero in range(resumen.paginas):
+            if numero in en_cache:
+                filas = json.loads(en_cache[numero].read_text(encoding='utf-8'))
+            else:
+                # map() entrega en orden: esta es justamente la página "numero"
+                _, filas = next(extraidas)
+                self._guardar_en_cache(numero, filas)
+            if self.progreso:
+                self.progreso(numero + 1, resumen.paginas)
+            yield filas
+
+    def _extraer(self, numeros):
+        if not numeros:
+            return
+        if self.procesos == 1 or len(numeros) == 1:
+            # Sin procesos extra: se extrae aquí mismo
+            abrir_pdf(self.ruta)
+            try:
+                yield from map(extraer_pagina, numeros)
+            finally:
+                cerrar_pdf()
+            return
+
+        procesos = min(self.procesos, len(numeros))
+        pool = ProcessPoolExecutor(max_workers=procesos, initializer=abrir_pdf, initargs=(self.ruta,))
+        try:
+            yield from pool.map(extraer_pagina, numeros, chunksize=max(1, len(numeros) // (procesos * 8)))
+        finally:
+            # Si la carga se corta, las páginas que no empezaron no se extraen
+            pool.shutdown(cancel_futures=True)
+
+    def _guardar_en_cache(self, numero, filas):
+        if self.cache is None:
+            return
+        # Se escribe en un temporal y se renombra: una carga interrumpida no deja archivos a medias
+        temporal = self.cache / f'{numero}.json.tmp'
+        temporal.write_text(json.dumps(filas, ensure_ascii=False), encoding='utf-8')
+        os.replace(temporal, self.cache / f'{numero}.json')
+
+    @staticmethod
+    @transaction.atomic
+    def guardar(filas, resumen):
+        """
+        Upsert por lote con la misma llave que antes usaba update_or_create: (codigo_ins, nombre_aditivo).
+        Si la llave se repite dentro del lote gana la última fila.
+        """
+        por_llave = {(f['codigo_ins'], f['nombre_aditivo']): f for f in filas}
+        existentes = LimiteNormativo.objects.filter(
+            codigo_ins__in={codigo for codigo, _ in por_llave},
+            nombre_aditivo__in={nombre for _, nombre in por_llave},
+        )
+        actualizar = []
+        ahora = timezone.now()
+        for limite in existentes:
+            datos = por_llave.get((limite.codigo_ins, limite.nombre_aditivo))
+            if datos is None:
+                continue
+            for campo in ('limite_maximo_ppm', 'categoria_alimento', 'fuente'):
+                setattr(limite, campo, datos[campo])
+            # bulk_update no aplica auto_now
+            limite.fecha_modificacion = ahora
+            actualizar.append(limite)
+
+        vistas = {(l.codigo_ins, l.nombre_aditivo) for l in actualizar}
+        nuevas = [LimiteNormativo(**datos) for llave, datos in por_llave.items() if llave not in vistas]
+        LimiteNormativo.objects.bulk_update(actualizar, ['limite_maximo_ppm', 'categoria_alimento', 'fuente', 'fecha_modificacion'], batch_size=500)
+        LimiteNormativo.objects.bulk_create(nuevas, batch_size=500)
+        resumen.actualizados += len(actualizar)
+        resumen.creados += len(nuevas)
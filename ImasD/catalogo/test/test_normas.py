@@ -0,0 +1,165 @@
+"""
+ImasD\catalogo\test\test_normas.py
+
+Descripcion: Pruebas de la carga de normas desde el PDF (catalogo/normas.py)
+
+NOTA: No se usa el PDF real del Codex; cada prueba arma un PDF pequeño con tablas
+"""
+import tempfile
+from decimal import Decimal
+from io import StringIO
+from pathlib import Path
+
+from django.core.management import call_command
+from django.test import TestCase
+
+from catalogo.models import LimiteNormativo
+from catalogo.normas import CargaNormas, ResumenCarga, limpiar_numero, normalizar_fila
+
+
+def pdf_con_tablas(paginas):
+    """
+    PDF mínimo con una tabla (celdas con bordes) por página
+
+    args: paginas (lista de tablas; cada tabla es una lista de filas [aditivo, INS, límite])
+    """
+    objetos = []
+    def agregar(contenido):
+        objetos.append(contenido)
+        return len(objetos)
+    fuente = agregar(b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>")
+    raiz_paginas = len(objetos) + 2 * len(paginas) + 1
+    hojas = []
+    for filas in paginas:
+        trazos = []
+        for i, fila in enumerate(filas):
+            y = 750 - 20 * i
+            for j, texto in enumerate(fila):
+                x = 50 + 150 * j
+                trazos.append(f"{x} {y} 150 20 re S")
+                texto = texto.replace('(', r'\(').replace(')', r'\)')
+                trazos.append(f"BT /F1 9 Tf {x + 3} {y + 6} Td ({texto}) Tj ET")
+        flujo = "\n".join(trazos).encode('latin-1')
+        contenido = agregar(b"<< /Length %d >>\nstream\n" % len(flujo) + flujo + b"\nendstream")
+        hojas.append(agregar(
+            b"<< /Type /Page /Parent %d 0 R /MediaBox [0 0 612 792] /Contents %d 0 R "
+            b"/Resources << /Font << /F1 %d 0 R >> >> >>" % (raiz_paginas, contenido, fuente)
+        ))
+    kids = b" ".join(b"%d 0 R" % h for h in hojas)
+    assert agregar(b"<< /Type /Pages /Kids [%s] /Count %d >>" % (kids, len(hojas))) == raiz_paginas
+    catalogo = agregar(b"<< /Type /Catalog /Pages %d 0 R >>" % raiz_paginas)
+    salida = bytearray(b"%PDF-1.4\n")
+    posiciones = []
+    for n, contenido in enumerate(objetos, 1):
+        posiciones.append(len(salida))
+        salida += b"%d 0 obj\n" % n + contenido + b"\nendobj\n"
+    xref = len(salida)
+    salida += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objetos) + 1)
+    for p in posiciones:
+        salida += b"%010d 00000 n \n" % p
+    salida += b"trailer\n<< /Size %d /Root %d 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objetos) + 1, catalogo, xref)
+    return bytes(salida)
+
+
+class NormalizacionTest(TestCase):
+
+    def test_limpiar_numero(self):
+        self.assertEqual(limpiar_numero('2 000 mg/kg'), Decimal('2000'))
+        self.assertEqual(limpiar_numero('GMP'), Decimal('-1'))
+        self.assertEqual(limpiar_numero('sin dato'), Decimal('0'))
+
+    def test_normalizar_fila(self):
+        datos = normalizar_fila(['Benzoato\nde sodio', '211', '1 000 mg/kg'])
+        self.assertEqual(datos['nombre_aditivo'], 'Benzoato de sodio')
+        self.assertEqual(datos['codigo_ins'], '211')
+        self.assertEqual(datos['limite_maximo_ppm'], Decimal('1000'))
+        # BPF: sin límite numérico
+        self.assertIsNone(normalizar_fila(['Sorbato', '202', 'GMP'])['limite_maximo_ppm'])
+        self.assertEqual(normalizar_fila(['Nisina', None, None])['codigo_ins'], 'S/N')
+
+    def test_filas_ignoradas_y_errores(self):
+        self.assertIsNone(normalizar_fila(['Aditivo', 'INS', 'Max']))
+        self.assertIsNone(normalizar_fila([None, '211', '10']))
+        with self.assertRaises(ValueError):
+            normalizar_fila(['Raro', '999', '123456789012'])
+
+
+class CargaNormasTest(TestCase):
+
+    def setUp(self):
+        self.carpeta = tempfile.TemporaryDirectory()
+        self.addCleanup(self.carpeta.cleanup)
+        self.cache = Path(self.carpeta.name) / 'cache'
+        self.pdf = self.escribir_pdf('codex.pdf', [
+            [['Aditivo', 'INS', 'Max'], ['Benzoato de sodio', '211', '1 000 mg/kg'], ['Sorbato', '202', 'GMP']],
+            [['Aditivo', 'INS', 'Max'], ['Nisina', '234', '12.5'], ['Raro', '999', '123456789012']],
+            [['Benzoato de sodio', '211', '500']],
+        ])
+
+    def escribir_pdf(self, nombre, paginas):
+        ruta = Path(self.carpeta.name) / nombre
+        ruta.write_bytes(pdf_con_tablas(paginas))
+        return ruta
+
+    def cargar(self, **kwargs):
+        kwargs.setdefault('procesos', 1)
+        kwargs.setdefault('cache', self.cache)
+        return CargaNormas(self.pdf, **kwargs).ejecutar()
+
+    def test_carga_y_upsert(self):
+        resumen = self.cargar()
+        self.assertEqual(resumen.paginas, 3)
+        self.assertEqual(resumen.filas, 7)
+        self.assertEqual(resumen.ignoradas, 2)
+        self.assertEqual(resumen.errores, 1)
+        self.assertEqual(LimiteNormativo.objects.count(), 3)
+        # La llave (INS, nombre) se repite en la página 3: gana la última fila
+        benzoato = LimiteNormativo.objects.get(codigo_ins='211')
+        self.assertEqual(benzoato.limite_maximo_ppm, Decimal('500'))
+        self.assertIsNone(LimiteNormativo.objects.get(codigo_ins='202').limite_maximo_ppm)
+
+        # Con lotes de una fila la repetición llega como actualización
+        LimiteNormativo.objects.all().delete()
+        resumen = self.cargar(lote=1, usar_cache=False)
+        self.assertEqual((resumen.creados, resumen.actualizados), (3, 1))
+        self.assertEqual(LimiteNormativo.objects.get(codigo_ins='211').limite_maximo_ppm, Decimal('500'))
+
+    def test_segunda_carga_usa_la_cache(self):
+        primera = self.cargar()
+        self.assertEqual(primera.paginas_en_cache, 0)
+        self.assertEqual(len(list(self.cache.glob('*/*.json'))), 3)
+
+        LimiteNormativo.objects.filter(codigo_ins='234').update(limite_maximo_ppm=1)
+        segunda = self.cargar()
+        self.assertEqual(segunda.paginas_en_cache, 3)
+        self.assertEqual(segunda.actualizados, 3)
+        self.assertEqual(LimiteNormativo.objects.get(codigo_ins='234').limite_maximo_ppm, Decimal('12.5'))
+
+        # Otro PDF (otro hash) no usa la caché del anterior
+        self.pdf = self.escribir_pdf('otro.pdf', [[['Nisina', '234', '10']]])
+        self.assertEqual(self.cargar().paginas_en_cache, 0)
+
+    def test_extraccion_en_paralelo(self):
+        paginas = [[[f'Aditivo {p}-{f}', str(100 + p), f'{f} mg/kg'] for f in range(1, 6)] for p in range(8)]
+        self.pdf = self.escribir_pdf('grande.pdf', paginas)
+        vistas = []
+        resumen = self.cargar(procesos=2, usar_cache=False, lote=7, progreso=lambda listas, total: vistas.append(listas))
+        self.assertEqual(resumen.filas, 40)
+        self.assertEqual(resumen.creados, 40)
+        # Las páginas llegan en orden aunque se extraigan en varios procesos
+        self.assertEqual(vistas, list(range(1, 9)))
+        self.assertEqual(LimiteNormativo.objects.get(nombre_aditivo='Aditivo 7-5').limite_maximo_ppm, Decimal('5'))
+
+    def test_filas_por_segundo(self):
+        self.assertEqual(ResumenCarga().filas_por_segundo, 0.0)
+        self.assertEqual(ResumenCarga(filas=100, segundos=2).filas_por_segundo, 50)
+
+    def test_comando(self):
+        salida = StringIO()
+        call_command('cargar_normas', str(self.pdf), '--procesos', '1', '--cache', str(self.cache), stdout=salida)
+        self.assertIn('Registros creados: 3', salida.getvalue())
+        self.assertIn('filas/s', salida.getvalue())
+
+        salida = StringIO()
+        call_command('cargar_normas', str(Path(self.carpeta.name) / 'no_existe.pdf'), stdout=salida)
+        self.assertIn('No se encontró el archivo PDF.', salida.getvalue())
@@ -1,9 +1,53 @@
-from django.contrib import admin
+from django.contrib import admin, messages
+from django.core.exceptions import ValidationError
+from django.forms.models import BaseInlineFormSet
 from .models import Producto, ItemFormula, HistorialFichas
+from .cumplimiento import VerificadorCumplimiento, PRODUCTO_NUEVO
+from .motor import ErrorFormula
+
+# Validación normativa: la fórmula se revisa contra los límites del Codex ANTES de guardarse.
+# Se revisan el producto y todos los productos que lo usan como sub-producto.
+class ItemFormulaFormSet(BaseInlineFormSet):
+
+    def clean(self):
+        super().clean()
+        self.cumplimiento = None
+        producto = self.instance
+        if any(self.errors) or None in (producto.codigo, producto.cantidad_base_lote, producto.densidad_teorica):
+            return
+
+        renglones = []
+        for form in self.forms:
+            datos = getattr(form, 'cleaned_data', None)
+            if not datos or datos.get('DELETE'):
+                continue
+            materia, sub = datos.get('materia_prima'), datos.get('sub_producto')
+            renglones.append((
+                materia.pk if materia else None,
+                sub.pk if sub else None,
+                datos['cantidad_porcentaje'],
+                datos['porcentaje_uso'],
+                datos.get('norma_asociada'),
+            ))
+
+        try:
+            resultados = VerificadorCumplimiento.verificar_formula_propuesta(producto, renglones)
+        except ErrorFormula as e:
+            raise ValidationError(str(e))
+
+        errores = [
+            f"{resultado.codigo} no cumple la norma: {incumplimiento}"
+            for resultado in resultados.values()
+            for incumplimiento in resultado.incumplimientos
+        ]
+        if errores:
+            raise ValidationError(errores)
+        self.cumplimiento = resultados[producto.pk if producto.pk is not None else PRODUCTO_NUEVO]
 
 # 1. Inline de Ingredientes (La "Planilla Excel")
 class ItemFormulaInline(admin.TabularInline):
     model = ItemFormula
+    formset = ItemFormulaFormSet
     fk_name = "producto_padre"  # <--- ¡AGREGA ESTA LÍNEA!
     extra = 1 # Muestra una fila vacía lista para llenar
     
@@ -36,7 +80,7 @@ class ProductoAdmin(admin.ModelAdmin):
     # Agrupación visual de campos
     fieldsets = (
         ('Encabezado de Ficha', {
-            'fields': ('codigo', 'nombre', 'version_actual', 'estado', 'creado_por')
+            'fields': ('codigo', 'nombre', 'version_actual', 'estado', 'categoria_alimento', 'creado_por')
         }),
         ('Variables Matemáticas Globales', {
             'fields': (('cantidad_base_lote', 'densidad_teorica'),),
@@ -48,4 +92,13 @@ class ProductoAdmin(admin.ModelAdmin):
     def save_model(self, request, obj, form, change):
         if not obj.pk: # Si es nuevo
             obj.creado_por = request.user
-        super().save_model(request, obj, form, change)
\ No newline at end of file
+        super().save_model(request, obj, form, change)
+
+    # Los incumplimientos ya bloquearon el guardado en ItemFormulaFormSet.clean; aquí solo se avisa
+    # de los aditivos sin límite registrado
+    def save_related(self, request, form, formsets, change):
+        super().save_related(request, form, formsets, change)
+        for formset in formsets:
+            resultado = getattr(formset, 'cumplimiento', None)
+            if resultado is not None and resultado.sin_limite:
+                messages.warning(request, f"{form.instance.codigo}: sin límite registrado para INS {', '.join(resultado.sin_limite)}")
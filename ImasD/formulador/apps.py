@@ -3,3 +3,7 @@ from django.apps import AppConfig
 
 class FormuladorConfig(AppConfig):
     name = 'formulador'
+
+    def ready(self):
+        # Registra las señales del recálculo incremental
+        from . import signals  # noqa: F401
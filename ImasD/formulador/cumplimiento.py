@@ -0,0 +1,271 @@
+"""
+ImasD\formulador\cumplimiento.py
+
+Descripcion: Verificador de cumplimiento normativo (Codex CXS 192) de las fórmulas.
+
+Un renglón con norma_asociada es un aditivo. Su concentración efectiva en el alimento final es:
+
+    ppm = fracción del aditivo en el producto (siguiendo los sub-productos) x porcentaje_uso / 100 x 1.000.000
+
+Si el mismo aditivo (código INS) llega por varios caminos, las ppm se suman.
+
+Responsabilidad:
+- IndiceNormativo: LimiteNormativo en un diccionario {(código INS, categoría): límite},
+  construido una vez con una sola consulta. Las categorías del Codex son jerárquicas: si
+  no hay límite para "12.5.1" se busca en "12.5" y luego en "12".
+- VerificadorCumplimiento: calcula las ppm de todos los productos en una pasada (orden
+  topológico, cada sub-producto una vez) y devuelve los incumplimientos.
+
+La categoría que se valida es Producto.categoria_alimento; si está vacía se usa la categoría
+de la norma asociada al renglón.
+
+El admin valida la fórmula ANTES de guardarla (verificar_formula_propuesta): la fórmula del
+formulario se pone en memoria en lugar de la guardada y se revisan el producto y todos los
+productos que lo usan como sub-producto (sus ppm también cambian).
+"""
+import re
+from collections import defaultdict
+from dataclasses import dataclass, field
+
+from catalogo.models import LimiteNormativo
+from .dependencias import IndiceDependencias
+from .models import Producto, ItemFormula
+from .motor import GrafoFormulas
+
+# Margen para errores de redondeo del float
+_TOLERANCIA_PPM = 1e-6
+_PREFIJO_INS = re.compile(r'^(INS|E)\s*', re.IGNORECASE)
+_CODIGO_CATEGORIA = re.compile(r'^\d+(\.\d+)*')
+# Clave en el grafo de un producto que todavía no existe (los ids empiezan en 1)
+PRODUCTO_NUEVO = 0
+
+
+def normalizar_ins(codigo):
+    """
+    'INS 211' / 'ins211' / ' 211 ' -> '211'
+    """
+    return _PREFIJO_INS.sub('', (codigo or '').strip()).replace(' ', '').upper()
+
+
+def normalizar_categoria(categoria):
+    """
+    '12.5 Sopas y caldos' -> '12.5'. Sin código numérico: el texto en minúsculas
+    """
+    texto = (categoria or '').strip()
+    codigo = _CODIGO_CATEGORIA.match(texto)
+    return codigo.group(0) if codigo else texto.lower()
+
+
+@dataclass
+class Incumplimiento:
+    codigo_ins: str
+    nombre_aditivo: str
+    categoria: str
+    ppm: float
+    limite_ppm: float
+
+    def __str__(self):
+        return f"INS {self.codigo_ins} ({self.nombre_aditivo}): {self.ppm:,.2f} ppm > {self.limite_ppm:,.2f} ppm en {self.categoria}"
+
+
+@dataclass
+class ResultadoCumplimiento:
+    producto_id: int
+    codigo: str
+    # {código INS: ppm en el alimento final}
+    ppm: dict = field(default_factory=dict)
+    incumplimientos: list = field(default_factory=list)
+    # Aditivos sin límite registrado para la categoría (revisar la norma)
+    sin_limite: list = field(default_factory=list)
+
+    @property
+    def cumple(self):
+        return not self.incumplimientos
+
+
+class IndiceNormativo:
+    """
+    Límites en memoria: {(INS, categoría): (límite ppm o None si es BPF, nombre del aditivo)}
+    """
+    def __init__(self, limites):
+        self.limites = limites
+        self._busquedas = {}
+
+    @classmethod
+    def cargar(cls):
+        limites = {}
+        filas = LimiteNormativo.objects.values_list('codigo_ins', 'categoria_alimento', 'limite_maximo_ppm', 'nombre_aditivo')
+        for codigo_ins, categoria, limite, nombre in filas.iterator(chunk_size=5000):
+            clave = (normalizar_ins(codigo_ins), normalizar_categoria(categoria))
+            limite = None if limite is None else float(limite)
+            if clave in limites:
+                # Filas repetidas: gana la más estricta (None = BPF, sin límite numérico)
+                anterior = limites[clave][0]
+                if limite is None or (anterior is not None and anterior <= limite):
+                    continue
+            limites[clave] = (limite, nombre)
+        return cls(limites)
+
+    def buscar(self, codigo_ins, categoria):
+        """
+        return (límite, nombre) o None si no hay norma para el aditivo en esa categoría ni en sus padres
+        """
+        return self._buscar(normalizar_ins(codigo_ins), normalizar_categoria(categoria))
+
+    def _buscar(self, codigo_ins, categoria):
+        # Recibe claves ya normalizadas; guarda cada búsqueda (se repiten mucho en un lote)
+        clave = (codigo_ins, categoria)
+        if clave not in self._busquedas:
+            while True:
+                encontrado = self.limites.get((codigo_ins, categoria))
+                if encontrado is not None or '.' not in categoria:
+                    break
+                categoria = categoria.rsplit('.', 1)[0]
+            self._busquedas[clave] = encontrado
+        return self._busquedas[clave]
+
+
+class VerificadorCumplimiento:
+    """
+    Verifica uno o todos los productos contra el IndiceNormativo
+    """
+    def __init__(self, grafo=None, indice=None):
+        self.grafo = grafo if grafo is not None else GrafoFormulas.cargar()
+        self.indice = indice if indice is not None else IndiceNormativo.cargar()
+        self._aditivos = None
+        self._categorias = {}
+        # {producto_id: categoria_alimento} de formularios aún sin guardar
+        self.categorias_propuestas = {}
+
+    @classmethod
+    def para_producto(cls, producto_id, indice=None):
+        """
+        Verificador que solo carga el árbol de un producto (para validar al guardar)
+        """
+        return cls(GrafoFormulas.cargar_arbol([producto_id]), indice)
+
+    @classmethod
+    def verificar_formula_propuesta(cls, producto, renglones, indice=None):
+        """
+        Verifica una fórmula que todavía no se ha guardado.
+
+        args: producto (instancia con los datos del formulario; pk None si es nuevo)
+        renglones [(materia_prima_id, sub_producto_id, cantidad_porcentaje, porcentaje_uso, LimiteNormativo o None)]
+
+        return {producto_id: ResultadoCumplimiento} del producto (con clave PRODUCTO_NUEVO si
+        no tiene pk) y de todos sus ancestros. Lanza FormulaCiclica si la fórmula se contiene a sí misma.
+        """
+        clave = producto.pk if producto.pk is not None else PRODUCTO_NUEVO
+        ids = IndiceDependencias.afectados(productos=[producto.pk]) if producto.pk is not None else {clave}
+        subproductos = {sub for _, sub, _, _, _ in renglones if sub is not None}
+
+        # Árbol guardado de los ancestros y de los sub-productos nuevos; luego se reemplaza la fórmula propia
+        grafo = GrafoFormulas.cargar_arbol((ids | subproductos) - {PRODUCTO_NUEVO})
+        grafo.renglones[clave] = [(mp, sub, float(cantidad) / 100) for mp, sub, cantidad, _, _ in renglones]
+        grafo.productos[clave] = (producto.codigo, float(producto.cantidad_base_lote), float(producto.densidad_teorica))
+        grafo.cargados.add(clave)
+
+        verificador = cls(grafo, indice)
+        verificador._cargar_aditivos()[clave] = [
+            (normalizar_ins(norma.codigo_ins), float(cantidad) / 100 * float(uso) / 100, norma.categoria_alimento)
+            for _, _, cantidad, uso, norma in renglones if norma is not None
+        ]
+        verificador.categorias_propuestas[clave] = producto.categoria_alimento
+        return verificador.verificar_todos(ids)
+
+    def verificar(self, producto_id):
+        return self.verificar_todos([producto_id])[producto_id]
+
+    def verificar_todos(self, producto_ids=None):
+        """
+        return {producto_id: ResultadoCumplimiento} (todo el grafo cargado si producto_ids es None)
+        """
+        aditivos = self._cargar_aditivos()
+        ids = list(self.grafo.productos) if producto_ids is None else list(producto_ids)
+
+        # Fracción efectiva de cada aditivo por producto: {INS: fracción}
+        # Cada sub-producto se acumula una sola vez (orden topológico)
+        fracciones = {}
+        for pk in self.grafo.orden_topologico(ids):
+            acumulado = defaultdict(float)
+            for codigo_ins, fraccion, _ in aditivos.get(pk, ()):
+                acumulado[codigo_ins] += fraccion
+            for _, sub, fraccion_sub in self.grafo.renglones.get(pk, ()):
+                if sub is not None:
+                    for codigo_ins, fraccion in fracciones[sub].items():
+                        acumulado[codigo_ins] += fraccion_sub * fraccion
+            fracciones[pk] = acumulado
+
+        categorias = Producto.objects.all()
+        if producto_ids is not None:
+            categorias = categorias.filter(id__in=ids)
+        categorias = dict(categorias.values_list('id', 'categoria_alimento'))
+        categorias.update(self.categorias_propuestas)
+        return {pk: self._evaluar(pk, fracciones[pk], categorias.get(pk)) for pk in ids}
+
+    def _categorias_norma(self, producto_id):
+        """
+        {INS: categorías de las normas asociadas en todo el árbol}. Solo se usa para los
+        productos sin categoria_alimento
+        """
+        aditivos = self._cargar_aditivos()
+        for pk in self.grafo.orden_topologico([producto_id], listos=self._categorias):
+            categorias = defaultdict(set)
+            for codigo_ins, _, categoria in aditivos.get(pk, ()):
+                categorias[codigo_ins].add(categoria)
+            for sub in self.grafo.subproductos(pk):
+                for codigo_ins, categorias_sub in self._categorias[sub].items():
+                    categorias[codigo_ins] |= categorias_sub
+            self._categorias[pk] = categorias
+        return self._categorias[producto_id]
+
+    def _cargar_aditivos(self):
+        # Renglones con norma asociada de los productos del grafo (una consulta)
+        if self._aditivos is None:
+            aditivos = defaultdict(list)
+            filas = ItemFormula.objects.filter(norma_asociada__isnull=False)
+            if self.grafo.cargados is not None:
+                filas = filas.filter(producto_padre_id__in=self.grafo.cargados)
+            filas = filas.values_list(
+                'producto_padre_id', 'cantidad_porcentaje', 'porcentaje_uso',
+                'norma_asociada__codigo_ins', 'norma_asociada__categoria_alimento'
+            )
+            for padre, cantidad, uso, codigo_ins, categoria in filas.iterator(chunk_size=5000):
+                fraccion = float(cantidad) / 100 * float(uso) / 100
+                aditivos[padre].append((normalizar_ins(codigo_ins), fraccion, categoria))
+            self._aditivos = dict(aditivos)
+        return self._aditivos
+
+    def _evaluar(self, producto_id, fracciones, categoria_producto):
+        resultado = ResultadoCumplimiento(producto_id=producto_id, codigo=self.grafo.productos[producto_id][0])
+        if categoria_producto:
+            propia = [(categoria_producto, normalizar_categoria(categoria_producto))]
+        else:
+            categorias_norma = self._categorias_norma(producto_id)
+
+        for codigo_ins, fraccion in fracciones.items():
+            ppm = fraccion * 1_000_000
+            resultado.ppm[codigo_ins] = ppm
+            if categoria_producto:
+                categorias = propia
+            else:
+                categorias = [(c, normalizar_categoria(c)) for c in sorted(categorias_norma[codigo_ins])]
+
+            # Con varias categorías candidatas se valida contra la más estricta
+            peor = None
+            for categoria, clave in categorias:
+                encontrado = self.indice._buscar(codigo_ins, clave)
+                if encontrado is None:
+                    continue
+                limite, nombre = encontrado
+                if limite is not None and (peor is None or peor[1] is None or limite < peor[1]):
+                    peor = (categoria, limite, nombre)
+                elif peor is None:
+                    peor = (categoria, None, nombre)
+
+            if peor is None:
+                resultado.sin_limite.append(codigo_ins)
+            elif peor[1] is not None and ppm > peor[1] + _TOLERANCIA_PPM:
+                categoria, limite, nombre = peor
+                resultado.incumplimientos.append(Incumplimiento(codigo_ins, nombre, categoria, ppm, limite))
+        return resultado
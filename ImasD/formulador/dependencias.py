@@ -0,0 +1,197 @@
+"""
+ImasD\formulador\dependencias.py
+
+Descripcion: Recálculo incremental de los totales guardados (ProductoCalculado).
+
+Cambiar el costo_kilo o la densidad de una Materia Prima, la densidad_teorica de un
+Producto o un renglón de una fórmula afecta a todos los productos que lo usan, directamente
+o a través de cadenas de sub-productos. En vez de recalcular todo el catálogo:
+
+- IndiceDependencias: mantiene DependenciaFormula (MP -> productos, sub-producto -> padres)
+  y sube por ese índice para encontrar los afectados (una consulta por nivel).
+- RecalculoFormulas: carga solo las fórmulas afectadas, toma de ProductoCalculado los
+  totales de los sub-productos que no cambiaron, evalúa en orden topológico con el
+  MotorFormulas y guarda todo con un upsert.
+
+Responsabilidad: Las señales (formulador/signals.py) llaman a programar() y el recálculo
+se hace una sola vez cuando la transacción confirma.
+"""
+import logging
+import threading
+
+from django.db import transaction
+
+from .models import ItemFormula, DependenciaFormula, ProductoCalculado
+from .motor import GrafoFormulas, MotorFormulas, ResultadoFormula, ErrorFormula
+
+logger = logging.getLogger(__name__)
+
+# Columnas de ProductoCalculado que se sobrescriben en cada cálculo
+_CAMPOS_CALCULADOS = ['porcentaje_total', 'costo_kilo', 'litros_por_kilo', 'densidad', 'fecha_calculo']
+
+
+class IndiceDependencias:
+
+    @staticmethod
+    def actualizar(producto_ids):
+        """
+        Reescribe las filas del índice de esos productos a partir de sus ItemFormula
+        """
+        producto_ids = set(producto_ids)
+        DependenciaFormula.objects.filter(producto_id__in=producto_ids).delete()
+        pares = set(ItemFormula.objects.filter(producto_padre_id__in=producto_ids).values_list(
+            'producto_padre_id', 'materia_prima_id', 'sub_producto_id'
+        ))
+        DependenciaFormula.objects.bulk_create([
+            DependenciaFormula(producto_id=producto, materia_prima_id=materia, sub_producto_id=sub)
+            for producto, materia, sub in pares
+        ])
+
+    @staticmethod
+    @transaction.atomic
+    def reconstruir(batch_size=5000):
+        """
+        Vuelve a crear todo el índice (tras cargas masivas que no disparan señales)
+
+        return filas creadas
+        """
+        DependenciaFormula.objects.all().delete()
+        pares = ItemFormula.objects.values_list('producto_padre_id', 'materia_prima_id', 'sub_producto_id').distinct()
+        filas = [
+            DependenciaFormula(producto_id=producto, materia_prima_id=materia, sub_producto_id=sub)
+            for producto, materia, sub in pares.iterator(chunk_size=batch_size)
+        ]
+        DependenciaFormula.objects.bulk_create(filas, batch_size=batch_size)
+        return len(filas)
+
+    @staticmethod
+    def afectados(materias=(), sub_productos=(), productos=()):
+        """
+        Productos cuyos totales cambian.
+
+        args: materias (MP que cambiaron de costo o densidad)
+        sub_productos (productos que cambiaron de densidad_teorica: afecta a sus padres)
+        productos (productos cuya fórmula cambió: se afectan ellos mismos)
+
+        return set de ids, incluidos todos los ancestros
+        """
+        frontera = set(productos)
+        if materias:
+            frontera |= set(DependenciaFormula.objects.filter(
+                materia_prima_id__in=set(materias)
+            ).values_list('producto_id', flat=True))
+        if sub_productos:
+            frontera |= set(DependenciaFormula.objects.filter(
+                sub_producto_id__in=set(sub_productos)
+            ).values_list('producto_id', flat=True))
+
+        afectados = set()
+        while frontera:
+            afectados |= frontera
+            padres = DependenciaFormula.objects.filter(sub_producto_id__in=frontera).values_list('producto_id', flat=True)
+            # Restar los ya vistos también corta los ciclos
+            frontera = set(padres) - afectados
+        return afectados
+
+
+class RecalculoFormulas:
+
+    @staticmethod
+    def recalcular(producto_ids):
+        """
+        Recalcula y guarda los totales de esos productos (y de los sub-productos que nunca
+        se han calculado)
+
+        return cantidad de productos guardados
+        """
+        pendientes = set(producto_ids)
+        if not pendientes:
+            return 0
+
+        while True:
+            grafo = GrafoFormulas.cargar(pendientes)
+            # Productos borrados mientras tanto
+            pendientes &= set(grafo.productos)
+            hijos = {sub for pk in pendientes for sub in grafo.subproductos(pk)} - pendientes
+            conocidos = RecalculoFormulas._guardados(hijos, grafo)
+            faltan = hijos - set(conocidos)
+            if not faltan:
+                break
+            pendientes |= faltan
+
+        # Los totales no necesitan la composición: los sub-productos conocidos llegan sin ella
+        motor = MotorFormulas(grafo, conocidos=conocidos)
+        resultados = [motor.evaluar(pk) for pk in pendientes]
+        return RecalculoFormulas._guardar(resultados)
+
+    @staticmethod
+    def recalcular_todo(batch_size=2000):
+        """
+        Recalcula todo el catálogo
+
+        return cantidad de productos guardados
+        """
+        resultados = MotorFormulas().evaluar_todo()
+        return RecalculoFormulas._guardar(list(resultados.values()), batch_size)
+
+    @staticmethod
+    def _guardados(producto_ids, grafo):
+        filas = ProductoCalculado.objects.filter(producto_id__in=producto_ids).values_list(
+            'producto_id', 'porcentaje_total', 'costo_kilo', 'litros_por_kilo'
+        )
+        return {
+            pk: ResultadoFormula(
+                producto_id=pk, base_lote=grafo.productos[pk][1], porcentaje_total=float(total),
+                costo_kilo=float(costo), litros_por_kilo=float(litros),
+            )
+            for pk, total, costo, litros in filas
+        }
+
+    @staticmethod
+    def _guardar(resultados, batch_size=2000):
+        filas = [
+            ProductoCalculado(
+                producto_id=r.producto_id,
+                porcentaje_total=round(r.porcentaje_total, 4),
+                costo_kilo=round(r.costo_kilo, 4),
+                litros_por_kilo=round(r.litros_por_kilo, 6),
+                densidad=None if r.densidad is None else round(r.densidad, 4),
+            )
+            for r in resultados
+        ]
+        ProductoCalculado.objects.bulk_create(
+            filas, batch_size=batch_size,
+            update_conflicts=True, unique_fields=['producto'], update_fields=_CAMPOS_CALCULADOS,
+        )
+        return len(filas)
+
+
+# --- COLA DE RECÁLCULO POR TRANSACCIÓN ---
+_cola = threading.local()
+
+
+def programar(materias=(), sub_productos=(), productos=()):
+    """
+    Anota lo que cambió; el recálculo corre una vez cuando la transacción confirma.
+    Un formulario con 20 renglones dispara 20 señales pero un solo recálculo.
+    """
+    semillas = getattr(_cola, 'semillas', None)
+    if semillas is None:
+        semillas = _cola.semillas = {'materias': set(), 'sub_productos': set(), 'productos': set()}
+    semillas['materias'].update(materias)
+    semillas['sub_productos'].update(sub_productos)
+    semillas['productos'].update(productos)
+    # Cada llamada registra su callback; el primero en correr vacía la cola y los demás no hacen nada.
+    # Si la transacción se revierte, lo anotado se recalcula en la siguiente (recalcular no hace daño)
+    transaction.on_commit(_ejecutar)
+
+
+def _ejecutar():
+    semillas = _cola.__dict__.pop('semillas', None)
+    if not semillas:
+        return
+    try:
+        RecalculoFormulas.recalcular(IndiceDependencias.afectados(**semillas))
+    except ErrorFormula as e:
+        # Una fórmula inválida (ej: cíclica) no debe tumbar el guardado que ya confirmó
+        logger.warning(f"No se pudieron recalcular los totales: {e}")
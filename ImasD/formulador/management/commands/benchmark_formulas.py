@@ -0,0 +1,226 @@
+"""
+ImasD\formulador\management\commands\benchmark_formulas.py
+
+Este archivo mide el motor de fórmulas (formulador/motor.py) sobre un catálogo sintético
+
+Nota: Todo se crea dentro de una transacción que se revierte al final,
+la base de datos queda igual que antes de ejecutar el comando.
+
+Uso: python manage.py benchmark_formulas --productos 10000 --niveles 50
+"""
+import random
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+
+from catalogo.models import MateriaPrima, FuncionTecnologica, InformacionNutricional, LimiteNormativo
+from formulador.models import Producto, ItemFormula
+from formulador.motor import GrafoFormulas, MotorFormulas
+from formulador.nutricion import NUTRIENTES, CalculadoraNutricional
+from formulador.dependencias import IndiceDependencias, RecalculoFormulas
+from formulador.cumplimiento import VerificadorCumplimiento
+
+
+class _Revertir(Exception):
+    """
+    Se lanza al final para deshacer el catálogo sintético
+    """
+
+
+class Command(BaseCommand):
+    help = 'Mide el motor de fórmulas sobre un catálogo sintético con anidación profunda'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--productos', type=int, default=10000, help='Productos a generar')
+        parser.add_argument('--materias', type=int, default=2000, help='Materias primas a generar')
+        parser.add_argument('--niveles', type=int, default=50, help='Profundidad de anidación')
+        parser.add_argument('--renglones', type=int, default=8, help='Renglones por fórmula')
+        parser.add_argument('--familias', type=int, default=50,
+                            help='Líneas de producto: cada una usa sus propias materias primas (1 = todas con todas)')
+        parser.add_argument('--semilla', type=int, default=42)
+
+    def handle(self, *args, **options):
+        self.stdout.write(self.style.WARNING(
+            f"Generando {options['productos']} productos en {options['niveles']} niveles..."
+        ))
+        try:
+            with transaction.atomic():
+                self.generar(options)
+                self.medir()
+                raise _Revertir()
+        except _Revertir:
+            pass
+        self.stdout.write(self.style.SUCCESS('BENCHMARK TERMINADO (catálogo sintético revertido).'))
+
+    def generar(self, options):
+        azar = random.Random(options['semilla'])
+        inicio = time.perf_counter()
+
+        usuario = get_user_model().objects.create_user(correo='benchmark@imasd.local', nombre='Benchmark', password=None)
+        funcion = FuncionTecnologica.objects.create(nombre='Benchmark')
+        materias = MateriaPrima.objects.bulk_create([
+            MateriaPrima(
+                codigo=f'BMP{i:06d}', nombre=f'Materia {i}',
+                densidad=round(azar.uniform(0.6, 1.8), 4), costo_kilo=round(azar.uniform(1, 50), 2),
+            )
+            for i in range(options['materias'])
+        ], batch_size=1000)
+        InformacionNutricional.objects.bulk_create([
+            InformacionNutricional(materia_prima=materia, **{n: round(azar.uniform(0, 100), 3) for n in NUTRIENTES})
+            for materia in materias
+        ], batch_size=1000)
+
+        # 300 aditivos con límite en 20 categorías del Codex
+        categorias = [f'{c // 4 + 1}.{c % 4 + 1} Categoría {c}' for c in range(20)]
+        normas = LimiteNormativo.objects.bulk_create([
+            LimiteNormativo(
+                codigo_ins=str(100 + i), nombre_aditivo=f'Aditivo {i}', categoria_alimento=categoria,
+                limite_maximo_ppm=azar.choice([None, 100, 500, 1000, 5000]),
+            )
+            for i in range(300) for categoria in categorias
+        ], batch_size=1000)
+
+        total, niveles = options['productos'], max(1, options['niveles'])
+        productos = Producto.objects.bulk_create([
+            Producto(
+                codigo=f'BPP{i:06d}', nombre=f'Producto {i}', creado_por=usuario,
+                densidad_teorica=round(azar.uniform(0.8, 1.4), 4), categoria_alimento=azar.choice(categorias),
+            )
+            for i in range(total)
+        ], batch_size=1000)
+
+        # El producto i vive en el nivel i * niveles // total y en la familia i % familias.
+        # Usa sub-productos del nivel anterior de su familia y materias primas de su familia
+        familias = max(1, min(options['familias'], total // niveles or 1))
+        por_nivel = [[[] for _ in range(familias)] for _ in range(niveles)]
+        for i, producto in enumerate(productos):
+            por_nivel[i * niveles // total][i % familias].append(producto)
+        materias_familia = [materias[f::familias] or materias for f in range(familias)]
+
+        items = []
+        for nivel, grupos in enumerate(por_nivel):
+            for familia, grupo in enumerate(grupos):
+                for producto in grupo:
+                    pesos = [azar.random() + 0.1 for _ in range(options['renglones'])]
+                    suma = sum(pesos)
+                    for j, peso in enumerate(pesos):
+                        item = ItemFormula(
+                            producto_padre=producto, funcion=funcion,
+                            cantidad_porcentaje=round(100 * peso / suma, 4),
+                        )
+                        # Dos renglones por fórmula son sub-productos (desde el nivel 1)
+                        if nivel and j < 2 and por_nivel[nivel - 1][familia]:
+                            item.sub_producto = azar.choice(por_nivel[nivel - 1][familia])
+                        else:
+                            item.materia_prima = azar.choice(materias_familia[familia])
+                            # Uno de cada diez renglones de MP es un aditivo
+                            if azar.random() < 0.1:
+                                item.norma_asociada = azar.choice(normas)
+                                item.cantidad_porcentaje = round(azar.uniform(0.001, 0.5), 4)
+                        items.append(item)
+        ItemFormula.objects.bulk_create(items, batch_size=2000)
+
+        self.stdout.write(
+            f"Catálogo: {len(productos)} productos, {len(materias)} materias primas, "
+            f"{len(items)} renglones ({time.perf_counter() - inicio:.1f}s)"
+        )
+
+    def medir(self):
+        inicio = time.perf_counter()
+        with CaptureQueriesContext(connection) as consultas:
+            grafo = GrafoFormulas.cargar()
+        carga = time.perf_counter() - inicio
+
+        inicio = time.perf_counter()
+        resultados = MotorFormulas(grafo).evaluar_todo()
+        calculo = time.perf_counter() - inicio
+
+        # Evaluaciones que haría un recorrido recursivo sin memoria (tamaño del árbol expandido)
+        expandido = {}
+        for pk in grafo.orden_topologico():
+            expandido[pk] = 1 + sum(expandido[sub] for sub in grafo.subproductos(pk))
+        sin_memoria = sum(expandido.values())
+
+        ingredientes = max(len(r.composicion) for r in resultados.values())
+        self.stdout.write(f"Carga del grafo: {carga:.2f}s en {len(consultas)} consultas")
+        self.stdout.write(f"Evaluación de {len(resultados)} productos: {calculo:.2f}s ({len(resultados) / calculo:,.0f} productos/s)")
+        self.stdout.write(f"Máximo de materias primas en una fórmula aplanada: {ingredientes}")
+        self.stdout.write(f"Evaluaciones con memoria: {len(resultados)} / sin memoria: {sin_memoria:.3e}")
+
+        self.medir_nutricion(grafo, resultados)
+        self.medir_incremental()
+        self.medir_cumplimiento(grafo)
+
+    def medir_nutricion(self, grafo, resultados):
+        inicio = time.perf_counter()
+        calculadora = CalculadoraNutricional(grafo)
+        calculadora.matriz_perfiles()
+        primera = time.perf_counter() - inicio
+
+        # Cambia una materia prima y se recalcula todo el catálogo
+        InformacionNutricional.objects.filter(pk=InformacionNutricional.objects.values('pk')[:1]).update(sodio_mg=999)
+        inicio = time.perf_counter()
+        calculadora.actualizar_matriz()
+        calculadora.matriz_perfiles()
+        recalculo = time.perf_counter() - inicio
+
+        # Referencia: composición aplanada x nutrientes, producto por producto en Python
+        nutrientes = {
+            fila[0]: fila[1:]
+            for fila in InformacionNutricional.objects.values_list('materia_prima_id', *NUTRIENTES)
+        }
+        inicio = time.perf_counter()
+        for resultado in resultados.values():
+            perfil = [0.0] * len(NUTRIENTES)
+            for mp, porcentaje in resultado.composicion.items():
+                for j, valor in enumerate(nutrientes[mp]):
+                    perfil[j] += porcentaje / 100 * float(valor)
+        bucle = time.perf_counter() - inicio
+
+        self.stdout.write(f"Perfil nutricional del catálogo (NumPy): {primera:.2f}s la primera vez, {recalculo:.3f}s tras cambiar una MP")
+        self.stdout.write(f"Perfil nutricional producto por producto (Python): {bucle:.2f}s")
+
+    def medir_incremental(self):
+        # El catálogo se creó con bulk_create (sin señales): se construyen índice y totales
+        inicio = time.perf_counter()
+        IndiceDependencias.reconstruir()
+        total = RecalculoFormulas.recalcular_todo()
+        completo = time.perf_counter() - inicio
+
+        # Sube el costo de una materia prima de la primera fórmula (nivel más profundo)
+        materia = ItemFormula.objects.filter(materia_prima__isnull=False).order_by('id').values_list('materia_prima_id', flat=True)[0]
+        MateriaPrima.objects.filter(pk=materia).update(costo_kilo=99)
+        inicio = time.perf_counter()
+        with CaptureQueriesContext(connection) as consultas:
+            afectados = IndiceDependencias.afectados(materias=[materia])
+            RecalculoFormulas.recalcular(afectados)
+        incremental = time.perf_counter() - inicio
+
+        self.stdout.write(f"Recálculo completo (índice + {total} totales): {completo:.2f}s")
+        self.stdout.write(
+            f"Recálculo incremental tras cambiar una MP: {len(afectados)} productos afectados, "
+            f"{incremental:.3f}s en {len(consultas)} consultas"
+        )
+
+    def medir_cumplimiento(self, grafo):
+        inicio = time.perf_counter()
+        with CaptureQueriesContext(connection) as consultas:
+            resultados = VerificadorCumplimiento(grafo).verificar_todos()
+        lote = time.perf_counter() - inicio
+        incumplen = sum(1 for r in resultados.values() if not r.cumple)
+
+        # Validación de un solo producto (la que corre al guardar en el admin): el más anidado
+        producto = max(grafo.productos)
+        inicio = time.perf_counter()
+        with CaptureQueriesContext(connection) as consultas_uno:
+            VerificadorCumplimiento.para_producto(producto).verificar(producto)
+        uno = time.perf_counter() - inicio
+
+        self.stdout.write(
+            f"Cumplimiento normativo del catálogo: {lote:.2f}s en {len(consultas)} consultas "
+            f"({incumplen} productos incumplen)"
+        )
+        self.stdout.write(f"Cumplimiento de un producto al guardar: {uno:.3f}s en {len(consultas_uno)} consultas")
@@ -0,0 +1,27 @@
+"""
+ImasD\formulador\management\commands\recalcular_formulas.py
+
+Este archivo reconstruye el índice de dependencias y los totales de todos los productos
+
+Nota: Úsalo después de cargas masivas (bulk_create, importaciones, SQL directo),
+porque esas operaciones no disparan las señales del recálculo incremental.
+"""
+import time
+
+from django.core.management.base import BaseCommand
+
+from formulador.dependencias import IndiceDependencias, RecalculoFormulas
+
+
+class Command(BaseCommand):
+    help = 'Reconstruye DependenciaFormula y ProductoCalculado de todo el catálogo'
+
+    def handle(self, *args, **kwargs):
+        inicio = time.perf_counter()
+        dependencias = IndiceDependencias.reconstruir()
+        self.stdout.write(f"Índice de dependencias: {dependencias} filas ({time.perf_counter() - inicio:.2f}s)")
+
+        inicio = time.perf_counter()
+        productos = RecalculoFormulas.recalcular_todo()
+        self.stdout.write(f"Totales recalculados: {productos} productos ({time.perf_counter() - inicio:.2f}s)")
+        self.stdout.write(self.style.SUCCESS('PROCESO TERMINADO.'))
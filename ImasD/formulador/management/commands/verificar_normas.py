@@ -0,0 +1,41 @@
+"""
+ImasD\formulador\management\commands\verificar_normas.py
+
+Este archivo valida todas las fórmulas del catálogo contra los límites normativos (Codex)
+
+Uso: python manage.py verificar_normas [--estricto]
+Con --estricto el comando termina con error si algún producto incumple (para integrarlo a procesos automáticos)
+"""
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from formulador.cumplimiento import VerificadorCumplimiento
+
+
+class Command(BaseCommand):
+    help = 'Valida todo el catálogo contra LimiteNormativo y reporta los incumplimientos'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--estricto', action='store_true', help='Termina con error si hay incumplimientos')
+
+    def handle(self, *args, **options):
+        inicio = time.perf_counter()
+        resultados = VerificadorCumplimiento().verificar_todos()
+        duracion = time.perf_counter() - inicio
+
+        incumplen = [r for r in resultados.values() if not r.cumple]
+        for resultado in incumplen:
+            for incumplimiento in resultado.incumplimientos:
+                self.stdout.write(self.style.ERROR(f"{resultado.codigo}: {incumplimiento}"))
+
+        sin_limite = sum(1 for r in resultados.values() if r.sin_limite)
+        self.stdout.write(f"Productos revisados: {len(resultados)} en {duracion:.2f}s")
+        self.stdout.write(self.style.WARNING(f"Productos con aditivos sin límite registrado: {sin_limite}"))
+        if incumplen:
+            mensaje = f"{len(incumplen)} productos no cumplen la norma."
+            if options['estricto']:
+                raise CommandError(mensaje)
+            self.stdout.write(self.style.ERROR(mensaje))
+        else:
+            self.stdout.write(self.style.SUCCESS('Todos los productos cumplen la norma.'))
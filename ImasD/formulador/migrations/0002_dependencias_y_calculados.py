@@ -0,0 +1,56 @@
+# Generated by Django 4.2.25 on 2026-10-18 06:06
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def construir_indice(apps, schema_editor):
+    # Llena el índice con las fórmulas que ya existen
+    ItemFormula = apps.get_model('formulador', 'ItemFormula')
+    DependenciaFormula = apps.get_model('formulador', 'DependenciaFormula')
+    pares = ItemFormula.objects.values_list('producto_padre_id', 'materia_prima_id', 'sub_producto_id').distinct()
+    DependenciaFormula.objects.bulk_create([
+        DependenciaFormula(producto_id=producto, materia_prima_id=materia, sub_producto_id=sub)
+        for producto, materia, sub in pares
+    ], batch_size=5000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalogo', '0002_funciontecnologica'),
+        ('formulador', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductoCalculado',
+            fields=[
+                ('producto', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='calculado', serialize=False, to='formulador.producto')),
+                ('porcentaje_total', models.DecimalField(decimal_places=4, default=0, max_digits=10, verbose_name='% Total de la Fórmula')),
+                ('costo_kilo', models.DecimalField(decimal_places=4, default=0, max_digits=14, verbose_name='Costo por Kg')),
+                ('litros_por_kilo', models.DecimalField(decimal_places=6, default=0, max_digits=14, verbose_name='Litros por Kg')),
+                ('densidad', models.DecimalField(blank=True, decimal_places=4, max_digits=10, null=True, verbose_name='Densidad Calculada (g/ml)')),
+                ('fecha_calculo', models.DateTimeField(auto_now=True, verbose_name='Fecha del cálculo')),
+            ],
+            options={
+                'verbose_name': 'Producto Calculado',
+                'verbose_name_plural': 'Productos Calculados',
+            },
+        ),
+        migrations.CreateModel(
+            name='DependenciaFormula',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('materia_prima', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='dependientes', to='catalogo.materiaprima')),
+                ('producto', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='dependencias', to='formulador.producto')),
+                ('sub_producto', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='dependientes', to='formulador.producto')),
+            ],
+            options={
+                'verbose_name': 'Dependencia de Fórmula',
+                'verbose_name_plural': 'Dependencias de Fórmulas',
+                'indexes': [models.Index(fields=['materia_prima', 'producto'], name='dependencia_mp_idx'), models.Index(fields=['sub_producto', 'producto'], name='dependencia_sub_idx')],
+            },
+        ),
+        migrations.RunPython(construir_indice, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.25 on 2026-10-18 06:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('formulador', '0002_dependencias_y_calculados'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='producto',
+            name='categoria_alimento',
+            field=models.CharField(blank=True, help_text='Ej: 12.5 Sopas y caldos. Si está vacía se usa la categoría de la norma de cada renglón.', max_length=255, verbose_name='Categoría Alimento'),
+        ),
+    ]
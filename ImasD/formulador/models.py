@@ -22,6 +22,14 @@ class Producto(ModeloBase):
     nombre = models.CharField(max_length=200, verbose_name="Nombre del Producto")
     version_actual = models.PositiveIntegerField(default=1, verbose_name="Versión Matemática")
     estado = models.CharField(max_length=10, choices=ESTADOS, default='BORRADOR')
+
+    # Categoría del Codex (CXS 192) del alimento final: define qué límites normativos aplican
+    categoria_alimento = models.CharField(
+        max_length=255,
+        blank=True,
+        verbose_name="Categoría Alimento",
+        help_text="Ej: 12.5 Sopas y caldos. Si está vacía se usa la categoría de la norma de cada renglón."
+    )
     
     # --- VARIABLES PARA CÁLCULOS ---
     cantidad_base_lote = models.DecimalField(
@@ -160,4 +168,49 @@ class HistorialFichas(models.Model):
         verbose_name_plural = "Historial de Fichas"
 
     def __str__(self):
-        return f"PDF v{self.version} - {self.producto.codigo}"
\ No newline at end of file
+        return f"PDF v{self.version} - {self.producto.codigo}"
+# --- 4. ÍNDICE DE DEPENDENCIAS (QUIÉN USA A QUIÉN) ---
+class DependenciaFormula(models.Model):
+    """
+    Índice inverso de las fórmulas: una fila por ingrediente distinto de cada producto.
+    Responde rápido "¿qué productos usan esta MP / este sub-producto?".
+
+    Nota: Lo mantienen las señales de ItemFormula (formulador/signals.py).
+    Tras cargas masivas se reconstruye con: python manage.py recalcular_formulas
+    """
+    producto = models.ForeignKey(Producto, on_delete=models.CASCADE, related_name='dependencias')
+    materia_prima = models.ForeignKey(MateriaPrima, on_delete=models.CASCADE, null=True, blank=True, related_name='dependientes')
+    sub_producto = models.ForeignKey(Producto, on_delete=models.CASCADE, null=True, blank=True, related_name='dependientes')
+
+    class Meta:
+        verbose_name = "Dependencia de Fórmula"
+        verbose_name_plural = "Dependencias de Fórmulas"
+        indexes = [
+            # Búsqueda inversa: del ingrediente a los productos que lo usan
+            models.Index(fields=['materia_prima', 'producto'], name='dependencia_mp_idx'),
+            models.Index(fields=['sub_producto', 'producto'], name='dependencia_sub_idx'),
+        ]
+
+    def __str__(self):
+        ingrediente = self.materia_prima_id or self.sub_producto_id
+        return f"{self.producto_id} usa {ingrediente}"
+
+# --- 5. TOTALES CALCULADOS (VISTA MATERIALIZADA) ---
+class ProductoCalculado(models.Model):
+    """
+    Totales de la fórmula aplanada de cada producto, guardados para no recalcular en cada consulta.
+    Se actualizan solo los productos afectados por cada cambio (formulador/dependencias.py).
+    """
+    producto = models.OneToOneField(Producto, on_delete=models.CASCADE, primary_key=True, related_name='calculado')
+    porcentaje_total = models.DecimalField(max_digits=10, decimal_places=4, default=0, verbose_name="% Total de la Fórmula")
+    costo_kilo = models.DecimalField(max_digits=14, decimal_places=4, default=0, verbose_name="Costo por Kg")
+    litros_por_kilo = models.DecimalField(max_digits=14, decimal_places=6, default=0, verbose_name="Litros por Kg")
+    densidad = models.DecimalField(max_digits=10, decimal_places=4, null=True, blank=True, verbose_name="Densidad Calculada (g/ml)")
+    fecha_calculo = models.DateTimeField(auto_now=True, verbose_name="Fecha del cálculo")
+
+    class Meta:
+        verbose_name = "Producto Calculado"
+        verbose_name_plural = "Productos Calculados"
+
+    def __str__(self):
+        return f"{self.producto_id}: {self.costo_kilo}/Kg"
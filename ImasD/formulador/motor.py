@@ -0,0 +1,273 @@
+"""
+ImasD\formulador\motor.py
+
+Descripcion: Motor de cálculo de las fórmulas (lista de materiales recursiva).
+
+Un ItemFormula apunta a una Materia Prima o a un Sub-Producto, y ese sub-producto
+tiene a su vez su propia fórmula. Este archivo "aplana" ese árbol:
+
+- Composición final: % de cada Materia Prima en el producto terminado.
+- Kilos por lote (Variable VERDE): composición x cantidad_base_lote.
+- Volumen (Variable MORADA): cada ingrediente aporta fracción / densidad. Las MP usan
+  su densidad y los sub-productos su densidad_teorica.
+- Costo por Kg: suma de fracción x costo_kilo de cada ingrediente.
+
+Responsabilidad: Cargar todo el catálogo en memoria con 3 consultas (GrafoFormulas),
+detectar fórmulas cíclicas y evaluar cada producto una sola vez (MotorFormulas).
+Un sub-producto compartido por muchos padres se calcula una vez y se reutiliza.
+
+NOTA: Se calcula con float por velocidad. Si se guarda el resultado en la base de
+datos se redondea a los decimales de cada columna.
+"""
+from collections import defaultdict
+from dataclasses import dataclass, field
+
+from catalogo.models import MateriaPrima
+from .models import Producto, ItemFormula
+
+# Estados del recorrido en profundidad
+_EN_CURSO = 1
+_LISTO = 2
+
+
+class ErrorFormula(Exception):
+    """
+    La fórmula tiene datos con los que no se puede calcular
+    """
+
+
+class FormulaCiclica(ErrorFormula):
+    """
+    Un producto termina siendo ingrediente de sí mismo (A -> B -> A)
+    """
+    def __init__(self, ciclo):
+        # Códigos de los productos del ciclo, ej: ['PP1', 'PP2', 'PP1']
+        self.ciclo = ciclo
+        super().__init__("Fórmula cíclica: " + " -> ".join(ciclo))
+
+
+@dataclass
+class ResultadoFormula:
+    """
+    Resultado aplanado de la fórmula de un producto
+    """
+    producto_id: int
+    base_lote: float
+    # Suma de cantidad_porcentaje de los renglones directos (lo normal es 100)
+    porcentaje_total: float = 0.0
+    # {materia_prima_id: % de esa MP en el producto terminado}
+    composicion: dict = field(default_factory=dict)
+    costo_kilo: float = 0.0
+    # Litros que ocupan los ingredientes de 1 Kg de producto
+    litros_por_kilo: float = 0.0
+
+    @property
+    def kilos_lote(self):
+        """
+        Kilos de cada Materia Prima para fabricar cantidad_base_lote
+        """
+        return {mp: porcentaje / 100 * self.base_lote for mp, porcentaje in self.composicion.items()}
+
+    @property
+    def volumen_lote(self):
+        """
+        Litros del lote completo
+        """
+        return self.litros_por_kilo * self.base_lote
+
+    @property
+    def densidad(self):
+        """
+        Densidad calculada (g/ml) a partir de los ingredientes. None si la fórmula está vacía
+        """
+        if not self.litros_por_kilo:
+            return None
+        return (self.porcentaje_total / 100) / self.litros_por_kilo
+
+
+class GrafoFormulas:
+    """
+    Catálogo completo en diccionarios (sin objetos del ORM)
+    """
+    def __init__(self, productos, renglones, materias):
+        # {producto_id: (codigo, cantidad_base_lote, densidad_teorica)}
+        self.productos = productos
+        # {producto_padre_id: [(materia_prima_id, sub_producto_id, fraccion), ...]}
+        self.renglones = renglones
+        # {materia_prima_id: (densidad, costo_kilo)}
+        self.materias = materias
+        # Productos cuyas fórmulas se leyeron (None: todo el catálogo)
+        self.cargados = None
+
+    @classmethod
+    def cargar(cls, productos=None, chunk_size=5000):
+        """
+        Carga el catálogo con 3 consultas (renglones, productos y materias primas)
+
+        args: productos (ids): si se da, solo las fórmulas de esos productos
+        (y los datos de sus sub-productos directos, sin sus fórmulas)
+        """
+        consulta = ItemFormula.objects.all()
+        if productos is not None:
+            consulta = consulta.filter(producto_padre_id__in=productos)
+        renglones = cls._leer_renglones(consulta, chunk_size)
+        return cls._completar(renglones, productos, chunk_size)
+
+    @classmethod
+    def cargar_arbol(cls, raices, chunk_size=5000):
+        """
+        Solo las fórmulas alcanzables desde raices: una consulta por nivel de anidación
+        más 2 (productos y materias primas). Sirve para validar un producto sin cargar
+        el catálogo completo.
+        """
+        renglones = {}
+        cargados = set()
+        pendientes = set(raices)
+        while pendientes:
+            nivel = cls._leer_renglones(ItemFormula.objects.filter(producto_padre_id__in=pendientes), chunk_size)
+            renglones.update(nivel)
+            cargados |= pendientes
+            pendientes = {sub for filas in nivel.values() for _, sub, _ in filas if sub is not None} - cargados
+        return cls._completar(renglones, cargados, chunk_size)
+
+    @staticmethod
+    def _leer_renglones(consulta, chunk_size):
+        renglones = defaultdict(list)
+        consulta = consulta.order_by('id').values_list(
+            'producto_padre_id', 'materia_prima_id', 'sub_producto_id', 'cantidad_porcentaje'
+        )
+        for padre, materia, sub, porcentaje in consulta.iterator(chunk_size=chunk_size):
+            renglones[padre].append((materia, sub, float(porcentaje) / 100))
+        return dict(renglones)
+
+    @classmethod
+    def _completar(cls, renglones, productos, chunk_size):
+        # Cabeceras de producto y materias primas de los renglones leídos
+        cabeceras = Producto.objects.all()
+        materias = MateriaPrima.objects.all()
+        if productos is not None:
+            usados = [r for filas in renglones.values() for r in filas]
+            cabeceras = cabeceras.filter(id__in=set(productos) | {sub for _, sub, _ in usados if sub is not None})
+            materias = materias.filter(id__in={mp for mp, _, _ in usados if mp is not None})
+
+        cabeceras = {
+            pk: (codigo, float(base), float(densidad))
+            for pk, codigo, base, densidad in cabeceras.values_list(
+                'id', 'codigo', 'cantidad_base_lote', 'densidad_teorica'
+            ).iterator(chunk_size=chunk_size)
+        }
+        materias = {
+            pk: (float(densidad), float(costo))
+            for pk, densidad, costo in materias.values_list(
+                'id', 'densidad', 'costo_kilo'
+            ).iterator(chunk_size=chunk_size)
+        }
+        grafo = cls(cabeceras, renglones, materias)
+        if productos is not None:
+            grafo.cargados = set(productos)
+        return grafo
+
+    def subproductos(self, producto_id):
+        return [sub for _, sub, _ in self.renglones.get(producto_id, ()) if sub is not None]
+
+    def orden_topologico(self, raices=None, listos=()):
+        """
+        Productos alcanzables desde raices (todos si es None), cada sub-producto antes que sus padres.
+
+        args: raices (ids de producto por donde empezar)
+        listos (ids ya calculados: no se recorren ni se devuelven)
+
+        return lista de ids
+
+        Nota: El recorrido usa una pila propia (no recursión) para soportar anidaciones
+        profundas. Lanza FormulaCiclica si un producto se contiene a sí mismo.
+        """
+        estado = {}
+        orden = []
+        for raiz in (self.productos if raices is None else raices):
+            if raiz in estado or raiz in listos:
+                continue
+            estado[raiz] = _EN_CURSO
+            pila = [(raiz, iter(self.subproductos(raiz)))]
+            while pila:
+                nodo, hijos = pila[-1]
+                for hijo in hijos:
+                    if hijo in listos:
+                        continue
+                    marca = estado.get(hijo)
+                    if marca is None:
+                        # Bajamos un nivel
+                        estado[hijo] = _EN_CURSO
+                        pila.append((hijo, iter(self.subproductos(hijo))))
+                        break
+                    if marca == _EN_CURSO:
+                        # El hijo está en el camino actual: ciclo
+                        camino = [n for n, _ in pila]
+                        ciclo = camino[camino.index(hijo):] + [hijo]
+                        raise FormulaCiclica([self.productos[n][0] for n in ciclo])
+                else:
+                    # Todos los hijos listos: el nodo también
+                    pila.pop()
+                    estado[nodo] = _LISTO
+                    orden.append(nodo)
+        return orden
+
+
+class MotorFormulas:
+    """
+    Evalúa fórmulas sobre un GrafoFormulas guardando (memoizando) cada resultado
+    """
+    def __init__(self, grafo=None, conocidos=None):
+        self.grafo = grafo if grafo is not None else GrafoFormulas.cargar()
+        # conocidos: resultados ya calculados ({producto_id: ResultadoFormula}) que no se recalculan
+        self._memo = dict(conocidos or {})
+
+    def evaluar(self, producto_id):
+        """
+        return ResultadoFormula del producto (calcula antes los sub-productos que falten)
+        """
+        if producto_id not in self._memo:
+            for pk in self.grafo.orden_topologico([producto_id], listos=self._memo):
+                self._memo[pk] = self._calcular(pk)
+        return self._memo[producto_id]
+
+    def evaluar_todo(self):
+        """
+        return {producto_id: ResultadoFormula} de todo el catálogo
+        """
+        for pk in self.grafo.orden_topologico(listos=self._memo):
+            self._memo[pk] = self._calcular(pk)
+        return self._memo
+
+    def _calcular(self, producto_id):
+        # Los sub-productos ya están en self._memo (orden topológico)
+        codigo, base_lote, _ = self.grafo.productos[producto_id]
+        resultado = ResultadoFormula(producto_id=producto_id, base_lote=base_lote)
+        composicion = defaultdict(float)
+        total = costo = litros = 0.0
+
+        for materia, sub, fraccion in self.grafo.renglones.get(producto_id, ()):
+            if materia is not None and sub is None:
+                densidad, costo_ingrediente = self.grafo.materias[materia]
+                composicion[materia] += fraccion * 100
+            elif sub is not None and materia is None:
+                hijo = self._memo[sub]
+                densidad = self.grafo.productos[sub][2]
+                costo_ingrediente = hijo.costo_kilo
+                for mp, porcentaje in hijo.composicion.items():
+                    composicion[mp] += fraccion * porcentaje
+            else:
+                raise ErrorFormula(f"{codigo}: cada renglón debe tener una Materia Prima o un Sub-Producto (solo uno).")
+
+            if densidad <= 0:
+                raise ErrorFormula(f"{codigo}: un ingrediente tiene densidad {densidad}; debe ser mayor que cero.")
+
+            total += fraccion
+            costo += fraccion * costo_ingrediente
+            litros += fraccion / densidad
+
+        resultado.porcentaje_total = total * 100
+        resultado.composicion = dict(composicion)
+        resultado.costo_kilo = costo
+        resultado.litros_por_kilo = litros
+        return resultado
@@ -0,0 +1,159 @@
+"""
+ImasD\formulador\nutricion.py
+
+Descripcion: Calculadora del perfil nutricional de los productos con NumPy.
+
+InformacionNutricional guarda cada nutriente por 100 g de Materia Prima. El perfil de
+un producto por 100 g es la suma de fracción x nutrientes de cada ingrediente:
+
+    perfil(producto) = sum(fraccion_mp x nutrientes_mp) + sum(fraccion_sub x perfil(sub))
+
+Responsabilidad:
+- MatrizNutricional: todos los nutrientes en un solo arreglo (materias x nutrientes), 1 consulta.
+- CalculadoraNutricional.perfil: un producto (composición aplanada del MotorFormulas x matriz).
+- CalculadoraNutricional.perfiles: todo el catálogo a la vez. Los renglones de las fórmulas
+  quedan como una matriz dispersa (arreglos de fila, columna y fracción) y se resuelven
+  nivel por nivel: primero las fórmulas que solo tienen MP, luego las que usan esas, etc.
+
+NOTA: Tras cambiar la información nutricional de una MP basta con actualizar_matriz()
+y volver a llamar perfiles(): la estructura de las fórmulas no se vuelve a cargar.
+"""
+import numpy as np
+
+from catalogo.models import InformacionNutricional
+from .motor import GrafoFormulas, MotorFormulas, ErrorFormula
+
+# Columnas de InformacionNutricional (por 100 g) en el orden de la matriz
+NUTRIENTES = (
+    'sodio_mg',
+    'azucares_g',
+    'azucares_anadidos_g',
+    'grasa_total_g',
+    'grasa_saturada_g',
+    'proteina_g',
+    'carbohidratos_g',
+)
+
+
+class MatrizNutricional:
+    """
+    Nutrientes de todas las materias primas: una fila por MP, una columna por nutriente
+    """
+    def __init__(self, ids, valores):
+        # {materia_prima_id: fila}
+        self.indice = {pk: fila for fila, pk in enumerate(ids)}
+        # La última fila es de ceros: la usan las MP sin información nutricional
+        self.valores = np.vstack([np.asarray(valores, dtype=np.float64).reshape(-1, len(NUTRIENTES)),
+                                  np.zeros((1, len(NUTRIENTES)))])
+
+    @classmethod
+    def cargar(cls):
+        filas = list(InformacionNutricional.objects.values_list('materia_prima_id', *NUTRIENTES))
+        return cls([fila[0] for fila in filas], [fila[1:] for fila in filas])
+
+    def filas(self, materias):
+        """
+        return arreglo con la fila de cada materia prima (la de ceros si no tiene información)
+        """
+        vacia = len(self.valores) - 1
+        return np.fromiter((self.indice.get(mp, vacia) for mp in materias), dtype=np.int64, count=len(materias))
+
+
+class CalculadoraNutricional:
+    """
+    Perfil nutricional por 100 g de uno o de todos los productos
+    """
+    def __init__(self, grafo=None, matriz=None):
+        self.grafo = grafo if grafo is not None else GrafoFormulas.cargar()
+        self.matriz = matriz if matriz is not None else MatrizNutricional.cargar()
+        self.motor = MotorFormulas(self.grafo)
+        self._estructura = None
+
+    def actualizar_matriz(self):
+        """
+        Vuelve a leer InformacionNutricional (tras editar una materia prima)
+        """
+        self.matriz = MatrizNutricional.cargar()
+        if self._estructura is not None:
+            self._estructura['columnas_mp'] = self.matriz.filas(self._estructura['materias'])
+
+    def perfil(self, producto_id):
+        """
+        return {nutriente: valor por 100 g} de un producto
+        """
+        composicion = self.motor.evaluar(producto_id).composicion
+        fracciones = np.fromiter(composicion.values(), dtype=np.float64, count=len(composicion)) / 100
+        valores = fracciones @ self.matriz.valores[self.matriz.filas(list(composicion))]
+        return self._a_diccionario(valores)
+
+    def perfiles(self):
+        """
+        return {producto_id: {nutriente: valor por 100 g}} de todo el catálogo
+        """
+        ids, valores = self.matriz_perfiles()
+        return {int(pk): self._a_diccionario(fila) for pk, fila in zip(ids, valores)}
+
+    def matriz_perfiles(self):
+        """
+        return (ids de producto, arreglo productos x nutrientes)
+        """
+        e = self._preparar()
+        perfiles = np.zeros((len(e['ids']), len(NUTRIENTES)))
+
+        # Aporte directo de las materias primas: matriz dispersa x matriz nutricional
+        aporte = e['fraccion_mp'][:, None] * self.matriz.valores[e['columnas_mp']]
+        for j in range(len(NUTRIENTES)):
+            perfiles[:, j] = np.bincount(e['filas_mp'], weights=aporte[:, j], minlength=len(e['ids']))
+
+        # Aporte de los sub-productos, un nivel a la vez (los hijos ya están completos)
+        for filas, columnas, fracciones in e['niveles']:
+            aporte = fracciones[:, None] * perfiles[columnas]
+            for j in range(len(NUTRIENTES)):
+                perfiles[:, j] += np.bincount(filas, weights=aporte[:, j], minlength=len(e['ids']))
+        return e['ids'], perfiles
+
+    def _preparar(self):
+        # Convierte las fórmulas en arreglos una sola vez (no dependen de los nutrientes)
+        if self._estructura is not None:
+            return self._estructura
+
+        orden = self.grafo.orden_topologico()
+        posicion = {pk: i for i, pk in enumerate(orden)}
+        nivel = {}
+        filas_mp, materias, fraccion_mp = [], [], []
+        aristas = []  # (producto padre, fila del hijo, fracción)
+        for pk in orden:
+            nivel[pk] = 0
+            for materia, sub, fraccion in self.grafo.renglones.get(pk, ()):
+                if (materia is None) == (sub is None):
+                    raise ErrorFormula(f"{self.grafo.productos[pk][0]}: cada renglón debe tener una Materia Prima o un Sub-Producto (solo uno).")
+                if sub is not None:
+                    nivel[pk] = max(nivel[pk], nivel[sub] + 1)
+                    aristas.append((pk, posicion[sub], fraccion))
+                else:
+                    filas_mp.append(posicion[pk])
+                    materias.append(materia)
+                    fraccion_mp.append(fraccion)
+
+        por_nivel = {}
+        for padre, hijo, fraccion in aristas:
+            por_nivel.setdefault(nivel[padre], []).append((posicion[padre], hijo, fraccion))
+        niveles = []
+        for n in sorted(por_nivel):
+            filas, columnas, fracciones = zip(*por_nivel[n])
+            niveles.append((np.array(filas), np.array(columnas), np.array(fracciones)))
+
+        self._estructura = {
+            'ids': np.array(orden, dtype=np.int64),
+            'materias': materias,
+            'filas_mp': np.array(filas_mp, dtype=np.int64),
+            'columnas_mp': self.matriz.filas(materias),
+            'fraccion_mp': np.array(fraccion_mp, dtype=np.float64),
+            'niveles': niveles,
+        }
+        return self._estructura
+
+    @staticmethod
+    def _a_diccionario(valores):
+        # Tres decimales, como las columnas de InformacionNutricional
+        return {nutriente: round(float(valor), 3) for nutriente, valor in zip(NUTRIENTES, valores)}
@@ -0,0 +1,55 @@
+"""
+ImasD\formulador\signals.py
+
+Descripcion: Señales que mantienen el índice de dependencias y programan el recálculo
+incremental de ProductoCalculado (formulador/dependencias.py).
+
+Nota: bulk_create, bulk_update y QuerySet.update no disparan señales. Después de una
+carga masiva se debe ejecutar: python manage.py recalcular_formulas
+"""
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.dispatch import receiver
+
+from catalogo.models import MateriaPrima
+from .models import Producto, ItemFormula
+from .dependencias import IndiceDependencias, programar
+
+
+def _cambio(sender, instance, campos):
+    # Compara contra lo guardado en la base de datos (una consulta por guardado)
+    if instance.pk is None:
+        return False
+    anterior = sender.objects.filter(pk=instance.pk).values_list(*campos).first()
+    # to_python: el formulario puede traer '1.6' (texto) donde la base de datos tiene Decimal('1.6000')
+    actual = tuple(sender._meta.get_field(campo).to_python(getattr(instance, campo)) for campo in campos)
+    return anterior is not None and anterior != actual
+
+
+@receiver(pre_save, sender=MateriaPrima)
+def detectar_cambio_materia_prima(sender, instance, **kwargs):
+    instance._recalcular_formulas = _cambio(sender, instance, ('costo_kilo', 'densidad'))
+
+
+@receiver(post_save, sender=MateriaPrima)
+def recalcular_por_materia_prima(sender, instance, **kwargs):
+    if getattr(instance, '_recalcular_formulas', False):
+        programar(materias=[instance.pk])
+
+
+@receiver(pre_save, sender=Producto)
+def detectar_cambio_densidad(sender, instance, **kwargs):
+    instance._recalcular_formulas = _cambio(sender, instance, ('densidad_teorica',))
+
+
+@receiver(post_save, sender=Producto)
+def recalcular_por_densidad(sender, instance, **kwargs):
+    # La densidad_teorica solo la usan los padres (cuando el producto es sub-producto)
+    if getattr(instance, '_recalcular_formulas', False):
+        programar(sub_productos=[instance.pk])
+
+
+@receiver(post_save, sender=ItemFormula)
+@receiver(post_delete, sender=ItemFormula)
+def recalcular_por_renglon(sender, instance, **kwargs):
+    IndiceDependencias.actualizar([instance.producto_padre_id])
+    programar(productos=[instance.producto_padre_id])
@@ -0,0 +1 @@
+# Esto es un paquete
\ No newline at end of file
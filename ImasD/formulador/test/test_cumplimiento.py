@@ -0,0 +1,168 @@
+"""
+ImasD\formulador\test\test_cumplimiento.py
+
+Descripcion: Este archivo se encarga del testing del verificador normativo (formulador/cumplimiento.py)
+"""
+from django.forms.models import inlineformset_factory
+
+from catalogo.models import MateriaPrima, LimiteNormativo
+from formulador.admin import ItemFormulaFormSet
+from formulador.cumplimiento import IndiceNormativo, VerificadorCumplimiento, normalizar_ins, normalizar_categoria
+from formulador.models import Producto, ItemFormula
+from formulador.test.test_motor import FormulaDePrueba
+
+
+class FormulaConConservante(FormulaDePrueba):
+    """
+    PP-CONSERVANTE = 10% BENZOATO (INS 211, límite 1000 ppm en 12.5) + 90% AGUA
+    PP-SOPA (categoría 12.5.1) = 1% PP-CONSERVANTE + 99% AGUA -> 1000 ppm de benzoato
+    """
+    def setUp(self):
+        super().setUp()
+        self.benzoato = MateriaPrima.objects.create(codigo="MP-BENZ", nombre="Benzoato de sodio")
+        self.norma = LimiteNormativo.objects.create(
+            codigo_ins="INS 211", nombre_aditivo="Benzoato de sodio",
+            categoria_alimento="12.5 Sopas y caldos", limite_maximo_ppm=1000,
+        )
+        self.conservante = self.producto("PP-CONSERVANTE")
+        self.renglon_benzoato = self.item(self.conservante, 10, materia_prima=self.benzoato, norma_asociada=self.norma)
+        self.item(self.conservante, 90, materia_prima=self.agua)
+        self.sopa = self.producto("PP-SOPA", categoria_alimento="12.5.1 Caldos y consomés")
+        self.item(self.sopa, 1, sub_producto=self.conservante)
+        self.item(self.sopa, 99, materia_prima=self.agua)
+
+
+class VerificadorCumplimientoTest(FormulaConConservante):
+    """
+    Testing del verificador normativo
+    """
+    def test_normalizacion(self):
+        self.assertEqual(normalizar_ins(" ins 211 "), "211")
+        self.assertEqual(normalizar_ins("160a"), "160A")
+        self.assertEqual(normalizar_categoria("12.5.1 Caldos"), "12.5.1")
+        self.assertEqual(normalizar_categoria(" General "), "general")
+
+    def test_ppm_efectivas_siguiendo_subproductos(self):
+        resultado = VerificadorCumplimiento().verificar(self.sopa.id)
+        self.assertAlmostEqual(resultado.ppm["211"], 1000)
+        # 12.5.1 no tiene límite propio: aplica el de 12.5
+        self.assertTrue(resultado.cumple)
+
+    def test_aditivo_por_varios_caminos_se_suma(self):
+        self.item(self.sopa, 0.5, sub_producto=self.conservante)
+        resultado = VerificadorCumplimiento().verificar(self.sopa.id)
+
+        self.assertAlmostEqual(resultado.ppm["211"], 1500)
+        [incumplimiento] = resultado.incumplimientos
+        self.assertEqual(incumplimiento.codigo_ins, "211")
+        self.assertEqual(incumplimiento.limite_ppm, 1000)
+        self.assertEqual(incumplimiento.categoria, "12.5.1 Caldos y consomés")
+
+    def test_porcentaje_uso(self):
+        self.renglon_benzoato.porcentaje_uso = 1
+        self.renglon_benzoato.save()
+        # Sin categoría propia se usa la de la norma: 10% x 1% = 1000 ppm
+        resultado = VerificadorCumplimiento().verificar(self.conservante.id)
+        self.assertAlmostEqual(resultado.ppm["211"], 1000)
+        self.assertTrue(resultado.cumple)
+
+    def test_catalogo_completo_en_un_lote(self):
+        with self.assertNumQueries(6):  # grafo (3), límites, aditivos y categorías
+            resultados = VerificadorCumplimiento().verificar_todos()
+        self.assertFalse(resultados[self.conservante.id].cumple)  # 100.000 ppm en 12.5
+        self.assertTrue(resultados[self.sopa.id].cumple)
+        self.assertEqual(resultados[self.bebida.id].ppm, {})
+
+    def test_un_producto_carga_solo_su_arbol(self):
+        verificador = VerificadorCumplimiento.para_producto(self.sopa.id)
+        self.assertNotIn(self.bebida.id, verificador.grafo.productos)
+        self.assertEqual(verificador.verificar(self.sopa.id), VerificadorCumplimiento().verificar(self.sopa.id))
+
+    def test_limites_repetidos_gana_el_mas_estricto(self):
+        LimiteNormativo.objects.create(codigo_ins="211", nombre_aditivo="Benzoato", categoria_alimento="12.5", limite_maximo_ppm=500)
+        LimiteNormativo.objects.create(codigo_ins="211", nombre_aditivo="Benzoato", categoria_alimento="12.5", limite_maximo_ppm=None)
+        indice = IndiceNormativo.cargar()
+        self.assertEqual(indice.buscar("211", "12.5.1.2")[0], 500)
+        self.assertIsNone(indice.buscar("211", "14.1"))
+
+    def test_aditivo_sin_limite(self):
+        self.sopa.categoria_alimento = "14.1 Bebidas"
+        self.sopa.save()
+        resultado = VerificadorCumplimiento().verificar(self.sopa.id)
+        self.assertTrue(resultado.cumple)
+        self.assertEqual(resultado.sin_limite, ["211"])
+
+
+class FormulaAdminCumplimientoTest(FormulaConConservante):
+    """
+    El formset del admin bloquea el guardado de fórmulas que incumplen, también en los ancestros.
+    PP-CONSERVANTE pasa a 14.1 (sin límite) para que solo PP-SOPA pueda incumplir.
+    """
+    def setUp(self):
+        super().setUp()
+        self.conservante.categoria_alimento = "14.1 Bebidas"
+        self.conservante.save()
+        self.FormSet = inlineformset_factory(
+            Producto, ItemFormula, formset=ItemFormulaFormSet, fk_name="producto_padre",
+            fields=('materia_prima', 'sub_producto', 'cantidad_porcentaje', 'porcentaje_uso', 'funcion', 'norma_asociada'),
+        )
+
+    def formset(self, producto, filas):
+        """filas: dicts con los campos del renglón; los que traen 'id' son renglones existentes"""
+        prefijo = self.FormSet.get_default_prefix()
+        filas = sorted(filas, key=lambda fila: 'id' not in fila)
+        datos = {
+            f'{prefijo}-TOTAL_FORMS': len(filas),
+            f'{prefijo}-INITIAL_FORMS': sum('id' in fila for fila in filas),
+        }
+        for i, fila in enumerate(filas):
+            fila = {'funcion': self.funcion.pk, 'porcentaje_uso': 100, **fila}
+            for campo, valor in fila.items():
+                datos[f'{prefijo}-{i}-{campo}'] = valor
+        return self.FormSet(datos, instance=producto, prefix=prefijo)
+
+    def filas_conservante(self, benzoato):
+        agua = ItemFormula.objects.get(producto_padre=self.conservante, materia_prima=self.agua)
+        return [
+            {'id': self.renglon_benzoato.pk, 'materia_prima': self.benzoato.pk, 'cantidad_porcentaje': benzoato, 'norma_asociada': self.norma.pk},
+            {'id': agua.pk, 'materia_prima': self.agua.pk, 'cantidad_porcentaje': 100 - benzoato},
+        ]
+
+    def test_formula_que_incumple_no_se_guarda(self):
+        formset = self.formset(self.sopa, [
+            {'sub_producto': self.conservante.pk, 'cantidad_porcentaje': 2},
+        ])
+        self.assertFalse(formset.is_valid())
+        self.assertIn("PP-SOPA no cumple la norma", formset.non_form_errors()[0])
+        self.assertEqual(ItemFormula.objects.filter(producto_padre=self.sopa).count(), 2)
+
+    def test_subproducto_editado_revisa_sus_ancestros(self):
+        # PP-CONSERVANTE no tiene límite propio, pero con 20% de benzoato PP-SOPA llega a 2000 ppm
+        formset = self.formset(self.conservante, self.filas_conservante(20))
+        self.assertFalse(formset.is_valid())
+        [error] = formset.non_form_errors()
+        self.assertIn("PP-SOPA no cumple la norma", error)
+
+    def test_formula_que_cumple_se_guarda(self):
+        formset = self.formset(self.conservante, self.filas_conservante(5))
+        self.assertTrue(formset.is_valid(), formset.non_form_errors())
+        self.assertEqual(formset.cumplimiento.sin_limite, ["211"])
+        formset.save()
+        self.renglon_benzoato.refresh_from_db()
+        self.assertEqual(self.renglon_benzoato.cantidad_porcentaje, 5)
+
+    def test_producto_nuevo(self):
+        nuevo = Producto(codigo="PP-CREMA", nombre="Crema", categoria_alimento="12.5 Sopas", creado_por=self.usuario)
+        formset = self.formset(nuevo, [
+            {'sub_producto': self.conservante.pk, 'cantidad_porcentaje': 2},
+            {'materia_prima': self.agua.pk, 'cantidad_porcentaje': 98},
+        ])
+        self.assertFalse(formset.is_valid())
+        self.assertIn("PP-CREMA no cumple la norma", formset.non_form_errors()[0])
+
+    def test_ciclo_no_se_guarda(self):
+        formset = self.formset(self.conservante, self.filas_conservante(5) + [
+            {'sub_producto': self.sopa.pk, 'cantidad_porcentaje': 1},
+        ])
+        self.assertFalse(formset.is_valid())
+        self.assertTrue(formset.non_form_errors())
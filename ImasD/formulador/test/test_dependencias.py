@@ -0,0 +1,90 @@
+"""
+ImasD\formulador\test\test_dependencias.py
+
+Descripcion: Este archivo se encarga del testing del recálculo incremental (formulador/dependencias.py)
+
+Nota: Los tests corren dentro de una transacción que nunca confirma; captureOnCommitCallbacks
+ejecuta los recálculos programados para el momento del commit.
+"""
+from decimal import Decimal
+from unittest import mock
+
+from formulador.dependencias import IndiceDependencias, RecalculoFormulas
+from formulador.models import ItemFormula, DependenciaFormula, ProductoCalculado
+from catalogo.models import MateriaPrima
+from formulador.test.test_motor import FormulaDePrueba
+
+
+class RecalculoIncrementalTest(FormulaDePrueba):
+    """
+    JARABE cuesta 0.6 x 1 + 0.4 x 4 = 2.2 / BEBIDA cuesta 0.5 x 2.2 + 0.5 x 1 = 1.6
+    """
+    def setUp(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            super().setUp()
+            self.sal = MateriaPrima.objects.create(codigo="MP-SAL", nombre="Sal", costo_kilo=2)
+            self.salmuera = self.producto("PP-SALMUERA")
+            self.item(self.salmuera, 100, materia_prima=self.sal)
+
+    def costo(self, producto):
+        return ProductoCalculado.objects.get(producto=producto).costo_kilo
+
+    def test_indice_mantenido_por_las_senales(self):
+        dependencias = set(DependenciaFormula.objects.filter(producto=self.bebida).values_list('materia_prima_id', 'sub_producto_id'))
+        self.assertEqual(dependencias, {(self.agua.id, None), (None, self.jarabe.id)})
+
+    def test_totales_calculados_al_guardar_la_formula(self):
+        self.assertEqual(self.costo(self.jarabe), Decimal('2.2'))
+        self.assertEqual(self.costo(self.bebida), Decimal('1.6'))
+        self.assertEqual(self.costo(self.salmuera), Decimal('2'))
+
+    def test_cambio_de_costo_recalcula_solo_los_afectados(self):
+        self.assertEqual(IndiceDependencias.afectados(materias=[self.azucar.id]), {self.jarabe.id, self.bebida.id})
+
+        self.azucar.costo_kilo = 9
+        with mock.patch.object(RecalculoFormulas, 'recalcular', wraps=RecalculoFormulas.recalcular) as recalcular:
+            with self.captureOnCommitCallbacks(execute=True):
+                self.azucar.save()
+        self.assertEqual(recalcular.call_args.args[0], {self.jarabe.id, self.bebida.id})
+        self.assertEqual(self.costo(self.jarabe), Decimal('4.2'))  # 0.6 + 0.4 x 9
+        self.assertEqual(self.costo(self.bebida), Decimal('2.6'))  # 0.5 x 4.2 + 0.5
+
+    def test_cambio_sin_efecto_no_programa_recalculo(self):
+        self.azucar.nombre = "Azúcar refinada"
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.azucar.save()
+        self.assertEqual(callbacks, [])
+
+    def test_densidad_teorica_afecta_solo_a_los_padres(self):
+        self.assertEqual(IndiceDependencias.afectados(sub_productos=[self.jarabe.id]), {self.bebida.id})
+
+        self.jarabe.densidad_teorica = Decimal('0.5')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.jarabe.save()
+        calculado = ProductoCalculado.objects.get(producto=self.bebida)
+        self.assertEqual(calculado.litros_por_kilo, Decimal('1.5'))  # 0.5 / 0.5 + 0.5 / 1
+
+    def test_borrar_un_renglon(self):
+        renglon = ItemFormula.objects.get(producto_padre=self.bebida, sub_producto=self.jarabe)
+        with self.captureOnCommitCallbacks(execute=True):
+            renglon.delete()
+        self.assertFalse(DependenciaFormula.objects.filter(producto=self.bebida, sub_producto=self.jarabe).exists())
+        self.assertEqual(self.costo(self.bebida), Decimal('0.5'))
+
+    def test_un_solo_recalculo_por_transaccion(self):
+        with mock.patch.object(RecalculoFormulas, 'recalcular') as recalcular:
+            with self.captureOnCommitCallbacks(execute=True):
+                for _ in range(5):
+                    self.item(self.salmuera, 1, materia_prima=self.agua)
+        self.assertEqual(recalcular.call_count, 1)
+
+    def test_usa_los_totales_guardados_de_los_subproductos(self):
+        # Renglones, productos, materias, totales guardados del jarabe y el upsert
+        with self.assertNumQueries(5):
+            RecalculoFormulas.recalcular({self.bebida.id})
+
+    def test_subproducto_nunca_calculado(self):
+        ProductoCalculado.objects.all().delete()
+        RecalculoFormulas.recalcular({self.bebida.id})
+        self.assertEqual(self.costo(self.jarabe), Decimal('2.2'))
+        self.assertEqual(self.costo(self.bebida), Decimal('1.6'))
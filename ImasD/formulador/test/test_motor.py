@@ -0,0 +1,104 @@
+"""
+ImasD\formulador\test\test_motor.py
+
+Descripcion: Este archivo se encarga del testing del motor de fórmulas (formulador/motor.py)
+"""
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+
+from catalogo.models import MateriaPrima, FuncionTecnologica
+from formulador.models import Producto, ItemFormula
+from formulador.motor import GrafoFormulas, MotorFormulas, ErrorFormula, FormulaCiclica
+
+
+class FormulaDePrueba(TestCase):
+    """
+    Catálogo base de los tests del formulador:
+        PP-JARABE = 60% AGUA + 40% AZUCAR
+        PP-BEBIDA = 50% PP-JARABE + 50% AGUA
+    """
+    def setUp(self):
+        self.usuario = get_user_model().objects.create_user(correo="formulador@imasd.com", nombre="Formulador", password="123")
+        self.funcion = FuncionTecnologica.objects.create(nombre="Base")
+        self.agua = MateriaPrima.objects.create(codigo="MP-AGUA", nombre="Agua", densidad=1, costo_kilo=1)
+        self.azucar = MateriaPrima.objects.create(codigo="MP-AZUCAR", nombre="Azúcar", densidad="1.6", costo_kilo=4)
+        self.jarabe = self.producto("PP-JARABE", densidad_teorica="1.2")
+        self.bebida = self.producto("PP-BEBIDA", cantidad_base_lote=200)
+        self.item(self.jarabe, 60, materia_prima=self.agua)
+        self.item(self.jarabe, 40, materia_prima=self.azucar)
+        self.item(self.bebida, 50, sub_producto=self.jarabe)
+        self.item(self.bebida, 50, materia_prima=self.agua)
+
+    def producto(self, codigo, **campos):
+        return Producto.objects.create(codigo=codigo, nombre=codigo, creado_por=self.usuario, **campos)
+
+    def item(self, padre, porcentaje, **ingrediente):
+        return ItemFormula.objects.create(producto_padre=padre, cantidad_porcentaje=porcentaje, funcion=self.funcion, **ingrediente)
+
+
+class MotorFormulasTest(FormulaDePrueba):
+    """
+    Testing del motor de fórmulas
+    """
+    def test_composicion_aplanada(self):
+        resultado = MotorFormulas().evaluar(self.bebida.id)
+
+        self.assertAlmostEqual(resultado.porcentaje_total, 100)
+        self.assertAlmostEqual(resultado.composicion[self.agua.id], 80)  # 50 + 50 x 60%
+        self.assertAlmostEqual(resultado.composicion[self.azucar.id], 20)  # 50 x 40%
+        self.assertAlmostEqual(resultado.kilos_lote[self.agua.id], 160)
+        self.assertAlmostEqual(resultado.kilos_lote[self.azucar.id], 40)
+
+    def test_costo_y_volumen(self):
+        resultado = MotorFormulas().evaluar(self.bebida.id)
+
+        self.assertAlmostEqual(resultado.costo_kilo, 0.8 * 1 + 0.2 * 4)
+        # El sub-producto aporta con su densidad_teorica, no con la de sus MP
+        self.assertAlmostEqual(resultado.litros_por_kilo, 0.5 / 1.2 + 0.5 / 1)
+        self.assertAlmostEqual(resultado.volumen_lote, 200 * (0.5 / 1.2 + 0.5))
+        self.assertAlmostEqual(resultado.densidad, 1 / (0.5 / 1.2 + 0.5))
+
+    def test_catalogo_en_pocas_consultas(self):
+        with self.assertNumQueries(3):
+            motor = MotorFormulas(GrafoFormulas.cargar())
+        with self.assertNumQueries(0):
+            resultados = motor.evaluar_todo()
+        self.assertEqual(set(resultados), {self.jarabe.id, self.bebida.id})
+
+    def test_subproducto_compartido_se_calcula_una_vez(self):
+        otra = self.producto("PP-OTRA")
+        self.item(otra, 100, sub_producto=self.jarabe)
+        motor = MotorFormulas()
+        with mock.patch.object(motor, '_calcular', wraps=motor._calcular) as calcular:
+            motor.evaluar(self.bebida.id)
+            motor.evaluar(otra.id)
+            motor.evaluar_todo()
+        calculados = [llamada.args[0] for llamada in calcular.call_args_list]
+        self.assertEqual(sorted(calculados), sorted([self.jarabe.id, self.bebida.id, otra.id]))
+        self.assertAlmostEqual(motor.evaluar(otra.id).composicion[self.azucar.id], 40)
+
+    def test_detecta_ciclos(self):
+        self.item(self.jarabe, 1, sub_producto=self.bebida)
+        with self.assertRaises(FormulaCiclica) as error:
+            MotorFormulas().evaluar_todo()
+        self.assertEqual(error.exception.ciclo[0], error.exception.ciclo[-1])
+        self.assertEqual(set(error.exception.ciclo), {"PP-JARABE", "PP-BEBIDA"})
+
+    def test_renglon_sin_ingrediente(self):
+        vacio = self.producto("PP-VACIO")
+        self.item(vacio, 100)
+        with self.assertRaises(ErrorFormula):
+            MotorFormulas().evaluar(vacio.id)
+
+    def test_anidacion_profunda(self):
+        # Más niveles que el límite de recursión de Python
+        anterior = self.jarabe
+        for nivel in range(1500):
+            actual = Producto(codigo=f"PP-N{nivel}", nombre="Nivel", creado_por=self.usuario)
+            actual.save()
+            ItemFormula.objects.create(producto_padre=actual, sub_producto=anterior, cantidad_porcentaje=100, funcion=self.funcion)
+            anterior = actual
+        resultado = MotorFormulas().evaluar(anterior.id)
+        self.assertAlmostEqual(resultado.composicion[self.azucar.id], 40)
@@ -0,0 +1,58 @@
+"""
+ImasD\formulador\test\test_nutricion.py
+
+Descripcion: Este archivo se encarga del testing de la calculadora nutricional (formulador/nutricion.py)
+"""
+from catalogo.models import InformacionNutricional
+from formulador.nutricion import CalculadoraNutricional, MatrizNutricional
+from formulador.test.test_motor import FormulaDePrueba
+
+
+class CalculadoraNutricionalTest(FormulaDePrueba):
+    """
+    AGUA: 10 mg de sodio / AZUCAR: 100 g de azúcares y 100 g de carbohidratos (por 100 g)
+    BEBIDA = 80% AGUA + 20% AZUCAR (aplanada)
+    """
+    def setUp(self):
+        super().setUp()
+        InformacionNutricional.objects.create(materia_prima=self.agua, sodio_mg=10)
+        self.info_azucar = InformacionNutricional.objects.create(materia_prima=self.azucar, azucares_g=100, carbohidratos_g=100)
+
+    def test_perfil_de_un_producto(self):
+        perfil = CalculadoraNutricional().perfil(self.bebida.id)
+
+        self.assertEqual(perfil['sodio_mg'], 8)
+        self.assertEqual(perfil['azucares_g'], 20)
+        self.assertEqual(perfil['carbohidratos_g'], 20)
+        self.assertEqual(perfil['proteina_g'], 0)
+
+    def test_todo_el_catalogo_coincide_con_el_perfil_individual(self):
+        calculadora = CalculadoraNutricional()
+        perfiles = calculadora.perfiles()
+
+        self.assertEqual(set(perfiles), {self.jarabe.id, self.bebida.id})
+        for producto_id, perfil in perfiles.items():
+            self.assertEqual(perfil, calculadora.perfil(producto_id))
+        self.assertEqual(perfiles[self.jarabe.id]['sodio_mg'], 6)
+
+    def test_materia_prima_sin_informacion_aporta_cero(self):
+        self.info_azucar.delete()
+        perfil = CalculadoraNutricional().perfiles()[self.bebida.id]
+        self.assertEqual(perfil['azucares_g'], 0)
+        self.assertEqual(perfil['sodio_mg'], 8)
+
+    def test_actualizar_matriz_tras_cambiar_una_materia_prima(self):
+        calculadora = CalculadoraNutricional()
+        calculadora.perfiles()
+
+        self.info_azucar.proteina_g = 50
+        self.info_azucar.save()
+        with self.assertNumQueries(1):
+            calculadora.actualizar_matriz()
+            perfiles = calculadora.perfiles()
+        self.assertEqual(perfiles[self.bebida.id]['proteina_g'], 10)
+
+    def test_matriz_en_una_consulta(self):
+        with self.assertNumQueries(1):
+            matriz = MatrizNutricional.cargar()
+        self.assertEqual(matriz.valores.shape, (3, 7))  # 2 MP + la fila de ceros
@@ -2,20 +2,26 @@ from django.core.exceptions import ValidationError
 from django.utils import timezone
 from datetime import timedelta  
 from .models import Actividad
-from descargo_responsabilidad.models import RegistroIngreso
+from descargo_responsabilidad.models import RegistroIngreso, PresenciaActual
+from home.imagenes import ColaImagenes
 
 class ActividadesService:
+
+    @staticmethod
+    def _ingreso_en_zona(usuario):
+        """
+        Solo se consulta si la vista no pasó el ingreso
+        (normalmente llega request.ingreso_activo desde el middleware).
+        """
+        return PresenciaActual.ingreso_de(usuario, solo_en_zona=True)
     
     @staticmethod
-    def iniciar_actividad(usuario, data, foto_inicial):
+    def iniciar_actividad(usuario, data, foto_inicial, ingreso=None):
         """
         Crea una actividad en estado EN_PROCESO (Card Roja).
         """
         # 1. Validar que el usuario tenga un ingreso activo
-        ingreso = RegistroIngreso.objects.filter(
-            visitante=usuario,
-            estado=RegistroIngreso.EstadoOpciones.EN_ZONA
-        ).first()
+        ingreso = ingreso or ActividadesService._ingreso_en_zona(usuario)
 
         if not ingreso:
             raise ValidationError("No tienes un ingreso activo en zona para registrar actividades.")
@@ -35,6 +41,7 @@ class ActividadesService:
             foto_inicial=foto_inicial,
             estado=Actividad.EstadoActividad.EN_PROCESO
         )
+        ColaImagenes.encolar(actividad, 'foto_inicial')
         
         return actividad
 
@@ -65,18 +72,16 @@ class ActividadesService:
         actividad.hora_fin = timezone.now()
         actividad.estado = Actividad.EstadoActividad.FINALIZADA
         actividad.save()
+        ColaImagenes.encolar(actividad, 'foto_final')
 
         return actividad
 
     @staticmethod
-    def listar_actividades(usuario):
+    def listar_actividades(usuario, ingreso=None):
         """
         Devuelve las actividades del ingreso actual del usuario.
         """
-        ingreso = RegistroIngreso.objects.filter(
-            visitante=usuario,
-            estado=RegistroIngreso.EstadoOpciones.EN_ZONA
-        ).first()
+        ingreso = ingreso or ActividadesService._ingreso_en_zona(usuario)
 
         if not ingreso:
             return []
@@ -84,34 +89,31 @@ class ActividadesService:
         return Actividad.objects.filter(registro_ingreso=ingreso).order_by('-hora_inicio')
 
     @staticmethod
-    def forzar_salida_por_tiempo(usuario):
+    def forzar_salida_por_tiempo(usuario, ingreso=None):
         """
         Cierra el ingreso, dejando las actividades en su estado actual (EN_PROCESO).
-        Esto sirve de evidencia de tareas inconclusas.
+        Esto sirve de evidencia de tareas inconclusas. También encola el reporte de salida.
         """
-        ingreso = RegistroIngreso.objects.filter(
-            visitante=usuario,
-            estado=RegistroIngreso.EstadoOpciones.EN_ZONA
-        ).first()
+        ingreso = ingreso or ActividadesService._ingreso_en_zona(usuario)
 
         if ingreso:
-            ingreso.fecha_hora_salida = timezone.now()
-            ingreso.estado = RegistroIngreso.EstadoOpciones.FINALIZADO 
-            ingreso.observaciones_salida = "Cierre automático del sistema: Tiempo de jornada agotado."
-            ingreso.save()
+            # Mismo cierre que el barrido de jornadas vencidas (incluye el reporte de salida)
+            from descargo_responsabilidad.services import SalidaService
+            ahora = timezone.now()
+            if SalidaService.cerrar_por_tiempo([ingreso.pk], ahora):
+                ingreso.fecha_hora_salida = ahora
+                ingreso.estado = RegistroIngreso.EstadoOpciones.FINALIZADO
+                ingreso.observaciones_salida = SalidaService.OBSERVACION_CIERRE_AUTOMATICO
             return True
         return False
     
     @staticmethod
-    def cerrar_ingreso_zona(usuario):
+    def cerrar_ingreso_zona(usuario, ingreso=None):
         """
         Cierra el ingreso actual del usuario (Salida Voluntaria).
         Cambia estado a FINALIZADO (o PENDIENTE_FIRMA según tu flujo).
         """
-        ingreso = RegistroIngreso.objects.filter(
-            visitante=usuario,
-            estado=RegistroIngreso.EstadoOpciones.EN_ZONA
-        ).first()
+        ingreso = ingreso or ActividadesService._ingreso_en_zona(usuario)
 
         if not ingreso:
             raise ValidationError("No hay un ingreso activo para cerrar.")
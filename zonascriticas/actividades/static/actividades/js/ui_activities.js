@@ -12,7 +12,8 @@ export const ActivitiesUI = {
         const isPending = act.estado === 'EN_PROCESO';
         const statusClass = `status-${act.estado}`; 
         const icon = isPending ? '<i class="fas fa-clock"></i>' : '<i class="fas fa-check-circle"></i>';
-        const bgImage = act.foto_inicial ? `background-image:url('${act.foto_inicial}')` : '';
+        const miniatura = act.foto_inicial_miniatura || act.foto_inicial;
+        const bgImage = miniatura ? `background-image:url('${miniatura}')` : '';
 
         // Agregamos una clase extra 'panel-card' para estilos específicos si se necesita
         return `
@@ -1,3 +1,71 @@
 from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
 
-# Create your tests here.
+from login.models import Usuario, Cargo
+from descargo_responsabilidad.models import Ubicacion, RegistroIngreso
+from .models import Actividad
+
+
+class IngresoActivoQueriesTestCase(TestCase):
+    """
+    request.ingreso_activo (middleware) se consulta UNA sola vez por petición:
+    decorador de tiempo, vista y servicio comparten el mismo objeto.
+
+    Consultas base de cualquier vista logueada: sesión + usuario.
+    """
+
+    def setUp(self):
+        cargo = Cargo.objects.create(nombre="Tester")
+        self.visitante = Usuario.objects.create(
+            first_name="Juan Perez", numero_documento="123456789", email="visitante@test.com", cargo=cargo, tipo_documento='CC'
+        )
+        responsable = Usuario.objects.create(
+            first_name="Maria Gomez", numero_documento="987654321", email="responsable@test.com", cargo=cargo,
+            tipo='Administrador', tipo_documento='CC'
+        )
+        ubicacion = Ubicacion.objects.create(nombre="Data Center", codigo_qr="DC-01", ciudad="Bogotá", freshservice_id=1001)
+        self.ingreso = RegistroIngreso.objects.create(
+            visitante=self.visitante, responsable=responsable, ubicacion=ubicacion,
+            modalidad=RegistroIngreso.ModalidadOpciones.SOLO_ACTIVIDADES,
+            estado=RegistroIngreso.EstadoOpciones.EN_ZONA,
+            fecha_hora_ingreso=timezone.now(),
+        )
+        Actividad.objects.create(registro_ingreso=self.ingreso, titulo="Cambio de disco", foto_inicial='x.jpg')
+
+        session = self.client.session
+        session['id_usuario_logueado'] = self.visitante.id
+        session.save()
+
+    def test_actividades_view(self):
+        # sesión, usuario, ingreso activo
+        with self.assertNumQueries(3):
+            response = self.client.get(reverse('actividades_view'))
+        self.assertEqual(response.status_code, 200)
+
+    def test_listar_actividades_api(self):
+        # sesión, usuario, ingreso activo, actividades
+        with self.assertNumQueries(4):
+            response = self.client.get(reverse('api_listar_actividades'))
+        self.assertEqual(len(response.json()['payload']['actividades']), 1)
+
+    def test_home_router_en_zona(self):
+        # sesión, usuario, ingreso activo (antes: exists() + first())
+        with self.assertNumQueries(3):
+            response = self.client.get(reverse('dashboard'))
+        self.assertRedirects(response, reverse('actividades_view'), fetch_redirect_response=False)
+
+    def test_responsabilidad_redirige_si_esta_en_zona(self):
+        with self.assertNumQueries(3):
+            response = self.client.get(reverse('responsabilidad'))
+        self.assertRedirects(response, reverse('dashboard'), fetch_redirect_response=False)
+
+    def test_tiempo_vencido_cierra_ingreso(self):
+        RegistroIngreso.objects.filter(pk=self.ingreso.pk).update(
+            fecha_hora_ingreso=timezone.now() - timezone.timedelta(hours=9)
+        )
+        response = self.client.get(reverse('api_listar_actividades'), HTTP_X_REQUESTED_WITH='XMLHttpRequest')
+
+        self.assertEqual(response.status_code, 403)
+        self.ingreso.refresh_from_db()
+        self.assertEqual(self.ingreso.estado, RegistroIngreso.EstadoOpciones.FINALIZADO)
@@ -8,7 +8,9 @@ from django.core.exceptions import ValidationError
 # Imports de Auth y Core
 from login.decorators import login_custom_required
 from home.utils import api_response, CronometroJornada
+from home.imagenes import url_miniatura
 from home.decorators import requiere_tiempo_activo
+from descargo_responsabilidad.middleware import ingreso_en_zona
 
 # Servicios y Modelos
 from .services import ActividadesService
@@ -22,9 +24,9 @@ from .services import ActividadesService
 def actividades_view(request: HttpRequest) -> HttpResponse:
     user = request.user
     
-    # 1. Obtener ingreso activo usando la utilidad centralizada
+    # 1. Ingreso activo: ya lo cargó el middleware (y lo usó el decorador de tiempo)
     # El decorador ya garantizó que el tiempo es > 0, pero validamos que exista el ingreso.
-    ingreso_activo = CronometroJornada.get_ingreso_activo(user)
+    ingreso_activo = ingreso_en_zona(request)
 
     if not ingreso_activo:
         # Si el usuario está logueado pero no tiene ingreso en zona, va al dashboard
@@ -59,7 +61,7 @@ def listar_actividades_api(request: HttpRequest) -> HttpResponse:
     Devuelve la lista de actividades del ingreso actual.
     """
     try:
-        actividades = ActividadesService.listar_actividades(request.user)
+        actividades = ActividadesService.listar_actividades(request.user, ingreso_en_zona(request))
         
         # Serialización manual para control total del formato JSON
         data = []
@@ -74,6 +76,8 @@ def listar_actividades_api(request: HttpRequest) -> HttpResponse:
                 'obs_final': act.observacion_final,
                 'foto_inicial': act.foto_inicial.url if act.foto_inicial else None,
                 'foto_final': act.foto_final.url if act.foto_final else None,
+                'foto_inicial_miniatura': url_miniatura(act.foto_inicial),
+                'foto_final_miniatura': url_miniatura(act.foto_final),
             })
             
         return api_response(data={'actividades': data})
@@ -93,7 +97,8 @@ def iniciar_actividad_api(request: HttpRequest) -> HttpResponse:
         nueva_actividad = ActividadesService.iniciar_actividad(
             request.user,
             request.POST,
-            request.FILES.get('foto_inicial')
+            request.FILES.get('foto_inicial'),
+            ingreso_en_zona(request)
         )
         
         return api_response(
@@ -137,7 +142,7 @@ def salida_zona_api(request: HttpRequest) -> HttpResponse:
     Registra la salida voluntaria de la zona.
     """
     try:
-        ActividadesService.cerrar_ingreso_zona(request.user)
+        ActividadesService.cerrar_ingreso_zona(request.user, ingreso_en_zona(request))
         return api_response(message='Jornada finalizada correctamente.')
         
     except ValidationError as e:
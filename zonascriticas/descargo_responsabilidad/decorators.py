@@ -1,6 +1,6 @@
 from functools import wraps
 from django.shortcuts import redirect
-from .models import RegistroIngreso
+from .middleware import ingreso_en_zona
 
 def no_tener_zona_activa(view_func):
     """
@@ -12,12 +12,8 @@ def no_tener_zona_activa(view_func):
     @wraps(view_func)
     def _wrapped_view(request, *args, **kwargs):
         # Consultamos si existe algún registro abierto (En Zona)
-        tiene_ingreso = RegistroIngreso.objects.filter(
-            visitante=request.user,
-            estado=RegistroIngreso.EstadoOpciones.EN_ZONA
-        ).exists()
-
-        if tiene_ingreso:
+        # request.ingreso_activo viene del middleware: no repite la consulta
+        if ingreso_en_zona(request):
             # ¡ALTO! Ya estás adentro. Vete al dashboard.
             return redirect('dashboard')
 
@@ -33,12 +29,7 @@ def requiere_zona_activa(view_func):
     """
     @wraps(view_func)
     def _wrapped_view(request, *args, **kwargs):
-        tiene_ingreso = RegistroIngreso.objects.filter(
-            visitante=request.user,
-            estado=RegistroIngreso.EstadoOpciones.EN_ZONA
-        ).exists()
-
-        if not tiene_ingreso:
+        if not ingreso_en_zona(request):
             # ¡ALTO! No has entrado. Vete al dashboard (que te mandará al escáner).
             return redirect('dashboard')
 
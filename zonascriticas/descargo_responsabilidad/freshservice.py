@@ -0,0 +1,134 @@
+"""
+zonascriticas/descargo_responsabilidad/freshservice.py
+
+Descripción:
+
+Cliente HTTP del inventario de activos de Freshservice que usa
+``FreshserviceSync`` (services.py).
+
+- ``ClienteFreshservice`` reutiliza una ``requests.Session`` (keep-alive) con
+  timeout, y descarga varias páginas a la vez con un pool de hilos. No se
+  sabe cuántas páginas hay: se piden ``hilos`` por adelantado y cada página
+  llena pide la siguiente. La primera página incompleta marca el final.
+- ``desde`` filtra en el servidor por ``updated_at`` (sincronización incremental).
+- ``LimitadorTasa`` reparte el presupuesto de peticiones por minuto entre los
+  hilos. Un 429 respeta ``Retry-After`` y pausa a todos los hilos.
+
+Se prueba contra ``descargo_responsabilidad/tests/fake_freshservice.py``.
+"""
+
+import logging
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import datetime, timezone
+from typing import Iterator, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+
+class LimitadorTasa:
+    """Turnos espaciados ``60 / por_minuto`` segundos, compartidos por todos los hilos."""
+
+    def __init__(self, por_minuto: int, reloj=time.monotonic, dormir=time.sleep):
+        self.intervalo = 60.0 / por_minuto if por_minuto > 0 else 0.0
+        self.reloj = reloj
+        self.dormir = dormir
+        self._proximo = 0.0
+        self._lock = threading.Lock()
+
+    def esperar_turno(self):
+        with self._lock:
+            ahora = self.reloj()
+            turno = max(ahora, self._proximo)
+            self._proximo = turno + self.intervalo
+        if turno > ahora:
+            self.dormir(turno - ahora)
+
+    def pausar(self, segundos: float):
+        """Nadie pide nada durante ``segundos`` (respuesta 429)."""
+        with self._lock:
+            self._proximo = max(self._proximo, self.reloj() + segundos)
+
+
+class ClienteFreshservice:
+
+    #: Máximo que permite la API de activos.
+    POR_PAGINA = 100
+    #: Reintentos ante 429 y errores 5xx.
+    REINTENTOS = 3
+
+    def __init__(self, base_url: str, api_key: str, hilos: int = 4, por_minuto: int = 100,
+                 timeout: tuple = (5, 30)):
+        self.url = f"{base_url.rstrip('/')}/api/v2/assets"
+        self.hilos = max(1, hilos)
+        self.timeout = timeout
+        self.limitador = LimitadorTasa(por_minuto)
+
+        self.session = requests.Session()
+        self.session.auth = (api_key, 'X')
+        self.session.headers['Accept'] = 'application/json'
+        # Una conexión keep-alive por hilo
+        adaptador = HTTPAdapter(pool_connections=1, pool_maxsize=self.hilos)
+        self.session.mount('https://', adaptador)
+        self.session.mount('http://', adaptador)
+
+    def cerrar(self):
+        self.session.close()
+
+    @staticmethod
+    def formatear_fecha(fecha: datetime) -> str:
+        return fecha.astimezone(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
+
+    def pagina(self, numero: int, desde: Optional[datetime] = None) -> list:
+        params = {'include': 'type_fields', 'per_page': self.POR_PAGINA, 'page': numero}
+        if desde:
+            params['filter'] = f"\"updated_at:>'{self.formatear_fecha(desde)}'\""
+
+        for intento in range(self.REINTENTOS + 1):
+            self.limitador.esperar_turno()
+            response = self.session.get(self.url, params=params, timeout=self.timeout)
+            if response.status_code == 429 or response.status_code >= 500:
+                if intento == self.REINTENTOS:
+                    break
+                espera = float(response.headers.get('Retry-After') or 2 ** intento)
+                logger.warning(f"Freshservice respondió {response.status_code} en la página {numero}; reintento en {espera}s")
+                self.limitador.pausar(espera)
+                continue
+            break
+        response.raise_for_status()
+        return response.json().get('assets', [])
+
+    def activos(self, desde: Optional[datetime] = None) -> Iterator[list]:
+        """
+        Yields
+        ------
+        list
+            Los activos de cada página, en el orden en que van llegando.
+        """
+        with ThreadPoolExecutor(max_workers=self.hilos, thread_name_prefix='freshservice') as pool:
+            pendientes = {pool.submit(self.pagina, n, desde): n for n in range(1, self.hilos + 1)}
+            siguiente = self.hilos + 1
+            ultima = None  # primera página incompleta: no hay nada después
+            try:
+                while pendientes:
+                    listas, _ = wait(pendientes, return_when=FIRST_COMPLETED)
+                    for futuro in listas:
+                        numero = pendientes.pop(futuro)
+                        activos = futuro.result()
+                        if ultima is not None and numero > ultima:
+                            continue
+                        if len(activos) < self.POR_PAGINA:
+                            ultima = numero
+                        elif ultima is None:
+                            pendientes[pool.submit(self.pagina, siguiente, desde)] = siguiente
+                            siguiente += 1
+                        if activos:
+                            yield activos
+            finally:
+                # Error o el llamador dejó de iterar: lo que no empezó no se pide
+                for futuro in pendientes:
+                    futuro.cancel()
@@ -0,0 +1,112 @@
+from datetime import datetime, timedelta
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from unittest import mock
+import requests
+import time
+
+from descargo_responsabilidad.tests.fake_freshservice import FakeFreshservice
+from descargo_responsabilidad.models import EstadoSincronizacion, Ubicacion
+from descargo_responsabilidad.services import FreshserviceSync
+
+# Compara la sincronización anterior (requests.get página por página, sleep de
+# 0.5 s y un update_or_create por activo) con FreshserviceSync completo e
+# incremental, contra el servidor falso con latencia de red simulada.
+#   python manage.py benchmark_freshservice --activos 3000 --latencia 0.08
+# Todo corre dentro de una transacción que se revierte al final: no deja datos.
+
+
+class _Revertir(Exception):
+    pass
+
+
+def _activo(i, version=0):
+    return {
+        'id': 10**9 + i, 'name': f"{'Zona' if i % 4 == 0 else 'Portátil'} {i}{' v2' if version else ''}",
+        'asset_tag': f'BENCH-FS-{i}', 'description': '', 'type_fields': {'ubicacin_1': 'Bogotá'},
+        # Cada activo con su propio updated_at; los modificados, después de todos
+        'updated_at': ((datetime(2026, 2, 1) if version else datetime(2025, 1, 1) + timedelta(minutes=i))
+                       .strftime('%Y-%m-%dT%H:%M:%SZ')),
+    }
+
+
+class Command(BaseCommand):
+    help = 'Benchmark de la sincronización con Freshservice (antes vs. paralela e incremental)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--activos', type=int, default=3000, help='Activos en el inventario falso')
+        parser.add_argument('--latencia', type=float, default=0.08, help='Segundos por respuesta del servidor')
+        parser.add_argument('--pausa', type=float, default=0.5, help='sleep entre páginas del método anterior')
+        parser.add_argument('--hilos', type=int, default=4, help='Páginas a la vez')
+
+    def _anterior(self, url, pausa, stats):
+        """Copia del bucle que había en FreshserviceSync.sincronizar_activos."""
+        page = 1
+        while True:
+            response = requests.get(f'{url}/api/v2/assets', auth=('clave', 'X'),
+                                    params={'include': 'type_fields', 'per_page': 50, 'page': page})
+            response.raise_for_status()
+            activos = response.json().get('assets', [])
+            if not activos:
+                break
+            for asset in activos:
+                if not FreshserviceSync._es_zona_critica(asset['name']):
+                    continue
+                Ubicacion.objects.update_or_create(freshservice_id=asset['id'], defaults={
+                    'nombre': asset['name'], 'codigo_qr': asset['asset_tag'], 'ciudad': 'Bogotá',
+                    'descripcion': '', 'activa': True,
+                })
+            stats['paginas'] = page
+            page += 1
+            time.sleep(pausa)
+
+    def _medir(self, servidor, funcion):
+        servidor.reiniciar_contadores()
+        with CaptureQueriesContext(connection) as consultas:
+            inicio = time.perf_counter()
+            funcion()
+            duracion = time.perf_counter() - inicio
+        return duracion, servidor.peticiones, servidor.conexiones, len(consultas)
+
+    def handle(self, *args, **options):
+        total = max(1, options['activos'])
+        self.stdout.write(self.style.WARNING(
+            f"🚀 Sincronización de {total} activos (latencia {options['latencia'] * 1000:.0f} ms)..."
+        ))
+        servidor = FakeFreshservice(activos=[_activo(i) for i in range(total)], latencia=options['latencia']).iniciar()
+        resultados = {}
+
+        configuracion = mock.patch.multiple(
+            FreshserviceSync, DOMAIN=servidor.url, API_KEY='clave', KEYWORDS=['zona'], POR_MINUTO=0
+        )
+        try:
+            with configuracion, transaction.atomic():
+                EstadoSincronizacion.objects.filter(nombre=FreshserviceSync.NOMBRE_ESTADO).delete()
+
+                # 1. Antes
+                resultados['anterior'] = self._medir(servidor, lambda: self._anterior(servidor.url, options['pausa'], {}))
+                Ubicacion.objects.filter(freshservice_id__gte=10**9).delete()
+
+                # 2. Completa en paralelo (sin ubicaciones previas)
+                resultados['completa'] = self._medir(
+                    servidor, lambda: FreshserviceSync.sincronizar_activos(completo=True, hilos=options['hilos'])
+                )
+
+                # 3. Incremental: cambia el 2 % del inventario
+                servidor.publicar([_activo(i, version=1 if i % 50 == 0 else 0) for i in range(total)])
+                resultados['incremental'] = self._medir(
+                    servidor, lambda: FreshserviceSync.sincronizar_activos(hilos=options['hilos'])
+                )
+                raise _Revertir()
+        except _Revertir:
+            pass
+        finally:
+            servidor.detener()
+
+        msg = "\n✅ BENCHMARK FINALIZADO\n----------------------------------------\n"
+        for nombre, (duracion, peticiones, conexiones, consultas) in resultados.items():
+            msg += (f" 🔄 {nombre:<12} {duracion:7.2f} s | {peticiones:4d} peticiones | "
+                    f"{conexiones:4d} conexiones | {consultas:5d} consultas\n")
+        msg += "----------------------------------------"
+        self.stdout.write(self.style.SUCCESS(msg))
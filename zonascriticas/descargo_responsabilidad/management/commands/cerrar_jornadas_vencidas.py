@@ -0,0 +1,51 @@
+from django.core.management.base import BaseCommand
+from django.db import connections
+import time
+
+from descargo_responsabilidad.services import SalidaService
+
+# Cierra los ingresos EN_ZONA cuya jornada ya venció (hora límite del usuario u
+# 8 h por defecto) y encola sus reportes de salida. @requiere_tiempo_activo cierra
+# el ingreso cuando el dueño vuelve a una vista; este comando cubre al que no vuelve.
+# Una pasada (cron cada minuto):
+#   python manage.py cerrar_jornadas_vencidas
+# Como proceso permanente junto a procesar_documentos:
+#   python manage.py cerrar_jornadas_vencidas --intervalo 60
+
+
+class Command(BaseCommand):
+    help = 'Cierra en lote los ingresos con jornada vencida y encola sus reportes de salida'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lote', type=int, default=500, help='Ingresos cerrados por UPDATE')
+        parser.add_argument('--intervalo', type=float, default=0,
+                            help='Segundos entre pasadas (0 = una sola pasada y termina)')
+
+    def _pasada(self, lote):
+        inicio = time.time()
+        stats = SalidaService.cerrar_jornadas_vencidas(lote=lote)
+        duracion = time.time() - inicio
+
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ Pasada en {duracion:.2f}s. "
+            f"Cerrados: {stats['cerrados']} | Vencimientos corregidos: {stats['corregidos']} | Lotes: {stats['lotes']}"
+        ))
+
+    def handle(self, *args, **options):
+        lote = max(1, options['lote'])
+        intervalo = options['intervalo']
+
+        self.stdout.write(self.style.WARNING('🚀 Buscando jornadas vencidas...'))
+
+        if not intervalo:
+            self._pasada(lote)
+            return
+
+        try:
+            while True:
+                self._pasada(lote)
+                # Entre pasadas no dejamos conexiones ociosas abiertas
+                connections.close_all()
+                time.sleep(intervalo)
+        except KeyboardInterrupt:
+            self.stdout.write(self.style.WARNING('⏹ Deteniendo...'))
@@ -0,0 +1,14 @@
+from home.colas import ComandoWorkerCola
+
+# Worker de la cola persistente de documentos (tabla cola_documentos).
+# Uso típico en producción (junto a gunicorn):
+#   python manage.py procesar_documentos --workers 4
+# Para vaciar la cola una sola vez (cron, pruebas):
+#   python manage.py procesar_documentos --una-vez
+# El bucle de los workers es común a todas las colas: ver home/colas.py
+
+
+class Command(ComandoWorkerCola):
+    help = 'Procesa la cola de documentos (PDF + correo) con uno o varios workers'
+    cola = 'descargo_responsabilidad.services.ColaDocumentos'
+    nombre_cola = 'documentos'
@@ -0,0 +1,264 @@
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+import json
+import os
+import tempfile
+import time
+
+from descargo_responsabilidad.models import RegistroIngreso, DocumentoPDF
+
+# Re-emisión masiva de actas y reportes (ej: cambió la redacción legal).
+#
+#   python manage.py regenerar_pdfs --tipo descargo --workers 8 --lote 200
+#
+# - Los ids se leen en streaming y por lotes; cada lote se dibuja en un proceso
+#   del pool (fpdf es CPU puro, los hilos no sirven por el GIL).
+# - Toda la BD es del padre: carga cada lote (select_related) y se lo pasa al hijo
+#   ya armado; al terminar hace las escrituras en bloque: bulk_create + bulk_update.
+#   Los hijos solo dibujan y escriben archivos (ruta de GeneradorRutaArchivo) y
+#   nunca abren una conexión: en Linux se crean con fork y compartirían el socket
+#   que el padre tenga abierto en ese momento.
+# - Tras cada lote se guarda un checkpoint. Si el proceso muere, al relanzar
+#   el comando continúa desde el último id cuyo lote (y todos los anteriores) terminó.
+#   Los documentos anteriores NO se borran: quedan en el historial del usuario.
+
+TIPOS = {
+    'descargo': {
+        'campo': 'pdf_descargo',
+        'tipo_documento': DocumentoPDF.TipoDocumento.DESCARGO,
+        'nombre': 'descargo_{id}.pdf',
+        'descripcion': 'Ingreso a {zona} (Reemitido)',
+    },
+    'salida': {
+        'campo': 'pdf_reporte_salida',
+        'tipo_documento': DocumentoPDF.TipoDocumento.REPORTE_SALIDA,
+        'nombre': 'reporte_salida_{id}.pdf',
+        'descripcion': 'Salida {zona} (Reemitido)',
+    },
+}
+
+
+def _inicializar_worker():
+    """Cada proceso hijo arranca Django (necesario con 'spawn' en Windows)."""
+    import django
+    from django.apps import apps
+    if not apps.ready:
+        django.setup()
+
+
+def _cargar_lote(ids, tipo):
+    """Lee en el proceso padre los registros de un lote con todo lo que necesita el PDF."""
+    registros = RegistroIngreso.objects.filter(pk__in=ids).select_related(
+        'visitante__cargo', 'visitante__empresa', 'responsable', 'ubicacion'
+    ).order_by('id')
+    if tipo == 'salida':
+        registros = registros.prefetch_related('actividades_registradas')
+    return list(registros)
+
+
+def _renderizar_lote(registros, tipo):
+    """
+    Dibuja y guarda en disco los PDFs de un lote. No consulta ni escribe en la BD.
+    Retorna (generados, errores):
+      generados: [(registro_id, visitante_id, ruta_archivo, descripcion), ...]
+      errores:   [(registro_id, mensaje), ...]
+    """
+    from django.core.files.base import ContentFile
+    from home.utils import PDFGenerator
+
+    config = TIPOS[tipo]
+    campo_archivo = DocumentoPDF._meta.get_field('archivo')
+    generar = PDFGenerator.crear_acta_ingreso if tipo == 'descargo' else PDFGenerator.crear_reporte_salida
+
+    generados, errores = [], []
+    for registro in registros:
+        try:
+            pdf_bytes = generar(registro)
+            # upload_to=GeneradorRutaArchivo('pdfs') -> pdfs/AÑO/MES/uuid.pdf
+            ruta = campo_archivo.generate_filename(None, config['nombre'].format(id=registro.id))
+            ruta = campo_archivo.storage.save(ruta, ContentFile(pdf_bytes))
+            descripcion = config['descripcion'].format(zona=registro.ubicacion.nombre if registro.ubicacion else '')
+            generados.append((registro.id, registro.visitante_id, ruta, descripcion))
+        except Exception as e:
+            errores.append((registro.id, str(e)))
+
+    return generados, errores
+
+
+class Command(BaseCommand):
+    help = 'Regenera en paralelo los PDFs históricos (actas de descargo o reportes de salida)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tipo', choices=list(TIPOS), default='descargo', help='Documento a regenerar')
+        parser.add_argument('--lote', type=int, default=200, help='Registros por lote')
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help='Procesos del pool (1 = sin pool)')
+        parser.add_argument('--desde-id', type=int, default=0, help='Regenerar solo ids mayores a este')
+        parser.add_argument('--hasta-id', type=int, default=None, help='Regenerar solo ids menores o iguales a este')
+        parser.add_argument('--checkpoint', type=str, default=None, help='Archivo JSON de avance (por defecto en la carpeta temporal)')
+        parser.add_argument('--reiniciar', action='store_true', help='Ignora el checkpoint y empieza de cero')
+
+    # ------------------------------------------------------------------
+    # Checkpoint
+    # ------------------------------------------------------------------
+
+    def _leer_checkpoint(self, ruta, tipo):
+        if not os.path.exists(ruta):
+            return None
+        with open(ruta, encoding='utf-8') as f:
+            datos = json.load(f)
+        if datos.get('tipo') != tipo:
+            raise CommandError(
+                f"El checkpoint {ruta} es de tipo '{datos.get('tipo')}'. Usa --reiniciar u otro --checkpoint."
+            )
+        return datos
+
+    def _guardar_checkpoint(self, ruta, datos):
+        # Escritura atómica: si morimos a mitad, el checkpoint anterior sigue intacto
+        temporal = f"{ruta}.tmp"
+        with open(temporal, 'w', encoding='utf-8') as f:
+            json.dump(datos, f)
+        os.replace(temporal, ruta)
+
+    # ------------------------------------------------------------------
+    # Lectura y escritura en BD (solo en el proceso padre)
+    # ------------------------------------------------------------------
+
+    def _lotes_de_ids(self, queryset, tamano):
+        lote = []
+        for registro_id in queryset.values_list('id', flat=True).iterator(chunk_size=tamano):
+            lote.append(registro_id)
+            if len(lote) == tamano:
+                yield lote
+                lote = []
+        if lote:
+            yield lote
+
+    def _aplicar_en_bd(self, tipo, generados):
+        """Crea los DocumentoPDF y re-apunta las FKs con dos consultas en bloque."""
+        if not generados:
+            return
+        config = TIPOS[tipo]
+
+        documentos = [
+            DocumentoPDF(usuario_id=visitante_id, archivo=ruta, tipo=config['tipo_documento'], descripcion=descripcion)
+            for _, visitante_id, ruta, descripcion in generados
+        ]
+        with transaction.atomic():
+            DocumentoPDF.objects.bulk_create(documentos)
+            # MySQL no devuelve los ids de bulk_create: los recuperamos por la ruta (única: uuid)
+            id_por_ruta = dict(
+                DocumentoPDF.objects.filter(archivo__in=[d.archivo.name for d in documentos]).values_list('archivo', 'id')
+            )
+            registros = []
+            for registro_id, _, ruta, _ in generados:
+                registro = RegistroIngreso(pk=registro_id)
+                setattr(registro, f"{config['campo']}_id", id_por_ruta[ruta])
+                registros.append(registro)
+            RegistroIngreso.objects.bulk_update(registros, [config['campo']])
+
+    # ------------------------------------------------------------------
+    # Orquestación
+    # ------------------------------------------------------------------
+
+    def handle(self, *args, **options):
+        tipo = options['tipo']
+        tamano_lote = max(1, options['lote'])
+        workers = max(1, options['workers'])
+        ruta_checkpoint = options['checkpoint'] or os.path.join(tempfile.gettempdir(), f'regenerar_pdfs_{tipo}.checkpoint.json')
+
+        checkpoint = None if options['reiniciar'] else self._leer_checkpoint(ruta_checkpoint, tipo)
+        desde_id = max(options['desde_id'], checkpoint['ultimo_id'] if checkpoint else 0)
+        procesados_previos = checkpoint['procesados'] if checkpoint else 0
+        errores = checkpoint['errores'] if checkpoint else []
+
+        queryset = RegistroIngreso.objects.filter(id__gt=desde_id).order_by('id')
+        if options['hasta_id'] is not None:
+            queryset = queryset.filter(id__lte=options['hasta_id'])
+        if tipo == 'salida':
+            queryset = queryset.filter(estado=RegistroIngreso.EstadoOpciones.FINALIZADO)
+
+        total = queryset.count()
+        if checkpoint:
+            self.stdout.write(self.style.WARNING(f'↩️  Reanudando desde el id {desde_id} ({procesados_previos} ya procesados).'))
+        self.stdout.write(self.style.WARNING(f'🚀 Regenerando {total} PDF(s) de {tipo} con {workers} worker(s), lotes de {tamano_lote}...'))
+
+        if not total:
+            self.stdout.write(self.style.SUCCESS('✅ Nada que regenerar.'))
+            return
+
+        inicio = time.perf_counter()
+        stats = {'generados': 0, 'errores': 0}
+
+        # Control de lotes en vuelo: el checkpoint solo avanza cuando
+        # un lote Y todos los anteriores ya terminaron (marca de agua contigua).
+        pendientes_en_orden = []   # [(numero_lote, ultimo_id)]
+        terminados = set()
+        siguiente_lote = 0
+
+        def registrar_resultado(numero, generados, errores_lote):
+            self._aplicar_en_bd(tipo, generados)
+            stats['generados'] += len(generados)
+            stats['errores'] += len(errores_lote)
+            errores.extend(errores_lote)
+            terminados.add(numero)
+
+            ultimo_id = None
+            while pendientes_en_orden and pendientes_en_orden[0][0] in terminados:
+                ultimo_id = pendientes_en_orden.pop(0)[1]
+            if ultimo_id is not None:
+                self._guardar_checkpoint(ruta_checkpoint, {
+                    'tipo': tipo,
+                    'ultimo_id': ultimo_id,
+                    'procesados': procesados_previos + stats['generados'] + stats['errores'],
+                    'errores': errores[-1000:],
+                })
+            self._reportar_progreso(stats, total, inicio)
+
+        if workers == 1:
+            # Sin pool: útil para depurar (y para los tests)
+            for lote in self._lotes_de_ids(queryset, tamano_lote):
+                pendientes_en_orden.append((siguiente_lote, lote[-1]))
+                registrar_resultado(siguiente_lote, *_renderizar_lote(_cargar_lote(lote, tipo), tipo))
+                siguiente_lote += 1
+        else:
+            max_en_vuelo = workers * 2
+
+            with ProcessPoolExecutor(max_workers=workers, initializer=_inicializar_worker) as pool:
+                en_vuelo = {}
+                for lote in self._lotes_de_ids(queryset, tamano_lote):
+                    pendientes_en_orden.append((siguiente_lote, lote[-1]))
+                    en_vuelo[pool.submit(_renderizar_lote, _cargar_lote(lote, tipo), tipo)] = siguiente_lote
+                    siguiente_lote += 1
+
+                    # Backpressure: no leemos más ids de los que el pool puede digerir
+                    while len(en_vuelo) >= max_en_vuelo:
+                        listos, _ = wait(en_vuelo, return_when=FIRST_COMPLETED)
+                        for futuro in listos:
+                            registrar_resultado(en_vuelo.pop(futuro), *futuro.result())
+
+                for futuro in list(en_vuelo):
+                    registrar_resultado(en_vuelo.pop(futuro), *futuro.result())
+
+        duracion = time.perf_counter() - inicio
+        msg = (
+            f"\n✅ PROCESO FINALIZADO en {duracion:.2f}s.\n"
+            f"----------------------------------------\n"
+            f" 📄 PDFs regenerados: {stats['generados']}\n"
+            f" ⚠️  Con error: {stats['errores']}\n"
+            f" 🚀 Rendimiento: {stats['generados'] / duracion if duracion else 0:.1f} archivos/s\n"
+            f" 💾 Checkpoint: {ruta_checkpoint}\n"
+            f"----------------------------------------"
+        )
+        self.stdout.write(self.style.SUCCESS(msg))
+        for registro_id, mensaje in errores[-10:]:
+            self.stdout.write(self.style.ERROR(f'   Registro {registro_id}: {mensaje}'))
+
+    def _reportar_progreso(self, stats, total, inicio):
+        hechos = stats['generados'] + stats['errores']
+        transcurrido = time.perf_counter() - inicio
+        velocidad = hechos / transcurrido if transcurrido else 0
+        restante = (total - hechos) / velocidad if velocidad else 0
+        self.stdout.write(
+            f"   [{hechos}/{total}] {hechos * 100 / total:5.1f}% | {velocidad:6.1f} archivos/s | ETA {restante:.0f}s"
+        )
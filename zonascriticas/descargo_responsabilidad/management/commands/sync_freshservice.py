@@ -4,29 +4,39 @@ import time
 
 # Esta estructura es en general para comandos que van mas de la mano de la administracion
 # Tareas administrativas que no deberia ver el usuario
+#   python manage.py sync_freshservice              -> solo lo que cambió desde la última corrida
+#   python manage.py sync_freshservice --completo   -> todo el inventario
 class Command(BaseCommand):
     help = 'Sincroniza Zonas buscando palabras clave en todo el inventario'
 
+    def add_arguments(self, parser):
+        parser.add_argument('--completo', action='store_true', help='Ignora la marca y recorre todo el inventario')
+        parser.add_argument('--hilos', type=int, default=None, help='Páginas descargadas a la vez')
+
     def handle(self, *args, **options):
         self.stdout.write(self.style.WARNING('🚀 Iniciando escaneo masivo de Freshservice...'))
         start_time = time.time()
 
         try:
-            res = FreshserviceSync.sincronizar_activos()
+            res = FreshserviceSync.sincronizar_activos(completo=options['completo'], hilos=options['hilos'])
             
             duration = time.time() - start_time
+            desde = f" (cambios desde {res['desde']:%Y-%m-%d %H:%M})" if res['desde'] else ''
             
             msg = (
                 f"\n✅ PROCESO FINALIZADO en {duration:.2f}s.\n"
                 f"----------------------------------------\n"
+                f" 🔁 Modo: {res['modo']}{desde}\n"
                 f" 📄 Páginas consultadas: {res['total_paginas']}\n"
                 f" 🔍 Total activos analizados: {res['total_analizados']}\n"
                 f" 🎯 Zonas/Impresoras encontradas: {res['importados']}\n"
                 f"    - Nuevas en DB: {res['creados']}\n"
                 f"    - Actualizadas: {res['actualizados']}\n"
+                f"    - Sin cambios: {res['sin_cambios']}\n"
+                f"    - Código QR en conflicto: {res['conflictos']}\n"
                 f"----------------------------------------"
             )
             self.stdout.write(self.style.SUCCESS(msg))
 
         except Exception as e:
-            self.stdout.write(self.style.ERROR(f'❌ Error crítico: {str(e)}'))
\ No newline at end of file
+            self.stdout.write(self.style.ERROR(f'❌ Error crítico: {str(e)}'))
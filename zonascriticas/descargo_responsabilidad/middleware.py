@@ -0,0 +1,59 @@
+"""
+zonascriticas/descargo_responsabilidad/middleware.py
+
+Descripción:
+
+Middleware que inyecta request.ingreso_activo de forma perezosa (igual que
+request.user en login/middleware.py).
+
+La consulta se hace UNA vez por petición y solo si alguien la pide: el
+decorador de tiempo, la vista y el servicio reutilizan el mismo objeto.
+
+Responsabilidades:
+
+- request.ingreso_activo: el ingreso NO finalizado del usuario
+  (PENDIENTE_HERRAMIENTAS o EN_ZONA) con ubicacion y visitante ya cargados,
+  leído de PresenciaActual por llave primaria.
+  Es None si el usuario no está logueado o no tiene ingreso abierto.
+- ingreso_en_zona(request): atajo que devuelve el ingreso solo si está EN_ZONA.
+
+Importante: debe ir DESPUÉS de CustomAuthMiddleware en settings.MIDDLEWARE.
+"""
+from django.utils.functional import SimpleLazyObject
+from .models import RegistroIngreso, PresenciaActual
+
+
+def get_ingreso_abierto(usuario):
+    """
+    Consulta REAL a la base de datos (una sola, por llave primaria sobre
+    presencia_actual).
+
+    args: usuario (Usuario o None)
+
+    return: RegistroIngreso o None
+    """
+    return PresenciaActual.ingreso_de(usuario)
+
+
+def ingreso_en_zona(request):
+    """
+    Devuelve request.ingreso_activo solo si está EN_ZONA, si no None.
+    No lanza consultas adicionales.
+    """
+    ingreso = request.ingreso_activo
+    if ingreso and ingreso.estado == RegistroIngreso.EstadoOpciones.EN_ZONA:
+        return ingreso
+    return None
+
+
+class IngresoActivoMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+
+        # Igual que request.user: la consulta solo ocurre al primer acceso
+        request.ingreso_activo = SimpleLazyObject(lambda: get_ingreso_abierto(request.user))
+
+        response = self.get_response(request)
+        return response
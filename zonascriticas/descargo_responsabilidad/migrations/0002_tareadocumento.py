@@ -0,0 +1,39 @@
+# Generated by Django 4.2.25 on 2026-10-18 05:00
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('descargo_responsabilidad', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TareaDocumento',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tipo', models.CharField(choices=[('ACTA_INGRESO', 'Acta de Descargo (Entrada)'), ('REPORTE_SALIDA', 'Reporte de Salida')], max_length=20)),
+                ('estado', models.CharField(choices=[('PENDIENTE', 'Pendiente'), ('EN_PROCESO', 'En Proceso'), ('COMPLETADA', 'Completada'), ('FALLIDA', 'Fallida (Sin más reintentos)')], default='PENDIENTE', max_length=20)),
+                ('intentos', models.PositiveSmallIntegerField(default=0)),
+                ('max_intentos', models.PositiveSmallIntegerField(default=5)),
+                ('disponible_desde', models.DateTimeField(default=django.utils.timezone.now, verbose_name='No procesar antes de')),
+                ('ultimo_error', models.TextField(blank=True, null=True)),
+                ('worker', models.CharField(blank=True, max_length=100, null=True)),
+                ('fecha_toma', models.DateTimeField(blank=True, null=True)),
+                ('fecha_creacion', models.DateTimeField(auto_now_add=True)),
+                ('fecha_actualizacion', models.DateTimeField(auto_now=True)),
+                ('documento', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='tareas_origen', to='descargo_responsabilidad.documentopdf')),
+                ('registro', models.ForeignKey(db_column='id_registro_ingreso', on_delete=django.db.models.deletion.CASCADE, related_name='tareas_documento', to='descargo_responsabilidad.registroingreso')),
+            ],
+            options={
+                'verbose_name': 'Tarea de Documento',
+                'verbose_name_plural': 'Cola de Documentos',
+                'db_table': 'cola_documentos',
+                'indexes': [models.Index(fields=['estado', 'disponible_desde'], name='cola_doc_estado_disp_idx')],
+            },
+        ),
+    ]
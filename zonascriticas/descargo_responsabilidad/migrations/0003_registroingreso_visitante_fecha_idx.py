@@ -0,0 +1,17 @@
+# Generated by Django 4.2.25 on 2026-10-18 05:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('descargo_responsabilidad', '0002_tareadocumento'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='registroingreso',
+            index=models.Index(fields=['visitante', 'fecha_hora_ingreso'], name='ingreso_visit_fecha_idx'),
+        ),
+    ]
@@ -0,0 +1,81 @@
+# Generated by Django 4.2.25 on 2026-10-18 05:23
+
+from datetime import timedelta
+
+from django.db import migrations, models
+from django.utils import timezone
+import django.db.models.deletion
+
+# Copia congelada de home.utils.CronometroJornada.calcular_fecha_limite al crear esta
+# migración: los cambios futuros del cronómetro no deben alterar el llenado inicial.
+DURACION_ESTANDAR_HORAS = 8
+
+
+def _fecha_limite(ingreso):
+    if not ingreso.fecha_hora_ingreso:
+        return None
+
+    entrada_local = timezone.localtime(ingreso.fecha_hora_ingreso)
+    hora_limite = ingreso.visitante.tiempo_limite_jornada
+    if not hora_limite:
+        return entrada_local + timedelta(hours=DURACION_ESTANDAR_HORAS)
+
+    limite = entrada_local.replace(
+        hour=hora_limite.hour, minute=hora_limite.minute, second=hora_limite.second, microsecond=0
+    )
+    # Turno nocturno: la hora de salida es del día siguiente
+    if limite < entrada_local:
+        limite += timedelta(days=1)
+    return limite
+
+
+def poblar_presencia(apps, schema_editor):
+    """Llena la tabla con los ingresos que hoy siguen abiertos (gana el Pendiente, luego el más reciente)."""
+    RegistroIngreso = apps.get_model('descargo_responsabilidad', 'RegistroIngreso')
+    PresenciaActual = apps.get_model('descargo_responsabilidad', 'PresenciaActual')
+
+    abiertos = RegistroIngreso.objects.select_related('visitante').filter(
+        estado__in=['Pendiente', 'En Zona']
+    ).order_by('-fecha_hora_ingreso')
+
+    presencias = {}
+    for ingreso in abiertos:
+        actual = presencias.get(ingreso.visitante_id)
+        if actual and not (ingreso.estado == 'Pendiente' and actual.estado != 'Pendiente'):
+            continue
+        presencias[ingreso.visitante_id] = PresenciaActual(
+            visitante_id=ingreso.visitante_id,
+            ingreso_id=ingreso.id,
+            ubicacion_id=ingreso.ubicacion_id,
+            estado=ingreso.estado,
+            fecha_limite=_fecha_limite(ingreso),
+        )
+
+    PresenciaActual.objects.bulk_create(presencias.values(), batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('login', '0003_contadorseguridad_eventos'),
+        ('descargo_responsabilidad', '0003_registroingreso_visitante_fecha_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PresenciaActual',
+            fields=[
+                ('visitante', models.OneToOneField(db_column='id_visitante', on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='presencia', serialize=False, to='login.usuario')),
+                ('estado', models.CharField(choices=[('Pendiente', 'Pendiente Registro Herramientas'), ('En Zona', 'En Zona'), ('Finalizado', 'Finalizado')], max_length=20)),
+                ('fecha_limite', models.DateTimeField(db_index=True)),
+                ('ingreso', models.OneToOneField(db_column='id_ingreso', on_delete=django.db.models.deletion.CASCADE, related_name='presencia', to='descargo_responsabilidad.registroingreso')),
+                ('ubicacion', models.ForeignKey(db_column='id_ubicacion', null=True, on_delete=django.db.models.deletion.PROTECT, related_name='presentes', to='descargo_responsabilidad.ubicacion')),
+            ],
+            options={
+                'verbose_name': 'Presencia Actual',
+                'verbose_name_plural': 'Presencia Actual',
+                'db_table': 'presencia_actual',
+            },
+        ),
+        migrations.RunPython(poblar_presencia, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 4.2.25 on 2026-10-18 05:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('descargo_responsabilidad', '0004_presenciaactual'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EstadoSincronizacion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('nombre', models.CharField(max_length=100, unique=True)),
+                ('marca', models.DateTimeField(blank=True, null=True)),
+                ('ultima_ejecucion', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'db_table': 'estado_sincronizacion',
+            },
+        ),
+    ]
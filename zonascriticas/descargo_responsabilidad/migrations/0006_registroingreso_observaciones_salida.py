@@ -0,0 +1,18 @@
+# Generated by Django 4.2.25 on 2026-10-18 06:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('descargo_responsabilidad', '0005_estado_sincronizacion'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='registroingreso',
+            name='observaciones_salida',
+            field=models.TextField(blank=True, null=True),
+        ),
+    ]
@@ -1,9 +1,10 @@
-from django.db import models
+from django.db import models, transaction
+from django.utils import timezone
 from login.models import Usuario
 
 # --- IMPORTACIÓN DEL NÚCLEO (Refactorización 1.1) ---
 # Reemplaza a las funciones locales de generación de rutas
-from home.utils import GeneradorRutaArchivo
+from home.utils import GeneradorRutaArchivo, CronometroJornada
 
 class Ubicacion(models.Model):
     """
@@ -25,6 +26,22 @@ class Ubicacion(models.Model):
     def __str__(self):
         return f"{self.nombre} ({self.ciudad}) - {self.codigo_qr}"
 
+class EstadoSincronizacion(models.Model):
+    """
+    Marca de agua (high-water mark) de una sincronización incremental: el
+    ``updated_at`` más reciente ya aplicado. La siguiente corrida solo pide
+    a Freshservice lo que cambió después (ver ``FreshserviceSync``).
+    """
+    nombre = models.CharField(max_length=100, unique=True)
+    marca = models.DateTimeField(null=True, blank=True)
+    ultima_ejecucion = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'estado_sincronizacion'
+
+    def __str__(self):
+        return f"{self.nombre}: {self.marca}"
+
 class DocumentoPDF(models.Model):
     class TipoDocumento(models.TextChoices):
         DESCARGO = 'DESCARGO', 'Descargo de Responsabilidad'
@@ -103,6 +120,8 @@ class RegistroIngreso(models.Model):
     
     fecha_hora_ingreso = models.DateTimeField(auto_now_add=True)
     fecha_hora_salida = models.DateTimeField(blank=True, null=True)
+    # Motivo de los cierres que no hizo el usuario (ej: jornada vencida)
+    observaciones_salida = models.TextField(blank=True, null=True)
 
     firma_visitante = models.ImageField(upload_to=GeneradorRutaArchivo('firmas/visitantes'))
     firma_responsable = models.ImageField(upload_to=GeneradorRutaArchivo('firmas/responsables'))
@@ -121,4 +140,169 @@ class RegistroIngreso(models.Model):
     )
 
     class Meta:
-        db_table = 'registros_ingreso'
\ No newline at end of file
+        db_table = 'registros_ingreso'
+        indexes = [
+            # Directorio de visitantes: MAX(fecha_hora_ingreso) por visitante sale del índice
+            models.Index(fields=['visitante', 'fecha_hora_ingreso'], name='ingreso_visit_fecha_idx'),
+        ]
+
+    #: Estados en los que el visitante sigue dentro (tiene fila en PresenciaActual)
+    ESTADOS_ABIERTOS = (EstadoOpciones.PENDIENTE_HERRAMIENTAS, EstadoOpciones.EN_ZONA)
+
+    def save(self, *args, **kwargs):
+        # Abrir, cerrar y reactivar pasan por aquí: la tabla de presencia se
+        # actualiza en la misma transacción que el ingreso.
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            PresenciaActual.sincronizar(self)
+
+
+class PresenciaActual(models.Model):
+    """
+    Quién está dentro AHORA: una fila por visitante con ingreso abierto
+    (Pendiente o En Zona). Es una copia desnormalizada de RegistroIngreso
+    para que las rutas calientes lean por llave primaria en vez de filtrar
+    el historial por estado.
+
+    Se mantiene desde ``RegistroIngreso.save()`` (abrir, cerrar, reactivar).
+    Quien actualice ingresos con ``.update()`` debe sincronizarla a mano.
+    """
+    visitante = models.OneToOneField(
+        Usuario, on_delete=models.CASCADE, primary_key=True, db_column='id_visitante', related_name='presencia'
+    )
+    ingreso = models.OneToOneField(
+        RegistroIngreso, on_delete=models.CASCADE, db_column='id_ingreso', related_name='presencia'
+    )
+    ubicacion = models.ForeignKey(
+        Ubicacion, on_delete=models.PROTECT, null=True, db_column='id_ubicacion', related_name='presentes'
+    )
+    estado = models.CharField(max_length=20, choices=RegistroIngreso.EstadoOpciones.choices)
+    # Vencimiento de la jornada (CronometroJornada.calcular_fecha_limite)
+    fecha_limite = models.DateTimeField(db_index=True)
+
+    class Meta:
+        db_table = 'presencia_actual'
+        verbose_name = "Presencia Actual"
+        verbose_name_plural = "Presencia Actual"
+
+    def __str__(self):
+        return f"{self.visitante_id} en {self.ubicacion_id} ({self.estado})"
+
+    @staticmethod
+    def sincronizar(ingreso):
+        """
+        Deja la presencia del visitante igual al ingreso:
+        - ingreso abierto -> crea/actualiza la fila (un ingreso abierto por visitante).
+        - ingreso finalizado -> borra la fila si apuntaba a ese ingreso.
+        """
+        if ingreso.estado in RegistroIngreso.ESTADOS_ABIERTOS:
+            PresenciaActual.objects.update_or_create(
+                visitante_id=ingreso.visitante_id,
+                defaults={
+                    'ingreso': ingreso,
+                    'ubicacion_id': ingreso.ubicacion_id,
+                    'estado': ingreso.estado,
+                    'fecha_limite': CronometroJornada.calcular_fecha_limite(ingreso),
+                },
+            )
+        else:
+            PresenciaActual.objects.filter(ingreso=ingreso).delete()
+
+    @staticmethod
+    def ingreso_de(usuario, solo_en_zona: bool = False):
+        """
+        Ingreso abierto del usuario (con ubicacion y visitante cargados) leyendo
+        la presencia por llave primaria. Una sola consulta.
+
+        args: usuario (Usuario o None), solo_en_zona (ignora los Pendiente)
+
+        return: RegistroIngreso o None
+        """
+        if not usuario:
+            return None
+
+        filtro = {'pk': usuario.pk}
+        if solo_en_zona:
+            filtro['estado'] = RegistroIngreso.EstadoOpciones.EN_ZONA
+
+        presencia = PresenciaActual.objects.select_related(
+            'ingreso__ubicacion', 'ingreso__visitante'
+        ).filter(**filtro).first()
+        return presencia.ingreso if presencia else None
+
+    @staticmethod
+    def recalcular_limite(usuario):
+        """
+        Recalcula el vencimiento si cambia la hora límite del usuario.
+        Relee el usuario de la BD (el objeto en memoria puede traer la hora como texto).
+        """
+        presencia = PresenciaActual.objects.select_related('ingreso__visitante').filter(pk=usuario.pk).first()
+        if presencia:
+            presencia.fecha_limite = CronometroJornada.calcular_fecha_limite(presencia.ingreso)
+            presencia.save(update_fields=['fecha_limite'])
+
+class TareaDocumento(models.Model):
+    """
+    Cola persistente de trabajos pesados (PDF + correo).
+
+    La petición HTTP solo inserta la fila en estado PENDIENTE y responde.
+    Los workers del comando ``procesar_documentos`` reclaman las tareas,
+    generan el PDF, lo guardan y lo envían por correo, reintentando con
+    backoff exponencial si algo falla.
+    """
+    class TipoTarea(models.TextChoices):
+        ACTA_INGRESO = 'ACTA_INGRESO', 'Acta de Descargo (Entrada)'
+        REPORTE_SALIDA = 'REPORTE_SALIDA', 'Reporte de Salida'
+
+    class EstadoTarea(models.TextChoices):
+        PENDIENTE = 'PENDIENTE', 'Pendiente'
+        EN_PROCESO = 'EN_PROCESO', 'En Proceso'
+        COMPLETADA = 'COMPLETADA', 'Completada'
+        FALLIDA = 'FALLIDA', 'Fallida (Sin más reintentos)'
+
+    registro = models.ForeignKey(
+        RegistroIngreso,
+        on_delete=models.CASCADE,
+        related_name='tareas_documento',
+        db_column='id_registro_ingreso'
+    )
+
+    tipo = models.CharField(max_length=20, choices=TipoTarea.choices)
+
+    estado = models.CharField(
+        max_length=20, choices=EstadoTarea.choices, default=EstadoTarea.PENDIENTE
+    )
+
+    # Control de reintentos
+    intentos = models.PositiveSmallIntegerField(default=0)
+    max_intentos = models.PositiveSmallIntegerField(default=5)
+    disponible_desde = models.DateTimeField(
+        default=timezone.now,
+        verbose_name="No procesar antes de"
+    )
+    ultimo_error = models.TextField(blank=True, null=True)
+
+    # Trazabilidad del worker que la tiene tomada
+    worker = models.CharField(max_length=100, blank=True, null=True)
+    fecha_toma = models.DateTimeField(blank=True, null=True)
+
+    documento = models.ForeignKey(
+        DocumentoPDF,
+        on_delete=models.SET_NULL, null=True, blank=True,
+        related_name='tareas_origen'
+    )
+
+    fecha_creacion = models.DateTimeField(auto_now_add=True)
+    fecha_actualizacion = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'cola_documentos'
+        verbose_name = "Tarea de Documento"
+        verbose_name_plural = "Cola de Documentos"
+        indexes = [
+            # El worker siempre pregunta: ¿qué está PENDIENTE y ya se puede procesar?
+            models.Index(fields=['estado', 'disponible_desde'], name='cola_doc_estado_disp_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.tipo} #{self.registro_id} ({self.estado})"
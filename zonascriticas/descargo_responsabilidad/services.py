@@ -1,24 +1,46 @@
 import logging
 import requests
 import os
+from datetime import datetime, timedelta
 from django.core.mail import EmailMessage
+from django.db import transaction
+from django.db.models import F, Q
 from django.utils import timezone
 from django.conf import settings
 from django.core.files.base import ContentFile
 
 # Importamos modelos
-from .models import RegistroIngreso, DocumentoPDF
-from home.utils import decodificar_imagen_base64, PDFGenerator # <-- IMPORTANTE
+from .models import RegistroIngreso, DocumentoPDF, TareaDocumento, PresenciaActual
+from home.utils import decodificar_imagen_base64, PDFGenerator, CronometroJornada # <-- IMPORTANTE
+from home.colas import calcular_backoff, liberar_huerfanas
 from login.models import Usuario
-from .models import Ubicacion
+from .models import Ubicacion, EstadoSincronizacion
+from .freshservice import ClienteFreshservice
 
 logger = logging.getLogger(__name__)
 
 class FreshserviceSync:
+    """
+    Sincroniza las zonas críticas (``Ubicacion``) con el inventario de activos
+    de Freshservice. Es incremental: guarda el ``updated_at`` más reciente ya
+    aplicado (``EstadoSincronizacion``) y la siguiente corrida solo pide lo
+    que cambió desde entonces. La descarga la hace ``ClienteFreshservice``
+    (páginas en paralelo dentro del presupuesto de peticiones por minuto).
+    Los cambios se comparan en memoria contra las ubicaciones existentes y se
+    aplican con ``bulk_create``/``bulk_update``.
+    """
     DOMAIN = os.getenv('FRESHSERVICE_DOMAIN')
     API_KEY = os.getenv('FRESHSERVICE_API_KEY')
     KEYWORDS_STR = os.getenv('FRESHSERVICE_KEYWORDS', '')
     KEYWORDS = [k.strip().lower() for k in KEYWORDS_STR.split(',') if k.strip()]
+    HILOS = int(os.getenv('FRESHSERVICE_HILOS', '4'))
+    # El plan más bajo de Freshservice permite 100 peticiones por minuto a la API
+    POR_MINUTO = int(os.getenv('FRESHSERVICE_POR_MINUTO', '100'))
+
+    NOMBRE_ESTADO = 'freshservice_activos'
+    # Margen por relojes desfasados: se vuelve a pedir un poco antes de la marca (el diff es idempotente)
+    SOLAPE = timedelta(minutes=5)
+    CAMPOS = ('nombre', 'codigo_qr', 'ciudad', 'descripcion', 'activa')
 
     @staticmethod
     def _obtener_valor_dinamico(diccionario, prefijo):
@@ -37,59 +59,106 @@ class FreshserviceSync:
         return False
 
     @classmethod
-    def sincronizar_activos(cls):
+    def _base_url(cls):
+        # FRESHSERVICE_DOMAIN puede traer el esquema (servidor falso de los tests)
+        return cls.DOMAIN if '://' in cls.DOMAIN else f"https://{cls.DOMAIN}"
+
+    @classmethod
+    def sincronizar_activos(cls, completo=False, hilos=None):
+        """
+        Args:
+            completo: ignora la marca y recorre todo el inventario.
+            hilos: páginas descargadas a la vez (por defecto FRESHSERVICE_HILOS).
+        """
         if not cls.DOMAIN or not cls.API_KEY:
             raise ValueError("Faltan credenciales en .env")
-        
-        base_url = f"https://{cls.DOMAIN}/api/v2/assets"
-        auth = (cls.API_KEY, 'X')
-        stats = {'total_paginas': 0, 'total_analizados': 0, 'importados': 0, 'creados': 0, 'actualizados': 0}
-        page = 1
-        continuar = True
-
-        while continuar:
-            params = {'include': 'type_fields', 'per_page': 50, 'page': page}
-            try:
-                response = requests.get(base_url, params=params, auth=auth)
-                response.raise_for_status()
-                data = response.json()
-                activos = data.get('assets', [])
-                if not activos: break
 
+        estado, _ = EstadoSincronizacion.objects.get_or_create(nombre=cls.NOMBRE_ESTADO)
+        desde = None if completo or estado.marca is None else estado.marca - cls.SOLAPE
+        stats = {
+            'modo': 'completo' if desde is None else 'incremental', 'desde': desde,
+            'total_paginas': 0, 'total_analizados': 0, 'importados': 0,
+            'creados': 0, 'actualizados': 0, 'sin_cambios': 0, 'conflictos': 0,
+        }
+
+        cliente = ClienteFreshservice(cls._base_url(), cls.API_KEY, hilos=hilos or cls.HILOS, por_minuto=cls.POR_MINUTO)
+        encontrados = {}
+        marca = estado.marca
+        try:
+            for activos in cliente.activos(desde):
                 stats['total_paginas'] += 1
                 stats['total_analizados'] += len(activos)
-
                 for asset in activos:
+                    if asset.get('updated_at'):
+                        actualizado = datetime.fromisoformat(asset['updated_at'])
+                        marca = actualizado if marca is None else max(marca, actualizado)
+
                     nombre = asset.get('name', '')
                     if not cls._es_zona_critica(nombre): continue
-                    
-                    type_fields = asset.get('type_fields', {})
-                    ciudad = cls._obtener_valor_dinamico(type_fields, 'ubicacin_')
                     asset_tag = asset.get('asset_tag')
                     if not asset_tag: continue
 
-                    obj, created = Ubicacion.objects.update_or_create(
-                        freshservice_id=asset.get('id'),
-                        defaults={
-                            'nombre': nombre,
-                            'codigo_qr': asset_tag,
-                            'ciudad': ciudad if ciudad else "No Definida",
-                            'descripcion': asset.get('description', ''),
-                            'activa': True
-                        }
-                    )
-                    stats['importados'] += 1
-                    if created: stats['creados'] += 1
-                    else: stats['actualizados'] += 1
-
-                page += 1
-                import time
-                time.sleep(0.5) 
-            except requests.RequestException as e:
-                logger.error(f"Error en página {page}: {e}")
-                raise e
+                    ciudad = cls._obtener_valor_dinamico(asset.get('type_fields', {}), 'ubicacin_')
+                    encontrados[asset.get('id')] = {
+                        'nombre': nombre,
+                        'codigo_qr': asset_tag,
+                        'ciudad': ciudad if ciudad else "No Definida",
+                        'descripcion': asset.get('description', ''),
+                        'activa': True
+                    }
+        except requests.RequestException as e:
+            # La marca no avanza: la próxima corrida vuelve a pedir lo mismo
+            logger.error(f"Error consultando Freshservice: {e}")
+            raise
+        finally:
+            cliente.cerrar()
+
+        cls._aplicar_cambios(encontrados, stats)
+
+        estado.marca = marca
+        estado.save()
         return stats
 
+    @classmethod
+    @transaction.atomic
+    def _aplicar_cambios(cls, encontrados: dict, stats: dict, batch_size: int = 500):
+        """Compara en memoria y escribe solo lo nuevo o lo que cambió."""
+        existentes, dueno_codigo = {}, {}
+        ids = list(encontrados)
+        for i in range(0, len(ids), batch_size):
+            lote = ids[i:i + batch_size]
+            codigos = [encontrados[fs_id]['codigo_qr'] for fs_id in lote]
+            for ubicacion in Ubicacion.objects.filter(Q(freshservice_id__in=lote) | Q(codigo_qr__in=codigos)):
+                existentes[ubicacion.freshservice_id] = ubicacion
+                dueno_codigo[ubicacion.codigo_qr] = ubicacion.freshservice_id
+
+        ahora = timezone.now()
+        crear, actualizar = [], []
+        for fs_id, campos in encontrados.items():
+            dueno = dueno_codigo.setdefault(campos['codigo_qr'], fs_id)
+            if dueno != fs_id:
+                # codigo_qr es único: el asset tag ya es de otra zona
+                logger.warning(f"Activo {fs_id}: el código {campos['codigo_qr']} ya pertenece al activo {dueno}.")
+                stats['conflictos'] += 1
+                continue
+
+            stats['importados'] += 1
+            actual = existentes.get(fs_id)
+            if actual is None:
+                crear.append(Ubicacion(freshservice_id=fs_id, **campos))
+            elif any(getattr(actual, campo) != valor for campo, valor in campos.items()):
+                for campo, valor in campos.items():
+                    setattr(actual, campo, valor)
+                actual.fecha_actualizacion = ahora  # bulk_update no aplica auto_now
+                actualizar.append(actual)
+            else:
+                stats['sin_cambios'] += 1
+
+        Ubicacion.objects.bulk_create(crear, batch_size=batch_size)
+        Ubicacion.objects.bulk_update(actualizar, cls.CAMPOS + ('fecha_actualizacion',), batch_size=batch_size)
+        stats['creados'] += len(crear)
+        stats['actualizados'] += len(actualizar)
+
 class UsuarioService:
 
     @staticmethod
@@ -120,6 +189,39 @@ class ZonaService:
         except Ubicacion.DoesNotExist:
             raise ValueError(f"QR '{codigo_qr}' no válido.")
 
+    @staticmethod
+    def ocupacion_zona(ubicacion_id):
+        """
+        Quién está dentro de una zona AHORA.
+        Recorre solo las filas de presencia de esa zona (índice por ubicación),
+        sin tocar el historial: el costo depende de los ocupantes, no de los años de registros.
+        """
+        zona = Ubicacion.objects.filter(pk=ubicacion_id).values('id', 'nombre').first()
+        if not zona:
+            raise ValueError("Zona no encontrada.")
+
+        ahora = timezone.now()
+        presentes = PresenciaActual.objects.filter(ubicacion_id=ubicacion_id).select_related(
+            'visitante__empresa', 'ingreso'
+        ).order_by('fecha_limite')
+
+        zona['ocupantes'] = [
+            {
+                'visitante_id': p.visitante_id,
+                'visitante_nombre': p.visitante.get_full_name(),
+                'visitante_doc': p.visitante.numero_documento,
+                'empresa': p.visitante.empresa.nombre_empresa if p.visitante.empresa else 'Particular',
+                'ingreso_id': p.ingreso_id,
+                'estado': p.estado,
+                'fecha_ingreso': p.ingreso.fecha_hora_ingreso.isoformat(),
+                'fecha_limite': p.fecha_limite.isoformat(),
+                'segundos_restantes': max(0, int((p.fecha_limite - ahora).total_seconds())),
+            }
+            for p in presentes
+        ]
+        zona['total'] = len(zona['ocupantes'])
+        return zona
+
 class PDFService:
     """
     Servicio ligero que delega la creación a PDFGenerator (en utils).
@@ -155,9 +257,204 @@ class PDFService:
         PDFService.enviar_correo_con_adjunto(usuario, archivo_bytes, nombre_archivo)
 
 
+class ColaDocumentos:
+    """
+    Cola persistente (tabla ``cola_documentos``) para sacar del request
+    la generación de PDFs y el envío de correos.
+
+    - ``encolar``: lo único que hace la petición HTTP (un INSERT).
+    - ``reclamar_siguiente``: un worker toma una tarea con un UPDATE
+      condicional (solo gana quien la cambia de PENDIENTE a EN_PROCESO),
+      así varios procesos pueden consumir la misma cola sin pisarse.
+    - ``ejecutar``: genera, guarda y envía. Si falla, reprograma con backoff.
+    """
+    #: Espera base antes del primer reintento (se duplica en cada intento).
+    BACKOFF_BASE_SEGUNDOS = 30
+
+    #: Tope de espera entre reintentos.
+    BACKOFF_MAX_SEGUNDOS = 3600
+
+    #: Si una tarea lleva más de esto EN_PROCESO, su worker murió: se libera.
+    TIEMPO_MAXIMO_TAREA_SEGUNDOS = 600
+
+    #: Cuántos candidatos se leen por consulta al reclamar.
+    LOTE_RECLAMO = 10
+
+    @staticmethod
+    def encolar(registro, tipo) -> TareaDocumento:
+        return TareaDocumento.objects.create(registro=registro, tipo=tipo)
+
+    @staticmethod
+    def encolar_lote(registro_ids, tipo) -> int:
+        """Igual que ``encolar`` para muchos registros con un solo INSERT."""
+        tareas = TareaDocumento.objects.bulk_create(
+            [TareaDocumento(registro_id=registro_id, tipo=tipo) for registro_id in registro_ids],
+            batch_size=500
+        )
+        return len(tareas)
+
+    @staticmethod
+    def calcular_backoff(intentos: int) -> timedelta:
+        return calcular_backoff(intentos, ColaDocumentos.BACKOFF_BASE_SEGUNDOS, ColaDocumentos.BACKOFF_MAX_SEGUNDOS)
+
+    @staticmethod
+    def liberar_huerfanas() -> int:
+        """
+        Devuelve a PENDIENTE las tareas cuyo worker dejó de responder.
+        Las que ya gastaron sus intentos quedan FALLIDA (ver home/colas.py).
+        """
+        return liberar_huerfanas(TareaDocumento, ColaDocumentos.TIEMPO_MAXIMO_TAREA_SEGUNDOS)
+
+    @staticmethod
+    def reclamar_siguiente(worker_id: str):
+        """
+        Toma la tarea pendiente más antigua que ya se pueda procesar.
+        Retorna None si la cola está vacía.
+        """
+        ahora = timezone.now()
+        candidatos = list(
+            TareaDocumento.objects.filter(
+                estado=TareaDocumento.EstadoTarea.PENDIENTE,
+                disponible_desde__lte=ahora
+            ).order_by('disponible_desde', 'id').values_list('id', flat=True)[:ColaDocumentos.LOTE_RECLAMO]
+        )
+
+        for tarea_id in candidatos:
+            # UPDATE condicional: si otro worker la tomó primero, afecta 0 filas.
+            tomada = TareaDocumento.objects.filter(
+                pk=tarea_id,
+                estado=TareaDocumento.EstadoTarea.PENDIENTE
+            ).update(
+                estado=TareaDocumento.EstadoTarea.EN_PROCESO,
+                worker=worker_id,
+                fecha_toma=ahora,
+                intentos=F('intentos') + 1
+            )
+            if tomada:
+                return TareaDocumento.objects.select_related(
+                    'registro__visitante__cargo',
+                    'registro__visitante__empresa',
+                    'registro__responsable',
+                    'registro__ubicacion',
+                ).get(pk=tarea_id)
+
+        return None
+
+    @staticmethod
+    def ejecutar(tarea) -> bool:
+        """
+        Procesa una tarea ya reclamada. Retorna True si terminó bien.
+        """
+        try:
+            if tarea.tipo == TareaDocumento.TipoTarea.ACTA_INGRESO:
+                documento = ColaDocumentos._emitir_acta_ingreso(tarea.registro)
+            elif tarea.tipo == TareaDocumento.TipoTarea.REPORTE_SALIDA:
+                documento = ColaDocumentos._emitir_reporte_salida(tarea.registro)
+            else:
+                raise ValueError(f"Tipo de tarea desconocido: {tarea.tipo}")
+        except Exception as e:
+            ColaDocumentos._registrar_fallo(tarea, e)
+            return False
+
+        tarea.estado = TareaDocumento.EstadoTarea.COMPLETADA
+        tarea.documento = documento
+        tarea.ultimo_error = None
+        tarea.save(update_fields=['estado', 'documento', 'ultimo_error', 'fecha_actualizacion'])
+        return True
+
+    @staticmethod
+    def procesar_pendientes(worker_id: str, limite: int = None) -> dict:
+        """
+        Vacía la cola (o hasta ``limite`` tareas). Lo usa el comando y los tests.
+        """
+        stats = {'procesadas': 0, 'exitosas': 0, 'fallidas': 0}
+        while limite is None or stats['procesadas'] < limite:
+            tarea = ColaDocumentos.reclamar_siguiente(worker_id)
+            if not tarea:
+                break
+            stats['procesadas'] += 1
+            if ColaDocumentos.ejecutar(tarea):
+                stats['exitosas'] += 1
+            else:
+                stats['fallidas'] += 1
+        return stats
+
+    @staticmethod
+    def _registrar_fallo(tarea, error):
+        tarea.ultimo_error = str(error)
+        tarea.worker = None
+        if tarea.intentos >= tarea.max_intentos:
+            tarea.estado = TareaDocumento.EstadoTarea.FALLIDA
+            logger.error(f"Tarea {tarea.id} agotó sus {tarea.max_intentos} intentos: {error}")
+        else:
+            tarea.estado = TareaDocumento.EstadoTarea.PENDIENTE
+            tarea.disponible_desde = timezone.now() + ColaDocumentos.calcular_backoff(tarea.intentos)
+            logger.warning(f"Tarea {tarea.id} falló (intento {tarea.intentos}), se reintenta: {error}")
+        tarea.save(update_fields=['ultimo_error', 'worker', 'estado', 'disponible_desde', 'fecha_actualizacion'])
+
+    @staticmethod
+    def _leer_o_generar(documento_existente, generar):
+        """
+        Si el PDF ya quedó guardado en un intento anterior (falló solo el correo),
+        se reutiliza en lugar de generar un documento duplicado.
+        """
+        if documento_existente and documento_existente.archivo:
+            with documento_existente.archivo.open('rb') as f:
+                return f.read(), False
+        return generar(), True
+
+    @staticmethod
+    def _emitir_acta_ingreso(registro):
+        pdf_bytes, es_nuevo = ColaDocumentos._leer_o_generar(
+            registro.pdf_descargo, lambda: PDFService.generar_pdf_descargo(registro)
+        )
+        nombre_pdf = f"descargo_{registro.id}.pdf"
+        documento = registro.pdf_descargo
+
+        if es_nuevo:
+            documento = DocumentoPDF(
+                usuario=registro.visitante,
+                tipo=DocumentoPDF.TipoDocumento.DESCARGO,
+                descripcion=f"Ingreso a {registro.ubicacion.nombre}"
+            )
+            documento.archivo.save(nombre_pdf, ContentFile(pdf_bytes))
+            documento.save()
+            RegistroIngreso.objects.filter(pk=registro.pk).update(pdf_descargo=documento)
+            registro.pdf_descargo = documento
+
+        PDFService.enviar_correo_con_adjunto(registro.visitante, pdf_bytes, nombre_pdf)
+        return documento
+
+    @staticmethod
+    def _emitir_reporte_salida(registro):
+        pdf_bytes, es_nuevo = ColaDocumentos._leer_o_generar(
+            registro.pdf_reporte_salida, lambda: PDFService.generar_reporte_salida(registro)
+        )
+        nombre_pdf = f"reporte_salida_{registro.id}.pdf"
+        documento = registro.pdf_reporte_salida
+
+        if es_nuevo:
+            documento = DocumentoPDF(
+                usuario=registro.visitante,
+                tipo=DocumentoPDF.TipoDocumento.REPORTE_SALIDA,
+                descripcion=f"Salida {registro.ubicacion.nombre}"
+            )
+            documento.archivo.save(nombre_pdf, ContentFile(pdf_bytes))
+            documento.save()
+            RegistroIngreso.objects.filter(pk=registro.pk).update(pdf_reporte_salida=documento)
+            registro.pdf_reporte_salida = documento
+
+        PDFService.enviar_reporte_final(registro.visitante, pdf_bytes, nombre_pdf)
+        return documento
+
+
 class DescargoService:
     @staticmethod
     def procesar_ingreso(data, usuario_visitante):
+        """
+        Registra el ingreso y encola el acta (PDF + correo).
+        Retorna (registro, tarea): la tarea sirve para consultar el estado del PDF.
+        """
         # 1. Validaciones
         try:
             responsable = Usuario.objects.get(pk=data.get('idResponsable'))
@@ -168,49 +465,49 @@ class DescargoService:
         modalidad = data.get('modalidad', RegistroIngreso.ModalidadOpciones.VISITA)
         estado = RegistroIngreso.EstadoOpciones.PENDIENTE_HERRAMIENTAS if modalidad == RegistroIngreso.ModalidadOpciones.CON_EQUIPOS else RegistroIngreso.EstadoOpciones.EN_ZONA
 
-        # 2. Crear Registro
-        registro = RegistroIngreso(
-            visitante=usuario_visitante,
-            responsable=responsable,
-            ubicacion=ubicacion,
-            acepta_descargo=data.get('aceptaDescargo'),
-            acepta_politicas=data.get('aceptaPoliticas'),
-            modalidad=modalidad, 
-            estado=estado,
-            firma_visitante=decodificar_imagen_base64(data.get('firmaVisitante'), f"vis_{usuario_visitante.id}.png"),
-            firma_responsable=decodificar_imagen_base64(data.get('firmaResponsable'), f"resp_{responsable.id}.png"),
-        )
-        registro.save()
-        
-        # 3. Generar PDF (Ahora es una llamada limpia)
+        firma_visitante = firma_responsable = None
         try:
-            pdf_bytes = PDFService.generar_pdf_descargo(registro)
-            nombre_pdf = f"descargo_{registro.id}.pdf"
-            
-            documento = DocumentoPDF(
-                usuario=usuario_visitante,
-                tipo=DocumentoPDF.TipoDocumento.DESCARGO,
-                descripcion=f"Ingreso a {ubicacion.nombre}"
-            )
-            documento.archivo.save(nombre_pdf, ContentFile(pdf_bytes))
-            documento.save()
-
-            registro.pdf_descargo = documento
-            registro.save()
-
-            PDFService.enviar_correo_con_adjunto(usuario_visitante, pdf_bytes, nombre_pdf)
-        except Exception as e:
-            logger.error(f"Error generando PDF entrada: {e}")
-
-        return registro
+            # Las firmas se decodifican por bloques a archivos temporales (ValueError si no son PNG válidos)
+            firma_visitante = decodificar_imagen_base64(data.get('firmaVisitante'), f"vis_{usuario_visitante.id}.png")
+            firma_responsable = decodificar_imagen_base64(data.get('firmaResponsable'), f"resp_{responsable.id}.png")
+
+            # 2. Crear Registro + Tarea en la misma transacción:
+            # nunca queda un ingreso sin su acta pendiente (ni al revés).
+            with transaction.atomic():
+                registro = RegistroIngreso(
+                    visitante=usuario_visitante,
+                    responsable=responsable,
+                    ubicacion=ubicacion,
+                    acepta_descargo=data.get('aceptaDescargo'),
+                    acepta_politicas=data.get('aceptaPoliticas'),
+                    modalidad=modalidad, 
+                    estado=estado,
+                    firma_visitante=firma_visitante,
+                    firma_responsable=firma_responsable,
+                )
+                registro.save()
+
+                # 3. El PDF y el correo los hace el worker (comando procesar_documentos)
+                tarea = ColaDocumentos.encolar(registro, TareaDocumento.TipoTarea.ACTA_INGRESO)
+        finally:
+            for firma in (firma_visitante, firma_responsable):
+                if firma:
+                    firma.close()
+
+        return registro, tarea
 
 class SalidaService:
+    #: Observación que dejan los cierres por jornada vencida (barrido y decorador).
+    OBSERVACION_CIERRE_AUTOMATICO = "Cierre automático del sistema: Tiempo de jornada agotado."
+
     @staticmethod
-    def cerrar_zona(usuario):
-        ingreso = RegistroIngreso.objects.filter(
-            visitante=usuario,
-            estado=RegistroIngreso.EstadoOpciones.EN_ZONA
-        ).first()
+    def cerrar_zona(usuario, ingreso=None):
+        """
+        Cierra el ingreso activo y encola el reporte de salida.
+        Si la vista ya tiene el ingreso (request.ingreso_activo) no se vuelve a consultar.
+        Retorna (ingreso, tarea).
+        """
+        ingreso = ingreso or PresenciaActual.ingreso_de(usuario, solo_en_zona=True)
 
         if not ingreso: raise ValueError("No hay ingreso activo.")
 
@@ -218,28 +515,100 @@ class SalidaService:
         if ingreso.actividades_registradas.filter(estado='EN_PROCESO').exists():
             raise ValueError("Hay actividades pendientes (Rojas).")
 
-        ingreso.fecha_hora_salida = timezone.now()
-        ingreso.estado = RegistroIngreso.EstadoOpciones.FINALIZADO
-        ingreso.save()
-
-        try:
-            # Generación limpia
-            pdf_bytes = PDFService.generar_reporte_salida(ingreso)
-            nombre_pdf = f"reporte_salida_{ingreso.id}.pdf"
+        with transaction.atomic():
+            ingreso.fecha_hora_salida = timezone.now()
+            ingreso.estado = RegistroIngreso.EstadoOpciones.FINALIZADO
+            ingreso.save()
 
-            documento = DocumentoPDF(
-                usuario=usuario,
-                tipo=DocumentoPDF.TipoDocumento.REPORTE_SALIDA,
-                descripcion=f"Salida {ingreso.ubicacion.nombre}"
-            )
-            documento.archivo.save(nombre_pdf, ContentFile(pdf_bytes))
-            documento.save()
+            tarea = ColaDocumentos.encolar(ingreso, TareaDocumento.TipoTarea.REPORTE_SALIDA)
 
-            ingreso.pdf_reporte_salida = documento
-            ingreso.save()
+        return ingreso, tarea
 
-            PDFService.enviar_reporte_final(usuario, pdf_bytes, nombre_pdf)
-        except Exception as e:
-            logger.error(f"Error reporte salida: {e}")
+    @staticmethod
+    def cerrar_por_tiempo(ingreso_ids, ahora=None) -> list:
+        """
+        Cierra por jornada vencida los ingresos indicados que sigan EN_ZONA y
+        encola sus reportes de salida. Es el único camino de cierre automático:
+        lo usan el barrido (``cerrar_jornadas_vencidas``) y el decorador
+        ``requiere_tiempo_activo`` (vía ``ActividadesService.forzar_salida_por_tiempo``).
+
+        Retorna los ids que efectivamente se cerraron.
+        """
+        ahora = ahora or timezone.now()
+        with transaction.atomic():
+            # El filtro por estado evita cerrar algo que se cerró/reactivó entretanto
+            cerrar = list(RegistroIngreso.objects.select_for_update().filter(
+                pk__in=ingreso_ids,
+                estado=RegistroIngreso.EstadoOpciones.EN_ZONA
+            ).values_list('id', flat=True))
+
+            RegistroIngreso.objects.filter(pk__in=cerrar).update(
+                estado=RegistroIngreso.EstadoOpciones.FINALIZADO,
+                fecha_hora_salida=ahora,
+                observaciones_salida=SalidaService.OBSERVACION_CIERRE_AUTOMATICO
+            )
+            # update() no pasa por RegistroIngreso.save(): sincronizamos la presencia a mano
+            PresenciaActual.objects.filter(ingreso_id__in=cerrar).delete()
+            ColaDocumentos.encolar_lote(cerrar, TareaDocumento.TipoTarea.REPORTE_SALIDA)
+        return cerrar
 
-        return ingreso
\ No newline at end of file
+    @staticmethod
+    def cerrar_jornadas_vencidas(lote: int = 500, ahora=None) -> dict:
+        """
+        Cierra TODOS los ingresos EN_ZONA cuya jornada ya venció y encola sus
+        reportes de salida. Lo llama el comando ``cerrar_jornadas_vencidas``.
+
+        Recorre presencia_actual por el índice de ``fecha_limite`` (solo las
+        filas vencidas, nunca todos los ingresos abiertos) en lotes de ``lote``:
+        por lote, un SELECT, un UPDATE de ingresos, un DELETE de presencia y un
+        INSERT de tareas (``cerrar_por_tiempo``).
+
+        Antes de cerrar se recalcula el vencimiento con CronometroJornada: si
+        la hora límite del usuario cambió y la fila quedó desactualizada, se
+        corrige y no se cierra.
+
+        Retorna: {'cerrados', 'corregidos', 'lotes'}
+        """
+        ahora = ahora or timezone.now()
+        stats = {'cerrados': 0, 'corregidos': 0, 'lotes': 0}
+        ultima_posicion = None
+
+        while True:
+            candidatos = PresenciaActual.objects.select_related('ingreso__visitante').filter(
+                estado=RegistroIngreso.EstadoOpciones.EN_ZONA,
+                fecha_limite__lte=ahora
+            ).order_by('fecha_limite', 'pk')
+
+            # Keyset: los que se corrigieron o ya no estaban abiertos no se vuelven a leer
+            if ultima_posicion:
+                fecha, pk = ultima_posicion
+                candidatos = candidatos.filter(Q(fecha_limite__gt=fecha) | Q(fecha_limite=fecha, pk__gt=pk))
+
+            candidatos = list(candidatos[:lote])
+            if not candidatos:
+                break
+
+            stats['lotes'] += 1
+            ultima_posicion = (candidatos[-1].fecha_limite, candidatos[-1].pk)
+
+            vencidos, corregidos = [], []
+            for presencia in candidatos:
+                limite = CronometroJornada.calcular_fecha_limite(presencia.ingreso)
+                if limite <= ahora:
+                    vencidos.append(presencia.ingreso_id)
+                else:
+                    presencia.fecha_limite = limite
+                    corregidos.append(presencia)
+
+            with transaction.atomic():
+                cerrar = SalidaService.cerrar_por_tiempo(vencidos, ahora)
+
+                if corregidos:
+                    PresenciaActual.objects.bulk_update(corregidos, ['fecha_limite'])
+
+            stats['cerrados'] += len(cerrar)
+            stats['corregidos'] += len(corregidos)
+
+        if stats['cerrados']:
+            logger.info("Jornadas vencidas cerradas: %s", stats['cerrados'])
+        return stats
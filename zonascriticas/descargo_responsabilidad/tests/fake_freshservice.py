@@ -0,0 +1,147 @@
+"""
+descargo_responsabilidad/tests/fake_freshservice.py
+
+Servidor HTTP **falso** y mínimo de la API de activos de Freshservice
+(``GET /api/v2/assets``) para probar ``FreshserviceSync`` sin red. Lo usan
+los tests de ``descargo_responsabilidad`` y el comando
+``benchmark_freshservice``. No es para producción.
+
+Soporta ``page``, ``per_page``, ``filter="updated_at:>'...'"``, autenticación
+básica, latencia simulada y un límite de peticiones por segundo (responde
+429 con ``Retry-After``). Cuenta peticiones, conexiones TCP y la máxima
+concurrencia observada.
+
+Uso
+---
+    servidor = FakeFreshservice(activos=[...], api_key='clave')
+    servidor.iniciar()          # escucha en 127.0.0.1 con un puerto libre
+    url = servidor.url          # 'http://127.0.0.1:<puerto>'
+    ...
+    servidor.detener()
+"""
+
+import base64
+import json
+import re
+import threading
+import time
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+_FILTRO_UPDATED = re.compile(r"updated_at:>'([^']+)'")
+
+
+class _Manejador(BaseHTTPRequestHandler):
+    # HTTP/1.1: la conexión se mantiene abierta entre peticiones (keep-alive)
+    protocol_version = 'HTTP/1.1'
+
+    def setup(self):
+        super().setup()
+        with self.server.lock:
+            self.server.conexiones += 1
+
+    def log_message(self, *args):
+        pass
+
+    def _responder(self, status, cuerpo, headers=None):
+        datos = json.dumps(cuerpo).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(datos)))
+        for clave, valor in (headers or {}).items():
+            self.send_header(clave, valor)
+        self.end_headers()
+        self.wfile.write(datos)
+
+    def do_GET(self):
+        servidor = self.server
+        with servidor.lock:
+            servidor.peticiones += 1
+            servidor.en_curso += 1
+            servidor.max_concurrencia = max(servidor.max_concurrencia, servidor.en_curso)
+        try:
+            self._atender(servidor)
+        finally:
+            with servidor.lock:
+                servidor.en_curso -= 1
+
+    def _atender(self, servidor):
+        esperado = 'Basic ' + base64.b64encode(f'{servidor.api_key}:X'.encode()).decode()
+        if self.headers.get('Authorization') != esperado:
+            return self._responder(401, {'message': 'Unauthorized'})
+
+        url = urlparse(self.path)
+        if url.path != '/api/v2/assets':
+            return self._responder(404, {'message': 'Not found'})
+
+        if servidor.por_segundo:
+            with servidor.lock:
+                ahora = time.monotonic()
+                servidor.ventana = [t for t in servidor.ventana if ahora - t < 1.0]
+                excedido = len(servidor.ventana) >= servidor.por_segundo
+                if not excedido:
+                    servidor.ventana.append(ahora)
+            if excedido:
+                servidor.rechazadas += 1
+                return self._responder(429, {'message': 'Too many requests'}, {'Retry-After': '1'})
+
+        if servidor.latencia:
+            time.sleep(servidor.latencia)
+
+        params = parse_qs(url.query)
+        pagina = int(params.get('page', ['1'])[0])
+        por_pagina = min(int(params.get('per_page', ['30'])[0]), 100)
+        activos = servidor.activos
+        filtro = _FILTRO_UPDATED.search(params.get('filter', [''])[0])
+        if filtro:
+            desde = datetime.fromisoformat(filtro.group(1))
+            activos = [a for a in activos if datetime.fromisoformat(a['updated_at']) > desde]
+            servidor.filtros.append(filtro.group(1))
+
+        inicio = (pagina - 1) * por_pagina
+        self._responder(200, {'assets': activos[inicio:inicio + por_pagina]})
+
+
+class FakeFreshservice:
+    """Servidor HTTP en un hilo de fondo."""
+
+    def __init__(self, activos=None, api_key: str = 'clave', latencia: float = 0.0,
+                 por_segundo: int = 0, host: str = '127.0.0.1', puerto: int = 0):
+        self._servidor = ThreadingHTTPServer((host, puerto), _Manejador)
+        self._servidor.daemon_threads = True
+        self._servidor.lock = threading.Lock()
+        self._servidor.activos = list(activos or [])
+        self._servidor.api_key = api_key
+        self._servidor.latencia = latencia
+        self._servidor.por_segundo = por_segundo
+        self._servidor.ventana = []
+        self._hilo = None
+        self.reiniciar_contadores()
+
+    def __getattr__(self, nombre):
+        # Contadores y datos viven en el servidor (los comparten los hilos del manejador)
+        return getattr(self._servidor, nombre)
+
+    @property
+    def url(self) -> str:
+        host, puerto = self._servidor.server_address[:2]
+        return f"http://{host}:{puerto}"
+
+    def publicar(self, activos):
+        """Reemplaza el inventario que sirve el servidor."""
+        self._servidor.activos = list(activos)
+
+    def reiniciar_contadores(self):
+        for nombre in ('peticiones', 'conexiones', 'en_curso', 'max_concurrencia', 'rechazadas'):
+            setattr(self._servidor, nombre, 0)
+        self._servidor.filtros = []
+
+    def iniciar(self):
+        self._hilo = threading.Thread(target=self._servidor.serve_forever, daemon=True)
+        self._hilo.start()
+        return self
+
+    def detener(self):
+        self._servidor.shutdown()
+        self._servidor.server_close()
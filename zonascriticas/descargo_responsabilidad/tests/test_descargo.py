@@ -0,0 +1,667 @@
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.db import connection
+from django.core import mail
+from django.core.management import call_command
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.urls import reverse
+from django.utils import timezone
+from datetime import timedelta
+from io import BytesIO, StringIO
+from unittest import mock
+from PIL import Image # Necesitamos Pillow para crear una imagen válida
+import base64
+import json
+import os
+import requests
+import shutil
+import tempfile
+
+# Importamos tus modelos y servicios
+from home.utils import CronometroJornada
+from login.models import Usuario, Empresa, Cargo
+from registros.services import RegistrosService
+from .fake_freshservice import FakeFreshservice
+from ..freshservice import LimitadorTasa
+from ..models import (
+    Ubicacion, RegistroIngreso, DocumentoPDF, TareaDocumento, PresenciaActual, EstadoSincronizacion
+)
+from ..services import PDFService, DescargoService, ColaDocumentos, SalidaService, FreshserviceSync
+
+class PDFGenerationTestCase(TestCase):
+    
+    def setUp(self):
+        print("\n--- INICIANDO CONFIGURACIÓN DEL TEST ---")
+        
+        # 1. Crear Empresa y Cargo
+        self.empresa = Empresa.objects.create(nombre_empresa="Test Corp", nit="900000000")
+        self.cargo = Cargo.objects.create(nombre="Tester")
+
+        # 2. Crear Usuarios (AJUSTADO A TU MODELO REAL)
+        # Eliminamos: username, last_name, password (no existen en tu modelo)
+        self.visitante = Usuario.objects.create(
+            first_name="Juan Perez", # Usamos first_name para el nombre completo
+            numero_documento="123456789",
+            email="visitante@test.com",
+            empresa=self.empresa,
+            cargo=self.cargo,
+            tipo='Usuario',
+            tipo_documento='CC'
+        )
+        
+        self.responsable = Usuario.objects.create(
+            first_name="Maria Gomez",
+            numero_documento="987654321",
+            email="responsable@test.com",
+            cargo=self.cargo,
+            tipo='Administrador',
+            tipo_documento='CC'
+        )
+
+        # 3. Crear Ubicación
+        self.ubicacion = Ubicacion.objects.create(
+            nombre="Data Center Principal",
+            codigo_qr="DC-01",
+            ciudad="Bogotá",
+            freshservice_id=1001,
+            activa=True
+        )
+
+        # 4. Generar Imagen Falsa
+        image_buffer = BytesIO()
+        image = Image.new('RGB', (200, 100), color='white')
+        image.save(image_buffer, 'PNG')
+        self.dummy_signature = SimpleUploadedFile(
+            name='firma_test.png',
+            content=image_buffer.getvalue(),
+            content_type='image/png'
+        )
+
+        # 5. Registro
+        self.registro = RegistroIngreso.objects.create(
+            visitante=self.visitante,
+            responsable=self.responsable,
+            ubicacion=self.ubicacion,
+            modalidad=RegistroIngreso.ModalidadOpciones.VISITA,
+            estado=RegistroIngreso.EstadoOpciones.EN_ZONA,
+            firma_visitante=self.dummy_signature,
+            firma_responsable=self.dummy_signature,
+            fecha_hora_ingreso=timezone.now()
+        )
+        print("✅ Datos de prueba creados exitosamente.")
+
+    def test_generacion_pdf_descargo(self):
+        """
+        Prueba unitaria: Llama al servicio y verifica que retorne bytes de PDF.
+        """
+        print("\n--- EJECUTANDO TEST DE GENERACIÓN PDF ---")
+        
+        try:
+            # 1. Llamamos al servicio (Aquí es donde suele fallar)
+            pdf_bytes = PDFService.generar_pdf_descargo(self.registro)
+            
+            # 2. Validaciones básicas
+            self.assertIsNotNone(pdf_bytes, "El servicio retornó None en lugar de bytes.")
+            self.assertIsInstance(pdf_bytes, bytes, "El retorno no es de tipo bytes.")
+            self.assertTrue(pdf_bytes.startswith(b'%PDF'), "El archivo generado no tiene cabecera PDF válida.")
+            
+            print(f"✅ PDF generado correctamente. Tamaño: {len(pdf_bytes)} bytes.")
+
+            # 3. GUARDADO LOCAL PARA DEBUG VISUAL
+            # Guardamos el PDF generado en la raíz del proyecto para que lo puedas abrir
+            ruta_salida = "debug_resultado.pdf"
+            with open(ruta_salida, "wb") as f:
+                f.write(pdf_bytes)
+            
+            print(f"📄 He guardado el PDF generado en: {os.path.abspath(ruta_salida)}")
+            print("👉 Ábrelo para verificar que el diseño y las imágenes se ven bien.")
+
+        except Exception as e:
+            print("\n❌ ERROR CRÍTICO DURANTE LA GENERACIÓN:")
+            print(f"Tipo de error: {type(e).__name__}")
+            print(f"Mensaje: {str(e)}")
+            
+            # Si el error es de FPDF y rutas, esto nos dirá qué ruta intentó buscar
+            if hasattr(self.registro.firma_visitante, 'path'):
+                print(f"Ruta de imagen intentada: {self.registro.firma_visitante.path}")
+                print(f"¿Existe el archivo?: {os.path.exists(self.registro.firma_visitante.path)}")
+            
+            # Hacemos fallar el test formalmente
+            self.fail(f"El servicio lanzó una excepción: {e}")
+
+    def tearDown(self):
+        # Limpieza (Opcional, Django test runner suele limpiar la DB, pero los archivos quedan en /tmp)
+        pass
+
+
+MEDIA_TEMPORAL = tempfile.mkdtemp()
+
+
+@override_settings(MEDIA_ROOT=MEDIA_TEMPORAL, EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend')
+class ColaDocumentosTestCase(TestCase):
+    """
+    La petición solo inserta el ingreso y la tarea; el worker genera y envía.
+    """
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(MEDIA_TEMPORAL, ignore_errors=True)
+
+    def setUp(self):
+        self.cargo = Cargo.objects.create(nombre="Tester")
+        self.visitante = Usuario.objects.create(
+            first_name="Juan Perez", numero_documento="123456789",
+            email="visitante@test.com", cargo=self.cargo, tipo_documento='CC'
+        )
+        self.responsable = Usuario.objects.create(
+            first_name="Maria Gomez", numero_documento="987654321",
+            email="responsable@test.com", cargo=self.cargo, tipo='Administrador', tipo_documento='CC'
+        )
+        self.ubicacion = Ubicacion.objects.create(
+            nombre="Data Center Principal", codigo_qr="DC-01", ciudad="Bogotá", freshservice_id=1001
+        )
+
+        buffer = BytesIO()
+        Image.new('RGB', (200, 100), color='white').save(buffer, 'PNG')
+        firma = "data:image/png;base64," + base64.b64encode(buffer.getvalue()).decode()
+
+        self.data = {
+            'idResponsable': self.responsable.id,
+            'idZona': self.ubicacion.id,
+            'aceptaDescargo': True,
+            'aceptaPoliticas': True,
+            'modalidad': RegistroIngreso.ModalidadOpciones.VISITA,
+            'firmaVisitante': firma,
+            'firmaResponsable': firma,
+        }
+
+    def test_ingreso_solo_encola(self):
+        registro, tarea = DescargoService.procesar_ingreso(self.data, self.visitante)
+
+        self.assertEqual(tarea.registro_id, registro.id)
+        self.assertEqual(tarea.estado, TareaDocumento.EstadoTarea.PENDIENTE)
+        self.assertIsNone(registro.pdf_descargo)
+        self.assertEqual(DocumentoPDF.objects.count(), 0)
+        self.assertEqual(len(mail.outbox), 0)
+
+    def test_worker_genera_guarda_y_envia(self):
+        registro, tarea = DescargoService.procesar_ingreso(self.data, self.visitante)
+
+        stats = ColaDocumentos.procesar_pendientes('test-worker')
+
+        self.assertEqual(stats, {'procesadas': 1, 'exitosas': 1, 'fallidas': 0})
+        tarea.refresh_from_db()
+        registro.refresh_from_db()
+        self.assertEqual(tarea.estado, TareaDocumento.EstadoTarea.COMPLETADA)
+        self.assertEqual(tarea.intentos, 1)
+        self.assertEqual(registro.pdf_descargo_id, tarea.documento_id)
+        self.assertEqual(len(mail.outbox), 1)
+
+    def test_fallo_reprograma_con_backoff_y_agota_intentos(self):
+        registro, tarea = DescargoService.procesar_ingreso(self.data, self.visitante)
+
+        with mock.patch('descargo_responsabilidad.services.PDFService.generar_pdf_descargo', side_effect=RuntimeError('fpdf caído')):
+            ColaDocumentos.procesar_pendientes('test-worker')
+            tarea.refresh_from_db()
+            self.assertEqual(tarea.estado, TareaDocumento.EstadoTarea.PENDIENTE)
+            self.assertEqual(tarea.ultimo_error, 'fpdf caído')
+            self.assertGreater(tarea.disponible_desde, timezone.now())
+
+            # No se vuelve a tomar hasta que venza el backoff
+            self.assertIsNone(ColaDocumentos.reclamar_siguiente('test-worker'))
+
+            # Forzamos el vencimiento de todos los reintentos restantes
+            for _ in range(tarea.max_intentos - 1):
+                TareaDocumento.objects.filter(pk=tarea.pk).update(disponible_desde=timezone.now())
+                ColaDocumentos.procesar_pendientes('test-worker')
+
+        tarea.refresh_from_db()
+        self.assertEqual(tarea.estado, TareaDocumento.EstadoTarea.FALLIDA)
+        self.assertEqual(tarea.intentos, tarea.max_intentos)
+
+    def test_huerfanas_sin_intentos_quedan_fallidas(self):
+        _, tarea = DescargoService.procesar_ingreso(self.data, self.visitante)
+        _, agotada = DescargoService.procesar_ingreso(self.data, self.visitante)
+        hace_rato = timezone.now() - timedelta(seconds=ColaDocumentos.TIEMPO_MAXIMO_TAREA_SEGUNDOS + 1)
+        TareaDocumento.objects.filter(pk=tarea.pk).update(
+            estado=TareaDocumento.EstadoTarea.EN_PROCESO, fecha_toma=hace_rato, intentos=1, worker='muerto'
+        )
+        TareaDocumento.objects.filter(pk=agotada.pk).update(
+            estado=TareaDocumento.EstadoTarea.EN_PROCESO, fecha_toma=hace_rato,
+            intentos=agotada.max_intentos, worker='muerto'
+        )
+
+        self.assertEqual(ColaDocumentos.liberar_huerfanas(), 1)
+
+        tarea.refresh_from_db()
+        agotada.refresh_from_db()
+        self.assertEqual(tarea.estado, TareaDocumento.EstadoTarea.PENDIENTE)
+        self.assertEqual(agotada.estado, TareaDocumento.EstadoTarea.FALLIDA)
+        self.assertIsNone(agotada.worker)
+
+    def test_backoff_exponencial_con_tope(self):
+        self.assertEqual(ColaDocumentos.calcular_backoff(1), timedelta(seconds=30))
+        self.assertEqual(ColaDocumentos.calcular_backoff(3), timedelta(seconds=120))
+        self.assertEqual(ColaDocumentos.calcular_backoff(20), timedelta(seconds=ColaDocumentos.BACKOFF_MAX_SEGUNDOS))
+
+    def test_polling_estado_tarea(self):
+        _, tarea = DescargoService.procesar_ingreso(self.data, self.visitante)
+        session = self.client.session
+        session['id_usuario_logueado'] = self.visitante.id
+        session.save()
+
+        url = f'/responsabilidad/api/documentos/{tarea.id}/estado/'
+        self.assertEqual(self.client.get(url).json()['payload']['estado'], 'PENDIENTE')
+
+        ColaDocumentos.procesar_pendientes('test-worker')
+        payload = self.client.get(url).json()['payload']
+        self.assertEqual(payload['estado'], 'COMPLETADA')
+        self.assertIsNotNone(payload['url_documento'])
+
+
+@override_settings(MEDIA_ROOT=MEDIA_TEMPORAL)
+class RegenerarPDFsTestCase(TestCase):
+    """
+    Comando regenerar_pdfs con y sin pool: archivos, FKs y checkpoint.
+    """
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(MEDIA_TEMPORAL, ignore_errors=True)
+
+    def setUp(self):
+        ColaDocumentosTestCase.setUp(self)
+        self.registros = [DescargoService.procesar_ingreso(self.data, self.visitante)[0] for _ in range(3)]
+        self.checkpoint = os.path.join(MEDIA_TEMPORAL, f'checkpoint_{self.id()}.json')
+
+    def _regenerar(self, *extra, workers=1):
+        salida = StringIO()
+        call_command(
+            'regenerar_pdfs', '--workers', str(workers), '--lote', '2', '--checkpoint', self.checkpoint, *extra,
+            stdout=salida
+        )
+        return salida.getvalue()
+
+    def test_regenera_archivos_y_actualiza_fks(self):
+        self._regenerar()
+
+        for registro in self.registros:
+            registro.refresh_from_db()
+            self.assertIsNotNone(registro.pdf_descargo)
+            self.assertTrue(registro.pdf_descargo.archivo.name.startswith('pdfs/'))
+            self.assertTrue(os.path.exists(registro.pdf_descargo.archivo.path))
+
+        with open(self.checkpoint) as f:
+            self.assertEqual(json.load(f)['ultimo_id'], self.registros[-1].id)
+
+        # Con el checkpoint al final, relanzar no hace nada
+        self.assertIn('Nada que regenerar', self._regenerar())
+
+    def test_con_pool_los_hijos_no_usan_la_bd(self):
+        # Los hijos reciben los registros ya cargados: no ven la BD de pruebas (en memoria)
+        salida = self._regenerar('--tipo', 'descargo', workers=2)
+
+        self.assertIn('PDFs regenerados: 3', salida)
+        for registro in self.registros:
+            registro.refresh_from_db()
+            self.assertTrue(os.path.exists(registro.pdf_descargo.archivo.path))
+        with open(self.checkpoint) as f:
+            self.assertEqual(json.load(f)['ultimo_id'], self.registros[-1].id)
+
+    def test_reanuda_desde_checkpoint(self):
+        with open(self.checkpoint, 'w') as f:
+            json.dump({'tipo': 'descargo', 'ultimo_id': self.registros[0].id, 'procesados': 1, 'errores': []}, f)
+
+        self._regenerar()
+
+        self.assertEqual(DocumentoPDF.objects.count(), 2)
+        self.registros[0].refresh_from_db()
+        self.assertIsNone(self.registros[0].pdf_descargo)
+
+
+# ======================================================
+# PRESENCIA ACTUAL (quién está dentro ahora)
+# ======================================================
+
+
+class PresenciaActualTestCase(TestCase):
+    """
+    presencia_actual se mantiene al abrir, cerrar y reactivar ingresos,
+    y la ocupación de una zona no depende del tamaño del historial.
+    """
+
+    def setUp(self):
+        cargo = Cargo.objects.create(nombre="Tester")
+        self.visitante = Usuario.objects.create(
+            first_name="Juan Perez", numero_documento="123456789", email="visitante@test.com", cargo=cargo
+        )
+        self.admin = Usuario.objects.create(
+            first_name="Maria Gomez", numero_documento="987654321", email="responsable@test.com",
+            cargo=cargo, tipo='Administrador'
+        )
+        self.zona = Ubicacion.objects.create(nombre="Data Center", codigo_qr="DC-01", ciudad="Bogotá", freshservice_id=1001)
+        self.otra_zona = Ubicacion.objects.create(nombre="Bodega", codigo_qr="BD-01", ciudad="Bogotá", freshservice_id=1002)
+
+    def abrir(self, visitante, zona, estado=RegistroIngreso.EstadoOpciones.EN_ZONA):
+        return RegistroIngreso.objects.create(
+            visitante=visitante, responsable=self.admin, ubicacion=zona, estado=estado
+        )
+
+    def test_abrir_cerrar_y_reactivar(self):
+        ingreso = self.abrir(self.visitante, self.zona)
+
+        presencia = PresenciaActual.objects.get(pk=self.visitante.pk)
+        self.assertEqual(presencia.ingreso_id, ingreso.id)
+        self.assertEqual(presencia.ubicacion_id, self.zona.id)
+        self.assertEqual(presencia.fecha_limite, CronometroJornada.calcular_fecha_limite(ingreso))
+
+        SalidaService.cerrar_zona(self.visitante)
+        self.assertFalse(PresenciaActual.objects.filter(pk=self.visitante.pk).exists())
+
+        RegistrosService.reactivar_ingreso_actualizando_tiempo(ingreso.id, '23:59')
+        presencia = PresenciaActual.objects.get(pk=self.visitante.pk)
+        self.assertEqual(presencia.estado, RegistroIngreso.EstadoOpciones.EN_ZONA)
+        self.assertEqual(timezone.localtime(presencia.fecha_limite).strftime('%H:%M'), '23:59')
+
+    def test_pendiente_pasa_a_en_zona(self):
+        ingreso = self.abrir(self.visitante, self.zona, RegistroIngreso.EstadoOpciones.PENDIENTE_HERRAMIENTAS)
+        self.assertIsNone(PresenciaActual.ingreso_de(self.visitante, solo_en_zona=True))
+        self.assertEqual(PresenciaActual.ingreso_de(self.visitante), ingreso)
+
+        ingreso.estado = RegistroIngreso.EstadoOpciones.EN_ZONA
+        ingreso.save()
+        self.assertEqual(PresenciaActual.ingreso_de(self.visitante, solo_en_zona=True), ingreso)
+
+    def test_ocupacion_de_zona(self):
+        visitantes = [
+            Usuario.objects.create(first_name=f"V{i}", numero_documento=f"50{i}", email=f"v{i}@test.com")
+            for i in range(3)
+        ]
+        # Historial viejo que NO debe recorrerse
+        for _ in range(20):
+            viejo = self.abrir(visitantes[0], self.zona)
+            viejo.estado = RegistroIngreso.EstadoOpciones.FINALIZADO
+            viejo.save()
+
+        self.abrir(visitantes[0], self.zona)
+        self.abrir(visitantes[1], self.zona)
+        self.abrir(visitantes[2], self.otra_zona)
+
+        session = self.client.session
+        session['id_usuario_logueado'] = self.admin.id
+        session.save()
+
+        # sesión, usuario, zona, ocupantes
+        with self.assertNumQueries(4):
+            respuesta = self.client.get(reverse('api-ocupacion-zona', args=[self.zona.id]))
+
+        datos = respuesta.json()['payload']
+        self.assertEqual(datos['total'], 2)
+        self.assertEqual({o['visitante_id'] for o in datos['ocupantes']}, {visitantes[0].id, visitantes[1].id})
+
+    def test_ocupacion_solo_administradores(self):
+        session = self.client.session
+        session['id_usuario_logueado'] = self.visitante.id
+        session.save()
+
+        respuesta = self.client.get(reverse('api-ocupacion-zona', args=[self.zona.id]))
+        self.assertEqual(respuesta.status_code, 403)
+
+
+# ======================================================
+# CIERRE AUTOMÁTICO DE JORNADAS VENCIDAS
+# ======================================================
+
+
+class CerrarJornadasVencidasTestCase(TestCase):
+    """
+    El barrido cierra solo lo vencido, por lotes, y su costo depende de los
+    vencidos (índice de fecha_limite), no de cuánta gente sigue dentro.
+    """
+
+    def setUp(self):
+        PresenciaActualTestCase.setUp(self)
+
+    abrir = PresenciaActualTestCase.abrir
+
+    def crear_visitantes(self, cantidad, prefijo, horas_dentro):
+        ingresos = []
+        for i in range(cantidad):
+            visitante = Usuario.objects.create(
+                first_name=f"{prefijo}{i}", numero_documento=f"{prefijo}{i}", email=f"{prefijo}{i}@test.com"
+            )
+            ingreso = self.abrir(visitante, self.zona)
+            # Simulamos que entró hace 'horas_dentro' horas (save() recalcula la presencia)
+            ingreso.fecha_hora_ingreso = timezone.now() - timedelta(hours=horas_dentro)
+            ingreso.save()
+            ingresos.append(ingreso)
+        return ingresos
+
+    def test_cierra_vencidos_y_encola_reportes(self):
+        vencidos = self.crear_visitantes(3, 'venc', horas_dentro=9)
+        activos = self.crear_visitantes(2, 'act', horas_dentro=1)
+
+        salida = StringIO()
+        call_command('cerrar_jornadas_vencidas', '--lote', '2', stdout=salida)
+        self.assertIn('Cerrados: 3', salida.getvalue())
+
+        for ingreso in vencidos:
+            ingreso.refresh_from_db()
+            self.assertEqual(ingreso.estado, RegistroIngreso.EstadoOpciones.FINALIZADO)
+            self.assertIsNotNone(ingreso.fecha_hora_salida)
+            self.assertEqual(ingreso.observaciones_salida, SalidaService.OBSERVACION_CIERRE_AUTOMATICO)
+        self.assertEqual(
+            set(TareaDocumento.objects.filter(tipo=TareaDocumento.TipoTarea.REPORTE_SALIDA).values_list('registro_id', flat=True)),
+            {ingreso.id for ingreso in vencidos}
+        )
+        self.assertEqual(
+            set(PresenciaActual.objects.values_list('ingreso_id', flat=True)),
+            {ingreso.id for ingreso in activos}
+        )
+
+        # Segunda pasada: no hay nada más que cerrar
+        self.assertEqual(SalidaService.cerrar_jornadas_vencidas()['cerrados'], 0)
+
+    def test_cierre_desde_el_decorador_es_igual_al_barrido(self):
+        from actividades.services import ActividadesService
+        ingreso = self.crear_visitantes(1, 'perezoso', horas_dentro=9)[0]
+
+        self.assertTrue(ActividadesService.forzar_salida_por_tiempo(ingreso.visitante, ingreso))
+
+        ingreso.refresh_from_db()
+        self.assertEqual(ingreso.estado, RegistroIngreso.EstadoOpciones.FINALIZADO)
+        self.assertEqual(ingreso.observaciones_salida, SalidaService.OBSERVACION_CIERRE_AUTOMATICO)
+        self.assertFalse(PresenciaActual.objects.filter(ingreso=ingreso).exists())
+        self.assertEqual(
+            TareaDocumento.objects.filter(registro=ingreso, tipo=TareaDocumento.TipoTarea.REPORTE_SALIDA).count(), 1
+        )
+
+        # El barrido ya no lo vuelve a cerrar ni a encolar
+        self.assertEqual(SalidaService.cerrar_jornadas_vencidas()['cerrados'], 0)
+        self.assertEqual(TareaDocumento.objects.filter(registro=ingreso).count(), 1)
+
+    def test_vencimiento_desactualizado_se_corrige(self):
+        ingreso = self.crear_visitantes(1, 'desact', horas_dentro=1)[0]
+        PresenciaActual.objects.filter(ingreso=ingreso).update(fecha_limite=timezone.now() - timedelta(minutes=5))
+
+        stats = SalidaService.cerrar_jornadas_vencidas()
+
+        self.assertEqual((stats['cerrados'], stats['corregidos']), (0, 1))
+        ingreso.refresh_from_db()
+        self.assertEqual(ingreso.estado, RegistroIngreso.EstadoOpciones.EN_ZONA)
+        self.assertGreater(PresenciaActual.objects.get(ingreso=ingreso).fecha_limite, timezone.now())
+
+    def test_costo_no_depende_de_los_que_siguen_dentro(self):
+        self.crear_visitantes(2, 'a', horas_dentro=9)
+        with CaptureQueriesContext(connection) as pocos:
+            SalidaService.cerrar_jornadas_vencidas()
+
+        self.crear_visitantes(2, 'b', horas_dentro=9)
+        self.crear_visitantes(40, 'dentro', horas_dentro=1)
+        with CaptureQueriesContext(connection) as muchos:
+            SalidaService.cerrar_jornadas_vencidas()
+
+        self.assertEqual(len(pocos), len(muchos))
+
+
+@override_settings(MEDIA_ROOT=MEDIA_TEMPORAL)
+class FirmasIngresoApiTestCase(TestCase):
+    """
+    procesar_ingreso_api: las firmas se guardan tal cual llegaron y lo que
+    no es un PNG (o es demasiado grande) se rechaza sin crear el ingreso.
+    """
+
+    def setUp(self):
+        ColaDocumentosTestCase.setUp(self)
+        session = self.client.session
+        session['id_usuario_logueado'] = self.visitante.id
+        session.save()
+
+    def enviar(self, data):
+        return self.client.post(reverse('api-procesar-ingreso'), json.dumps(data), content_type='application/json')
+
+    def test_firma_guardada_byte_a_byte(self):
+        respuesta = self.enviar(self.data)
+
+        self.assertEqual(respuesta.status_code, 201)
+        registro = RegistroIngreso.objects.get()
+        with registro.firma_visitante.open('rb') as archivo:
+            self.assertEqual(archivo.read(), base64.b64decode(self.data['firmaVisitante'].split(',', 1)[1]))
+
+    def test_firma_invalida_no_crea_ingreso(self):
+        no_png = "data:image/png;base64," + base64.b64encode(b"no soy un png").decode()
+        for firma in (no_png, "data:text/html;base64,PGh0bWw+"):
+            respuesta = self.enviar({**self.data, 'firmaResponsable': firma})
+            self.assertEqual(respuesta.status_code, 400)
+        self.assertFalse(RegistroIngreso.objects.exists())
+
+    @override_settings(FIRMA_MAX_BYTES=100)
+    def test_firma_muy_grande(self):
+        respuesta = self.enviar(self.data)
+        self.assertEqual(respuesta.status_code, 400)
+        self.assertIn('tamaño máximo', respuesta.json()['message'])
+
+    @override_settings(DATA_UPLOAD_MAX_MEMORY_SIZE=100)
+    def test_cuerpo_muy_grande(self):
+        self.assertEqual(self.enviar(self.data).status_code, 413)
+
+
+# ==========================================
+# SINCRONIZACIÓN INCREMENTAL CON FRESHSERVICE
+# ==========================================
+
+
+def activo(fs_id, nombre, tag, actualizado='2026-01-01T10:00:00Z', ciudad='Medellín'):
+    return {
+        'id': fs_id, 'name': nombre, 'asset_tag': tag, 'description': '', 'updated_at': actualizado,
+        'type_fields': {'ubicacin_123': ciudad},
+    }
+
+
+class FreshserviceSyncTestCase(TestCase):
+    """
+    FreshserviceSync contra un servidor falso: páginas en paralelo por una
+    sesión keep-alive, marca de agua para pedir solo lo que cambió y diff en
+    memoria aplicado por lotes.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.servidor = FakeFreshservice(api_key='clave', latencia=0.02).iniciar()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.servidor.detener()
+        super().tearDownClass()
+
+    def setUp(self):
+        self.servidor.reiniciar_contadores()
+        self.configuracion = mock.patch.multiple(
+            FreshserviceSync, DOMAIN=self.servidor.url, API_KEY='clave', KEYWORDS=['zona'], POR_MINUTO=0
+        )
+        self.configuracion.start()
+        self.addCleanup(self.configuracion.stop)
+
+    def test_sincronizacion_completa_en_paralelo(self):
+        # 250 activos: 3 páginas de 100; uno de cada 5 es zona crítica
+        self.servidor.publicar([
+            activo(i, f"{'Zona' if i % 5 == 0 else 'Portátil'} {i}", f'TAG-{i}') for i in range(1, 251)
+        ])
+
+        stats = FreshserviceSync.sincronizar_activos(hilos=4)
+
+        self.assertEqual((stats['modo'], stats['total_paginas'], stats['total_analizados']), ('completo', 3, 250))
+        self.assertEqual((stats['creados'], stats['actualizados']), (50, 0))
+        self.assertEqual(Ubicacion.objects.get(freshservice_id=5).ciudad, 'Medellín')
+        # Páginas 1-4 a la vez por conexiones reutilizadas; después de la última
+        # (incompleta) se piden como mucho hilos - 1 páginas de más, que salen vacías
+        self.assertLessEqual(self.servidor.peticiones, 3 + 4 - 1)
+        self.assertGreater(self.servidor.max_concurrencia, 1)
+        self.assertLessEqual(self.servidor.conexiones, 4)
+
+    def test_incremental_solo_pide_y_escribe_lo_que_cambio(self):
+        self.servidor.publicar([
+            activo(1, 'Zona A', 'TAG-1', '2026-01-01T10:00:00Z'),
+            activo(2, 'Zona B', 'TAG-2', '2026-01-02T10:00:00Z'),
+        ])
+        FreshserviceSync.sincronizar_activos()
+        self.assertEqual(EstadoSincronizacion.objects.get().marca.isoformat(), '2026-01-02T10:00:00+00:00')
+
+        self.servidor.publicar([
+            activo(2, 'Zona B', 'TAG-2', '2026-01-02T10:00:00Z'),
+            activo(3, 'Zona C', 'TAG-3', '2026-01-03T10:00:00Z'),
+            activo(1, 'Zona A renombrada', 'TAG-1', '2026-01-03T11:00:00Z'),
+        ])
+        with mock.patch.object(Ubicacion.objects, 'update_or_create') as update_or_create:
+            stats = FreshserviceSync.sincronizar_activos()
+
+        update_or_create.assert_not_called()
+        self.assertEqual(stats['modo'], 'incremental')
+        # Se pide desde la marca menos el margen; el activo 2 vuelve por el solape y no se reescribe
+        self.assertEqual(self.servidor.filtros[-1], '2026-01-02T09:55:00Z')
+        self.assertEqual((stats['creados'], stats['actualizados'], stats['sin_cambios']), (1, 1, 1))
+        self.assertEqual(Ubicacion.objects.get(freshservice_id=1).nombre, 'Zona A renombrada')
+
+    def test_codigo_qr_de_otra_zona_es_conflicto(self):
+        Ubicacion.objects.create(nombre='Zona vieja', codigo_qr='TAG-9', freshservice_id=900)
+        self.servidor.publicar([activo(1, 'Zona nueva', 'TAG-9'), activo(2, 'Zona B', 'TAG-2')])
+
+        stats = FreshserviceSync.sincronizar_activos()
+
+        self.assertEqual((stats['conflictos'], stats['creados']), (1, 1))
+        self.assertEqual(Ubicacion.objects.get(codigo_qr='TAG-9').freshservice_id, 900)
+
+    def test_error_no_avanza_la_marca(self):
+        self.servidor.publicar([activo(1, 'Zona A', 'TAG-1')])
+
+        with mock.patch.object(FreshserviceSync, 'API_KEY', 'otra'):
+            with self.assertRaises(requests.HTTPError):
+                FreshserviceSync.sincronizar_activos()
+
+        self.assertIsNone(EstadoSincronizacion.objects.get().marca)
+        self.assertFalse(Ubicacion.objects.exists())
+
+    def test_429_respeta_retry_after(self):
+        limitado = FakeFreshservice(api_key='clave', por_segundo=2).iniciar()
+        self.addCleanup(limitado.detener)
+        limitado.publicar([activo(i, f'Zona {i}', f'TAG-{i}') for i in range(1, 151)])
+
+        with mock.patch.object(FreshserviceSync, 'DOMAIN', limitado.url):
+            stats = FreshserviceSync.sincronizar_activos(hilos=4)
+
+        self.assertGreater(limitado.rechazadas, 0)
+        self.assertEqual(stats['creados'], 150)
+
+    def test_limitador_reparte_turnos(self):
+        reloj, dormido = [100.0], []
+        limitador = LimitadorTasa(por_minuto=120, reloj=lambda: reloj[0], dormir=dormido.append)
+
+        for _ in range(3):
+            limitador.esperar_turno()
+        limitador.pausar(5)
+        limitador.esperar_turno()
+
+        self.assertEqual(dormido, [0.5, 1.0, 5.0])
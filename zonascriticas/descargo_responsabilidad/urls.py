@@ -5,6 +5,8 @@ urlpatterns = [
     path('', views.responsabilidad_view, name='responsabilidad'),
     path('api/buscar-usuario/', views.buscar_usuario_api, name='api-buscar-usuario'),
     path('api/buscar-zona/', views.buscar_zona_api, name='api-buscar-zona'),
+    path('api/zonas/<int:ubicacion_id>/ocupacion/', views.ocupacion_zona_api, name='api-ocupacion-zona'),
     path('api/procesar-ingreso/', views.procesar_ingreso_api, name='api-procesar-ingreso'),
     path('api/salida/', views.salida_zona_api, name='api_salida_zona'),
+    path('api/documentos/<int:tarea_id>/estado/', views.estado_documento_api, name='api-estado-documento'),
 ]
\ No newline at end of file
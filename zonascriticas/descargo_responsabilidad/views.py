@@ -1,5 +1,6 @@
 # zonascriticas/descargo_responsabilidad/views.py
 
+from django.conf import settings
 from django.shortcuts import render
 from django.http import HttpRequest, HttpResponse
 from django.views.decorators.http import require_GET, require_POST
@@ -12,10 +13,12 @@ import json
 from home.utils import api_response
 
 # Importamos los servicios de negocio
-from .services import UsuarioService, ZonaService, DescargoService
+from .services import UsuarioService, ZonaService, DescargoService, SalidaService
+from .models import TareaDocumento
 
 # Importamos nuestro decorador local
 from .decorators import no_tener_zona_activa
+from .middleware import ingreso_en_zona
 
 # --- VISTA HTML ---
 @login_custom_required
@@ -88,6 +91,22 @@ def buscar_zona_api(request: HttpRequest) -> HttpResponse:
         return api_response(success=False, message=str(e), status_code=404)
 
 
+# --- API Endpoint 2.1: Ocupación de una zona (solo administradores) ---
+@login_custom_required
+@require_GET
+def ocupacion_zona_api(request: HttpRequest, ubicacion_id: int) -> HttpResponse:
+    """
+    ¿Quién está en la zona X ahora mismo? (tabla presencia_actual)
+    """
+    if request.user.tipo != 'Administrador':
+        return api_response(success=False, message='No autorizado', status_code=403)
+
+    try:
+        return api_response(data=ZonaService.ocupacion_zona(ubicacion_id))
+    except ValueError as e:
+        return api_response(success=False, message=str(e), status_code=404)
+
+
 # --- API Endpoint 3: Procesar Ingreso ---
 @login_custom_required
 @require_POST
@@ -95,16 +114,25 @@ def procesar_ingreso_api(request: HttpRequest) -> HttpResponse:
     """
     API para recibir el formulario de descargo firmado.
     """
+    # Se lee el stream directo (sin request.body): el cuerpo con las dos firmas
+    # no queda cacheado en el request mientras se decodifican. Por eso el
+    # límite de Django (DATA_UPLOAD_MAX_MEMORY_SIZE) se valida aquí a mano.
+    limite = settings.DATA_UPLOAD_MAX_MEMORY_SIZE
+    if limite is not None and int(request.META.get('CONTENT_LENGTH') or 0) > limite:
+        return api_response(success=False, message='La solicitud es demasiado grande.', status_code=413)
+
     try:
-        data = json.loads(request.body)
-    except json.JSONDecodeError:
+        data = json.load(request)
+    except (json.JSONDecodeError, UnicodeDecodeError):
         return api_response(success=False, message='Datos JSON mal formados', status_code=400)
 
     try:
-        # Delega la orquestación completa al servicio
-        DescargoService.procesar_ingreso(data, request.user)
+        # Delega la orquestación completa al servicio.
+        # El PDF y el correo quedan en cola: el front puede consultar 'tarea_id'.
+        registro, tarea = DescargoService.procesar_ingreso(data, request.user)
         
         return api_response(
+            data={'registro_id': registro.id, 'tarea_id': tarea.id},
             message='Ingreso registrado exitosamente', 
             status_code=201
         )
@@ -124,12 +152,41 @@ def salida_zona_api(request: HttpRequest) -> HttpResponse:
     API para cerrar la zona, generar reporte y liberar al usuario.
     """
     try:
-        SalidaService.cerrar_zona(request.user)
-        return api_response(message='Salida registrada y reporte enviado.')
+        _, tarea = SalidaService.cerrar_zona(request.user, ingreso_en_zona(request))
+        return api_response(
+            data={'tarea_id': tarea.id},
+            message='Salida registrada. El reporte llegará a tu correo.'
+        )
         
     except (ValidationError, ValueError) as e:
         # Errores de negocio (ej: actividades pendientes)
         return api_response(success=False, message=str(e), status_code=400)
         
     except Exception as e:
-        return api_response(success=False, message=f'Error interno: {str(e)}', status_code=500)
\ No newline at end of file
+        return api_response(success=False, message=f'Error interno: {str(e)}', status_code=500)
+
+
+# --- API Endpoint 5: Estado del documento en cola ---
+@login_custom_required
+@require_GET
+def estado_documento_api(request: HttpRequest, tarea_id: int) -> HttpResponse:
+    """
+    Polling del estado de una tarea de la cola de documentos (PDF + correo).
+    Solo el dueño del ingreso puede consultarla.
+    """
+    tarea = TareaDocumento.objects.select_related('documento').filter(
+        pk=tarea_id,
+        registro__visitante=request.user
+    ).first()
+
+    if not tarea:
+        return api_response(success=False, message='Tarea no encontrada', status_code=404)
+
+    return api_response(data={
+        'tarea_id': tarea.id,
+        'tipo': tarea.tipo,
+        'estado': tarea.estado,
+        'intentos': tarea.intentos,
+        'reintento_desde': tarea.disponible_desde.isoformat() if tarea.estado == TareaDocumento.EstadoTarea.PENDIENTE else None,
+        'url_documento': tarea.documento.archivo.url if tarea.documento else None,
+    })
@@ -0,0 +1,206 @@
+"""
+zonascriticas/empresas/busqueda.py
+
+Descripción:
+
+Búsqueda de empresas por nombre o NIT resuelta con índices (sin ``LIKE '%texto%'``).
+
+- ``normalizar``: minúsculas, sin tildes y sin signos ("Pavimentos Ñandú S.A.S."
+  -> "pavimentos nandu s a s"). Se guarda en ``Empresa.nombre_normalizado``.
+- ``IndiceEmpresas``: mantiene ``TerminoEmpresa`` (tabla ``empresa_terminos``),
+  un índice invertido con cada palabra del nombre, el NIT compacto
+  (solo letras y dígitos) y los trigramas de cada palabra.
+  ``Empresa.save()`` lo actualiza; las cargas con ``bulk_create`` deben llamar
+  a ``IndiceEmpresas.reindexar``.
+- ``BuscadorEmpresas.filtrar``: cada palabra buscada debe ser prefijo de alguna
+  palabra del nombre, o el texto completo prefijo del NIT. Los prefijos se
+  buscan como rango (``termino >= 'and' AND termino < 'ane'``) que resuelve el
+  índice. El límite superior se calcula dentro del alfabeto de los términos
+  ([0-9a-z], dígitos antes que letras), que ordena igual en la intercalación
+  binaria, en la de SQLite y en ``utf8mb4_0900_ai_ci`` de MySQL: 'z' y '9' no
+  se convierten en '{' y ':' ('anz' -> 'ao', '9' -> 'a').
+- ``BuscadorEmpresas.aproximadas``: si no hubo coincidencias, se cuentan los
+  trigramas compartidos (como ``pg_trgm``) para tolerar errores de digitación
+  ("andima" -> "Andina") y palabras a medias ("andina" -> "Transandina").
+"""
+
+import base64
+import math
+import re
+import unicodedata
+
+from django.db import transaction
+from django.db.models import Count, Q, QuerySet
+
+from .models import Empresa, TerminoEmpresa
+
+#: Largo de la columna ``termino``.
+LARGO_MAXIMO_TERMINO = 64
+#: Fracción de los trigramas buscados que debe tener una empresa para ser sugerida.
+SIMILITUD_MINIMA = 0.5
+#: Las palabras más cortas generan trigramas demasiado comunes.
+LARGO_MINIMO_APROXIMADO = 3
+
+_NO_ALFANUMERICO = re.compile(r'[^a-z0-9]+')
+#: Caracteres de los términos PALABRA y NIT, en el orden en que los comparan todos los motores.
+_ALFABETO = '0123456789abcdefghijklmnopqrstuvwxyz'
+
+
+def normalizar(texto: str) -> str:
+    sin_tildes = unicodedata.normalize('NFKD', texto or '').encode('ascii', 'ignore').decode()
+    return _NO_ALFANUMERICO.sub(' ', sin_tildes.lower()).strip()
+
+
+def compactar(texto: str) -> str:
+    """'900.123.456-7' -> '9001234567'"""
+    return normalizar(texto).replace(' ', '')
+
+
+def trigramas(palabra: str) -> set:
+    relleno = f"  {palabra} "
+    return {relleno[i:i + 3] for i in range(len(relleno) - 2)}
+
+
+def terminos_de(nombre: str, nit: str) -> set:
+    """Pares (clase, termino) que se indexan para una empresa."""
+    palabras = {p[:LARGO_MAXIMO_TERMINO] for p in normalizar(nombre).split()}
+    terminos = {(TerminoEmpresa.Clase.PALABRA, p) for p in palabras}
+    terminos |= {(TerminoEmpresa.Clase.TRIGRAMA, t) for p in palabras for t in trigramas(p)}
+    if compactar(nit):
+        terminos.add((TerminoEmpresa.Clase.NIT, compactar(nit)[:LARGO_MAXIMO_TERMINO]))
+    return terminos
+
+
+def _rango_prefijo(prefijo: str) -> tuple:
+    """
+    Rango [desde, hasta) de los términos que empiezan por ``prefijo``. El
+    límite superior es el siguiente prefijo dentro de ``_ALFABETO`` (las 'z'
+    finales se descartan, como un acarreo); ``None`` si no hay límite ('zz').
+    """
+    prefijo = prefijo[:LARGO_MAXIMO_TERMINO]
+    base = prefijo.rstrip(_ALFABETO[-1])
+    if not base:
+        return prefijo, None
+    return prefijo, base[:-1] + _ALFABETO[_ALFABETO.index(base[-1]) + 1]
+
+
+def _con_prefijo(clase: str, prefijo: str) -> QuerySet:
+    """ids de las empresas con un término de ``clase`` que empieza por ``prefijo``."""
+    desde, hasta = _rango_prefijo(prefijo)
+    terminos = TerminoEmpresa.objects.filter(clase=clase, termino__gte=desde)
+    if hasta is not None:
+        terminos = terminos.filter(termino__lt=hasta)
+    return terminos.values('empresa_id')
+
+
+class IndiceEmpresas:
+
+    @staticmethod
+    @transaction.atomic
+    def reindexar(empresas, batch_size: int = 1000) -> int:
+        """
+        Reemplaza los términos de las empresas dadas (ya guardadas).
+
+        Returns
+        -------
+        int
+            Filas escritas en ``empresa_terminos``.
+        """
+        empresas = list(empresas)
+        escritos = 0
+        for i in range(0, len(empresas), batch_size):
+            lote = empresas[i:i + batch_size]
+            TerminoEmpresa.objects.filter(empresa_id__in=[e.pk for e in lote]).delete()
+            filas = [
+                TerminoEmpresa(empresa_id=empresa.pk, clase=clase, termino=termino)
+                for empresa in lote
+                for clase, termino in terminos_de(empresa.nombre_empresa, empresa.nit)
+            ]
+            TerminoEmpresa.objects.bulk_create(filas, batch_size=batch_size)
+            escritos += len(filas)
+
+        for empresa in empresas:
+            empresa._indexado = (empresa.nombre_empresa, empresa.nit)
+        return escritos
+
+    @staticmethod
+    def reindexar_todo(batch_size: int = 1000) -> int:
+        """Recalcula ``nombre_normalizado`` y el índice de todas las empresas."""
+        escritos = 0
+        empresas = Empresa.objects.only('id', 'nombre_empresa', 'nit', 'nombre_normalizado').order_by('id')
+        lote = []
+        for empresa in empresas.iterator(chunk_size=batch_size):
+            empresa.nombre_normalizado = normalizar(empresa.nombre_empresa)
+            lote.append(empresa)
+            if len(lote) == batch_size:
+                Empresa.objects.bulk_update(lote, ['nombre_normalizado'])
+                escritos += IndiceEmpresas.reindexar(lote, batch_size)
+                lote = []
+        if lote:
+            Empresa.objects.bulk_update(lote, ['nombre_normalizado'])
+            escritos += IndiceEmpresas.reindexar(lote, batch_size)
+        return escritos
+
+
+class BuscadorEmpresas:
+
+    @staticmethod
+    def filtrar(empresas: QuerySet, texto: str) -> QuerySet:
+        """Empresas cuyo nombre tiene todas las palabras como prefijo, o cuyo NIT empieza por el texto."""
+        palabras = normalizar(texto).split()
+        if not palabras:
+            return empresas
+
+        por_nombre = Q()
+        for palabra in palabras:
+            por_nombre &= Q(id__in=_con_prefijo(TerminoEmpresa.Clase.PALABRA, palabra))
+
+        por_nit = Q(id__in=_con_prefijo(TerminoEmpresa.Clase.NIT, compactar(texto)))
+
+        return empresas.filter(por_nombre | por_nit)
+
+    @staticmethod
+    def aproximadas(empresas: QuerySet, texto: str, limite: int) -> list:
+        """
+        Las ``limite`` empresas de ``empresas`` más parecidas al texto,
+        de la más a la menos parecida. Lista vacía si nada se parece.
+        """
+        buscados = set()
+        for palabra in normalizar(texto).split():
+            if len(palabra) >= LARGO_MINIMO_APROXIMADO:
+                buscados |= trigramas(palabra[:LARGO_MAXIMO_TERMINO])
+        if not buscados:
+            return []
+
+        puntajes = TerminoEmpresa.objects.filter(
+            clase=TerminoEmpresa.Clase.TRIGRAMA,
+            termino__in=buscados,
+            empresa__in=empresas.values('id'),
+        ).values('empresa_id').annotate(
+            coincidencias=Count('id')
+        ).filter(
+            coincidencias__gte=math.ceil(len(buscados) * SIMILITUD_MINIMA)
+        ).order_by('-coincidencias', 'empresa_id')[:limite]
+
+        ids = [fila['empresa_id'] for fila in puntajes]
+        if not ids:
+            return []
+        por_id = empresas.in_bulk(ids)
+        return [por_id[i] for i in ids if i in por_id]
+
+    @staticmethod
+    def codificar_cursor(empresa) -> str:
+        """Cursor opaco con la posición (nombre_normalizado, id) de una fila."""
+        texto = f"{empresa.nombre_normalizado}|{empresa.id}"
+        return base64.urlsafe_b64encode(texto.encode()).decode()
+
+    @staticmethod
+    def decodificar_cursor(cursor: str):
+        """
+        Returns: (str, int). Lanza ValueError si el cursor no es válido.
+        """
+        try:
+            nombre, empresa_id = base64.urlsafe_b64decode(cursor.encode()).decode().rsplit('|', 1)
+            return nombre, int(empresa_id)
+        except (ValueError, UnicodeDecodeError) as e:
+            raise ValueError("Cursor de paginación inválido.") from e
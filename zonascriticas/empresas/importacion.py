@@ -0,0 +1,420 @@
+"""
+zonascriticas/empresas/importacion.py
+
+Descripción:
+
+Importación masiva de empresas y empleados desde un CSV o un XLSX, por lotes
+(consultas y transacciones por lote, no por persona).
+
+Flujo
+-----
+1. ``leer_filas`` recorre el archivo fila por fila (el XLSX se lee como XML en
+   streaming, sin dependencias). La primera fila trae los encabezados; se
+   aceptan los nombres de ``ALIAS_COLUMNAS``.
+2. ``ImportadorEmpleados`` valida cada fila contra conjuntos en memoria
+   (correos y documentos existentes, NITs) armados con una consulta cada uno,
+   y contra lo que ya se aceptó del mismo archivo.
+3. Cada ``batch_size`` filas válidas se guardan en una transacción: empresas
+   nuevas, servicios y cargos por lote (``_resolver_en_lote``, la misma regla
+   de ``_get_or_create_from_list``) y empleados con ``bulk_create``.
+
+Cada fila describe un empleado y su empresa (por NIT). Una fila sin datos de
+empleado solo registra la empresa o le agrega servicios. Las filas con
+errores no se guardan y quedan en ``resumen['errores']`` con su número de fila.
+"""
+
+import csv
+import io
+import re
+import zipfile
+from datetime import time as hora
+from typing import Iterator
+from xml.etree import ElementTree
+
+from django.core.exceptions import ValidationError
+from django.core.validators import validate_email
+from django.db import IntegrityError, transaction
+
+from login.models import Usuario
+from .busqueda import IndiceEmpresas, normalizar
+from .models import Cargo, Empresa, Servicio
+from .services import _resolver_en_lote
+
+#: Encabezado (normalizado) -> campo.
+ALIAS_COLUMNAS = {
+    'nit': 'nit',
+    'nit_empresa': 'nit',
+    'empresa': 'nombre_empresa',
+    'nombre_empresa': 'nombre_empresa',
+    'razon_social': 'nombre_empresa',
+    'direccion': 'direccion',
+    'contacto': 'contacto',
+    'servicios': 'servicios',
+    'nombre': 'first_name',
+    'nombres': 'first_name',
+    'nombre_empleado': 'first_name',
+    'first_name': 'first_name',
+    'correo': 'email',
+    'correo_electronico': 'email',
+    'email': 'email',
+    'documento': 'numero_documento',
+    'cedula': 'numero_documento',
+    'numero_documento': 'numero_documento',
+    'tipo_documento': 'tipo_documento',
+    'cargo': 'cargo',
+    'tipo': 'tipo',
+    'rol': 'tipo',
+    'hora_limite': 'tiempo_limite_jornada',
+    'tiempo_limite_jornada': 'tiempo_limite_jornada',
+}
+
+CAMPOS_EMPRESA = ('nombre_empresa', 'direccion', 'contacto')
+CAMPOS_EMPLEADO = ('first_name', 'email', 'numero_documento')
+
+_SEPARADOR_LISTA = re.compile(r'[;|,]')
+
+
+# --- LECTURA ---
+
+def _local(etiqueta: str) -> str:
+    return etiqueta.rsplit('}', 1)[-1]
+
+
+def _indice_columna(referencia: str) -> int:
+    """'C7' -> 2"""
+    indice = 0
+    for letra in referencia:
+        if not letra.isalpha():
+            break
+        indice = indice * 26 + (ord(letra.upper()) - 64)
+    return indice - 1
+
+
+def _numero(valor: str) -> str:
+    # Excel guarda los documentos y NITs como número: 1032456789.0 -> '1032456789'
+    try:
+        numero = float(valor)
+    except ValueError:
+        return valor
+    return str(int(numero)) if numero.is_integer() and abs(numero) < 1e15 else valor
+
+
+def _textos_compartidos(libro: zipfile.ZipFile) -> list:
+    if 'xl/sharedStrings.xml' not in libro.namelist():
+        return []
+    textos = []
+    with libro.open('xl/sharedStrings.xml') as xml:
+        for _, elemento in ElementTree.iterparse(xml):
+            if _local(elemento.tag) == 'si':
+                textos.append(''.join(t.text or '' for t in elemento.iter() if _local(t.tag) == 't'))
+                elemento.clear()
+    return textos
+
+
+def _primera_hoja(libro: zipfile.ZipFile) -> str:
+    try:
+        with libro.open('xl/workbook.xml') as xml:
+            hoja = next(e for e in ElementTree.parse(xml).iter() if _local(e.tag) == 'sheet')
+        relacion = next(v for k, v in hoja.attrib.items() if _local(k) == 'id')
+        with libro.open('xl/_rels/workbook.xml.rels') as xml:
+            destino = next(e.get('Target') for e in ElementTree.parse(xml).iter() if e.get('Id') == relacion)
+    except (KeyError, StopIteration):
+        return 'xl/worksheets/sheet1.xml'
+    return destino.lstrip('/') if destino.startswith('/') else f'xl/{destino}'
+
+
+def _filas_xlsx(archivo) -> Iterator[list]:
+    try:
+        libro = zipfile.ZipFile(archivo)
+    except zipfile.BadZipFile as e:
+        raise ValueError("El archivo no es un XLSX válido.") from e
+
+    with libro:
+        compartidos = _textos_compartidos(libro)
+        with libro.open(_primera_hoja(libro)) as xml:
+            celdas = {}
+            for _, elemento in ElementTree.iterparse(xml):
+                etiqueta = _local(elemento.tag)
+                if etiqueta == 'c':
+                    referencia = elemento.get('r')
+                    columna = _indice_columna(referencia) if referencia else len(celdas)
+                    tipo = elemento.get('t')
+                    valor = ''
+                    for hijo in elemento:
+                        if _local(hijo.tag) == 'v':
+                            valor = hijo.text or ''
+                        elif _local(hijo.tag) == 'is':
+                            valor = ''.join(t.text or '' for t in hijo.iter() if _local(t.tag) == 't')
+                    if tipo == 's' and valor:
+                        valor = compartidos[int(valor)]
+                    elif tipo in (None, 'n') and valor:
+                        valor = _numero(valor)
+                    celdas[columna] = valor
+                    elemento.clear()
+                elif etiqueta == 'row':
+                    yield [celdas.get(i, '') for i in range(max(celdas) + 1)] if celdas else []
+                    celdas = {}
+                    elemento.clear()
+
+
+def _filas_csv(archivo, encoding: str) -> Iterator[list]:
+    texto = io.TextIOWrapper(archivo, encoding=encoding, newline='')
+    try:
+        muestra = texto.read(4096)
+        texto.seek(0)
+        try:
+            # Excel en español exporta con ';'
+            dialecto = csv.Sniffer().sniff(muestra, delimiters=',;\t')
+        except csv.Error:
+            dialecto = csv.excel
+        yield from csv.reader(texto, dialecto)
+    except UnicodeDecodeError as e:
+        raise ValueError(f"El archivo no está en {encoding}.") from e
+    finally:
+        # Sin detach() el wrapper cerraría el archivo del llamador
+        texto.detach()
+
+
+def leer_filas(archivo, nombre: str, encoding: str = 'utf-8-sig') -> Iterator[tuple]:
+    """
+    Recorre un CSV o XLSX abierto en modo binario.
+
+    Yields
+    ------
+    tuple
+        (número de fila en el archivo, {campo: valor}). Las filas vacías se saltan.
+
+    Raises
+    ------
+    ValueError
+        Formato no soportado, archivo vacío o sin columna NIT.
+    """
+    extension = nombre.lower().rsplit('.', 1)[-1]
+    if extension == 'xlsx':
+        filas = _filas_xlsx(archivo)
+    elif extension == 'csv':
+        filas = _filas_csv(archivo, encoding)
+    else:
+        raise ValueError("Formato no soportado: use un archivo .csv o .xlsx.")
+
+    encabezado = next(filas, None)
+    if not encabezado:
+        raise ValueError("El archivo está vacío.")
+    campos = [ALIAS_COLUMNAS.get(normalizar(str(c)).replace(' ', '_')) for c in encabezado]
+    if 'nit' not in campos:
+        raise ValueError("Falta la columna 'nit'.")
+
+    for numero, valores in enumerate(filas, start=2):
+        fila = {campo: str(valor).strip() for campo, valor in zip(campos, valores) if campo}
+        if any(fila.values()):
+            yield numero, fila
+
+
+def _hora(valor: str):
+    """'18:00', '18:00:00' o la fracción de día de Excel (0.75)."""
+    if not valor:
+        return None
+    if ':' in valor:
+        partes = [int(p) for p in valor.split(':')]
+        return hora(*partes)
+    segundos = round(float(valor) * 86400)
+    if not 0 <= segundos < 86400:
+        raise ValueError(valor)
+    return hora(segundos // 3600, segundos % 3600 // 60)
+
+
+# --- IMPORTACIÓN ---
+
+class ImportadorEmpleados:
+    """
+    Uso::
+
+        resumen = ImportadorEmpleados().importar(leer_filas(archivo, 'personal.xlsx'))
+
+    ``resumen``: filas, empresas_creadas, empleados_creados y errores
+    (``[{'fila': 7, 'errores': ['...']}, ...]``). Con ``simular=True`` solo valida.
+    """
+
+    def __init__(self, batch_size: int = 1000, simular: bool = False):
+        self.batch_size = batch_size
+        self.simular = simular
+        self.resumen = {'filas': 0, 'empresas_creadas': 0, 'empleados_creados': 0, 'errores': []}
+
+    def importar(self, filas) -> dict:
+        # Conjuntos de unicidad: una consulta para usuarios y otra para empresas
+        self.emails, self.documentos = set(), set()
+        for email, documento in Usuario.objects.values_list('email', 'numero_documento').iterator(chunk_size=5000):
+            self.emails.add(email.lower())
+            self.documentos.add(documento)
+        self.empresas = dict(Empresa.objects.values_list('nit', 'id'))
+
+        self.nuevas_empresas = {}
+        self.servicios_por_nit = {}
+        pendientes = []
+
+        for numero, fila in filas:
+            self.resumen['filas'] += 1
+            datos = self._validar(numero, fila)
+            if datos:
+                pendientes.append(datos)
+            if len(pendientes) >= self.batch_size:
+                self._guardar(pendientes)
+                pendientes = []
+        self._guardar(pendientes)
+
+        self.resumen['errores'].sort(key=lambda error: error['fila'])
+        return self.resumen
+
+    def _error(self, numero: int, errores: list):
+        self.resumen['errores'].append({'fila': numero, 'errores': errores})
+
+    def _validar(self, numero: int, fila: dict):
+        errores = []
+        nit = fila.get('nit', '')
+        conocida = nit in self.empresas or nit in self.nuevas_empresas
+        if not nit:
+            errores.append('Falta el NIT de la empresa.')
+        elif not conocida and not fila.get('nombre_empresa'):
+            errores.append(f'La empresa {nit} no existe y la fila no trae su nombre.')
+        errores += self._validar_largos(Empresa, fila, ('nit',) + CAMPOS_EMPRESA)
+
+        empleado = None
+        if any(fila.get(campo) for campo in CAMPOS_EMPLEADO):
+            empleado = self._validar_empleado(fila, errores)
+
+        if errores:
+            self._error(numero, errores)
+            return None
+
+        if not conocida:
+            self.nuevas_empresas[nit] = {campo: fila.get(campo) or None for campo in CAMPOS_EMPRESA}
+        servicios = {s.strip() for s in _SEPARADOR_LISTA.split(fila.get('servicios', '')) if s.strip()}
+        if servicios:
+            self.servicios_por_nit.setdefault(nit, set()).update(servicios)
+        if empleado:
+            # Reservados: una fila posterior con el mismo correo o documento es un error
+            self.emails.add(empleado['email'].lower())
+            self.documentos.add(empleado['numero_documento'])
+        return {'fila': numero, 'nit': nit, 'empleado': empleado}
+
+    @staticmethod
+    def _validar_largos(model, fila: dict, campos) -> list:
+        return [
+            f"{campo} supera {model._meta.get_field(campo).max_length} caracteres."
+            for campo in campos
+            if len(fila.get(campo, '')) > model._meta.get_field(campo).max_length
+        ]
+
+    def _validar_empleado(self, fila: dict, errores: list) -> dict:
+        email = fila.get('email', '')
+        documento = fila.get('numero_documento', '')
+
+        if not fila.get('first_name'):
+            errores.append('Falta el nombre del empleado.')
+        if not documento:
+            errores.append('Falta el número de documento.')
+        elif documento in self.documentos:
+            errores.append('Ya existe un usuario con este documento.')
+        if not email:
+            errores.append('Falta el correo.')
+        else:
+            try:
+                validate_email(email)
+            except ValidationError:
+                errores.append(f'Correo inválido: {email}.')
+            if email.lower() in self.emails:
+                errores.append('Ya existe un usuario con este correo.')
+
+        tipo = fila.get('tipo') or 'Usuario'
+        if tipo not in dict(Usuario.TIPO):
+            errores.append(f'Tipo de usuario no válido: {tipo}.')
+        tipo_documento = fila.get('tipo_documento', '').upper()
+        if tipo_documento and tipo_documento not in dict(Usuario.TIPO_DOCUMENTO):
+            errores.append(f'Tipo de documento no válido: {tipo_documento}.')
+        try:
+            tiempo_limite = _hora(fila.get('tiempo_limite_jornada', ''))
+        except ValueError:
+            tiempo_limite = None
+            errores.append('Hora límite inválida (use HH:MM).')
+        errores += self._validar_largos(Usuario, fila, CAMPOS_EMPLEADO)
+
+        return {
+            'first_name': fila.get('first_name', ''),
+            'email': email,
+            'numero_documento': documento,
+            'tipo_documento': tipo_documento,
+            'tipo': tipo,
+            'tiempo_limite_jornada': tiempo_limite,
+            'cargo': fila.get('cargo', ''),
+        }
+
+    def _guardar(self, pendientes: list):
+        empleados = [datos for datos in pendientes if datos['empleado']]
+        if self.simular:
+            self.resumen['empresas_creadas'] += len(self.nuevas_empresas)
+            self.resumen['empleados_creados'] += len(empleados)
+            self.empresas.update(dict.fromkeys(self.nuevas_empresas))
+            self.nuevas_empresas, self.servicios_por_nit = {}, {}
+            return
+
+        with transaction.atomic():
+            self._guardar_empresas()
+            self._guardar_empleados(empleados)
+
+    def _guardar_empresas(self):
+        if self.nuevas_empresas:
+            # Otro proceso pudo crear alguna desde que se revisó el archivo: esas no cuentan como creadas
+            ya_existian = set(Empresa.objects.filter(nit__in=self.nuevas_empresas).values_list('nit', flat=True))
+            Empresa.objects.bulk_create([
+                Empresa(nit=nit, nombre_normalizado=normalizar(datos['nombre_empresa']), estado=True, **datos)
+                for nit, datos in self.nuevas_empresas.items()
+            ], batch_size=self.batch_size, ignore_conflicts=True)
+            # ignore_conflicts no devuelve IDs (y otro proceso pudo crear alguna): se releen por NIT
+            creadas = list(Empresa.objects.filter(nit__in=self.nuevas_empresas))
+            IndiceEmpresas.reindexar(creadas, self.batch_size)
+            self.empresas.update({empresa.nit: empresa.id for empresa in creadas})
+            self.resumen['empresas_creadas'] += len(set(self.nuevas_empresas) - ya_existian)
+            self.nuevas_empresas = {}
+
+        if self.servicios_por_nit:
+            ids = _resolver_en_lote(Servicio, set().union(*self.servicios_por_nit.values()), 'nombre_servicio')
+            Pivote = Empresa.servicios.through
+            Pivote.objects.bulk_create([
+                Pivote(empresa_id=self.empresas[nit], servicio_id=ids[nombre])
+                for nit, nombres in self.servicios_por_nit.items()
+                for nombre in nombres
+                if ids.get(nombre)
+            ], batch_size=self.batch_size, ignore_conflicts=True)
+            self.servicios_por_nit = {}
+
+    def _guardar_empleados(self, pendientes: list):
+        if not pendientes:
+            return
+        cargos = _resolver_en_lote(Cargo, {datos['empleado']['cargo'] for datos in pendientes}, 'nombre')
+
+        filas, usuarios = [], []
+        for datos in pendientes:
+            empleado = dict(datos['empleado'])
+            cargo = empleado.pop('cargo')
+            if cargo and cargos.get(cargo) is None:
+                self._error(datos['fila'], [f'El cargo {cargo} no existe.'])
+                continue
+            filas.append(datos['fila'])
+            usuarios.append(Usuario(
+                empresa_id=self.empresas[datos['nit']], cargo_id=cargos.get(cargo), is_active=True, **empleado
+            ))
+
+        try:
+            with transaction.atomic():
+                Usuario.objects.bulk_create(usuarios, batch_size=self.batch_size)
+            self.resumen['empleados_creados'] += len(usuarios)
+        except IntegrityError:
+            # Otro proceso registró alguno de estos correos/documentos después de
+            # armar los conjuntos: se reintenta uno a uno para señalar la fila
+            for numero, usuario in zip(filas, usuarios):
+                try:
+                    with transaction.atomic():
+                        Usuario.objects.bulk_create([usuario])
+                    self.resumen['empleados_creados'] += 1
+                except IntegrityError:
+                    self._error(numero, ['Ya existe un usuario con este correo o documento.'])
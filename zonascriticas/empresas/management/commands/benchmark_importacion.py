@@ -0,0 +1,84 @@
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+import csv
+import io
+import time
+
+from empresas import services
+from empresas.importacion import ImportadorEmpleados, leer_filas
+from empresas.models import Empresa
+
+# Compara crear_empleado en bucle (un empleado por llamada, como antes) con la
+# importación masiva de empresas/importacion.py sobre un CSV generado en memoria.
+#   python manage.py benchmark_importacion --empleados 10000 --bucle 1000
+# Todo corre dentro de una transacción que se revierte al final: no deja datos.
+
+
+class _Revertir(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = 'Benchmark de la importación masiva de empleados (bucle vs. por lotes)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--empleados', type=int, default=10000, help='Filas del archivo')
+        parser.add_argument('--empresas', type=int, default=50, help='Empresas distintas en el archivo')
+        parser.add_argument('--bucle', type=int, default=1000, help='Empleados creados con crear_empleado')
+
+    def _csv(self, empleados, empresas, prefijo):
+        salida = io.StringIO()
+        escritor = csv.writer(salida, delimiter=';')
+        escritor.writerow(['NIT', 'Empresa', 'Servicios', 'Nombre', 'Correo', 'Documento', 'Tipo documento', 'Cargo'])
+        for i in range(empleados):
+            e = i % empresas
+            escritor.writerow([
+                f'{prefijo}-{e}', f'Contratista {e}', 'Aseo; Redes', f'Empleado {i}',
+                f'{prefijo}-{i}@example.com', f'{prefijo}{i}', 'CC', f'Cargo {i % 20}',
+            ])
+        return io.BytesIO(salida.getvalue().encode('utf-8'))
+
+    def _medir(self, funcion):
+        with CaptureQueriesContext(connection) as consultas:
+            inicio = time.perf_counter()
+            funcion()
+            duracion = time.perf_counter() - inicio
+        return duracion, len(consultas)
+
+    def handle(self, *args, **options):
+        empleados, bucle = max(1, options['empleados']), max(1, options['bucle'])
+        self.stdout.write(self.style.WARNING(
+            f'🚀 Importación de {empleados} empleados (bucle con {bucle})...'
+        ))
+        resultados = {}
+
+        try:
+            with transaction.atomic():
+                # 1. Bucle anterior: crear_empleado por fila
+                empresa = Empresa.objects.create(nombre_empresa='Contratista Bucle', nit='bench-bucle')
+                resultados['bucle (crear_empleado)'] = (bucle, *self._medir(lambda: [
+                    services.crear_empleado({
+                        'id_empresa': empresa.id, 'first_name': f'Empleado {i}', 'cargo': f'Cargo {i % 20}',
+                        'email': f'bench-bucle-{i}@example.com', 'numero_documento': f'bench-bucle-{i}',
+                    }) for i in range(bucle)
+                ]))
+
+                # 2. Importación por lotes del archivo completo
+                archivo = self._csv(empleados, max(1, options['empresas']), 'bench-import')
+                importador = ImportadorEmpleados()
+                resultados['importación (CSV)'] = (empleados, *self._medir(
+                    lambda: importador.importar(leer_filas(archivo, 'benchmark.csv'))
+                ))
+                if importador.resumen['errores']:
+                    self.stdout.write(self.style.ERROR(f"   {len(importador.resumen['errores'])} filas con errores"))
+                raise _Revertir()
+        except _Revertir:
+            pass
+
+        msg = "\n✅ BENCHMARK FINALIZADO\n----------------------------------------\n"
+        for nombre, (filas, duracion, consultas) in resultados.items():
+            msg += (f" 👷 {nombre:<24} {filas:6d} filas {duracion:8.2f} s | "
+                    f"{filas / duracion:9.0f} filas/s | {consultas:6d} consultas\n")
+        msg += "----------------------------------------"
+        self.stdout.write(self.style.SUCCESS(msg))
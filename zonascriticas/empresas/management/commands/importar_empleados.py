@@ -0,0 +1,58 @@
+from django.core.management.base import BaseCommand, CommandError
+import csv
+import time
+
+from empresas.importacion import ImportadorEmpleados, leer_filas
+
+# Importa empresas y empleados desde un CSV o XLSX (ver empresas/importacion.py).
+#   python manage.py importar_empleados personal.xlsx --simular
+#   python manage.py importar_empleados personal.csv --reporte errores.csv
+
+
+class Command(BaseCommand):
+    help = 'Importación masiva de empresas y empleados (CSV o XLSX)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('archivo', help='Ruta del .csv o .xlsx')
+        parser.add_argument('--simular', action='store_true', help='Solo valida, no guarda nada')
+        parser.add_argument('--lote', type=int, default=1000, help='Filas por transacción')
+        parser.add_argument('--encoding', default='utf-8-sig', help='Codificación del CSV')
+        parser.add_argument('--reporte', help='CSV de salida con los errores por fila')
+
+    def handle(self, *args, **options):
+        ruta = options['archivo']
+        self.stdout.write(self.style.WARNING(
+            f"🚀 Importando {ruta}{' (simulación)' if options['simular'] else ''}..."
+        ))
+        start_time = time.time()
+
+        importador = ImportadorEmpleados(batch_size=max(1, options['lote']), simular=options['simular'])
+        try:
+            with open(ruta, 'rb') as archivo:
+                resumen = importador.importar(leer_filas(archivo, ruta, options['encoding']))
+        except (OSError, ValueError) as e:
+            raise CommandError(str(e))
+
+        if options['reporte']:
+            with open(options['reporte'], 'w', newline='', encoding='utf-8') as salida:
+                escritor = csv.writer(salida)
+                escritor.writerow(['fila', 'error'])
+                for error in resumen['errores']:
+                    escritor.writerows([error['fila'], mensaje] for mensaje in error['errores'])
+
+        for error in resumen['errores'][:20]:
+            self.stdout.write(self.style.ERROR(f"   Fila {error['fila']}: {' '.join(error['errores'])}"))
+        if len(resumen['errores']) > 20:
+            self.stdout.write(self.style.ERROR(f"   ... y {len(resumen['errores']) - 20} fila(s) más."))
+
+        duration = time.time() - start_time
+        msg = (
+            f"\n✅ PROCESO FINALIZADO en {duration:.2f}s.\n"
+            f"----------------------------------------\n"
+            f" 📄 Filas leídas: {resumen['filas']}\n"
+            f" 🏢 Empresas creadas: {resumen['empresas_creadas']}\n"
+            f" 👷 Empleados creados: {resumen['empleados_creados']}\n"
+            f" ❌ Filas con errores: {len(resumen['errores'])}\n"
+            f"----------------------------------------"
+        )
+        self.stdout.write(self.style.SUCCESS(msg))
@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand
+import time
+
+from empresas.busqueda import IndiceEmpresas
+
+# Reconstruye el índice de búsqueda de empresas (empresas/busqueda.py).
+# Empresa.save() lo mantiene al día; hace falta después de cargas con
+# bulk_create/update() o si se cambia la normalización.
+#   python manage.py reindexar_empresas
+
+
+class Command(BaseCommand):
+    help = 'Recalcula nombre_normalizado y la tabla empresa_terminos'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lote', type=int, default=1000, help='Empresas por lote')
+
+    def handle(self, *args, **options):
+        self.stdout.write(self.style.WARNING("🚀 Reindexando la búsqueda de empresas..."))
+        start_time = time.time()
+
+        terminos = IndiceEmpresas.reindexar_todo(batch_size=max(1, options['lote']))
+
+        duration = time.time() - start_time
+        msg = (
+            f"\n✅ PROCESO FINALIZADO en {duration:.2f}s.\n"
+            f"----------------------------------------\n"
+            f" 🔎 Términos indexados: {terminos}\n"
+            f"----------------------------------------"
+        )
+        self.stdout.write(self.style.SUCCESS(msg))
@@ -0,0 +1,90 @@
+# Generated by Django 4.2.25 on 2026-10-18 05:48
+
+import re
+import unicodedata
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+# Copia congelada de empresas/busqueda.py al crear esta migración: los cambios
+# futuros del buscador no deben alterar el llenado inicial.
+LARGO_MAXIMO_TERMINO = 64
+NO_ALFANUMERICO = re.compile(r'[^a-z0-9]+')
+
+
+def normalizar(texto):
+    sin_tildes = unicodedata.normalize('NFKD', texto or '').encode('ascii', 'ignore').decode()
+    return NO_ALFANUMERICO.sub(' ', sin_tildes.lower()).strip()
+
+
+def terminos_de(nombre, nit):
+    """Pares (clase, termino): 'P' palabra, 'T' trigrama, 'N' NIT compacto."""
+    palabras = {p[:LARGO_MAXIMO_TERMINO] for p in normalizar(nombre).split()}
+    terminos = {('P', p) for p in palabras}
+    for palabra in palabras:
+        relleno = f"  {palabra} "
+        terminos |= {('T', relleno[i:i + 3]) for i in range(len(relleno) - 2)}
+    nit_compacto = normalizar(nit).replace(' ', '')
+    if nit_compacto:
+        terminos.add(('N', nit_compacto[:LARGO_MAXIMO_TERMINO]))
+    return terminos
+
+
+def indexar_empresas(apps, schema_editor):
+    """Llena nombre_normalizado y empresa_terminos para las empresas existentes."""
+    Empresa = apps.get_model('empresas', 'Empresa')
+    TerminoEmpresa = apps.get_model('empresas', 'TerminoEmpresa')
+
+    empresas = list(Empresa.objects.only('id', 'nombre_empresa', 'nit'))
+    for empresa in empresas:
+        empresa.nombre_normalizado = normalizar(empresa.nombre_empresa)
+    Empresa.objects.bulk_update(empresas, ['nombre_normalizado'], batch_size=1000)
+    TerminoEmpresa.objects.bulk_create([
+        TerminoEmpresa(empresa_id=empresa.id, clase=clase, termino=termino)
+        for empresa in empresas
+        for clase, termino in terminos_de(empresa.nombre_empresa, empresa.nit)
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('empresas', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TerminoEmpresa',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('clase', models.CharField(choices=[('P', 'Palabra'), ('N', 'NIT'), ('T', 'Trigrama')], max_length=1)),
+                ('termino', models.CharField(max_length=64)),
+            ],
+            options={
+                'db_table': 'empresa_terminos',
+            },
+        ),
+        migrations.AddField(
+            model_name='empresa',
+            name='nombre_normalizado',
+            field=models.CharField(default='', editable=False, max_length=255),
+        ),
+        migrations.AddIndex(
+            model_name='empresa',
+            index=models.Index(fields=['nombre_normalizado', 'id'], name='empresa_nombre_norm_idx'),
+        ),
+        migrations.AddField(
+            model_name='terminoempresa',
+            name='empresa',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='terminos_busqueda', to='empresas.empresa'),
+        ),
+        migrations.AddIndex(
+            model_name='terminoempresa',
+            index=models.Index(fields=['clase', 'termino', 'empresa'], name='empresa_termino_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='terminoempresa',
+            constraint=models.UniqueConstraint(fields=('empresa', 'clase', 'termino'), name='termino_unico_por_empresa'),
+        ),
+        migrations.RunPython(indexar_empresas, migrations.RunPython.noop),
+    ]
@@ -39,8 +39,54 @@ class Empresa(models.Model):
         db_table='empresa_servicios_pivot' # Nombramos la tabla pivot
     )
 
+    # Nombre sin tildes ni mayúsculas (empresas/busqueda.py): orden del listado y cursor
+    nombre_normalizado = models.CharField(max_length=255, default='', editable=False)
+
     def __str__(self):
         return self.nombre_empresa
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instancia = super().from_db(db, field_names, values)
+        # Lo que está indexado hoy: save() solo reindexa si cambia
+        instancia._indexado = (instancia.__dict__.get('nombre_empresa'), instancia.__dict__.get('nit'))
+        return instancia
+
+    def save(self, *args, **kwargs):
+        from .busqueda import IndiceEmpresas, normalizar
+
+        self.nombre_normalizado = normalizar(self.nombre_empresa)
+        super().save(*args, **kwargs)
+        if getattr(self, '_indexado', None) != (self.nombre_empresa, self.nit):
+            IndiceEmpresas.reindexar([self])
+
+    class Meta:
+        db_table = 'empresas' # Nombramos la tabla
+        indexes = [
+            models.Index(fields=['nombre_normalizado', 'id'], name='empresa_nombre_norm_idx'),
+        ]
+
+
+class TerminoEmpresa(models.Model):
+    """
+    Índice invertido de la búsqueda de empresas (ver empresas/busqueda.py).
+    Una fila por palabra del nombre, por NIT compacto y por trigrama.
+    """
+    class Clase(models.TextChoices):
+        PALABRA = 'P', 'Palabra'
+        NIT = 'N', 'NIT'
+        TRIGRAMA = 'T', 'Trigrama'
+
+    empresa = models.ForeignKey(Empresa, on_delete=models.CASCADE, related_name='terminos_busqueda')
+    clase = models.CharField(max_length=1, choices=Clase.choices)
+    termino = models.CharField(max_length=64)
+
     class Meta:
-        db_table = 'empresas' # Nombramos la tabla
\ No newline at end of file
+        db_table = 'empresa_terminos'
+        constraints = [
+            models.UniqueConstraint(fields=['empresa', 'clase', 'termino'], name='termino_unico_por_empresa'),
+        ]
+        indexes = [
+            # Prefijos (rango sobre termino) y conteo de trigramas por empresa
+            models.Index(fields=['clase', 'termino', 'empresa'], name='empresa_termino_idx'),
+        ]
\ No newline at end of file
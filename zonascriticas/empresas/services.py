@@ -4,6 +4,9 @@ from django.db import transaction
 from django.core.exceptions import ValidationError
 from .models import Empresa, Cargo, Servicio
 from login.models import Usuario
+from login.cache_usuarios import invalidar_usuarios
+from descargo_responsabilidad.models import PresenciaActual
+from home.imagenes import ColaImagenes
 
 # --- LÓGICA DE HELPER ---
 
@@ -12,32 +15,74 @@ def _get_or_create_from_list(model, data_list: list, field_name: str) -> list:
     Toma una lista mixta de IDs (como strings) y nombres (strings),
     y un Modelo (ej. Servicio).
     Devuelve una lista de IDs de objetos, creando los que no existen.
-    
+    Los IDs que no existen se ignoran.
+
+    Resuelve toda la lista de una vez con _resolver_en_lote: antes era un
+    exists() o un get_or_create por elemento (30 servicios = 30+ consultas).
+
     Args:
         model: El modelo de Django (ej. Servicio)
         data_list: La lista del frontend (ej. ['1', 'Plomería', '2'])
         field_name: El campo donde buscar/crear (ej. 'nombre_servicio')
     """
-    object_ids = []
-    for item in data_list:
-        if not item: continue # Ignorar strings vacíos
+    valores = [str(item).strip() for item in data_list if item and str(item).strip()]
+    ids = _resolver_en_lote(model, valores, field_name)
 
-        # Si es un número, asumimos que es un ID existente
-        if item.isdigit():
-            # Verificamos que el ID realmente exista en la BD
-            if model.objects.filter(pk=item).exists():
-                object_ids.append(item)
-        
-        # Si NO es un número, es un nuevo string para crear
-        else:
-            # Usamos get_or_create para crear el objeto si no existe
-            # y evitar duplicados.
-            obj, created = model.objects.get_or_create(
-                **{field_name: item.strip()} # ej: nombre_servicio="Plomería"
-            )
-            object_ids.append(obj.id)
-            
-    return object_ids
+    # Mismo orden que llegó, sin repetidos
+    return list(dict.fromkeys(ids[v] for v in valores if ids[v] is not None))
+
+def _resolver_cargo(cargo_data):
+    """
+    ID del cargo elegido en el formulario: un ID existente o un nombre que se
+    crea si no existe. Lanza Cargo.DoesNotExist si el ID no existe.
+    """
+    if not cargo_data:
+        return None
+    cargo_ids = _get_or_create_from_list(Cargo, [cargo_data], 'nombre')
+    if not cargo_ids:
+        raise Cargo.DoesNotExist(f'No existe el cargo {cargo_data}.')
+    return cargo_ids[0]
+
+def _resolver_en_lote(model, valores, field_name: str) -> dict:
+    """
+    Resuelve muchos valores a la vez (formularios e importación masiva): un
+    número es el ID de un objeto existente y un texto es un nombre que se
+    busca o se crea.
+
+    Como máximo 4 consultas sin importar cuántos valores lleguen: IDs
+    existentes, nombres existentes y, si faltan nombres, su INSERT y su
+    relectura. El INSERT ignora los que otro proceso haya creado entre tanto
+    (campo único), y la relectura los trae igual.
+
+    Returns:
+        dict: valor (sin espacios) -> ID, o None si el ID no existe.
+    """
+    valores = {str(v).strip() for v in valores if v and str(v).strip()}
+    ids_pedidos = {v for v in valores if v.isdigit()}
+    nombres = valores - ids_pedidos
+    resultado = {}
+
+    if ids_pedidos:
+        existentes = set(model.objects.filter(pk__in=ids_pedidos).values_list('pk', flat=True))
+        resultado.update({v: int(v) if int(v) in existentes else None for v in ids_pedidos})
+
+    if nombres:
+        por_nombre = dict(model.objects.filter(**{f'{field_name}__in': nombres}).values_list(field_name, 'pk'))
+        faltantes = {n for n in nombres if n not in por_nombre}
+        if faltantes:
+            with transaction.atomic():
+                model.objects.bulk_create([model(**{field_name: n}) for n in faltantes], ignore_conflicts=True)
+                # Lectura con bloqueo: en MySQL (REPEATABLE READ) una lectura normal no
+                # vería la fila que otro proceso acaba de confirmar
+                por_nombre.update(
+                    model.objects.select_for_update()
+                    .filter(**{f'{field_name}__in': faltantes}).values_list(field_name, 'pk')
+                )
+        # Con collation sin mayúsculas (MySQL) la BD puede devolver 'Aseo' cuando se pidió 'aseo'
+        sin_mayusculas = {n.lower(): pk for n, pk in por_nombre.items()}
+        resultado.update({n: por_nombre.get(n, sin_mayusculas.get(n.lower())) for n in nombres})
+
+    return resultado
 
 # --- LÓGICA DE EMPRESAS ---
 
@@ -110,7 +155,10 @@ def actualizar_estado_empresa(empresa: Empresa, nuevo_estado: bool) -> str:
 
     if nuevo_estado is False:
         # Regla de negocio 1: Desactivar empresa desactiva empleados.
+        # update() no pasa por Usuario.save(): invalidamos la caché de sesión a mano
+        empleados_ids = list(empresa.empleados.values_list('id', flat=True))
         empleados_afectados_count = empresa.empleados.update(is_active=False)
+        invalidar_usuarios(empleados_ids)
         return f'Empresa desactivada. {empleados_afectados_count} empleado(s) han sido desactivados.'
     else:
         # Regla de negocio 2: Reactivar empresa NO reactiva empleados.
@@ -152,15 +200,9 @@ def crear_empleado(data: dict, imagen_file=None) -> Usuario:
     # 2. Obtener instancias relacionadas (levantará DoesNotExist si falla)
     empresa = Empresa.objects.get(pk=empresa_id)
     
-    cargo = None
-    if cargo_data:
-        if cargo_data.isdigit():
-            # Es un ID, lo buscamos
-            cargo = Cargo.objects.get(pk=cargo_data)
-        else:
-            # Es un String, lo creamos (o buscamos si ya existe)
-            cargo, created = Cargo.objects.get_or_create(nombre=cargo_data.strip())
-            
+    # Un ID existente o un nombre que se crea (levantará DoesNotExist si el ID no existe)
+    cargo_id = _resolver_cargo(cargo_data)
+
     # 3. Crear el objeto
     nuevo_empleado = Usuario.objects.create(
         email=email,
@@ -169,7 +211,7 @@ def crear_empleado(data: dict, imagen_file=None) -> Usuario:
         tipo_documento=data.get('tipo_documento') or '',
         tiempo_limite_jornada=data.get('tiempo_limite_jornada') or None,
         empresa=empresa,
-        cargo=cargo,
+        cargo_id=cargo_id,
         tipo=data.get('tipo', 'Usuario'),
         is_active=True # Regla de negocio: siempre activo al crear
     )
@@ -178,6 +220,7 @@ def crear_empleado(data: dict, imagen_file=None) -> Usuario:
     if imagen_file:
         nuevo_empleado.img = imagen_file
         nuevo_empleado.save()
+        ColaImagenes.encolar(nuevo_empleado, 'img')
 
     return nuevo_empleado
 
@@ -190,12 +233,7 @@ def actualizar_empleado(empleado: Usuario, data: dict, imagen_file=None) -> Usua
     numero_documento = data.get('numero_documento')
     cargo_data = data.get('cargo')
 
-    cargo = None
-    if cargo_data:
-        if cargo_data.isdigit():
-            cargo = Cargo.objects.get(pk=cargo_data)
-        else:
-            cargo, created = Cargo.objects.get_or_create(nombre=cargo_data.strip())
+    cargo_id = _resolver_cargo(cargo_data)
 
     # 1. Validar unicidad (excluyendo al empleado actual)
     _validar_datos_unicos_empleado(email, numero_documento, empleado_id=empleado.id)
@@ -207,10 +245,15 @@ def actualizar_empleado(empleado: Usuario, data: dict, imagen_file=None) -> Usua
     empleado.tipo_documento = data.get('tipo_documento') or ''
     empleado.tipo = data.get('tipo')
     empleado.tiempo_limite_jornada = data.get('tiempo_limite_jornada') or None
-    empleado.cargo = cargo # Asigna el cargo calculado arriba
+    empleado.cargo_id = cargo_id # Asigna el cargo calculado arriba
     
     if imagen_file:
         empleado.img = imagen_file
 
     empleado.save()
+    if imagen_file:
+        ColaImagenes.encolar(empleado, 'img')
+
+    # Si está dentro de una zona, su vencimiento cambia con la nueva hora límite
+    PresenciaActual.recalcular_limite(empleado)
     return empleado
\ No newline at end of file
@@ -118,6 +118,11 @@ export class EmpresasView {
             this.#empresas = data.empresas.sort((a, b) => b.estado - a.estado);
             
             this.#render();
+
+            // Sin coincidencias exactas el backend sugiere las más parecidas
+            if (data.aproximada) {
+                ui.showNotification('Sin coincidencias exactas: se muestran empresas parecidas', 'info');
+            }
         } catch (error) {
             ui.showNotification(`Error al cargar empresas: ${error.message}`, 'error');
         }
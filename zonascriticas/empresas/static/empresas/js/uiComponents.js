@@ -67,7 +67,8 @@ export function createEmpleadoCard(empleado, isCompanyActive = true) {
     
     // Usamos el 'get_full_name' de Django o el username
     const nombreCompleto = empleado.nombre_completo || empleado.username;
-    const imagenSrc = empleado.img ? normalizarRutaImagen(empleado.img) : null;
+    const imagenListado = empleado.img_miniatura || empleado.img;
+    const imagenSrc = imagenListado ? normalizarRutaImagen(imagenListado) : null;
 
     return `
     <div class="${cardClasses}" data-employee-id="${empleado.id}">
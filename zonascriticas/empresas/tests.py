@@ -1,3 +1,341 @@
+import io
+import zipfile
+from unittest import mock
+
+from django.core.files.uploadedfile import SimpleUploadedFile
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.db import connection
+from django.urls import reverse
+
+from login.models import Usuario
+from . import services
+from .busqueda import IndiceEmpresas, _rango_prefijo, normalizar
+from .importacion import ImportadorEmpleados, leer_filas
+from .models import Cargo, Empresa, Servicio, TerminoEmpresa
+
+
+class BusquedaEmpresasTestCase(TestCase):
+    """
+    empresa_list: búsqueda por prefijo (nombre y NIT) con el índice de
+    empresas/busqueda.py, sugerencias tolerantes a errores, paginación por
+    cursor y un número de consultas que no depende de cuántas empresas hay.
+    """
+
+    def setUp(self):
+        self.admin = Usuario.objects.create(
+            first_name="Admin", numero_documento="1", email="admin@test.com", tipo='Administrador'
+        )
+        self.aseo = Servicio.objects.create(nombre_servicio='Aseo')
+        self.redes = Servicio.objects.create(nombre_servicio='Redes')
+        nombres = [
+            ('Transportes Andinos S.A.S.', '900.123.456-7'),
+            ('Pavimentos Ñandú', '800555111'),
+            ('Redes del Valle', '901000222'),
+            ('Transandina Ltda', '830999888'),
+        ]
+        self.empresas = []
+        for nombre, nit in nombres:
+            empresa = Empresa.objects.create(nombre_empresa=nombre, nit=nit)
+            empresa.servicios.set([self.aseo, self.redes])
+            self.empresas.append(empresa)
+
+        session = self.client.session
+        session['id_usuario_logueado'] = self.admin.id
+        session.save()
+
+    def buscar(self, **params):
+        respuesta = self.client.get(reverse('api-empresa-list'), params)
+        return respuesta.status_code, respuesta.json()
+
+    def nombres(self, **params):
+        return [fila['nombre_empresa'] for fila in self.buscar(**params)[1]['payload']['empresas']]
+
+    def test_normalizar(self):
+        self.assertEqual(normalizar('Pavimentos Ñandú S.A.S.'), 'pavimentos nandu s a s')
+
+    def test_prefijo_de_cualquier_palabra_sin_tildes(self):
+        self.assertEqual(self.nombres(busqueda='tran'), ['Transandina Ltda', 'Transportes Andinos S.A.S.'])
+        self.assertEqual(self.nombres(busqueda='ANDIN'), ['Transportes Andinos S.A.S.'])
+        self.assertEqual(self.nombres(busqueda='ñandu pav'), ['Pavimentos Ñandú'])
+
+    def test_prefijo_del_nit_con_o_sin_puntos(self):
+        self.assertEqual(self.nombres(busqueda='900.123'), ['Transportes Andinos S.A.S.'])
+        self.assertEqual(self.nombres(busqueda='9001234567'), ['Transportes Andinos S.A.S.'])
+
+    def test_rango_de_prefijo_no_sale_del_alfabeto(self):
+        # '{' y ':' ordenan antes que letras y dígitos en utf8mb4_0900_ai_ci
+        self.assertEqual(_rango_prefijo('and'), ('and', 'ane'))
+        self.assertEqual(_rango_prefijo('anz'), ('anz', 'ao'))
+        self.assertEqual(_rango_prefijo('9'), ('9', 'a'))
+        self.assertEqual(_rango_prefijo('9009'), ('9009', '900a'))
+        self.assertEqual(_rango_prefijo('zz'), ('zz', None))
+        self.assertEqual(self.nombres(busqueda='830.999'), ['Transandina Ltda'])
+
+    def test_error_de_digitacion_devuelve_aproximadas(self):
+        status, datos = self.buscar(busqueda='pavimentoz')
+
+        self.assertEqual(status, 200)
+        self.assertTrue(datos['payload']['aproximada'])
+        self.assertEqual(datos['payload']['empresas'][0]['nombre_empresa'], 'Pavimentos Ñandú')
+
+    def test_sin_parecidos_lista_vacia(self):
+        status, datos = self.buscar(busqueda='xyzw')
+
+        self.assertEqual(datos['payload'], {'empresas': [], 'siguiente_cursor': None, 'aproximada': False})
+
+    def test_renombrar_actualiza_el_indice(self):
+        empresa = Empresa.objects.get(pk=self.empresas[2].pk)
+        empresa.nombre_empresa = 'Conexiones del Valle'
+        empresa.save()
+
+        self.assertEqual(self.nombres(busqueda='conex'), ['Conexiones del Valle'])
+        self.assertEqual(self.nombres(busqueda='redes'), [])
+
+    def test_actualizar_otro_campo_no_reindexa(self):
+        empresa = Empresa.objects.get(pk=self.empresas[0].pk)
+        empresa.contacto = 'Laura'
+
+        with self.assertNumQueries(1):
+            empresa.save()
+
+    def test_paginas_por_cursor_cubren_todo_sin_repetir(self):
+        vistos, cursor = [], None
+        while True:
+            params = {'limite': 3}
+            if cursor:
+                params['cursor'] = cursor
+            payload = self.buscar(**params)[1]['payload']
+            vistos += [fila['nombre_empresa'] for fila in payload['empresas']]
+            cursor = payload['siguiente_cursor']
+            if not cursor:
+                break
+
+        self.assertEqual(vistos, sorted(vistos, key=normalizar))
+        self.assertEqual(len(vistos), 4)
+
+    def test_cursor_invalido(self):
+        status, datos = self.buscar(limite=2, cursor='no-es-un-cursor')
+
+        self.assertEqual(status, 400)
+        self.assertFalse(datos['success'])
+
+    def test_servicios_salen_del_prefetch(self):
+        with CaptureQueriesContext(connection) as pocas:
+            self.buscar()
+
+        nuevas = Empresa.objects.bulk_create([Empresa(nombre_empresa=f'Extra {i}', nit=f'7{i}') for i in range(20)])
+        for empresa in nuevas:
+            empresa.servicios.set([self.aseo])
+        IndiceEmpresas.reindexar(nuevas)
+
+        with CaptureQueriesContext(connection) as muchas:
+            status, datos = self.buscar(busqueda='extra')
+
+        self.assertEqual(len(datos['payload']['empresas']), 20)
+        self.assertEqual(datos['payload']['empresas'][0]['servicios_nombres'], 'Aseo')
+        self.assertEqual(len(muchas), len(pocas))
+
+    def test_reindexar_todo(self):
+        TerminoEmpresa.objects.all().delete()
+        Empresa.objects.filter(pk=self.empresas[1].pk).update(nombre_normalizado='')
+
+        IndiceEmpresas.reindexar_todo()
+
+        self.assertEqual(self.nombres(busqueda='nandu'), ['Pavimentos Ñandú'])
+
+
+def xlsx(filas) -> bytes:
+    """XLSX mínimo: textos en sharedStrings y números como celdas numéricas."""
+    compartidos, hoja = [], []
+    for r, fila in enumerate(filas, start=1):
+        celdas = []
+        for c, valor in enumerate(fila):
+            ref = f"{chr(65 + c)}{r}"
+            if isinstance(valor, (int, float)):
+                celdas.append(f'<c r="{ref}"><v>{valor}</v></c>')
+            elif valor:
+                compartidos.append(valor)
+                celdas.append(f'<c r="{ref}" t="s"><v>{len(compartidos) - 1}</v></c>')
+        hoja.append(f'<row r="{r}">{"".join(celdas)}</row>')
+
+    ns = 'xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"'
+    salida = io.BytesIO()
+    with zipfile.ZipFile(salida, 'w') as libro:
+        libro.writestr('xl/workbook.xml', (
+            f'<workbook {ns} xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+            '<sheets><sheet name="Personal" sheetId="1" r:id="rId1"/></sheets></workbook>'
+        ))
+        libro.writestr('xl/_rels/workbook.xml.rels', (
+            '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+            '<Relationship Id="rId1" Target="worksheets/hoja1.xml"/></Relationships>'
+        ))
+        libro.writestr('xl/worksheets/hoja1.xml', f'<worksheet {ns}><sheetData>{"".join(hoja)}</sheetData></worksheet>')
+        libro.writestr('xl/sharedStrings.xml', f'<sst {ns}>{"".join(f"<si><t>{t}</t></si>" for t in compartidos)}</sst>')
+    return salida.getvalue()
+
+
+class ImportacionEmpleadosTestCase(TestCase):
+    """
+    ImportadorEmpleados: validación por fila contra conjuntos en memoria,
+    empresas/cargos/servicios por lote y reporte de errores.
+    """
+
+    ENCABEZADO = 'NIT;Empresa;Servicios;Nombre;Correo;Documento;Tipo documento;Cargo;Hora límite\n'
+
+    def setUp(self):
+        self.existente = Empresa.objects.create(nombre_empresa='Jolifoods', nit='900')
+        Usuario.objects.create(first_name='Ana', numero_documento='111', email='ana@test.com', empresa=self.existente)
+        self.cargo = Cargo.objects.create(nombre='Técnico')
+
+    def importar(self, texto, **kwargs):
+        archivo = io.BytesIO((self.ENCABEZADO + texto).encode('utf-8'))
+        return ImportadorEmpleados(**kwargs).importar(leer_filas(archivo, 'personal.csv'))
+
+    def test_importa_empresas_empleados_y_reporta_errores(self):
+        resumen = self.importar(
+            '800;Andina SAS;Aseo, Redes;Luis;luis@test.com;222;cc;Técnico;18:00\n'
+            '800;;;Eva;eva@test.com;333;;Soldador;\n'
+            '900;;Aseo;Juan;juan@test.com;111;;;\n'        # documento ya registrado
+            '800;;;Leo;luis@TEST.com;444;;;\n'              # correo repetido en el archivo
+            '700;;;Sol;sol@test.com;555;;;\n'               # empresa nueva sin nombre
+            '800;;;Rita;rita@test.com;666;;99999;\n'        # ID de cargo inexistente
+            '900;;;Pia;no-es-correo;777;XX;;25:00\n'
+            '900;;Aseo;;;;;;\n'                            # solo agrega un servicio a la empresa
+        , batch_size=2)
+
+        self.assertEqual(resumen['filas'], 8)
+        self.assertEqual(resumen['empresas_creadas'], 1)
+        self.assertEqual(resumen['empleados_creados'], 2)
+        self.assertEqual([error['fila'] for error in resumen['errores']], [4, 5, 6, 7, 8])
+        self.assertIn('Ya existe un usuario con este documento.', resumen['errores'][0]['errores'])
+        self.assertIn('Ya existe un usuario con este correo.', resumen['errores'][1]['errores'])
+        self.assertEqual(len(resumen['errores'][4]['errores']), 3)
+
+        andina = Empresa.objects.get(nit='800')
+        self.assertEqual(andina.nombre_normalizado, 'andina sas')
+        self.assertEqual(sorted(andina.servicios.values_list('nombre_servicio', flat=True)), ['Aseo', 'Redes'])
+        self.assertEqual(list(self.existente.servicios.values_list('nombre_servicio', flat=True)), ['Aseo'])
+        luis = Usuario.objects.get(numero_documento='222')
+        self.assertEqual((luis.empresa, luis.cargo, luis.tipo_documento), (andina, self.cargo, 'CC'))
+        self.assertEqual(luis.tiempo_limite_jornada.hour, 18)
+        self.assertEqual(Usuario.objects.get(numero_documento='333').cargo.nombre, 'Soldador')
+
+    def test_consultas_no_dependen_de_las_filas(self):
+        def consultas_para(nit, filas):
+            texto = ''.join(f'{nit};Andina;Aseo {nit};E{i};{nit}-{i}@test.com;{nit}-{i};;Cargo {nit}-{i % 3};\n' for i in range(filas))
+            with CaptureQueriesContext(connection) as consultas:
+                resumen = self.importar(texto, batch_size=1000)
+            self.assertEqual(resumen['empleados_creados'], filas)
+            return len(consultas)
+
+        # Solo crece el número de INSERT en que el backend parte el bulk_create (999 parámetros en SQLite)
+        self.assertLessEqual(consultas_para('801', 300) - consultas_para('800', 30), 3)
+
+    def test_empresa_creada_por_otro_proceso_no_cuenta(self):
+        guardar_original = ImportadorEmpleados._guardar_empresas
+
+        def otro_proceso_llega_primero(importador):
+            # Entre la validación del archivo y el INSERT alguien más creó la empresa 800
+            Empresa.objects.create(nombre_empresa='Andina (otro proceso)', nit='800')
+            return guardar_original(importador)
+
+        with mock.patch.object(ImportadorEmpleados, '_guardar_empresas', autospec=True, side_effect=otro_proceso_llega_primero):
+            resumen = self.importar('800;Andina;;Luis;luis@test.com;222;;;\n700;Sol;;Eva;eva@test.com;333;;;\n')
+
+        self.assertEqual(resumen['empresas_creadas'], 1)
+        self.assertEqual(resumen['empleados_creados'], 2)
+        self.assertEqual(Usuario.objects.get(numero_documento='222').empresa.nombre_empresa, 'Andina (otro proceso)')
+
+    def test_simular_no_guarda(self):
+        resumen = self.importar('800;Andina;;Luis;luis@test.com;222;;Nuevo;\n', simular=True)
+
+        self.assertEqual((resumen['empresas_creadas'], resumen['empleados_creados']), (1, 1))
+        self.assertFalse(Empresa.objects.filter(nit='800').exists())
+        self.assertFalse(Cargo.objects.filter(nombre='Nuevo').exists())
+
+    def test_xlsx_por_api(self):
+        admin = Usuario.objects.create(first_name='Admin', numero_documento='1', email='admin@test.com', tipo='Administrador')
+        session = self.client.session
+        session['id_usuario_logueado'] = admin.id
+        session.save()
+        contenido = xlsx([
+            ['NIT', 'Razón social', 'Nombres', 'Correo electrónico', 'Cédula', 'Hora límite'],
+            [800123, 'Andina', 'Luis', 'luis@test.com', 1032456789, 0.75],
+        ])
+
+        respuesta = self.client.post(reverse('api-empleado-importar'), {
+            'archivo': SimpleUploadedFile('personal.xlsx', contenido),
+        })
+
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertEqual(respuesta.json()['payload']['empleados_creados'], 1)
+        luis = Usuario.objects.get(numero_documento='1032456789')
+        self.assertEqual((luis.empresa.nit, luis.tiempo_limite_jornada.hour), ('800123', 18))
+
+    def test_formato_no_soportado(self):
+        with self.assertRaises(ValueError):
+            list(leer_filas(io.BytesIO(b'x'), 'personal.pdf'))
+        with self.assertRaises(ValueError):
+            list(leer_filas(io.BytesIO(b'nombre;correo\nLuis;l@test.com\n'), 'personal.csv'))
+
+
+class ResolverEnLoteTestCase(TestCase):
+    """
+    _get_or_create_from_list resuelve IDs y nombres con un número fijo de
+    consultas y tolera que otro proceso cree el mismo nombre a la vez.
+    """
+
+    def setUp(self):
+        self.existentes = [Servicio.objects.create(nombre_servicio=f'Servicio {i}') for i in range(15)]
+
+    def datos(self, nuevos):
+        return {
+            'nombre_empresa': 'Andina', 'nit': f'nit-{nuevos}',
+            'servicios': [str(s.id) for s in self.existentes] + ['99999', ''] + [f'Nuevo {nuevos}-{i}' for i in range(nuevos)],
+        }
+
+    def test_consultas_no_dependen_de_la_cantidad(self):
+        with CaptureQueriesContext(connection) as pocos:
+            services.crear_empresa(self.datos(1))
+        with CaptureQueriesContext(connection) as muchos:
+            empresa = services.crear_empresa(self.datos(15))
+
+        self.assertEqual(len(muchos), len(pocos))
+        self.assertEqual(empresa.servicios.count(), 30)  # el ID 99999 no existe y se ignora
+
+    def test_orden_y_sin_repetidos(self):
+        ids = services._get_or_create_from_list(
+            Servicio, ['Servicio 3', str(self.existentes[0].id), ' Servicio 3 ', 'Otro'], 'nombre_servicio'
+        )
+
+        self.assertEqual(ids[:2], [self.existentes[3].id, self.existentes[0].id])
+        self.assertEqual(len(ids), 3)
+        self.assertEqual(Servicio.objects.get(pk=ids[2]).nombre_servicio, 'Otro')
+
+    def test_carrera_con_otro_proceso(self):
+        bulk_create_original = Servicio.objects.bulk_create
+
+        def otro_proceso_llega_primero(objetos, **kwargs):
+            # Entre la lectura y el INSERT alguien más creó 'Pintura'
+            Servicio.objects.create(nombre_servicio='Pintura')
+            return bulk_create_original(objetos, **kwargs)
+
+        with mock.patch.object(Servicio.objects, 'bulk_create', side_effect=otro_proceso_llega_primero):
+            ids = services._get_or_create_from_list(Servicio, ['Pintura', 'Redes'], 'nombre_servicio')
+
+        self.assertEqual(len(ids), 2)
+        self.assertEqual(Servicio.objects.filter(nombre_servicio='Pintura').count(), 1)
+        self.assertEqual(Servicio.objects.get(pk=ids[0]).nombre_servicio, 'Pintura')
+
+    def test_cargo_del_empleado(self):
+        empresa = Empresa.objects.create(nombre_empresa='Andina', nit='800')
+        base = {'id_empresa': empresa.id, 'first_name': 'Luis', 'email': 'luis@test.com', 'numero_documento': '222'}
+
+        empleado = services.crear_empleado({**base, 'cargo': ' Soldador '})
+        self.assertEqual(empleado.cargo.nombre, 'Soldador')
 
-# Create your tests here.
+        with self.assertRaises(Cargo.DoesNotExist):
+            services.actualizar_empleado(empleado, {**base, 'cargo': '99999', 'tipo': 'Usuario'})
+        services.actualizar_empleado(empleado, {**base, 'cargo': str(empleado.cargo_id), 'tipo': 'Usuario'})
+        self.assertEqual(Usuario.objects.get(pk=empleado.pk).cargo.nombre, 'Soldador')
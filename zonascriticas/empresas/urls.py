@@ -18,4 +18,5 @@ urlpatterns = [
 
     path('api/empleados/crear/', views.empleado_create, name='api-empleado-create'),
     path('api/empleados/<int:empleado_id>/actualizar/', views.empleado_update, name='api-empleado-update'),
+    path('api/empleados/importar/', views.importar_empleados_api, name='api-empleado-importar'),
 ]
\ No newline at end of file
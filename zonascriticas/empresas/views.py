@@ -11,9 +11,16 @@ import json
 from .models import Empresa, Cargo, Servicio
 from login.models import Usuario
 from . import services 
+from .busqueda import BuscadorEmpresas
+from .importacion import ImportadorEmpleados, leer_filas
 
 # --- IMPORTACIÓN DEL NÚCLEO ---
 from home.utils import api_response
+from home.imagenes import url_miniatura
+from home.replica import lectura_en_replica
+
+# Máximo de filas por página cuando se usa ?limite=
+LIMITE_MAXIMO_PAGINA = 500
 
 @login_custom_required
 def empresas_view(request):
@@ -25,28 +32,61 @@ def empresas_view(request):
     return render(request, 'empresas.html', context)
 
 @require_http_methods(["GET"])
+@lectura_en_replica
 def empresa_list(request):
-    """API: Devuelve una lista de todas las empresas."""
+    """
+    API: Devuelve la lista de empresas, ordenada por nombre.
+
+    ``?busqueda=`` busca por prefijo de palabras del nombre o del NIT
+    (empresas/busqueda.py). Si no hay coincidencias se devuelven las más
+    parecidas y ``aproximada`` viene en true.
+    Paginación opcional por cursor (keyset sobre nombre_normalizado, id):
+        ?limite=50              -> primera página
+        ?limite=50&cursor=<...> -> página siguiente (``siguiente_cursor`` de la anterior)
+    Sin ``limite`` se devuelven todas (clientes que no paginan).
+    """
     try:
         filtro = request.GET.get('filtro', 'todos')
         busqueda = request.GET.get('busqueda', '')
+        cursor = request.GET.get('cursor')
+        limite = request.GET.get('limite')
+        limite = min(int(limite), LIMITE_MAXIMO_PAGINA) if limite else None
+        if limite is not None and limite < 1:
+            raise ValueError("El límite debe ser mayor que cero.")
 
-        empresas = Empresa.objects.prefetch_related('servicios').all()
+        empresas = Empresa.objects.prefetch_related('servicios').order_by('nombre_normalizado', 'id')
 
         if filtro == 'activos':
             empresas = empresas.filter(estado=True)
         elif filtro == 'inactivos':
             empresas = empresas.filter(estado=False)
 
+        candidatas = empresas
         if busqueda:
+            empresas = BuscadorEmpresas.filtrar(empresas, busqueda)
+
+        if cursor:
+            nombre, empresa_id = BuscadorEmpresas.decodificar_cursor(cursor)
             empresas = empresas.filter(
-                Q(nombre_empresa__icontains=busqueda) | 
-                Q(nit__icontains=busqueda)
+                Q(nombre_normalizado__gt=nombre) | Q(nombre_normalizado=nombre, id__gt=empresa_id)
             )
 
+        # Una fila de más nos dice si hay página siguiente
+        pagina = list(empresas[:limite + 1]) if limite is not None else list(empresas)
+        siguiente_cursor = None
+        if limite is not None and len(pagina) > limite:
+            pagina = pagina[:limite]
+            siguiente_cursor = BuscadorEmpresas.codificar_cursor(pagina[-1])
+
+        aproximada = False
+        if busqueda and not pagina and not cursor:
+            pagina = BuscadorEmpresas.aproximadas(candidatas, busqueda, limite or LIMITE_MAXIMO_PAGINA)
+            aproximada = bool(pagina)
+
         data = []
-        for empresa in empresas:
-            servicios = list(empresa.servicios.values_list('nombre_servicio', flat=True))
+        for empresa in pagina:
+            # servicios.all() sale de la caché del prefetch (values_list hacía 2 consultas por empresa)
+            servicios = list(empresa.servicios.all())
             data.append({
                 'id': empresa.id,
                 'nombre_empresa': empresa.nombre_empresa,
@@ -54,17 +94,20 @@ def empresa_list(request):
                 'direccion': empresa.direccion,
                 'contacto': empresa.contacto,
                 'estado': empresa.estado,
-                'servicios_nombres': ", ".join(servicios),
-                'servicios': list(empresa.servicios.values_list('id', flat=True)) 
+                'servicios_nombres': ", ".join(s.nombre_servicio for s in servicios),
+                'servicios': [s.id for s in servicios]
             })
 
-        # Estructura: payload -> { 'empresas': [...] }
-        return api_response(data={'empresas': data})
+        # Estructura: payload -> { 'empresas': [...], 'siguiente_cursor': ..., 'aproximada': ... }
+        return api_response(data={'empresas': data, 'siguiente_cursor': siguiente_cursor, 'aproximada': aproximada})
 
+    except ValueError as e:
+        return api_response(success=False, message=str(e), status_code=400)
     except Exception as e:
         return api_response(success=False, message=str(e), status_code=500)
 
 @require_http_methods(["GET"])
+@lectura_en_replica
 def empleado_list(request, empresa_id):
     """API: Devuelve los empleados de una empresa."""
     try:
@@ -79,6 +122,7 @@ def empleado_list(request, empresa_id):
                 'numero_documento': emp.numero_documento,
                 'tipo_documento': emp.tipo_documento,
                 'img': emp.img.url if emp.img else None,
+                'img_miniatura': url_miniatura(emp.img),
                 'estado': emp.is_active,
                 'cargo': emp.cargo_id, 
                 'cargo_nombre': emp.cargo.nombre if emp.cargo else 'Sin cargo',
@@ -93,6 +137,7 @@ def empleado_list(request, empresa_id):
         return api_response(success=False, message=str(e), status_code=500)
 
 @require_http_methods(["GET"])
+@lectura_en_replica
 def recursos_list(request):
     """API: Devuelve listas de Cargos y Servicios."""
     try:
@@ -239,4 +284,32 @@ def empleado_update(request, empleado_id):
     except ValidationError as e:
         return api_response(success=False, message=e.message, status_code=400)
     except Exception as e:
-        return api_response(success=False, message=str(e), status_code=500)
\ No newline at end of file
+        return api_response(success=False, message=str(e), status_code=500)
+
+@login_custom_required
+@require_http_methods(["POST"])
+def importar_empleados_api(request):
+    """
+    API: Importa empresas y empleados desde un CSV o XLSX (campo ``archivo``).
+    Con ``simular=true`` solo valida. Las filas con errores se reportan y no se guardan.
+    """
+    if request.user.tipo != 'Administrador':
+        return api_response(success=False, message='No autorizado', status_code=403)
+
+    archivo = request.FILES.get('archivo')
+    if not archivo:
+        return api_response(success=False, message='Adjunte un archivo .csv o .xlsx.', status_code=400)
+
+    try:
+        importador = ImportadorEmpleados(simular=request.POST.get('simular') in ('1', 'true', 'True'))
+        resumen = importador.importar(leer_filas(archivo, archivo.name))
+    except ValueError as e:
+        return api_response(success=False, message=str(e), status_code=400)
+    except Exception as e:
+        return api_response(success=False, message=str(e), status_code=500)
+
+    mensaje = (
+        f"{resumen['empleados_creados']} empleado(s) y {resumen['empresas_creadas']} empresa(s) importados"
+        f"{', con errores en ' + str(len(resumen['errores'])) + ' fila(s)' if resumen['errores'] else ''}."
+    )
+    return api_response(data=resumen, message=mensaje)
@@ -0,0 +1,156 @@
+"""
+zonascriticas/home/almacenamiento.py
+
+Descripción:
+
+Storage de archivos con deduplicación por contenido. ``GeneradorRutaArchivo``
+le da a cada subida una ruta nueva (uuid), pero la misma foto de la
+herramienta se sube una y otra vez: cada contenido se guarda una sola vez.
+
+Cómo funciona:
+
+- Al guardar, el contenido se escribe UNA vez a un temporal calculando su
+  SHA-256 en la misma pasada.
+- El contenido vive en ``MEDIA_ROOT/.blobs/ab/cd/<sha256>`` (dos niveles de
+  carpetas para no tener millones de archivos en un solo directorio).
+- La ruta que genera ``upload_to`` (la que queda en la BD y sale en las URLs)
+  es un *hard link* a ese blob. Si el blob ya existía, la subida solo crea el
+  enlace: no se escribe ni un byte más.
+- El conteo de referencias lo lleva el sistema de archivos (``st_nlink``):
+  ``referencias(nombre)`` dice cuántas rutas comparten el contenido. Al borrar
+  la última ruta se borra también el blob.
+
+Para el resto del código es un ``FileSystemStorage``: nombres, ``upload_to``,
+``url()`` y ``open()`` no cambian. Los archivos guardados sin deduplicar se
+procesan con ``python manage.py deduplicar_media``.
+
+Si el sistema de archivos no soporta hard links, se guarda una copia normal.
+"""
+
+import hashlib
+import logging
+import os
+import shutil
+import tempfile
+
+from django.core.files.storage import FileSystemStorage
+
+logger = logging.getLogger(__name__)
+
+CARPETA_BLOBS = '.blobs'
+
+
+def sha256_archivo(ruta: str, bloque: int = 1024 * 1024) -> str:
+    digest = hashlib.sha256()
+    with open(ruta, 'rb') as archivo:
+        for trozo in iter(lambda: archivo.read(bloque), b''):
+            digest.update(trozo)
+    return digest.hexdigest()
+
+
+class AlmacenamientoDeduplicado(FileSystemStorage):
+
+    @property
+    def carpeta_blobs(self) -> str:
+        return os.path.join(self.location, CARPETA_BLOBS)
+
+    def ruta_blob(self, sha: str) -> str:
+        return os.path.join(self.carpeta_blobs, sha[:2], sha[2:4], sha)
+
+    def _crear_carpeta(self, carpeta: str) -> None:
+        if self.directory_permissions_mode is not None:
+            old_umask = os.umask(0o777 & ~self.directory_permissions_mode)
+            try:
+                os.makedirs(carpeta, self.directory_permissions_mode, exist_ok=True)
+            finally:
+                os.umask(old_umask)
+        else:
+            os.makedirs(carpeta, exist_ok=True)
+
+    def _escribir_temporal(self, content):
+        """Copia el contenido a un temporal junto a los blobs y devuelve (ruta, sha256)."""
+        self._crear_carpeta(self.carpeta_blobs)
+        digest = hashlib.sha256()
+        fd, temporal = tempfile.mkstemp(dir=self.carpeta_blobs, prefix='.subida-')
+        with os.fdopen(fd, 'wb') as destino:
+            for trozo in content.chunks():
+                if isinstance(trozo, str):
+                    trozo = trozo.encode()
+                digest.update(trozo)
+                destino.write(trozo)
+        return temporal, digest.hexdigest()
+
+    def guardar_blob(self, temporal: str, sha: str) -> str:
+        """
+        Deja el contenido de ``temporal`` en su blob (si no estaba) y borra el temporal.
+        Retorna la ruta del blob.
+        """
+        blob = self.ruta_blob(sha)
+        try:
+            if not os.path.exists(blob):
+                self._crear_carpeta(os.path.dirname(blob))
+                if self.file_permissions_mode is not None:
+                    os.chmod(temporal, self.file_permissions_mode)
+                try:
+                    # link y no rename: si otra subida igual ganó la carrera, conservamos su blob
+                    os.link(temporal, blob)
+                except FileExistsError:
+                    pass
+        finally:
+            os.remove(temporal)
+        return blob
+
+    def _save(self, name, content):
+        temporal, sha = self._escribir_temporal(content)
+        try:
+            blob = self.guardar_blob(temporal, sha)
+        except OSError as e:
+            # Sin hard links (o sin permisos en .blobs): guardado normal
+            logger.warning(f"Deduplicación desactivada para {name}: {e}")
+            content.seek(0)
+            return super()._save(name, content)
+
+        full_path = self.path(name)
+        self._crear_carpeta(os.path.dirname(full_path))
+
+        while True:
+            try:
+                os.link(blob, full_path)
+            except FileExistsError:
+                # Misma lógica que FileSystemStorage: el nombre se ocupó entre medio
+                name = self.get_available_name(name)
+                full_path = self.path(name)
+            except OSError:
+                shutil.copyfile(blob, full_path)
+                break
+            else:
+                break
+
+        name = os.path.relpath(full_path, self.location)
+        return str(name).replace("\\", "/")
+
+    def referencias(self, name) -> int:
+        """Cuántas rutas comparten el contenido de ``name`` (sin contar el blob)."""
+        return os.stat(self.path(name)).st_nlink - 1
+
+    def delete(self, name):
+        if not name:
+            raise ValueError("The name must be given to delete().")
+        full_path = self.path(name)
+
+        blob = None
+        try:
+            if not os.path.isdir(full_path) and os.stat(full_path).st_nlink == 2:
+                # Última ruta que apunta al blob: hay que localizarlo para borrarlo también
+                candidato = self.ruta_blob(sha256_archivo(full_path))
+                if os.path.exists(candidato) and os.path.samefile(candidato, full_path):
+                    blob = candidato
+        except FileNotFoundError:
+            return
+
+        super().delete(name)
+        if blob:
+            try:
+                os.remove(blob)
+            except FileNotFoundError:
+                pass
@@ -0,0 +1,150 @@
+"""
+zonascriticas/home/colas.py
+
+Descripción:
+
+Piezas comunes de las colas persistentes en base de datos:
+
+- ``cola_documentos`` (``descargo_responsabilidad.services.ColaDocumentos``)
+- ``cola_imagenes`` (``home.imagenes.ColaImagenes``)
+
+Las dos tablas tienen las mismas columnas de control (``estado``,
+``intentos``, ``max_intentos``, ``disponible_desde``, ``worker``,
+``fecha_toma``, ``ultimo_error``) y los mismos estados PENDIENTE /
+EN_PROCESO / FALLIDA. Aquí viven:
+
+- ``calcular_backoff``: espera exponencial con tope entre reintentos.
+- ``liberar_huerfanas``: tareas cuyo worker murió. Vuelven a PENDIENTE, o
+  quedan FALLIDA si ya gastaron sus intentos (un archivo que tumba al worker
+  no se puede liberar para siempre).
+- ``ComandoWorkerCola``: comando base de ``procesar_documentos`` y
+  ``procesar_imagenes`` (uno o varios procesos que vacían la cola).
+"""
+
+import logging
+import multiprocessing
+import os
+import socket
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+from django.db.models import F
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+
+def calcular_backoff(intentos: int, base_segundos: int, max_segundos: int) -> timedelta:
+    """``base_segundos`` antes del primer reintento; se duplica en cada intento hasta ``max_segundos``."""
+    segundos = base_segundos * (2 ** max(intentos - 1, 0))
+    return timedelta(seconds=min(segundos, max_segundos))
+
+
+def liberar_huerfanas(modelo, tiempo_maximo_segundos: int) -> int:
+    """
+    Libera las tareas de ``modelo`` que llevan más de ``tiempo_maximo_segundos``
+    EN_PROCESO. Retorna cuántas volvieron a PENDIENTE.
+    """
+    limite = timezone.now() - timedelta(seconds=tiempo_maximo_segundos)
+    huerfanas = modelo.objects.filter(estado=modelo.EstadoTarea.EN_PROCESO, fecha_toma__lt=limite)
+    agotadas = huerfanas.filter(intentos__gte=F('max_intentos')).update(
+        estado=modelo.EstadoTarea.FALLIDA,
+        worker=None,
+        ultimo_error='El worker dejó de responder en el último intento.'
+    )
+    if agotadas:
+        logger.error(f"{agotadas} tarea(s) huérfanas de {modelo._meta.db_table} agotaron sus intentos y quedan FALLIDA.")
+    return huerfanas.update(estado=modelo.EstadoTarea.PENDIENTE, worker=None)
+
+
+def _bucle_worker(ruta_cola, numero, intervalo, una_vez):
+    """
+    Cuerpo de cada proceso worker. Es una función de módulo (y la cola llega
+    como ruta importable) para que multiprocessing la pueda lanzar también
+    con 'spawn' (Windows).
+    """
+    import django
+    from django.apps import apps
+    if not apps.ready:
+        django.setup()
+
+    from django.utils.module_loading import import_string
+    cola = import_string(ruta_cola)
+
+    worker_id = f"{socket.gethostname()}:{os.getpid()}:{numero}"
+
+    try:
+        while True:
+            cola.liberar_huerfanas()
+            stats = cola.procesar_pendientes(worker_id)
+
+            if una_vez:
+                return stats
+
+            if not stats['procesadas']:
+                # Cola vacía: dormimos para no martillar la base de datos
+                time.sleep(intervalo)
+    except KeyboardInterrupt:
+        return None
+    finally:
+        connections.close_all()
+
+
+class ComandoWorkerCola(BaseCommand):
+    """
+    Comando base de los workers. Cada subclase define:
+
+    - ``cola``: ruta importable de la clase con ``liberar_huerfanas`` y
+      ``procesar_pendientes(worker_id)``.
+    - ``nombre_cola``: para los mensajes (ej: 'documentos').
+    """
+    cola = None
+    nombre_cola = ''
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=1, help='Número de procesos worker')
+        parser.add_argument('--intervalo', type=float, default=2.0, help='Segundos de espera con la cola vacía')
+        parser.add_argument('--una-vez', action='store_true', help='Vacía la cola y termina')
+
+    def handle(self, *args, **options):
+        workers = max(1, options['workers'])
+        intervalo = options['intervalo']
+        una_vez = options['una_vez']
+
+        self.stdout.write(self.style.WARNING(f'🚀 Iniciando {workers} worker(s) de {self.nombre_cola}...'))
+        start_time = time.time()
+
+        if workers == 1:
+            stats = _bucle_worker(self.cola, 0, intervalo, una_vez)
+            if stats:
+                duration = time.time() - start_time
+                self.stdout.write(self.style.SUCCESS(
+                    f"✅ Cola vaciada en {duration:.2f}s. "
+                    f"Procesadas: {stats['procesadas']} | Exitosas: {stats['exitosas']} | Con fallo: {stats['fallidas']}"
+                ))
+            return
+
+        # Los procesos hijos NO deben heredar la conexión abierta del padre
+        connections.close_all()
+
+        procesos = [
+            multiprocessing.Process(target=_bucle_worker, args=(self.cola, i, intervalo, una_vez), daemon=False)
+            for i in range(workers)
+        ]
+        for p in procesos:
+            p.start()
+
+        try:
+            for p in procesos:
+                p.join()
+        except KeyboardInterrupt:
+            self.stdout.write(self.style.WARNING('⏹ Deteniendo workers...'))
+            for p in procesos:
+                p.terminate()
+            for p in procesos:
+                p.join()
+
+        duration = time.time() - start_time
+        self.stdout.write(self.style.SUCCESS(f'✅ Workers finalizados en {duration:.2f}s.'))
@@ -1,6 +1,7 @@
 from functools import wraps
 from django.shortcuts import redirect
 from home.utils import CronometroJornada, api_response
+from descargo_responsabilidad.middleware import ingreso_en_zona
 
 def requiere_tiempo_activo(view_func):
     """
@@ -13,8 +14,9 @@ def requiere_tiempo_activo(view_func):
     """
     @wraps(view_func)
     def _wrapped_view(request, *args, **kwargs):
-        # Validamos tiempo
-        if CronometroJornada.esta_vencido(request.user):
+        # Validamos tiempo con el ingreso que ya cargó el middleware
+        ingreso = ingreso_en_zona(request)
+        if CronometroJornada.ingreso_vencido(ingreso):
             
             # 🚨 ACCIÓN CORRECTIVA: ROMPER EL BUCLE 🚨
             # Importamos aquí dentro para evitar errores de carga circular
@@ -22,7 +24,9 @@ def requiere_tiempo_activo(view_func):
             
             # Forzamos el cierre en base de datos.
             # Ahora el usuario pasa de 'EN_ZONA' a 'FINALIZADO'.
-            ActividadesService.forzar_salida_por_tiempo(request.user)
+            # (Si ni siquiera hay ingreso en zona no hay nada que cerrar.)
+            if ingreso:
+                ActividadesService.forzar_salida_por_tiempo(request.user, ingreso)
             
             # Detectamos si es API (AJAX/Fetch)
             es_ajax = request.headers.get('x-requested-with') == 'XMLHttpRequest' or \
@@ -0,0 +1,307 @@
+"""
+zonascriticas/home/imagenes.py
+
+Descripción:
+
+Etapa de procesamiento de las fotos de evidencia (el celular manda fotos de
+4 a 8 MB con EXIF, incluida la ubicación GPS):
+
+1. La petición solo guarda el archivo original y encola una ``TareaImagen``.
+2. El comando ``procesar_imagenes`` (varios procesos worker) toma la tarea y
+   con Pillow endereza la foto según su EXIF, limita el lado mayor a
+   ``IMAGENES_LADO_MAXIMO``, la recomprime (WebP o JPEG progresivo, sin
+   metadatos) y genera una miniatura de ``IMAGENES_LADO_MINIATURA``.
+3. Los archivos nuevos quedan junto al original (misma carpeta de
+   ``GeneradorRutaArchivo``)::
+
+       herramientas/evidencias/2026/10/<uuid>.jpg        <- original (se borra)
+       herramientas/evidencias/2026/10/<uuid>_opt.webp   <- foto optimizada
+       herramientas/evidencias/2026/10/<uuid>_opt_min.webp  <- miniatura
+
+4. Todas las filas que apuntaban al original pasan a la optimizada (la foto
+   de referencia del inventario se copia como evidencia al carrito, así que
+   una misma ruta puede estar en varias tablas: ver ``CAMPOS_IMAGEN``).
+
+Las APIs devuelven ``url_miniatura(...)`` para los listados. Mientras la foto
+no se haya procesado, ``url_miniatura`` devuelve la URL del original.
+
+Las firmas en base64 NO pasan por aquí: van embebidas en los PDFs y se leen
+por ruta desde la cola de documentos.
+"""
+
+import io
+import logging
+import os
+from datetime import timedelta
+from typing import Optional, Tuple
+
+from django.apps import apps
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+from .colas import calcular_backoff, liberar_huerfanas
+from .models import TareaImagen
+
+logger = logging.getLogger(__name__)
+
+#: (modelo, campo) de todos los ImageField que pasan por la etapa.
+CAMPOS_IMAGEN = (
+    ('actividades.Actividad', 'foto_inicial'),
+    ('actividades.Actividad', 'foto_final'),
+    ('registro_herramientas.InventarioHerramienta', 'foto_referencia'),
+    ('registro_herramientas.HerramientaIngresada', 'foto_evidencia'),
+    ('login.Usuario', 'img'),
+)
+
+SUFIJO_OPTIMIZADA = '_opt'
+SUFIJO_MINIATURA = '_min'
+
+
+def _nombre_con_sufijo(nombre: str, sufijo: str, ext: Optional[str] = None) -> str:
+    base, ext_actual = os.path.splitext(nombre)
+    return f"{base}{sufijo}{'.' + ext if ext else ext_actual}"
+
+
+def esta_procesada(nombre: Optional[str]) -> bool:
+    return bool(nombre) and os.path.splitext(nombre)[0].endswith(SUFIJO_OPTIMIZADA)
+
+
+def nombre_miniatura(nombre: str) -> str:
+    return _nombre_con_sufijo(nombre, SUFIJO_MINIATURA)
+
+
+def url_miniatura(archivo, storage=None) -> Optional[str]:
+    """
+    URL de la miniatura de una foto (o la del original si aún no se procesa).
+
+    Parameters
+    ----------
+    archivo : FieldFile | str | None
+        El campo de imagen o la ruta guardada en la BD (ej: la que llega
+        de una ``Subquery``; en ese caso pasar también ``storage``).
+    storage : Storage, opcional
+        Por defecto el del campo.
+
+    Returns
+    -------
+    str | None
+    """
+    nombre = getattr(archivo, 'name', archivo)
+    if not nombre:
+        return None
+    storage = storage or getattr(archivo, 'storage', None) or default_storage
+    return storage.url(nombre_miniatura(nombre) if esta_procesada(nombre) else nombre)
+
+
+class ProcesadorImagen:
+    """
+    Transformaciones con Pillow. Trabaja sobre bytes para no depender del storage.
+    """
+
+    @staticmethod
+    def _formato() -> Tuple[str, str]:
+        formato = getattr(settings, 'IMAGENES_FORMATO', 'WEBP').upper()
+        return ('JPEG', 'jpg') if formato in ('JPEG', 'JPG') else ('WEBP', 'webp')
+
+    @staticmethod
+    def _codificar(imagen, formato: str) -> bytes:
+        salida = io.BytesIO()
+        calidad = getattr(settings, 'IMAGENES_CALIDAD', 80)
+        if formato == 'JPEG':
+            if imagen.mode != 'RGB':
+                # JPEG no tiene transparencia: la aplanamos sobre blanco
+                fondo = Image.new('RGB', imagen.size, (255, 255, 255))
+                fondo.paste(imagen, mask=imagen.getchannel('A') if 'A' in imagen.getbands() else None)
+                imagen = fondo
+            imagen.save(salida, 'JPEG', quality=calidad, optimize=True, progressive=True)
+        else:
+            imagen.save(salida, 'WEBP', quality=calidad, method=4)
+        # Sin exif= ni icc_profile=: los metadatos del original no se copian
+        return salida.getvalue()
+
+    @staticmethod
+    def procesar(contenido: bytes) -> Tuple[bytes, bytes, str]:
+        """
+        Returns
+        -------
+        (foto optimizada, miniatura, extensión)
+
+        Raises
+        ------
+        UnidentifiedImageError si el archivo no es una imagen.
+        """
+        formato, ext = ProcesadorImagen._formato()
+        lado_maximo = getattr(settings, 'IMAGENES_LADO_MAXIMO', 1600)
+        lado_miniatura = getattr(settings, 'IMAGENES_LADO_MINIATURA', 320)
+
+        with Image.open(io.BytesIO(contenido)) as original:
+            # En JPEG el decodificador puede reducir al leer (1/2, 1/4, 1/8):
+            # no se descomprimen los 12 MP completos para quedarnos con 1600 px.
+            original.draft('RGB', (lado_maximo, lado_maximo))
+            # La orientación vive en el EXIF que vamos a quitar: la aplicamos antes
+            imagen = ImageOps.exif_transpose(original)
+            imagen = imagen.convert('RGBA' if 'A' in imagen.getbands() or 'transparency' in imagen.info else 'RGB')
+
+        imagen.thumbnail((lado_maximo, lado_maximo), Image.LANCZOS)
+        principal = ProcesadorImagen._codificar(imagen, formato)
+
+        imagen.thumbnail((lado_miniatura, lado_miniatura), Image.LANCZOS)
+        miniatura = ProcesadorImagen._codificar(imagen, formato)
+
+        return principal, miniatura, ext
+
+
+class ColaImagenes:
+    """
+    Cola persistente (tabla ``cola_imagenes``) de fotos por procesar.
+    Mismo esquema que ``ColaDocumentos``: la petición solo inserta, los
+    workers reclaman con un UPDATE condicional y un fallo se reintenta con
+    backoff (``disponible_desde``), no en el acto.
+    """
+    #: Espera base antes del primer reintento (se duplica en cada intento).
+    BACKOFF_BASE_SEGUNDOS = 15
+
+    #: Tope de espera entre reintentos.
+    BACKOFF_MAX_SEGUNDOS = 600
+
+    #: Si una tarea lleva más de esto EN_PROCESO, su worker murió: se libera.
+    TIEMPO_MAXIMO_TAREA_SEGUNDOS = 300
+
+    #: Cuántos candidatos se leen por consulta al reclamar.
+    LOTE_RECLAMO = 10
+
+    @staticmethod
+    def encolar(instancia, *campos) -> int:
+        """
+        Encola los campos de imagen de ``instancia`` que tengan archivo sin procesar.
+        Se llama después de ``save()``, cuando el archivo ya quedó en el storage.
+        """
+        tareas = []
+        for campo in campos:
+            nombre = getattr(instancia, campo).name
+            if nombre and not esta_procesada(nombre):
+                tareas.append(TareaImagen(modelo=instancia._meta.label, campo=campo, ruta_original=nombre))
+        TareaImagen.objects.bulk_create(tareas)
+        return len(tareas)
+
+    @staticmethod
+    def calcular_backoff(intentos: int) -> timedelta:
+        return calcular_backoff(intentos, ColaImagenes.BACKOFF_BASE_SEGUNDOS, ColaImagenes.BACKOFF_MAX_SEGUNDOS)
+
+    @staticmethod
+    def liberar_huerfanas() -> int:
+        return liberar_huerfanas(TareaImagen, ColaImagenes.TIEMPO_MAXIMO_TAREA_SEGUNDOS)
+
+    @staticmethod
+    def reclamar_siguiente(worker_id: str):
+        ahora = timezone.now()
+        candidatos = list(
+            TareaImagen.objects.filter(estado=TareaImagen.EstadoTarea.PENDIENTE, disponible_desde__lte=ahora)
+            .order_by('disponible_desde', 'id').values_list('id', flat=True)[:ColaImagenes.LOTE_RECLAMO]
+        )
+        for tarea_id in candidatos:
+            tomada = TareaImagen.objects.filter(
+                pk=tarea_id, estado=TareaImagen.EstadoTarea.PENDIENTE
+            ).update(
+                estado=TareaImagen.EstadoTarea.EN_PROCESO,
+                worker=worker_id,
+                fecha_toma=ahora,
+                intentos=F('intentos') + 1
+            )
+            if tomada:
+                return TareaImagen.objects.get(pk=tarea_id)
+        return None
+
+    @staticmethod
+    def _reemplazar_ruta(original: str, nueva: str) -> int:
+        """
+        Cambia ``original`` por ``nueva`` en todos los ``CAMPOS_IMAGEN``.
+        Retorna cuántas filas cambiaron (0 = nadie usa ya el original).
+        """
+        from login.cache_usuarios import invalidar_usuarios
+
+        total = 0
+        with transaction.atomic():
+            for etiqueta, campo in CAMPOS_IMAGEN:
+                modelo = apps.get_model(etiqueta)
+                ids = list(modelo.objects.filter(**{campo: original}).values_list('pk', flat=True))
+                if not ids:
+                    continue
+                total += modelo.objects.filter(pk__in=ids, **{campo: original}).update(**{campo: nueva})
+                if etiqueta == 'login.Usuario':
+                    # .update() no pasa por Usuario.save(): la caché del middleware se limpia aquí
+                    invalidar_usuarios(ids)
+        return total
+
+    @staticmethod
+    def ejecutar(tarea, storage=None) -> bool:
+        """
+        Procesa una tarea ya reclamada. Retorna True si terminó bien.
+        """
+        storage = storage or default_storage
+        original = tarea.ruta_original
+        nuevos = []
+
+        try:
+            if not storage.exists(original):
+                raise FileNotFoundError(f"No existe {original}")
+
+            with storage.open(original, 'rb') as archivo:
+                principal, miniatura, ext = ProcesadorImagen.procesar(archivo.read())
+
+            nueva = storage.save(_nombre_con_sufijo(original, SUFIJO_OPTIMIZADA, ext), ContentFile(principal))
+            nuevos.append(nueva)
+            ruta_miniatura = storage.save(nombre_miniatura(nueva), ContentFile(miniatura))
+            nuevos.append(ruta_miniatura)
+            if ruta_miniatura != nombre_miniatura(nueva):
+                raise RuntimeError(f"La miniatura no quedó junto a {nueva}")
+
+            if ColaImagenes._reemplazar_ruta(original, nueva):
+                storage.delete(original)
+            else:
+                # La foto se cambió mientras esperaba en la cola: descartamos lo generado
+                for ruta in nuevos:
+                    storage.delete(ruta)
+        except Exception as e:
+            for ruta in nuevos:
+                storage.delete(ruta)
+            ColaImagenes._registrar_fallo(tarea, e, definitivo=isinstance(e, (UnidentifiedImageError, FileNotFoundError)))
+            return False
+
+        tarea.estado = TareaImagen.EstadoTarea.COMPLETADA
+        tarea.ultimo_error = None
+        tarea.save(update_fields=['estado', 'ultimo_error', 'fecha_actualizacion'])
+        return True
+
+    @staticmethod
+    def procesar_pendientes(worker_id: str, limite: int = None) -> dict:
+        stats = {'procesadas': 0, 'exitosas': 0, 'fallidas': 0}
+        while limite is None or stats['procesadas'] < limite:
+            tarea = ColaImagenes.reclamar_siguiente(worker_id)
+            if not tarea:
+                break
+            stats['procesadas'] += 1
+            if ColaImagenes.ejecutar(tarea):
+                stats['exitosas'] += 1
+            else:
+                stats['fallidas'] += 1
+        return stats
+
+    @staticmethod
+    def _registrar_fallo(tarea, error, definitivo=False):
+        tarea.ultimo_error = str(error)
+        tarea.worker = None
+        if definitivo or tarea.intentos >= tarea.max_intentos:
+            # El original se conserva: la foto se sigue sirviendo sin optimizar
+            tarea.estado = TareaImagen.EstadoTarea.FALLIDA
+            logger.error(f"Imagen {tarea.ruta_original} no se pudo procesar: {error}")
+        else:
+            tarea.estado = TareaImagen.EstadoTarea.PENDIENTE
+            tarea.disponible_desde = timezone.now() + ColaImagenes.calcular_backoff(tarea.intentos)
+            logger.warning(f"Imagen {tarea.ruta_original} falló (intento {tarea.intentos}), se reintenta: {error}")
+        tarea.save(update_fields=['ultimo_error', 'worker', 'estado', 'disponible_desde', 'fecha_actualizacion'])
@@ -0,0 +1,154 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.core.signals import request_finished
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.test import Client
+import sqlite3
+import time
+
+from descargo_responsabilidad.models import RegistroIngreso, Ubicacion
+from empresas.busqueda import IndiceEmpresas
+from empresas.models import Empresa
+from home.replica import RouterReplica, replica_configurada
+from login.models import Usuario
+from zonascriticas.bd import ALIAS_REPLICA
+
+# Mide el perfil de base de datos (zonascriticas/bd.py) con requests reales del
+# cliente de pruebas de Django:
+#   1. Conexión por request (CONN_MAX_AGE=0, como antes) vs. persistente.
+#   2. Consultas de los listados en primaria vs. réplica.
+# Localmente dos archivos SQLite hacen de primaria y réplica:
+#   DB_NAME=/tmp/primaria.db python manage.py migrate
+#   DB_NAME=/tmp/primaria.db DB_REPLICA_NAME=/tmp/replica.db \
+#       python manage.py benchmark_bd --sembrar 500 --sincronizar-replica
+# --sembrar escribe datos de prueba en la BD configurada: úsalo solo con archivos temporales.
+
+
+class Command(BaseCommand):
+    help = 'Benchmark de conexiones persistentes y lecturas en réplica'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--peticiones', type=int, default=100, help='Requests por escenario')
+        parser.add_argument('--sembrar', type=int, default=0, help='Empresas y visitantes de prueba a crear')
+        parser.add_argument('--sincronizar-replica', action='store_true',
+                            help='Copia la primaria a la réplica (solo SQLite)')
+
+    def _sembrar(self, cantidad):
+        admin = Usuario.objects.create(
+            first_name='Benchmark BD', numero_documento=f'bench-bd-{time.time_ns()}',
+            email=f'bench-bd-{time.time_ns()}@example.com', tipo='Administrador'
+        )
+        ubicacion = Ubicacion.objects.create(
+            nombre='Zona Benchmark BD', codigo_qr=f'BENCH-BD-{time.time_ns()}', freshservice_id=-time.time_ns() % 10**12
+        )
+        prefijo = time.time_ns()
+        empresas = Empresa.objects.bulk_create([
+            Empresa(nombre_empresa=f'Empresa {i}', nombre_normalizado=f'empresa {i}', nit=f'{prefijo}-{i}')
+            for i in range(cantidad)
+        ], batch_size=500)
+        IndiceEmpresas.reindexar(empresas)
+        visitantes = Usuario.objects.bulk_create([
+            Usuario(first_name=f'Visitante {i}', numero_documento=f'{prefijo}-{i}', email=f'{prefijo}-{i}@example.com')
+            for i in range(cantidad)
+        ], batch_size=500)
+        RegistroIngreso.objects.bulk_create([
+            RegistroIngreso(visitante=v, responsable=admin, ubicacion=ubicacion,
+                            estado=RegistroIngreso.EstadoOpciones.FINALIZADO)
+            for v in visitantes
+        ], batch_size=500)
+        return admin
+
+    def _sincronizar_replica(self):
+        primaria = connections['default'].settings_dict
+        replica = connections[ALIAS_REPLICA].settings_dict
+        if 'sqlite3' not in primaria['ENGINE'] or 'sqlite3' not in replica['ENGINE']:
+            self.stdout.write(self.style.ERROR('   --sincronizar-replica solo aplica a SQLite.'))
+            return
+        connections.close_all()
+        origen, destino = sqlite3.connect(primaria['NAME']), sqlite3.connect(replica['NAME'])
+        with destino:
+            origen.backup(destino)
+        origen.close()
+        destino.close()
+
+    def _cliente(self, usuario):
+        cliente = Client(HTTP_HOST='localhost')
+        if usuario:
+            session = cliente.session
+            session['id_usuario_logueado'] = usuario.id
+            session.save()
+            cliente.cookies[settings.SESSION_COOKIE_NAME] = session.session_key
+        return cliente
+
+    def _medir(self, cliente, urls, peticiones):
+        """Retorna (ms por request, conexiones abiertas, consultas por alias)."""
+        conexiones = []
+        consultas = {alias: 0 for alias in connections}
+
+        def contar_conexion(sender, connection, **kwargs):
+            conexiones.append(connection.alias)
+
+        def contador(alias):
+            def envoltura(execute, sql, params, many, context):
+                consultas[alias] += 1
+                return execute(sql, params, many, context)
+            return envoltura
+
+        envolturas = [connections[alias].execute_wrapper(contador(alias)) for alias in connections]
+        for envoltura in envolturas:
+            envoltura.__enter__()
+        connection_created.connect(contar_conexion)
+        try:
+            inicio = time.perf_counter()
+            for i in range(peticiones):
+                respuesta = cliente.get(urls[i % len(urls)])
+                if respuesta.streaming:
+                    b''.join(respuesta.streaming_content)
+                respuesta.close()
+            duracion = time.perf_counter() - inicio
+        finally:
+            connection_created.disconnect(contar_conexion)
+            for envoltura in envolturas:
+                envoltura.__exit__(None, None, None)
+        return duracion * 1000 / peticiones, len(conexiones), consultas
+
+    def handle(self, *args, **options):
+        peticiones = max(1, options['peticiones'])
+        self.stdout.write(self.style.WARNING(f'🚀 Benchmark de base de datos ({peticiones} requests por escenario)...'))
+
+        admin = self._sembrar(options['sembrar']) if options['sembrar'] else (
+            Usuario.objects.filter(tipo='Administrador').first() or Usuario.objects.first()
+        )
+        if options['sincronizar_replica'] and replica_configurada():
+            self._sincronizar_replica()
+
+        urls = ['/empresas/api/recursos/', '/registros/api/listar-visitantes/?limite=20']
+        cliente = self._cliente(admin)
+        resultados = []
+
+        # 1. Conexiones (todo en la primaria): se cambia CONN_MAX_AGE en caliente (se lee al conectar)
+        RouterReplica.ACTIVO = False
+        original = connections['default'].settings_dict['CONN_MAX_AGE']
+        for max_age in (0, 60):
+            connections.close_all()
+            for alias in connections:
+                connections[alias].settings_dict['CONN_MAX_AGE'] = max_age
+            resultados.append((f'CONN_MAX_AGE={max_age}', *self._medir(cliente, urls, peticiones)))
+        for alias in connections:
+            connections[alias].settings_dict['CONN_MAX_AGE'] = original
+        RouterReplica.ACTIVO = True
+
+        # 2. Réplica: mismo tráfico, ahora las lecturas de los listados salen de la otra BD
+        if replica_configurada():
+            resultados.append(('con réplica', *self._medir(cliente, urls, peticiones)))
+        else:
+            self.stdout.write(self.style.WARNING('   Sin DB_REPLICA_NAME/DB_REPLICA_HOST: se omite el escenario de réplica.'))
+
+        request_finished.send(sender=self.__class__)
+        msg = "\n✅ BENCHMARK FINALIZADO\n----------------------------------------\n"
+        for nombre, ms, conexiones, consultas in resultados:
+            por_alias = ' | '.join(f'{alias}: {total}' for alias, total in consultas.items())
+            msg += f" {nombre:<18} {ms:7.2f} ms/req | conexiones abiertas: {conexiones:<4} | consultas {por_alias}\n"
+        msg += "----------------------------------------"
+        self.stdout.write(self.style.SUCCESS(msg))
@@ -0,0 +1,83 @@
+from django.core.files.storage import storages
+from django.core.management.base import BaseCommand, CommandError
+import os
+import time
+
+from home.almacenamiento import AlmacenamientoDeduplicado, CARPETA_BLOBS, sha256_archivo
+
+# Pasa los archivos que ya existen en MEDIA_ROOT al esquema de blobs
+# (home/almacenamiento.py). Las rutas no cambian, así que la BD no se toca:
+# cada archivo queda como hard link a su blob y los repetidos comparten disco.
+# Se puede relanzar: los archivos ya enlazados se saltan.
+#   python manage.py deduplicar_media --simular
+#   python manage.py deduplicar_media
+
+
+class Command(BaseCommand):
+    help = 'Deduplica por contenido (SHA-256) los archivos existentes de MEDIA_ROOT'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--simular', action='store_true', help='Solo cuenta, no modifica nada')
+
+    def handle(self, *args, **options):
+        storage = storages['default']
+        if not isinstance(storage, AlmacenamientoDeduplicado):
+            raise CommandError("El storage por defecto no es AlmacenamientoDeduplicado (ver STORAGES en settings).")
+
+        simular = options['simular']
+        self.stdout.write(self.style.WARNING(
+            f"🚀 Deduplicando {storage.location}{' (simulación)' if simular else ''}..."
+        ))
+        start_time = time.time()
+
+        stats = {'archivos': 0, 'ya_enlazados': 0, 'duplicados': 0, 'bytes_ahorrados': 0}
+        vistos = set()
+
+        for carpeta, subcarpetas, archivos in os.walk(storage.location):
+            if carpeta == storage.location and CARPETA_BLOBS in subcarpetas:
+                subcarpetas.remove(CARPETA_BLOBS)
+
+            for nombre in archivos:
+                ruta = os.path.join(carpeta, nombre)
+                if os.path.islink(ruta) or not os.path.isfile(ruta):
+                    continue
+                stats['archivos'] += 1
+
+                info = os.stat(ruta)
+                if info.st_nlink > 1:
+                    # Ya es un enlace a un blob (subido con el storage nuevo o de una pasada anterior)
+                    stats['ya_enlazados'] += 1
+                    continue
+
+                sha = sha256_archivo(ruta)
+                blob = storage.ruta_blob(sha)
+                repetido = os.path.exists(blob) or sha in vistos
+                vistos.add(sha)
+
+                if repetido:
+                    stats['duplicados'] += 1
+                    stats['bytes_ahorrados'] += info.st_size
+
+                if simular:
+                    continue
+
+                if not os.path.exists(blob):
+                    storage._crear_carpeta(os.path.dirname(blob))
+                    os.link(ruta, blob)
+                else:
+                    # Se reemplaza el archivo por un enlace al blob de forma atómica
+                    temporal = f"{ruta}.dedup"
+                    os.link(blob, temporal)
+                    os.replace(temporal, ruta)
+
+        duration = time.time() - start_time
+        msg = (
+            f"\n✅ PROCESO FINALIZADO en {duration:.2f}s.\n"
+            f"----------------------------------------\n"
+            f" 📁 Archivos revisados: {stats['archivos']}\n"
+            f" 🔗 Ya enlazados: {stats['ya_enlazados']}\n"
+            f" ♻️  Duplicados: {stats['duplicados']}\n"
+            f" 💾 Espacio liberado: {stats['bytes_ahorrados'] / (1024 * 1024):.2f} MB\n"
+            f"----------------------------------------"
+        )
+        self.stdout.write(self.style.SUCCESS(msg))
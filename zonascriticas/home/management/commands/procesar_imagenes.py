@@ -0,0 +1,14 @@
+from home.colas import ComandoWorkerCola
+
+# Worker de la cola de imágenes (tabla cola_imagenes, ver home/imagenes.py).
+# Pillow usa CPU: conviene un proceso por núcleo libre.
+#   python manage.py procesar_imagenes --workers 4
+# Para vaciar la cola una sola vez (cron, pruebas, fotos ya existentes):
+#   python manage.py procesar_imagenes --una-vez
+# El bucle de los workers es común a todas las colas: ver home/colas.py
+
+
+class Command(ComandoWorkerCola):
+    help = 'Optimiza las fotos subidas (EXIF, tamaño, WebP/JPEG progresivo y miniatura) con uno o varios workers'
+    cola = 'home.imagenes.ColaImagenes'
+    nombre_cola = 'imágenes'
@@ -0,0 +1,27 @@
+# Generated by Django 4.2.25 on 2026-10-18 06:28
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('home', '0001_cola_imagenes'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='tareaimagen',
+            name='cola_img_estado_idx',
+        ),
+        migrations.AddField(
+            model_name='tareaimagen',
+            name='disponible_desde',
+            field=models.DateTimeField(default=django.utils.timezone.now, verbose_name='No procesar antes de'),
+        ),
+        migrations.AddIndex(
+            model_name='tareaimagen',
+            index=models.Index(fields=['estado', 'disponible_desde'], name='cola_img_estado_disp_idx'),
+        ),
+    ]
@@ -1,3 +1,50 @@
 from django.db import models
+from django.utils import timezone
 
-# Create your models here.
+
+class TareaImagen(models.Model):
+    """
+    Cola persistente de fotos por optimizar (ver ``home/imagenes.py``).
+
+    Guarda la ruta del original y de dónde vino; el worker reemplaza esa
+    ruta en todas las tablas que la usen.
+    """
+    class EstadoTarea(models.TextChoices):
+        PENDIENTE = 'PENDIENTE', 'Pendiente'
+        EN_PROCESO = 'EN_PROCESO', 'En Proceso'
+        COMPLETADA = 'COMPLETADA', 'Completada'
+        FALLIDA = 'FALLIDA', 'Fallida (se sirve el original)'
+
+    # 'app_label.Modelo' y campo donde se subió la foto (trazabilidad)
+    modelo = models.CharField(max_length=100)
+    campo = models.CharField(max_length=50)
+    ruta_original = models.CharField(max_length=255)
+
+    estado = models.CharField(
+        max_length=20, choices=EstadoTarea.choices, default=EstadoTarea.PENDIENTE
+    )
+    intentos = models.PositiveSmallIntegerField(default=0)
+    max_intentos = models.PositiveSmallIntegerField(default=3)
+    disponible_desde = models.DateTimeField(
+        default=timezone.now,
+        verbose_name="No procesar antes de"
+    )
+    ultimo_error = models.TextField(blank=True, null=True)
+
+    worker = models.CharField(max_length=100, blank=True, null=True)
+    fecha_toma = models.DateTimeField(blank=True, null=True)
+
+    fecha_creacion = models.DateTimeField(auto_now_add=True)
+    fecha_actualizacion = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'cola_imagenes'
+        verbose_name = "Tarea de Imagen"
+        verbose_name_plural = "Cola de Imágenes"
+        indexes = [
+            # Igual que cola_documentos: ¿qué está PENDIENTE y ya se puede procesar?
+            models.Index(fields=['estado', 'disponible_desde'], name='cola_img_estado_disp_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.ruta_original} ({self.estado})"
@@ -0,0 +1,97 @@
+"""
+zonascriticas/home/replica.py
+
+Descripción:
+
+Lecturas de listados en la réplica de solo lectura (alias ``replica``, ver
+``zonascriticas/bd.py``). Los listados de ``registros`` y ``empresas`` son las
+consultas más pesadas y toleran unos segundos de retraso de replicación; el
+resto de la aplicación (login, ingresos, herramientas) sigue leyendo de la
+primaria para ver siempre lo que acaba de escribir.
+
+- ``@lectura_en_replica`` marca una vista: sus lecturas van a la réplica.
+  Si la respuesta es streaming, la marca se mantiene mientras se genera.
+- ``en_replica()`` hace lo mismo como context manager (comandos, benchmark).
+- ``RouterReplica`` (``DATABASE_ROUTERS``) aplica la marca. Sin alias
+  ``replica`` configurado no hace nada.
+
+Las escrituras y todo lo que ocurra dentro de una transacción abierta en
+``default`` van siempre a la primaria.
+"""
+
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from zonascriticas.bd import ALIAS_REPLICA
+
+_leer_en_replica = ContextVar('leer_en_replica', default=False)
+
+
+def replica_configurada() -> bool:
+    return ALIAS_REPLICA in settings.DATABASES
+
+
+@contextmanager
+def en_replica():
+    previo = _leer_en_replica.get()
+    _leer_en_replica.set(True)
+    try:
+        yield
+    finally:
+        _leer_en_replica.set(previo)
+
+
+def _iterar_en_replica(contenido):
+    # La marca solo se pone mientras se produce cada trozo: entre uno y otro
+    # el hilo puede volver al servidor
+    iterador = iter(contenido)
+    while True:
+        with en_replica():
+            try:
+                trozo = next(iterador)
+            except StopIteration:
+                return
+        yield trozo
+
+
+def lectura_en_replica(view_func):
+    """Decorador para vistas de solo lectura (listados)."""
+    @wraps(view_func)
+    def _wrapped_view(request, *args, **kwargs):
+        with en_replica():
+            respuesta = view_func(request, *args, **kwargs)
+
+        if getattr(respuesta, 'streaming', False) and replica_configurada():
+            respuesta.streaming_content = _iterar_en_replica(respuesta.streaming_content)
+        return respuesta
+    return _wrapped_view
+
+
+class RouterReplica:
+
+    #: Interruptor global (el benchmark lo apaga para medir el 'antes').
+    ACTIVO = True
+
+    def db_for_read(self, model, **hints):
+        if not (RouterReplica.ACTIVO and _leer_en_replica.get() and replica_configurada()):
+            return None
+        if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            # Dentro de una transacción se lee lo que ella misma escribió
+            return None
+        return ALIAS_REPLICA
+
+    def db_for_write(self, model, **hints):
+        # Explícito: sin router, guardar un objeto leído de la réplica escribiría en ella
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Réplica y primaria tienen los mismos datos
+        return {obj1._state.db, obj2._state.db} <= {DEFAULT_DB_ALIAS, ALIAS_REPLICA}
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # La réplica se alimenta de la replicación del servidor, no de migraciones
+        return db != ALIAS_REPLICA
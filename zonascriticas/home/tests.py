@@ -1,3 +1,385 @@
-from django.test import TestCase
+import base64
+import io
+import os
+import shutil
+import tempfile
+import tracemalloc
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.core.exceptions import ImproperlyConfigured
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import router
+from django.http import StreamingHttpResponse
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+from PIL import Image
+
+from home.almacenamiento import AlmacenamientoDeduplicado
+from home.imagenes import ColaImagenes, ProcesadorImagen, esta_procesada, nombre_miniatura
+from home.models import TareaImagen
+from home.replica import en_replica, lectura_en_replica
+from home.utils import decodificar_imagen_base64, CABECERA_PNG, MAX_FIRMA_EN_MEMORIA, GeneradorRutaArchivo
+from login.models import Usuario, Cargo
+from descargo_responsabilidad.models import Ubicacion, RegistroIngreso
+from registro_herramientas.models import InventarioHerramienta, HerramientaIngresada
+from registro_herramientas.services import HerramientasService
+from zonascriticas.bd import ALIAS_REPLICA, perfil_bases_de_datos
+
+
+def foto_de_celular(ancho=3000, alto=2000, orientacion=None) -> bytes:
+    """JPEG grande con EXIF (cámara y, opcionalmente, orientación)."""
+    exif = Image.Exif()
+    exif[0x010F] = "Fabricante"  # Make
+    exif[0x0110] = "Modelo X"     # Model
+    if orientacion:
+        exif[0x0112] = orientacion
+    salida = io.BytesIO()
+    Image.new('RGB', (ancho, alto), (200, 30, 30)).save(salida, 'JPEG', quality=95, exif=exif)
+    return salida.getvalue()
+
+
+class ProcesadorImagenTestCase(TestCase):
+
+    def abrir(self, contenido):
+        return Image.open(io.BytesIO(contenido))
+
+    def test_limita_tamano_quita_exif_y_respeta_orientacion(self):
+        # Orientación 6: la cámara la guardó acostada, se ve 2000x3000
+        principal, miniatura, ext = ProcesadorImagen.procesar(foto_de_celular(orientacion=6))
+
+        self.assertEqual(ext, 'webp')
+        with self.abrir(principal) as imagen:
+            self.assertEqual(imagen.format, 'WEBP')
+            self.assertEqual(max(imagen.size), 1600)
+            self.assertGreater(imagen.height, imagen.width)
+            self.assertFalse(imagen.getexif())
+        with self.abrir(miniatura) as imagen:
+            self.assertEqual(max(imagen.size), 320)
+
+    @override_settings(IMAGENES_FORMATO='JPEG')
+    def test_jpeg_progresivo(self):
+        principal, _, ext = ProcesadorImagen.procesar(foto_de_celular())
+
+        self.assertEqual(ext, 'jpg')
+        with self.abrir(principal) as imagen:
+            self.assertEqual(imagen.format, 'JPEG')
+            self.assertTrue(imagen.info.get('progressive'))
+            self.assertFalse(imagen.getexif())
+
+
+class ColaImagenesTestCase(TestCase):
+    """
+    De la subida a la miniatura: el worker reemplaza la ruta en todas las
+    tablas que la comparten y borra el original.
+    """
+
+    def setUp(self):
+        self.media = tempfile.mkdtemp()
+        self.ajustes = override_settings(MEDIA_ROOT=self.media)
+        self.ajustes.enable()
+
+        cargo = Cargo.objects.create(nombre="Tester")
+        self.visitante = Usuario.objects.create(
+            first_name="Juan Perez", numero_documento="123", email="visitante@test.com", cargo=cargo
+        )
+        responsable = Usuario.objects.create(
+            first_name="Maria Gomez", numero_documento="456", email="responsable@test.com", cargo=cargo
+        )
+        ubicacion = Ubicacion.objects.create(nombre="Data Center", codigo_qr="DC-01", ciudad="Bogotá", freshservice_id=1001)
+        self.ingreso = RegistroIngreso.objects.create(
+            visitante=self.visitante, responsable=responsable, ubicacion=ubicacion,
+            estado=RegistroIngreso.EstadoOpciones.PENDIENTE_HERRAMIENTAS,
+        )
+
+    def tearDown(self):
+        self.ajustes.disable()
+        shutil.rmtree(self.media, ignore_errors=True)
+
+    def crear_item(self, contenido=None):
+        archivo = SimpleUploadedFile('foto.jpg', contenido or foto_de_celular(), content_type='image/jpeg')
+        return HerramientasService.crear_item_inventario(
+            self.visitante,
+            {'categoria': InventarioHerramienta.CategoriaOpciones.HERRAMIENTA, 'nombre': 'Taladro', 'marca_serial': 'T-1'},
+            archivo
+        )
+
+    def test_subida_encola_y_worker_optimiza(self):
+        item = self.crear_item()
+        original = item.foto_referencia.name
+        # La foto de referencia se copia como evidencia al carrito
+        HerramientasService.gestion_masiva_carrito(self.ingreso, [item.id], 'AGREGAR')
+
+        self.assertEqual(TareaImagen.objects.filter(ruta_original=original).count(), 1)
+        stats = ColaImagenes.procesar_pendientes('test')
+        self.assertEqual(stats['exitosas'], 1)
+
+        item.refresh_from_db()
+        nueva = item.foto_referencia.name
+        self.assertTrue(esta_procesada(nueva))
+        self.assertTrue(nueva.endswith('.webp'))
+        self.assertEqual(HerramientaIngresada.objects.get().foto_evidencia.name, nueva)
+        self.assertFalse(default_storage.exists(original))
+        self.assertTrue(default_storage.exists(nombre_miniatura(nueva)))
+        self.assertLess(default_storage.size(nueva), len(foto_de_celular()))
+
+        inventario = HerramientasService.obtener_inventario_usuario(self.visitante, self.ingreso.id)
+        fila = inventario['herramientas'][0]
+        self.assertTrue(fila['foto'].endswith(nueva))
+        self.assertTrue(fila['foto_miniatura'].endswith(nombre_miniatura(nueva)))
+
+    def test_antes_de_procesar_la_miniatura_es_el_original(self):
+        item = self.crear_item()
+        fila = HerramientasService.obtener_inventario_usuario(self.visitante, self.ingreso.id)['herramientas'][0]
+        self.assertEqual(fila['foto_miniatura'], item.foto_referencia.url)
+
+    def test_foto_reemplazada_en_cola_se_descarta(self):
+        item = self.crear_item()
+        original = item.foto_referencia.name
+        item.foto_referencia = 'herramientas/inventario/otra_opt.webp'
+        item.save()
+
+        ColaImagenes.procesar_pendientes('test')
+
+        item.refresh_from_db()
+        self.assertEqual(item.foto_referencia.name, 'herramientas/inventario/otra_opt.webp')
+        # No quedan archivos generados huérfanos junto al original
+        carpeta = original.rsplit('/', 1)[0]
+        self.assertEqual(default_storage.listdir(carpeta)[1], [original.rsplit('/', 1)[1]])
+
+    def test_archivo_que_no_es_imagen_falla_sin_perder_el_original(self):
+        item = self.crear_item(contenido=b'esto no es una imagen')
+        original = item.foto_referencia.name
+
+        stats = ColaImagenes.procesar_pendientes('test')
+
+        self.assertEqual(stats['fallidas'], 1)
+        self.assertEqual(TareaImagen.objects.get().estado, TareaImagen.EstadoTarea.FALLIDA)
+        item.refresh_from_db()
+        self.assertEqual(item.foto_referencia.name, original)
+        self.assertTrue(default_storage.exists(original))
+
+    def test_fallo_transitorio_espera_el_backoff(self):
+        self.crear_item()
+        with mock.patch('home.imagenes.ProcesadorImagen.procesar', side_effect=RuntimeError('disco lleno')):
+            stats = ColaImagenes.procesar_pendientes('test')
+
+            # Un solo intento: la tarea no se vuelve a tomar en el acto
+            self.assertEqual((stats['procesadas'], stats['fallidas']), (1, 1))
+            tarea = TareaImagen.objects.get()
+            self.assertEqual(tarea.estado, TareaImagen.EstadoTarea.PENDIENTE)
+            self.assertEqual(tarea.intentos, 1)
+            self.assertGreater(tarea.disponible_desde, timezone.now())
+            self.assertIsNone(ColaImagenes.reclamar_siguiente('test'))
+
+        # Vencido el backoff se reintenta y ahora sí se procesa
+        TareaImagen.objects.update(disponible_desde=timezone.now())
+        self.assertEqual(ColaImagenes.procesar_pendientes('test')['exitosas'], 1)
+        self.assertEqual(ColaImagenes.calcular_backoff(2), timedelta(seconds=2 * ColaImagenes.BACKOFF_BASE_SEGUNDOS))
+
+    def test_comando_vacia_la_cola(self):
+        self.crear_item()
+        salida = StringIO()
+        call_command('procesar_imagenes', '--una-vez', stdout=salida)
+        self.assertIn('Procesadas: 1 | Exitosas: 1', salida.getvalue())
+        self.assertEqual(TareaImagen.objects.get().estado, TareaImagen.EstadoTarea.COMPLETADA)
+
+
+def firma_base64(tamano: int) -> str:
+    """Data URI con cabecera PNG y ``tamano`` bytes (no hace falta que sea un PNG completo)."""
+    return "data:image/png;base64," + base64.b64encode(CABECERA_PNG + os.urandom(tamano)).decode()
+
+
+class DecodificarFirmaTestCase(TestCase):
+    """
+    Decodificación por bloques: mismo resultado que b64decode, validación
+    previa y memoria acotada sin importar el tamaño de la firma.
+    """
+
+    def pico_de_memoria(self, data_uri, **kwargs):
+        tracemalloc.start()
+        try:
+            archivo = decodificar_imagen_base64(data_uri, **kwargs)
+            _, pico = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        archivo.close()
+        return pico
+
+    def test_resultado_igual_a_b64decode(self):
+        data_uri = firma_base64(200_000)
+        archivo = decodificar_imagen_base64(data_uri, "vis_1.png")
+
+        self.assertEqual(archivo.name, "vis_1.png")
+        self.assertEqual(archivo.size, 200_008)
+        self.assertEqual(archivo.read(), base64.b64decode(data_uri.split(',', 1)[1]))
+        archivo.close()
+
+    def test_sin_firma(self):
+        self.assertIsNone(decodificar_imagen_base64(None))
+        self.assertIsNone(decodificar_imagen_base64(""))
+
+    def test_rechaza_lo_que_no_es_png(self):
+        jpeg = "data:image/jpeg;base64," + base64.b64encode(b"\xff\xd8\xff" + b"0" * 100).decode()
+        disfrazado = "data:image/png;base64," + base64.b64encode(b"GIF89a" + b"0" * 100).decode()
+        roto = "data:image/png;base64,iVBORw0KGgo%%%%"
+
+        for data_uri in (jpeg, disfrazado, roto):
+            with self.assertRaises(ValueError):
+                decodificar_imagen_base64(data_uri)
+
+    def test_rechaza_tamano_antes_de_decodificar(self):
+        data_uri = firma_base64(50_000)
+        tracemalloc.start()
+        try:
+            with self.assertRaisesMessage(ValueError, "tamaño máximo"):
+                decodificar_imagen_base64(data_uri, max_bytes=10_000)
+            _, pico = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        # No alcanzó a decodificar ni un bloque
+        self.assertLess(pico, 10_000)
+
+    def test_memoria_no_crece_con_el_tamano(self):
+        pequena = self.pico_de_memoria(firma_base64(300_000), max_bytes=8_000_000)
+        grande = self.pico_de_memoria(firma_base64(4_000_000), max_bytes=8_000_000)
+
+        # Lo que esté en memoria del temporal + un bloque; nunca la firma completa
+        self.assertLess(grande, 2 * MAX_FIRMA_EN_MEMORIA)
+        self.assertLess(grande, pequena * 1.5)
+
+
+class AlmacenamientoDeduplicadoTestCase(TestCase):
+    """
+    Mismo contenido = un solo blob; cada subida conserva su ruta de upload_to.
+    """
+
+    def setUp(self):
+        self.media = tempfile.mkdtemp()
+        self.ajustes = override_settings(MEDIA_ROOT=self.media)
+        self.ajustes.enable()
+        self.storage = AlmacenamientoDeduplicado()
+
+    def tearDown(self):
+        self.ajustes.disable()
+        shutil.rmtree(self.media, ignore_errors=True)
+
+    def blobs(self):
+        return [
+            os.path.join(carpeta, nombre)
+            for carpeta, _, nombres in os.walk(self.storage.carpeta_blobs) for nombre in nombres
+        ]
+
+    def guardar(self, carpeta, contenido):
+        return self.storage.save(GeneradorRutaArchivo(carpeta)(None, 'foto.jpg'), ContentFile(contenido))
+
+    def test_duplicado_solo_enlaza(self):
+        contenido = os.urandom(50_000)
+        referencia = self.guardar('herramientas/inventario', contenido)
+        evidencia = self.guardar('herramientas/evidencias', contenido)
+        otra = self.guardar('herramientas/evidencias', os.urandom(50_000))
+
+        self.assertNotEqual(referencia, evidencia)
+        self.assertTrue(os.path.samefile(self.storage.path(referencia), self.storage.path(evidencia)))
+        self.assertEqual(self.storage.referencias(referencia), 2)
+        self.assertEqual(self.storage.referencias(otra), 1)
+        self.assertEqual(len(self.blobs()), 2)
+        with self.storage.open(evidencia) as archivo:
+            self.assertEqual(archivo.read(), contenido)
+
+    def test_borrar_la_ultima_referencia_borra_el_blob(self):
+        contenido = os.urandom(10_000)
+        primera = self.guardar('actividades/inicio', contenido)
+        segunda = self.guardar('actividades/fin', contenido)
+
+        self.storage.delete(primera)
+        self.assertEqual(len(self.blobs()), 1)
+        self.assertEqual(self.storage.referencias(segunda), 1)
+
+        self.storage.delete(segunda)
+        self.assertEqual(self.blobs(), [])
+        # Volver a subirlo crea el blob de nuevo
+        tercera = self.guardar('actividades/inicio', contenido)
+        self.assertEqual(self.storage.referencias(tercera), 1)
+
+    def test_comando_deduplica_media_existente(self):
+        contenido = os.urandom(20_000)
+        rutas = []
+        for carpeta in ('herramientas/inventario', 'herramientas/evidencias', 'usuarios'):
+            os.makedirs(os.path.join(self.media, carpeta))
+            rutas.append(os.path.join(self.media, carpeta, 'foto.jpg'))
+            with open(rutas[-1], 'wb') as archivo:
+                archivo.write(contenido)
+
+        salida = io.StringIO()
+        with self.settings(STORAGES={'default': {'BACKEND': 'home.almacenamiento.AlmacenamientoDeduplicado'},
+                                     'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'}}):
+            call_command('deduplicar_media', stdout=salida)
+            # Relanzarlo no cambia nada
+            call_command('deduplicar_media', stdout=io.StringIO())
+
+        self.assertIn('Duplicados: 2', salida.getvalue())
+        self.assertEqual(len(self.blobs()), 1)
+        self.assertTrue(all(os.path.samefile(rutas[0], ruta) for ruta in rutas[1:]))
+        with open(rutas[2], 'rb') as archivo:
+            self.assertEqual(archivo.read(), contenido)
+
+
+class PerfilBaseDatosTestCase(SimpleTestCase):
+
+    def test_por_defecto_conexiones_persistentes_sin_replica(self):
+        bases = perfil_bases_de_datos({})
+
+        self.assertEqual(list(bases), ['default'])
+        self.assertEqual(bases['default']['CONN_MAX_AGE'], 60)
+        self.assertTrue(bases['default']['CONN_HEALTH_CHECKS'])
+
+    def test_mysql_con_replica(self):
+        bases = perfil_bases_de_datos({
+            'DB_ENGINE': 'django.db.backends.mysql', 'DB_NAME': 'zc', 'DB_HOST': 'primaria',
+            'DB_REPLICA_HOST': 'replica-1', 'DB_CONN_MAX_AGE': '0',
+        })
+
+        self.assertEqual(bases['default']['OPTIONS']['charset'], 'utf8mb4')
+        # El sql_mode del servidor no se toca
+        self.assertNotIn('init_command', bases['default']['OPTIONS'])
+        self.assertEqual(bases['default']['CONN_MAX_AGE'], 0)
+        self.assertEqual(bases[ALIAS_REPLICA]['HOST'], 'replica-1')
+        self.assertEqual(bases[ALIAS_REPLICA]['NAME'], 'zc')
+        self.assertEqual(bases[ALIAS_REPLICA]['TEST'], {'MIRROR': 'default'})
+
+    def test_pool_sin_soporte_falla_al_arrancar(self):
+        with self.assertRaises(ImproperlyConfigured):
+            perfil_bases_de_datos({'DB_POOL': 'True'})  # SQLite no tiene pool
+
+
+class RouterReplicaTestCase(SimpleTestCase):
+    BASES = {
+        'default': {'ENGINE': 'django.db.backends.sqlite3', 'NAME': ':memory:'},
+        ALIAS_REPLICA: {'ENGINE': 'django.db.backends.sqlite3', 'NAME': ':memory:'},
+    }
+
+    def test_sin_replica_todo_va_a_default(self):
+        with en_replica():
+            self.assertEqual(Usuario.objects.all().db, 'default')
+
+    def test_solo_las_lecturas_marcadas_van_a_la_replica(self):
+        with override_settings(DATABASES=self.BASES):
+            self.assertEqual(Usuario.objects.all().db, 'default')
+            with en_replica():
+                self.assertEqual(Usuario.objects.all().db, ALIAS_REPLICA)
+                self.assertEqual(router.db_for_write(Usuario), 'default')
+            self.assertEqual(Usuario.objects.all().db, 'default')
+
+    def test_streaming_se_genera_en_la_replica(self):
+        @lectura_en_replica
+        def vista(request):
+            return StreamingHttpResponse(Usuario.objects.all().db for _ in range(2))
+
+        with override_settings(DATABASES=self.BASES):
+            respuesta = vista(None)
+            self.assertEqual(list(respuesta.streaming_content), [ALIAS_REPLICA.encode()] * 2)
@@ -1,12 +1,16 @@
 import os
 import uuid
-import base64
+import binascii
+import tempfile
 import logging
 from datetime import datetime, timedelta
-from django.http import JsonResponse
+import json
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import JsonResponse, StreamingHttpResponse
 from django.utils.deconstruct import deconstructible
-from typing import Any, Optional
-from django.core.files.base import ContentFile
+from typing import Any, Callable, Iterable, Optional
+from django.conf import settings
+from django.core.files.base import File
 from fpdf import FPDF
 from django.utils import timezone
 
@@ -55,24 +59,99 @@ def api_response(data: Any = None, success: bool = True, message: str = "Operaci
     }
     return JsonResponse(response_data, status=status_code)
 
-def decodificar_imagen_base64(data_uri: str, nombre_archivo: str = "archivo.png") -> Optional[ContentFile]:
+def api_response_streaming(filas: Iterable[dict], message: str = "Operación exitosa",
+                           extra: Optional[Callable[[], dict]] = None) -> StreamingHttpResponse:
+    """
+    Igual que ``api_response`` (mismo sobre JSON) pero el ``payload`` es una lista
+    que se escribe fila por fila a medida que se consume ``filas``. Así un listado
+    grande no se arma entero en memoria antes de responder.
+
+    ``extra`` se evalúa DESPUÉS de recorrer las filas (ej: el cursor de la página
+    siguiente depende de la última fila) y sus claves se agregan al sobre.
+    """
+    def generar():
+        yield '{"success": true, "message": %s, "payload": [' % json.dumps(message)
+        separador = ''
+        for fila in filas:
+            yield separador + json.dumps(fila, cls=DjangoJSONEncoder)
+            separador = ','
+        yield ']'
+        for clave, valor in (extra() if extra else {}).items():
+            yield ', %s: %s' % (json.dumps(clave), json.dumps(valor, cls=DjangoJSONEncoder))
+        yield ', "timestamp": %s}' % json.dumps(datetime.now().isoformat())
+
+    return StreamingHttpResponse(generar(), content_type='application/json')
+
+#: Caracteres base64 que se decodifican por vuelta (múltiplo de 4 -> 48 KB de salida).
+BLOQUE_BASE64 = 64 * 1024
+
+#: Por encima de esto el archivo temporal pasa de memoria a disco.
+MAX_FIRMA_EN_MEMORIA = 256 * 1024
+
+CABECERA_PNG = b'\x89PNG\r\n\x1a\n'
+
+
+def decodificar_imagen_base64(data_uri: str, nombre_archivo: str = "archivo.png",
+                              max_bytes: Optional[int] = None) -> Optional[File]:
+    """
+    Decodifica una firma PNG en base64 (data URI del canvas) por bloques,
+    sin copias del texto completo:
+
+    - El tamaño se valida con la longitud del texto, ANTES de decodificar.
+    - Se decodifica de a ``BLOQUE_BASE64`` caracteres hacia un
+      ``SpooledTemporaryFile`` (memoria hasta ``MAX_FIRMA_EN_MEMORIA``, luego disco).
+    - La cabecera PNG se revisa con el primer bloque.
+    - El storage lee el archivo por chunks al guardarlo.
+
+    Returns
+    -------
+    File | None
+        ``None`` si no llegó firma.
+
+    Raises
+    ------
+    ValueError
+        Si no es PNG, no es base64 válido o supera ``max_bytes``
+        (por defecto ``FIRMA_MAX_BYTES``).
+    """
     if not data_uri or not isinstance(data_uri, str):
         return None
-    
-    if 'base64,' in data_uri:
-        try:
-            _, imgstr = data_uri.split(';base64,')
-        except ValueError:
-            return None
-    else:
-        imgstr = data_uri
 
+    inicio = 0
+    # La cabecera 'data:image/png;base64,' está al principio: no se busca en todo el texto
+    marca = data_uri.find(';base64,', 0, 64)
+    if marca != -1:
+        if data_uri[:marca].lower() != 'data:image/png':
+            raise ValueError("La firma debe ser una imagen PNG.")
+        inicio = marca + len(';base64,')
+
+    max_bytes = max_bytes or getattr(settings, 'FIRMA_MAX_BYTES', 1024 * 1024)
+    if (len(data_uri) - inicio) // 4 * 3 > max_bytes:
+        raise ValueError(f"La firma supera el tamaño máximo permitido ({max_bytes // 1024} KB).")
+
+    destino = tempfile.SpooledTemporaryFile(max_size=MAX_FIRMA_EN_MEMORIA)
     try:
-        decoded_file = base64.b64decode(imgstr)
-    except Exception:
+        for pos in range(inicio, len(data_uri), BLOQUE_BASE64):
+            bloque = binascii.a2b_base64(data_uri[pos:pos + BLOQUE_BASE64], strict_mode=True)
+            if pos == inicio and not bloque.startswith(CABECERA_PNG):
+                raise ValueError("La firma debe ser una imagen PNG.")
+            destino.write(bloque)
+    except binascii.Error:
+        destino.close()
+        raise ValueError("La firma no es un base64 válido.")
+    except ValueError:
+        destino.close()
+        raise
+
+    if destino.tell() == 0:
+        destino.close()
         return None
 
-    return ContentFile(decoded_file, name=nombre_archivo)
+    archivo = File(destino, name=nombre_archivo)
+    # SpooledTemporaryFile no expone tamaño: lo fijamos para que File no lo busque en disco
+    archivo.size = destino.tell()
+    destino.seek(0)
+    return archivo
 
 
 # ======================================================
@@ -287,33 +366,30 @@ class CronometroJornada:
 
     @staticmethod
     def get_ingreso_activo(user):
-        """Busca si el usuario tiene un ingreso activo en zona."""
-        from descargo_responsabilidad.models import RegistroIngreso
-        return RegistroIngreso.objects.filter(
-            visitante=user,
-            estado=RegistroIngreso.EstadoOpciones.EN_ZONA
-        ).first()
+        """Busca si el usuario tiene un ingreso activo en zona (presencia por PK)."""
+        from descargo_responsabilidad.models import PresenciaActual
+        return PresenciaActual.ingreso_de(user, solo_en_zona=True)
 
     @staticmethod
-    def calcular_segundos_restantes(ingreso) -> int:
+    def calcular_fecha_limite(ingreso, usuario=None):
         """
-        Calcula el tiempo basándose en la configuración del USUARIO.
+        Fecha/hora en que vence la jornada del ingreso.
         Prioridad:
         1. 'tiempo_limite_jornada' en la tabla Usuarios.
         2. Si es nulo, usa 8 horas desde la entrada.
+
+        ``usuario`` permite pasar el visitante ya cargado (por defecto ingreso.visitante).
+        Retorna None si el ingreso no tiene fecha de entrada.
         """
         if not ingreso or not ingreso.fecha_hora_ingreso:
-            return 0
-            
-        usuario = ingreso.visitante
-        
-        # 1. Obtenemos hora actual con zona horaria (Colombia)
-        ahora = timezone.localtime(timezone.now())
-        
-        # 2. Obtenemos la fecha/hora de entrada en zona horaria local
+            return None
+
+        usuario = usuario or ingreso.visitante
+
+        # 1. Obtenemos la fecha/hora de entrada en zona horaria local (Colombia)
         entrada_local = timezone.localtime(ingreso.fecha_hora_ingreso)
 
-        # 3. LÓGICA DE DECISIÓN
+        # 2. LÓGICA DE DECISIÓN
         if usuario.tiempo_limite_jornada:
             # CASO A: El usuario tiene hora fija de salida (ej: 19:22:00)
             hora_limite_usuario = usuario.tiempo_limite_jornada
@@ -337,18 +413,36 @@ class CronometroJornada:
         else:
             # CASO B: No tiene hora asignada, usamos duración estándar (8 horas)
             limite = entrada_local + timedelta(hours=CronometroJornada.DURACION_ESTANDAR_HORAS)
-        
-        # 4. Calcular diferencia
-        diferencia = limite - ahora
+
+        return limite
+
+    @staticmethod
+    def calcular_segundos_restantes(ingreso) -> int:
+        """
+        Segundos que le quedan a la jornada (ver calcular_fecha_limite).
+        """
+        limite = CronometroJornada.calcular_fecha_limite(ingreso)
+        if limite is None:
+            return 0
+
+        # Calcular diferencia con la hora actual
+        diferencia = limite - timezone.now()
         return int(diferencia.total_seconds())
 
+    @staticmethod
+    def ingreso_vencido(ingreso) -> bool:
+        """
+        Igual que esta_vencido pero con el ingreso ya cargado
+        (ej: request.ingreso_activo), sin volver a consultar.
+        """
+        if not ingreso:
+            return True
+
+        return CronometroJornada.calcular_segundos_restantes(ingreso) <= 0
+
     @staticmethod
     def esta_vencido(user) -> bool:
         """
         Retorna True si el tiempo se acabó.
         """
-        ingreso = CronometroJornada.get_ingreso_activo(user)
-        if not ingreso:
-            return True 
-            
-        return CronometroJornada.calcular_segundos_restantes(ingreso) <= 0
\ No newline at end of file
+        return CronometroJornada.ingreso_vencido(CronometroJornada.get_ingreso_activo(user))
\ No newline at end of file
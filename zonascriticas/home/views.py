@@ -30,22 +30,16 @@ def home_view(request: HttpRequest) -> HttpResponse:
     if user.tipo == 'Administrador' or user.is_staff:
         return redirect('perfil')
 
+    # El ingreso abierto lo carga el middleware (una sola consulta con
+    # ubicacion y visitante): lo reutilizamos para las dos decisiones.
+    ingreso_activo = request.ingreso_activo
+
     # 2. PENDIENTE HERRAMIENTAS (Prioridad Alta)
     # Si tiene herramientas pendientes, no puede hacer nada más.
-    if RegistroIngreso.objects.filter( 
-        visitante=user, 
-        estado=RegistroIngreso.EstadoOpciones.PENDIENTE_HERRAMIENTAS 
-    ).exists(): # Verifica si existe el usuario con esas condiciones
-    # Observacion tecnica: Se usa exists dado que es menos costoso que usar count 
+    if ingreso_activo and ingreso_activo.estado == RegistroIngreso.EstadoOpciones.PENDIENTE_HERRAMIENTAS:
         return redirect('registro_herramientas_view')
 
     # 3. EN ZONA (Usuario ya ingresado y activo)
-    # Usamos select_related para optimizar la consulta de la ubicación
-    ingreso_activo = RegistroIngreso.objects.select_related('ubicacion').filter(
-        visitante=user,
-        estado=RegistroIngreso.EstadoOpciones.EN_ZONA
-    ).first() 
-
     if ingreso_activo:
         # A. Modalidad de Trabajo -> Tablero Actividades
         if ingreso_activo.modalidad in [
@@ -0,0 +1,95 @@
+"""
+zonascriticas/login/cache_usuarios.py
+
+Descripción:
+
+Caché de usuarios para ``CustomAuthMiddleware``. El usuario se guarda ya
+resuelto con ``select_related('empresa', 'cargo')`` en el alias de caché
+``USUARIOS_CACHE_ALIAS``.
+
+Responsabilidades:
+
+- Resolver un usuario por id: primero la caché, luego UNA consulta a la BD.
+- Invalidar la entrada cuando el usuario cambia:
+    * ``Usuario.save()`` / ``Usuario.delete()`` (ver ``login/models.py``).
+    * Actualizaciones masivas con ``.update()`` que no pasan por ``save()``
+      (ej: ``actualizar_estado_empresa``), llamando a ``invalidar_usuarios``.
+
+Las claves llevan ``VERSION_CACHE``: si cambian los campos de ``Usuario`` se sube
+el número y las entradas viejas (pickles del modelo anterior) quedan ignoradas.
+
+Ojo: con ``LocMemCache`` cada proceso tiene su propia caché; la invalidación solo
+llega al proceso que hizo el cambio y los demás ven el dato viejo como mucho
+``USUARIOS_CACHE_TTL`` segundos (5 por defecto en memoria, 300 con otra caché).
+Con una caché compartida (Redis, Memcached) la invalidación es inmediata en
+todos los workers.
+"""
+
+from typing import Iterable, Optional
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import DEFAULT_DB_ALIAS, transaction
+
+#: Súbelo cuando cambien los campos de Usuario, Empresa o Cargo.
+VERSION_CACHE = 1
+
+
+def _cache():
+    return caches[getattr(settings, 'USUARIOS_CACHE_ALIAS', 'usuarios')]
+
+
+def clave_usuario(user_id) -> str:
+    return f"usuario:v{VERSION_CACHE}:{user_id}"
+
+
+def obtener_usuario(user_id):
+    """
+    Retorna el usuario con empresa y cargo ya cargados.
+
+    Parameters
+    ----------
+    user_id : int
+        Id guardado en la sesión.
+
+    Returns
+    -------
+    Usuario | None
+        ``None`` si el usuario no existe.
+    """
+    from .models import Usuario
+
+    cache = _cache()
+    clave = clave_usuario(user_id)
+
+    usuario = cache.get(clave)
+    if usuario is not None:
+        return usuario
+
+    # Siempre de la primaria: lo que se guarde en caché no puede venir atrasado de la réplica
+    usuario = Usuario.objects.db_manager(DEFAULT_DB_ALIAS).select_related('empresa', 'cargo').filter(pk=user_id).first()
+    if usuario is not None:
+        cache.set(clave, usuario, getattr(settings, 'USUARIOS_CACHE_TTL', 300))
+    return usuario
+
+
+def invalidar_usuarios(ids: Iterable) -> None:
+    """
+    Borra de la caché los usuarios indicados.
+
+    Se borra ya y otra vez al confirmar la transacción: así un request
+    concurrente que lea la fila vieja antes del commit no deja en caché un
+    dato desactualizado.
+    """
+    claves = [clave_usuario(user_id) for user_id in ids]
+    if not claves:
+        return
+
+    cache = _cache()
+    cache.delete_many(claves)
+    transaction.on_commit(lambda: cache.delete_many(claves))
+
+
+def invalidar_usuario(user_id: Optional[int]) -> None:
+    if user_id is not None:
+        invalidar_usuarios([user_id])
@@ -0,0 +1,480 @@
+"""
+login/contadores.py
+
+Almacenes de contadores (counter stores) para ``SecurityJail``: la interfaz
+``ContadorStore`` y tres implementaciones.
+
+- ``MemoriaStore``: diccionarios en proceso repartidos en *shards* con su
+  propio lock. Para desarrollo o un único worker.
+- ``BaseDatosStore``: tabla ``contadores_seguridad``.
+- ``RedisStore``: cliente mínimo del protocolo RESP (sin dependencias).
+  Se prueba contra ``login/fake_redis.py``.
+
+``registrar_evento`` guarda un registro deslizante de como mucho ``limite``
+marcas de tiempo por clave; es la base de ``login/limitador.py``.
+
+Se elige con ``SEGURIDAD_CONTADOR_STORE`` (``'memoria'``, ``'bd'`` por
+defecto o ``'redis'``) y ``SEGURIDAD_REDIS_URL``.
+"""
+
+import logging
+import random
+import socket
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import deque
+from typing import Dict, Iterable, Optional
+from urllib.parse import urlparse
+
+from django.conf import settings
+from django.db import connection, transaction
+
+logger = logging.getLogger(__name__)
+
+
+class ContadorStore(ABC):
+    """
+    Interfaz común. Las claves son cadenas y los valores enteros.
+    """
+
+    @abstractmethod
+    def obtener_varios(self, claves: Iterable[str]) -> Dict[str, int]:
+        """
+        Lee varias claves en un solo viaje.
+
+        Returns
+        -------
+        dict
+            Solo las claves existentes y no expiradas.
+        """
+
+    @abstractmethod
+    def incrementar(self, clave: str, ttl: float) -> int:
+        """
+        Suma 1 de forma atómica y retorna el nuevo valor.
+        Si la clave no existe (o expiró) se crea con valor 1 y expiración ``ttl``.
+        """
+
+    @abstractmethod
+    def registrar_evento(self, clave: str, ventana: float, limite: int) -> bool:
+        """
+        Agrega un evento "ahora" al registro deslizante de ``clave`` y descarta
+        los que tengan más de ``ventana`` segundos.
+
+        Returns
+        -------
+        bool
+            ``True`` si con este evento hay ``limite`` eventos dentro de la
+            ventana. En ese caso el registro se vacía en la misma operación,
+            de modo que solo UNA llamada concurrente ve el cruce del umbral.
+        """
+
+    @abstractmethod
+    def fijar(self, clave: str, valor: int, ttl: float) -> None:
+        """Escribe ``valor`` con expiración ``ttl`` (sobrescribe)."""
+
+    @abstractmethod
+    def eliminar(self, clave: str) -> None:
+        """Borra la clave si existe."""
+
+
+# ----------------------------------------------------------------------
+# 1. Memoria (en proceso)
+# ----------------------------------------------------------------------
+
+class MemoriaStore(ContadorStore):
+    """
+    Store en memoria del proceso, repartido en shards para reducir la
+    contención del lock entre hilos.
+
+    Ojo: cada proceso de gunicorn tiene su propio store. Con varios workers
+    un atacante tendría N veces más intentos; en producción usa 'bd' o 'redis'.
+    """
+
+    #: Al superar este tamaño, un shard purga sus claves expiradas.
+    MAX_CLAVES_POR_SHARD: int = 10000
+
+    def __init__(self, shards: int = 16, reloj=time.monotonic):
+        self._shards = [({}, threading.Lock()) for _ in range(shards)]
+        self.reloj = reloj
+
+    def _shard(self, clave):
+        return self._shards[hash(clave) % len(self._shards)]
+
+    def obtener_varios(self, claves):
+        ahora = self.reloj()
+        resultado = {}
+        for clave in claves:
+            datos, lock = self._shard(clave)
+            with lock:
+                entrada = datos.get(clave)
+            if entrada and entrada[1] > ahora:
+                resultado[clave] = entrada[0]
+        return resultado
+
+    def incrementar(self, clave, ttl):
+        datos, lock = self._shard(clave)
+        ahora = self.reloj()
+        with lock:
+            valor, expira = datos.get(clave, (0, 0.0))
+            if expira <= ahora:
+                valor, expira = 0, ahora + ttl
+            valor += 1
+            datos[clave] = (valor, expira)
+
+            if len(datos) > self.MAX_CLAVES_POR_SHARD:
+                self._purgar(datos, ahora)
+        return valor
+
+    def registrar_evento(self, clave, ventana, limite):
+        datos, lock = self._shard(clave)
+        ahora = self.reloj()
+        with lock:
+            entrada = datos.get(clave)
+            eventos = entrada[0] if entrada and entrada[1] > ahora else deque(maxlen=limite)
+
+            while eventos and eventos[0] <= ahora - ventana:
+                eventos.popleft()
+            eventos.append(ahora)
+
+            if len(eventos) >= limite:
+                datos.pop(clave, None)
+                return True
+
+            datos[clave] = (eventos, ahora + ventana)
+            if len(datos) > self.MAX_CLAVES_POR_SHARD:
+                self._purgar(datos, ahora)
+            return False
+
+    def fijar(self, clave, valor, ttl):
+        datos, lock = self._shard(clave)
+        with lock:
+            datos[clave] = (valor, self.reloj() + ttl)
+
+    def eliminar(self, clave):
+        datos, lock = self._shard(clave)
+        with lock:
+            datos.pop(clave, None)
+
+    @staticmethod
+    def _purgar(datos, ahora):
+        for clave in [c for c, (_, expira) in datos.items() if expira <= ahora]:
+            del datos[clave]
+
+
+# ----------------------------------------------------------------------
+# 2. Base de datos
+# ----------------------------------------------------------------------
+
+class BaseDatosStore(ContadorStore):
+    """
+    Store sobre la tabla ``contadores_seguridad`` (modelo ``ContadorSeguridad``).
+
+    ``incrementar`` lee y escribe la fila dentro de ``atomic`` con
+    ``select_for_update`` (solo lo usan ``benchmark_login`` y los tests; el
+    limitador usa ``registrar_evento``).
+
+    ``registrar_evento`` guarda las marcas de tiempo en la columna ``eventos``
+    y usa ``valor`` como versión (compare-and-swap): un SELECT y un UPDATE
+    condicionado. Si otro worker escribió en medio, se reintenta; agotados los
+    reintentos el evento se registra bajo ``select_for_update``. Un evento
+    nunca se descarta: bajo ataque el limitador no puede quedar abierto.
+    """
+
+    #: Probabilidad de purgar filas expiradas en cada incremento (limpieza amortizada).
+    PROBABILIDAD_PURGA: float = 0.01
+
+    #: Reintentos del compare-and-swap de registrar_evento bajo contención.
+    REINTENTOS_CAS: int = 10
+
+    def __init__(self):
+        from .models import ContadorSeguridad
+        self.modelo = ContadorSeguridad
+        self.tabla = connection.ops.quote_name(ContadorSeguridad._meta.db_table)
+
+    def obtener_varios(self, claves):
+        return dict(
+            self.modelo.objects.filter(clave__in=list(claves), expira__gt=time.time())
+            .values_list('clave', 'valor')
+        )
+
+    def incrementar(self, clave, ttl):
+        ahora = time.time()
+        self._purga_amortizada(ahora)
+
+        with transaction.atomic():
+            fila, _ = self.modelo.objects.select_for_update().get_or_create(clave=clave, defaults={'expira': ahora + ttl})
+            if fila.expira <= ahora:
+                fila.valor, fila.expira = 0, ahora + ttl
+            fila.valor += 1
+            fila.save(update_fields=['valor', 'expira'])
+        return fila.valor
+
+    def _purga_amortizada(self, ahora):
+        if random.random() < self.PROBABILIDAD_PURGA:
+            self.modelo.objects.filter(expira__lte=ahora).delete()
+
+    def registrar_evento(self, clave, ventana, limite):
+        self._purga_amortizada(time.time())
+
+        for _ in range(self.REINTENTOS_CAS):
+            alcanzado = self._intento_cas(clave, ventana, limite)
+            if alcanzado is not None:
+                return alcanzado
+
+        logger.warning("registrar_evento: contención persistente sobre %s; se registra con bloqueo de fila.", clave)
+        with transaction.atomic():
+            fila, _ = self.modelo.objects.select_for_update().get_or_create(clave=clave, defaults={'expira': 0})
+            ahora = time.time()
+            alcanzado, texto = _siguiente_registro(fila.eventos if fila.expira > ahora else '', ahora, ventana, limite)
+            fila.valor += 1
+            fila.eventos = texto
+            fila.expira = ahora + ventana
+            fila.save(update_fields=['valor', 'eventos', 'expira'])
+        return alcanzado
+
+    def _intento_cas(self, clave, ventana, limite):
+        """Un SELECT + escritura condicionada. ``None`` si otro worker escribió en medio."""
+        ahora = time.time()
+        fila = self.modelo.objects.filter(clave=clave).values_list('valor', 'eventos', 'expira').first()
+        alcanzado, texto = _siguiente_registro(fila[1] if fila and fila[2] > ahora else '', ahora, ventana, limite)
+
+        if fila is None:
+            with connection.cursor() as cursor:
+                insertar = 'INSERT IGNORE INTO' if connection.vendor == 'mysql' else 'INSERT INTO'
+                conflicto = '' if connection.vendor == 'mysql' else ' ON CONFLICT (clave) DO NOTHING'
+                cursor.execute(
+                    f"{insertar} {self.tabla} (clave, valor, eventos, expira) VALUES (%s, 1, %s, %s){conflicto}",
+                    [clave, texto, ahora + ventana],
+                )
+                return alcanzado if cursor.rowcount == 1 else None
+        if self.modelo.objects.filter(clave=clave, valor=fila[0]).update(
+            valor=fila[0] + 1, eventos=texto, expira=ahora + ventana
+        ):
+            return alcanzado
+        return None
+
+    def fijar(self, clave, valor, ttl):
+        expira = time.time() + ttl
+        with connection.cursor() as cursor:
+            if connection.vendor == 'mysql':
+                cursor.execute(
+                    f"INSERT INTO {self.tabla} (clave, valor, eventos, expira) VALUES (%s, %s, '', %s) "
+                    f"ON DUPLICATE KEY UPDATE valor = VALUES(valor), expira = VALUES(expira)",
+                    [clave, valor, expira],
+                )
+            else:
+                cursor.execute(
+                    f"INSERT INTO {self.tabla} (clave, valor, eventos, expira) VALUES (%s, %s, '', %s) "
+                    f"ON CONFLICT (clave) DO UPDATE SET valor = EXCLUDED.valor, expira = EXCLUDED.expira",
+                    [clave, valor, expira],
+                )
+
+    def eliminar(self, clave):
+        self.modelo.objects.filter(clave=clave).delete()
+
+
+# ----------------------------------------------------------------------
+# 3. Redis (protocolo RESP, sin dependencias)
+# ----------------------------------------------------------------------
+
+class ErrorRedis(Exception):
+    """Respuesta de error (-ERR ...) del servidor Redis."""
+
+
+class RedisStore(ContadorStore):
+    """
+    Cliente RESP mínimo: una conexión por hilo y comandos en *pipeline*.
+
+    ``incrementar`` envía ``MULTI / SET clave 0 PX ttl NX / INCR clave / EXEC``
+    en una sola escritura: un viaje, atómico, y la expiración solo se fija
+    al crear la clave.
+    """
+
+    def __init__(self, url: str = 'redis://localhost:6379/0', timeout: float = 2.0):
+        partes = urlparse(url)
+        self.host = partes.hostname or 'localhost'
+        self.puerto = partes.port or 6379
+        self.db = int((partes.path or '/0').lstrip('/') or 0)
+        self.password = partes.password
+        self.timeout = timeout
+        self._local = threading.local()
+
+    # --- Conexión y protocolo ---
+
+    def _conexion(self):
+        conexion = getattr(self._local, 'conexion', None)
+        if conexion is None:
+            sock = socket.create_connection((self.host, self.puerto), timeout=self.timeout)
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            conexion = (sock, sock.makefile('rb'))
+            self._local.conexion = conexion
+
+            iniciales = []
+            if self.password:
+                iniciales.append(('AUTH', self.password))
+            if self.db:
+                iniciales.append(('SELECT', self.db))
+            if iniciales:
+                self._pipeline(iniciales)
+        return conexion
+
+    def cerrar(self):
+        conexion = getattr(self._local, 'conexion', None)
+        if conexion:
+            conexion[1].close()
+            conexion[0].close()
+            self._local.conexion = None
+
+    @staticmethod
+    def _codificar(comando):
+        partes = [f"*{len(comando)}\r\n".encode()]
+        for arg in comando:
+            dato = arg if isinstance(arg, bytes) else str(arg).encode()
+            partes.append(b"$%d\r\n%s\r\n" % (len(dato), dato))
+        return b"".join(partes)
+
+    @classmethod
+    def _leer(cls, archivo):
+        linea = archivo.readline()
+        if not linea:
+            raise ConnectionError("Conexión cerrada por Redis.")
+        tipo, resto = linea[:1], linea[1:-2]
+        if tipo == b'+':
+            return resto.decode()
+        if tipo == b'-':
+            return ErrorRedis(resto.decode())
+        if tipo == b':':
+            return int(resto)
+        if tipo == b'$':
+            largo = int(resto)
+            if largo < 0:
+                return None
+            dato = archivo.read(largo + 2)
+            return dato[:-2]
+        if tipo == b'*':
+            largo = int(resto)
+            if largo < 0:
+                return None
+            return [cls._leer(archivo) for _ in range(largo)]
+        raise ErrorRedis(f"Respuesta RESP desconocida: {linea!r}")
+
+    def _pipeline(self, comandos):
+        """Envía todos los comandos en una escritura y lee todas las respuestas."""
+        sock, archivo = self._conexion()
+        try:
+            sock.sendall(b"".join(self._codificar(c) for c in comandos))
+            respuestas = [self._leer(archivo) for _ in comandos]
+        except (OSError, ConnectionError):
+            self.cerrar()
+            raise
+        for respuesta in respuestas:
+            if isinstance(respuesta, ErrorRedis):
+                raise respuesta
+        return respuestas
+
+    # --- Interfaz ContadorStore ---
+
+    def obtener_varios(self, claves):
+        claves = list(claves)
+        if not claves:
+            return {}
+        valores = self._pipeline([('MGET', *claves)])[0]
+        return {clave: int(valor) for clave, valor in zip(claves, valores) if valor is not None}
+
+    def incrementar(self, clave, ttl):
+        ms = max(1, int(ttl * 1000))
+        respuestas = self._pipeline([
+            ('MULTI',),
+            ('SET', clave, 0, 'PX', ms, 'NX'),
+            ('INCR', clave),
+            ('EXEC',),
+        ])
+        resultado_exec = respuestas[-1]
+        if isinstance(resultado_exec[1], ErrorRedis):
+            raise resultado_exec[1]
+        return resultado_exec[1]
+
+    def registrar_evento(self, clave, ventana, limite):
+        # Sorted set con las marcas de tiempo; se recorta a 'limite' miembros.
+        ahora = time.time()
+        respuestas = self._pipeline([
+            ('MULTI',),
+            ('ZREMRANGEBYSCORE', clave, '-inf', ahora - ventana),
+            ('ZADD', clave, ahora, f"{ahora:.6f}:{random.getrandbits(32)}"),
+            ('ZREMRANGEBYRANK', clave, 0, -(limite + 1)),
+            ('ZCARD', clave),
+            ('PEXPIRE', clave, max(1, int(ventana * 1000))),
+            ('EXEC',),
+        ])
+        if respuestas[-1][3] < limite:
+            return False
+
+        # Sin Lua no podemos vaciar dentro del MULTI: en una carrera exacta
+        # dos llamadas podrían ver el cruce (más estricto, nunca más permisivo).
+        self._pipeline([('DEL', clave)])
+        return True
+
+    def fijar(self, clave, valor, ttl):
+        self._pipeline([('SET', clave, valor, 'PX', max(1, int(ttl * 1000)))])
+
+    def eliminar(self, clave):
+        self._pipeline([('DEL', clave)])
+
+
+def _ultimos(eventos, cantidad):
+    """Los ``cantidad`` eventos más recientes (lista vacía si cantidad <= 0)."""
+    return eventos[-cantidad:] if cantidad > 0 else []
+
+
+def _siguiente_registro(texto, ahora, ventana, limite):
+    """
+    Agrega ``ahora`` al registro guardado como texto (marcas separadas por comas).
+
+    Returns
+    -------
+    tuple
+        ``(alcanzado, texto_nuevo)``; al alcanzar el límite el registro queda vacío.
+    """
+    eventos = [float(t) for t in texto.split(',') if float(t) > ahora - ventana] if texto else []
+    eventos = _ultimos(eventos, limite - 1) + [ahora]
+    alcanzado = len(eventos) >= limite
+    return alcanzado, '' if alcanzado else ','.join(f'{t:.3f}' for t in eventos)
+
+
+# ----------------------------------------------------------------------
+# Registro global del store activo
+# ----------------------------------------------------------------------
+
+_store: Optional[ContadorStore] = None
+_lock_store = threading.Lock()
+
+
+def crear_store(tipo: str) -> ContadorStore:
+    """
+    Fábrica a partir del nombre configurado en ``SEGURIDAD_CONTADOR_STORE``.
+    """
+    if tipo == 'memoria':
+        return MemoriaStore()
+    if tipo == 'bd':
+        return BaseDatosStore()
+    if tipo == 'redis':
+        return RedisStore(getattr(settings, 'SEGURIDAD_REDIS_URL', 'redis://localhost:6379/0'))
+    raise ValueError(f"Store de contadores desconocido: {tipo}")
+
+
+def get_store() -> ContadorStore:
+    """Retorna (y crea la primera vez) el store configurado en settings."""
+    global _store
+    if _store is None:
+        with _lock_store:
+            if _store is None:
+                _store = crear_store(getattr(settings, 'SEGURIDAD_CONTADOR_STORE', 'bd'))
+    return _store
+
+
+def set_store(store: Optional[ContadorStore]) -> None:
+    """Reemplaza el store activo (tests / benchmark). ``None`` vuelve al de settings."""
+    global _store
+    _store = store
@@ -0,0 +1,220 @@
+"""
+login/fake_redis.py
+
+Servidor Redis **falso** y mínimo (protocolo RESP sobre TCP) para probar
+``RedisStore`` sin tener Redis instalado. Lo usan los tests de ``login`` y
+el comando ``benchmark_login``. No es para producción.
+
+Comandos soportados: PING, GET, MGET, SET (NX, EX, PX), INCR, DEL,
+ZADD, ZREMRANGEBYSCORE, ZREMRANGEBYRANK, ZCARD, PEXPIRE, MULTI / EXEC y FLUSHDB.
+
+Uso
+---
+    servidor = FakeRedis()
+    servidor.iniciar()          # escucha en 127.0.0.1 con un puerto libre
+    url = servidor.url          # 'redis://127.0.0.1:<puerto>/0'
+    ...
+    servidor.detener()
+"""
+
+import socket
+import socketserver
+import threading
+import time
+
+
+class _Datos:
+    """Diccionario compartido con expiración y un lock global (como el hilo único de Redis)."""
+
+    def __init__(self):
+        self.valores = {}
+        self.lock = threading.Lock()
+
+    def _vigente(self, clave):
+        entrada = self.valores.get(clave)
+        if entrada is None:
+            return None
+        valor, expira = entrada
+        if expira is not None and expira <= time.monotonic():
+            del self.valores[clave]
+            return None
+        return valor
+
+    def ejecutar(self, comando):
+        nombre = comando[0].upper()
+        args = comando[1:]
+
+        if nombre == b'PING':
+            return '+PONG'
+        if nombre == b'GET':
+            return self._vigente(args[0])
+        if nombre == b'MGET':
+            return [self._vigente(c) for c in args]
+        if nombre == b'SET':
+            clave, valor = args[0], args[1]
+            expira, solo_si_no_existe = None, False
+            i = 2
+            while i < len(args):
+                opcion = args[i].upper()
+                if opcion == b'NX':
+                    solo_si_no_existe = True
+                elif opcion == b'EX':
+                    i += 1
+                    expira = time.monotonic() + int(args[i])
+                elif opcion == b'PX':
+                    i += 1
+                    expira = time.monotonic() + int(args[i]) / 1000
+                i += 1
+            if solo_si_no_existe and self._vigente(clave) is not None:
+                return None
+            self.valores[clave] = (valor, expira)
+            return '+OK'
+        if nombre == b'INCR':
+            clave = args[0]
+            actual = self._vigente(clave)
+            try:
+                nuevo = int(actual or 0) + 1
+            except ValueError:
+                return Exception('ERR value is not an integer or out of range')
+            expira = self.valores[clave][1] if actual is not None else None
+            self.valores[clave] = (str(nuevo).encode(), expira)
+            return nuevo
+        if nombre == b'ZADD':
+            clave = args[0]
+            zset = self._vigente(clave)
+            if not isinstance(zset, dict):
+                zset = {}
+                self.valores[clave] = (zset, None)
+            nuevos = 0
+            for i in range(1, len(args), 2):
+                nuevos += args[i + 1] not in zset
+                zset[args[i + 1]] = float(args[i])
+            return nuevos
+        if nombre == b'ZREMRANGEBYSCORE':
+            zset = self._vigente(args[0]) or {}
+            minimo, maximo = float(args[1]), float(args[2])
+            borrar = [m for m, puntaje in zset.items() if minimo <= puntaje <= maximo]
+            for miembro in borrar:
+                del zset[miembro]
+            return len(borrar)
+        if nombre == b'ZREMRANGEBYRANK':
+            zset = self._vigente(args[0]) or {}
+            ordenados = sorted(zset, key=zset.get)
+            inicio, fin = int(args[1]), int(args[2])
+            inicio = inicio + len(ordenados) if inicio < 0 else inicio
+            fin = fin + len(ordenados) if fin < 0 else fin
+            borrar = ordenados[max(inicio, 0):fin + 1] if fin >= 0 else []
+            for miembro in borrar:
+                del zset[miembro]
+            return len(borrar)
+        if nombre == b'ZCARD':
+            return len(self._vigente(args[0]) or {})
+        if nombre == b'PEXPIRE':
+            valor = self._vigente(args[0])
+            if valor is None:
+                return 0
+            self.valores[args[0]] = (valor, time.monotonic() + int(args[1]) / 1000)
+            return 1
+        if nombre == b'DEL':
+            borradas = 0
+            for clave in args:
+                if self._vigente(clave) is not None:
+                    del self.valores[clave]
+                    borradas += 1
+            return borradas
+        if nombre == b'FLUSHDB':
+            self.valores.clear()
+            return '+OK'
+        if nombre in (b'SELECT', b'AUTH'):
+            return '+OK'
+        return Exception(f"ERR unknown command '{nombre.decode()}'")
+
+
+def _codificar(respuesta):
+    if respuesta is None:
+        return b"$-1\r\n"
+    if isinstance(respuesta, Exception):
+        return f"-{respuesta}\r\n".encode()
+    if isinstance(respuesta, str) and respuesta.startswith('+'):
+        return f"{respuesta}\r\n".encode()
+    if isinstance(respuesta, int):
+        return f":{respuesta}\r\n".encode()
+    if isinstance(respuesta, bytes):
+        return b"$%d\r\n%s\r\n" % (len(respuesta), respuesta)
+    if isinstance(respuesta, list):
+        return f"*{len(respuesta)}\r\n".encode() + b"".join(_codificar(r) for r in respuesta)
+    raise TypeError(respuesta)
+
+
+class _Manejador(socketserver.StreamRequestHandler):
+
+    def setup(self):
+        super().setup()
+        # Sin Nagle: las respuestas de un pipeline salen de inmediato
+        self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+    def _leer_comando(self):
+        linea = self.rfile.readline()
+        if not linea:
+            return None
+        cantidad = int(linea[1:-2])
+        comando = []
+        for _ in range(cantidad):
+            largo = int(self.rfile.readline()[1:-2])
+            comando.append(self.rfile.read(largo + 2)[:-2])
+        return comando
+
+    def handle(self):
+        datos = self.server.datos
+        en_transaccion = None
+
+        while True:
+            comando = self._leer_comando()
+            if comando is None:
+                return
+
+            nombre = comando[0].upper()
+            if nombre == b'MULTI':
+                en_transaccion = []
+                respuesta = '+OK'
+            elif nombre == b'EXEC':
+                # Toda la transacción bajo el mismo lock: atómica como en Redis
+                with datos.lock:
+                    respuesta = [datos.ejecutar(c) for c in (en_transaccion or [])]
+                en_transaccion = None
+            elif en_transaccion is not None:
+                en_transaccion.append(comando)
+                respuesta = '+QUEUED'
+            else:
+                with datos.lock:
+                    respuesta = datos.ejecutar(comando)
+
+            self.wfile.write(_codificar(respuesta))
+
+
+class _Servidor(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+class FakeRedis:
+    """Servidor RESP en un hilo de fondo."""
+
+    def __init__(self, host: str = '127.0.0.1', puerto: int = 0):
+        self._servidor = _Servidor((host, puerto), _Manejador)
+        self._servidor.datos = _Datos()
+        self._hilo = None
+
+    @property
+    def url(self) -> str:
+        host, puerto = self._servidor.server_address[:2]
+        return f"redis://{host}:{puerto}/0"
+
+    def iniciar(self):
+        self._hilo = threading.Thread(target=self._servidor.serve_forever, daemon=True)
+        self._hilo.start()
+        return self
+
+    def detener(self):
+        self._servidor.shutdown()
+        self._servidor.server_close()
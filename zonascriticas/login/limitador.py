@@ -0,0 +1,158 @@
+"""
+login/limitador.py
+
+Limitador de intentos de login con **ventana deslizante** y niveles escalonados.
+
+Cada nivel usa un registro deslizante exacto (sliding log): se bloquea cuando
+hay ``limite`` eventos en los últimos ``ventana`` segundos, sin importar dónde
+caigan, así no hay ráfagas en el borde de una ventana. El registro guarda
+como mucho ``limite`` marcas de tiempo por IP y vive en el ``ContadorStore``
+activo (``login/contadores.py``).
+
+Niveles (configurables)
+-----------------------
+Los niveles se encadenan: el evento del primer nivel es un login fallido y
+el evento de cada nivel siguiente es un bloqueo del nivel anterior.
+
+- ``leve``: 5 fallos en 5 minutos -> bloqueo de 5 minutos.
+- ``grave``: 3 reincidencias (bloqueos leves) en 1 hora -> bloqueo de 24 horas.
+
+Se pueden cambiar con ``SEGURIDAD_NIVELES`` en settings.py (lista de dicts
+con nombre, limite, ventana, castigo y mensaje).
+"""
+
+import time
+from typing import Dict, Iterable, List, NamedTuple, Optional
+
+from django.conf import settings
+
+from .contadores import ContadorStore, get_store
+
+
+class Nivel(NamedTuple):
+    """Un escalón de la política de bloqueo."""
+
+    #: Nombre del nivel; forma las claves ``block_<nombre>_<ip>`` y ``log_<nombre>_<ip>``.
+    nombre: str
+    #: Eventos permitidos dentro de la ventana antes de bloquear.
+    limite: int
+    #: Tamaño de la ventana deslizante (segundos).
+    ventana: int
+    #: Duración del bloqueo (segundos).
+    castigo: int
+    #: Mensaje para el usuario bloqueado.
+    mensaje: str
+
+
+class Veredicto(NamedTuple):
+    """Resultado de verificar una IP."""
+
+    permitido: bool
+    mensaje: Optional[str] = None
+    #: Segundos hasta que termina el bloqueo (para la cabecera Retry-After).
+    reintentar_en: int = 0
+    #: Nivel que bloquea (``None`` si está permitido).
+    nivel: Optional[str] = None
+
+
+PERMITIDO = Veredicto(True)
+
+NIVELES_POR_DEFECTO = [
+    Nivel('leve', limite=5, ventana=300, castigo=300,
+          mensaje="Demasiados intentos. Espere 5 minutos."),
+    Nivel('grave', limite=3, ventana=3600, castigo=86400,
+          mensaje="IP bloqueada por 24 horas debido a actividad sospechosa."),
+]
+
+
+def niveles_configurados() -> List[Nivel]:
+    """Niveles de ``settings.SEGURIDAD_NIVELES`` o los valores por defecto."""
+    configuracion = getattr(settings, 'SEGURIDAD_NIVELES', None)
+    if not configuracion:
+        return list(NIVELES_POR_DEFECTO)
+    return [Nivel(**nivel) for nivel in configuracion]
+
+
+class LimitadorLogin:
+    """
+    Aplica la política de niveles sobre un ``ContadorStore``.
+
+    - ``verificar`` / ``verificar_multi``: UN viaje al store (lectura múltiple
+      de las banderas de bloqueo de todos los niveles y todas las IPs).
+    - ``registrar_fallo``: un ``registrar_evento`` por fallo; solo al cruzar
+      un umbral se escribe la bandera y se escala al nivel siguiente.
+
+    El valor de cada bandera de bloqueo es el instante (epoch) en que termina,
+    así el ``Retry-After`` sale de la misma lectura.
+    """
+
+    def __init__(self, niveles: Optional[List[Nivel]] = None,
+                 store: Optional[ContadorStore] = None, reloj=time.time):
+        self.niveles = niveles if niveles is not None else niveles_configurados()
+        self._store = store
+        self.reloj = reloj
+
+    @property
+    def store(self) -> ContadorStore:
+        # Si no se inyectó uno, usamos el activo (respeta set_store en tests/benchmark)
+        return self._store or get_store()
+
+    # ------------------------------------------------------------------
+    # Verificación
+    # ------------------------------------------------------------------
+
+    def verificar(self, ip: str) -> Veredicto:
+        """Veredicto para una IP con una sola lectura al store."""
+        return self.verificar_multi([ip])[ip]
+
+    def verificar_multi(self, ips: Iterable[str]) -> Dict[str, Veredicto]:
+        """
+        Veredicto para muchas IPs (ej: un proxy que reenvía varias) con UNA
+        sola lectura al store, sin importar cuántas IPs ni cuántos niveles.
+        """
+        ips = list(dict.fromkeys(ips))
+        claves = [f"block_{nivel.nombre}_{ip}" for ip in ips for nivel in self.niveles]
+        bloqueos = self.store.obtener_varios(claves) if claves else {}
+        ahora = self.reloj()
+
+        veredictos = {}
+        for ip in ips:
+            veredictos[ip] = PERMITIDO
+            # Del nivel más severo al más leve: se reporta el peor bloqueo
+            for nivel in reversed(self.niveles):
+                fin = bloqueos.get(f"block_{nivel.nombre}_{ip}")
+                if fin:
+                    veredictos[ip] = Veredicto(
+                        permitido=False,
+                        mensaje=nivel.mensaje,
+                        reintentar_en=max(1, int(fin - ahora)),
+                        nivel=nivel.nombre,
+                    )
+                    break
+        return veredictos
+
+    # ------------------------------------------------------------------
+    # Registro de fallos
+    # ------------------------------------------------------------------
+
+    def registrar_fallo(self, ip: str) -> Optional[Nivel]:
+        """
+        Registra un login fallido y escala por los niveles.
+
+        Returns
+        -------
+        Nivel | None
+            El nivel más alto que quedó bloqueado con este fallo, o ``None``.
+        """
+        store = self.store
+        bloqueado = None
+
+        for nivel in self.niveles:
+            if not store.registrar_evento(f"log_{nivel.nombre}_{ip}", nivel.ventana, nivel.limite):
+                break
+
+            # Umbral cruzado (solo esta llamada lo ve): bloqueo + evento del nivel siguiente
+            store.fijar(f"block_{nivel.nombre}_{ip}", int(self.reloj() + nivel.castigo), nivel.castigo)
+            bloqueado = nivel
+
+        return bloqueado
@@ -0,0 +1,164 @@
+from concurrent.futures import ThreadPoolExecutor
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import RequestFactory
+import logging
+import threading
+import time
+
+from login.contadores import ContadorStore, MemoriaStore, BaseDatosStore, RedisStore, set_store
+from login.fake_redis import FakeRedis
+from login.limitador import LimitadorLogin
+from login.models import ContadorSeguridad
+from login.utils import SecurityJail
+
+# Intentos de login fallidos por segundo (verificar_acceso + registrar_fallo)
+# con varios hilos concurrentes, para cada store de contadores.
+#   python manage.py benchmark_login --hilos 8 --intentos 2000
+#   python manage.py benchmark_login --stores redis --redis-url redis://localhost:6379/0
+# Sin --redis-url se levanta el servidor falso de login/fake_redis.py.
+# Con --micro se mide además el costo por operación del limitador (µs/op, un hilo):
+#   python manage.py benchmark_login --micro
+# Las IPs son del rango de documentación 198.51.100.0/24 (nunca clientes reales).
+
+PREFIJO_IP = '198.51.100.'
+
+
+class _StoreContado(ContadorStore):
+    """Envuelve un store y cuenta los viajes (una llamada = un viaje)."""
+
+    def __init__(self, store):
+        self.store = store
+        self.viajes = 0
+        self._lock = threading.Lock()
+
+    def _contar(self):
+        with self._lock:
+            self.viajes += 1
+
+    def obtener_varios(self, claves):
+        self._contar()
+        return self.store.obtener_varios(claves)
+
+    def incrementar(self, clave, ttl):
+        self._contar()
+        return self.store.incrementar(clave, ttl)
+
+    def registrar_evento(self, clave, ventana, limite):
+        self._contar()
+        return self.store.registrar_evento(clave, ventana, limite)
+
+    def fijar(self, clave, valor, ttl):
+        self._contar()
+        return self.store.fijar(clave, valor, ttl)
+
+    def eliminar(self, clave):
+        self._contar()
+        return self.store.eliminar(clave)
+
+
+class Command(BaseCommand):
+    help = 'Benchmark de SecurityJail (intentos de login/s) con los stores memoria, bd y redis'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--hilos', type=int, default=8, help='Hilos concurrentes')
+        parser.add_argument('--intentos', type=int, default=2000, help='Intentos fallidos por store')
+        parser.add_argument('--ips', type=int, default=200, help='IPs distintas simuladas')
+        parser.add_argument('--stores', type=str, default='memoria,bd,redis', help='Lista separada por comas')
+        parser.add_argument('--redis-url', type=str, default=None, help='Redis real (por defecto: servidor falso)')
+        parser.add_argument('--micro', action='store_true', help='Mide también µs por operación del limitador')
+
+    def _ronda(self, store, hilos, intentos, ips):
+        contado = _StoreContado(store)
+        set_store(contado)
+        fabrica = RequestFactory()
+        requests = [fabrica.post('/login/', REMOTE_ADDR=f'{PREFIJO_IP}{i % 250}.{i // 250}') for i in range(ips)]
+        por_hilo = intentos // hilos
+
+        def trabajar(numero):
+            try:
+                for i in range(por_hilo):
+                    request = requests[(numero * por_hilo + i) % ips]
+                    puede_pasar, _ = SecurityJail.verificar_acceso(request)
+                    if puede_pasar:
+                        SecurityJail.registrar_fallo(request)
+            finally:
+                connection.close()
+                if isinstance(store, RedisStore):
+                    store.cerrar()
+
+        inicio = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=hilos) as pool:
+            list(pool.map(trabajar, range(hilos)))
+        duracion = time.perf_counter() - inicio
+
+        total = por_hilo * hilos
+        return total / duracion, contado.viajes / total
+
+    def _micro(self, store, repeticiones=500):
+        """µs por operación (un hilo) de verificar, verificar_multi(100 IPs) y registrar_fallo."""
+        limitador = LimitadorLogin(store=store)
+        ips = [f'{PREFIJO_IP}{i}.micro' for i in range(100)]
+
+        def medir(funcion):
+            inicio = time.perf_counter()
+            for i in range(repeticiones):
+                funcion(i)
+            return (time.perf_counter() - inicio) / repeticiones * 1e6
+
+        tiempos = {
+            'verificar': medir(lambda i: limitador.verificar(ips[i % 100])),
+            'verificar_multi': medir(lambda i: limitador.verificar_multi(ips)),
+            'registrar_fallo': medir(lambda i: limitador.registrar_fallo(ips[i % 100])),
+        }
+        return ' | '.join(f'{op} {us:7.1f} µs' for op, us in tiempos.items())
+
+    def handle(self, *args, **options):
+        hilos = max(1, options['hilos'])
+        intentos = options['intentos']
+        ips = max(1, options['ips'])
+        nombres = [n.strip() for n in options['stores'].split(',') if n.strip()]
+
+        # Un warning por fallo ensuciaría la medición
+        logger_jail = logging.getLogger('login.utils')
+        nivel_original = logger_jail.level
+        logger_jail.setLevel(logging.CRITICAL + 1)
+
+        servidor_falso = None
+        resultados = []
+        self.stdout.write(self.style.WARNING(f'🚀 {intentos} intentos fallidos por store con {hilos} hilos...'))
+
+        try:
+            for nombre in nombres:
+                if nombre == 'memoria':
+                    store = MemoriaStore()
+                elif nombre == 'bd':
+                    store = BaseDatosStore()
+                elif nombre == 'redis':
+                    url = options['redis_url']
+                    if not url:
+                        servidor_falso = FakeRedis().iniciar()
+                        url = servidor_falso.url
+                        nombre = 'redis (falso)'
+                    store = RedisStore(url)
+                else:
+                    self.stdout.write(self.style.ERROR(f'Store desconocido: {nombre}'))
+                    continue
+
+                por_segundo, viajes = self._ronda(store, hilos, intentos, ips)
+                resultados.append((nombre, por_segundo, viajes))
+                self.stdout.write(f'   {nombre:<14} {por_segundo:9.1f} intentos/s | {viajes:.2f} viajes por intento')
+                if options['micro']:
+                    self.stdout.write(f'   {"":<14} {self._micro(store)}')
+        finally:
+            set_store(None)
+            logger_jail.setLevel(nivel_original)
+            ContadorSeguridad.objects.filter(clave__contains=PREFIJO_IP).delete()
+            if servidor_falso:
+                servidor_falso.detener()
+
+        msg = "\n✅ BENCHMARK FINALIZADO\n----------------------------------------\n"
+        for nombre, por_segundo, viajes in resultados:
+            msg += f" 🔐 {nombre}: {por_segundo:.1f} intentos/s ({viajes:.2f} viajes/intento)\n"
+        msg += "----------------------------------------"
+        self.stdout.write(self.style.SUCCESS(msg))
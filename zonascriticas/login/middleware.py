@@ -19,34 +19,32 @@ responsabilidades:
 
 -Este middleware inyecta request.user de forma perezosa, usando 
 la sesión como fuente de verdad, sin golpear la base de datos en cada request.
+-El usuario (con empresa y cargo) sale de la caché de login/cache_usuarios.py;
+con SESSION_MODO='cookie' o 'cache' un request autenticado no toca la BD.
 """
 from django.utils.functional import SimpleLazyObject
-from .models import Usuario
+from .cache_usuarios import obtener_usuario
 
 def get_user_from_session(request):
     """
-    Función auxiliar que realiza la consulta REAL a la base de datos.
+    Función auxiliar que resuelve el usuario (caché y, si no está, la BD).
     Solo se ejecuta cuando se accede a request.user por primera vez.
     Esto evita realizar mil consultas a la base de datos
 
     args: request
 
-    return: Usuario o None
-
-    execption: Usuario.DoesNotExist
+    return: Usuario o None (con empresa y cargo ya cargados)
     """
     user_id = request.session.get('id_usuario_logueado')
     
     if not user_id:
         return None
 
-    try:
-        user = Usuario.objects.get(pk=user_id)
-        return user
-    except Usuario.DoesNotExist:
+    user = obtener_usuario(user_id)
+    if user is None:
         # Si el ID está en sesión pero el usuario fue borrado de la BD
         request.session.flush() 
-        return None
+    return user
 
 class CustomAuthMiddleware:
     def __init__(self, get_response):
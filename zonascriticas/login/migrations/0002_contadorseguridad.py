@@ -0,0 +1,25 @@
+# Generated by Django 4.2.25 on 2026-10-18 05:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('login', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ContadorSeguridad',
+            fields=[
+                ('clave', models.CharField(max_length=200, primary_key=True, serialize=False)),
+                ('valor', models.IntegerField(default=0)),
+                ('expira', models.FloatField(db_index=True)),
+            ],
+            options={
+                'db_table': 'contadores_seguridad',
+                'managed': True,
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.25 on 2026-10-18 05:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('login', '0002_contadorseguridad'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='contadorseguridad',
+            name='eventos',
+            field=models.TextField(blank=True, default=''),
+        ),
+    ]
@@ -11,6 +11,7 @@ los datos que se pueden ver a continuacion
 """
 from django.db import models
 from empresas.models import Empresa, Cargo 
+from .cache_usuarios import invalidar_usuario
 
 class Usuario(models.Model):
     """
@@ -106,8 +107,43 @@ class Usuario(models.Model):
     def __str__(self):
         return self.email or f"Usuario {self.id}"
 
+    # --- Invalidación de la caché de CustomAuthMiddleware (login/cache_usuarios.py) ---
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        invalidar_usuario(self.pk)
+
+    def delete(self, *args, **kwargs):
+        user_id = self.pk
+        resultado = super().delete(*args, **kwargs)
+        invalidar_usuario(user_id)
+        return resultado
+
     class Meta:
         # Le decimos a Django que cree esta tabla
         # localmente para nosotros.
         managed = True 
-        db_table = 'usuarios' # El nombre de la BD real
\ No newline at end of file
+        db_table = 'usuarios' # El nombre de la BD real
+
+class ContadorSeguridad(models.Model):
+    """
+    Contadores volátiles de SecurityJail cuando se usa el store de base de datos
+    (login/contadores.py -> BaseDatosStore).
+
+    'expira' se guarda como epoch en segundos (float) para poder compararlo
+    dentro de una sentencia sin depender de las funciones de fecha de cada motor.
+    """
+    clave = models.CharField(max_length=200, primary_key=True)
+    valor = models.IntegerField(default=0)
+    expira = models.FloatField(db_index=True)
+
+    # Registro deslizante de login/limitador.py: marcas de tiempo separadas por comas
+    # (como mucho el límite del nivel, ej: 5). En ese caso 'valor' es la versión (CAS).
+    eventos = models.TextField(blank=True, default='')
+
+    def __str__(self):
+        return f"{self.clave}={self.valor}"
+
+    class Meta:
+        managed = True
+        db_table = 'contadores_seguridad'
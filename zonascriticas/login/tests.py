@@ -1,3 +1,452 @@
-from django.test import TestCase
+from django.contrib.sessions.middleware import SessionMiddleware
+from django.core.cache import caches
+from django.http import HttpResponse
+from django.test import TestCase, RequestFactory, SimpleTestCase, override_settings
+import random
+import threading
+import time
+from abc import ABC, abstractmethod
+from unittest import mock
 
-# Si algo falla puedes testear aqui
\ No newline at end of file
+from .contadores import MemoriaStore, BaseDatosStore, RedisStore, set_store
+from .fake_redis import FakeRedis
+from .limitador import LimitadorLogin, NIVELES_POR_DEFECTO
+from .middleware import CustomAuthMiddleware
+from .models import Usuario
+from empresas.models import Empresa, Cargo
+from empresas.services import actualizar_estado_empresa
+from .utils import SecurityJail
+
+
+class ContratoStoreMixin(ABC):
+    """
+    Mismo contrato para los tres stores: incremento atómico con ventana fija,
+    registro deslizante, lectura múltiple en un viaje, fijar y eliminar.
+    """
+
+    @abstractmethod
+    def crear_store(self):
+        ...
+
+    def setUp(self):
+        super().setUp()
+        self.store = self.crear_store()
+
+    def test_incrementar_y_leer(self):
+        self.assertEqual(self.store.incrementar('attempts_1.1.1.1', 60), 1)
+        self.assertEqual(self.store.incrementar('attempts_1.1.1.1', 60), 2)
+        self.store.fijar('block_leve_1.1.1.1', 1, 60)
+
+        self.assertEqual(
+            self.store.obtener_varios(['attempts_1.1.1.1', 'block_leve_1.1.1.1', 'no_existe']),
+            {'attempts_1.1.1.1': 2, 'block_leve_1.1.1.1': 1},
+        )
+
+        self.store.eliminar('attempts_1.1.1.1')
+        self.assertEqual(self.store.obtener_varios(['attempts_1.1.1.1']), {})
+
+    def test_ventana_expira_y_reinicia(self):
+        self.store.incrementar('attempts_2.2.2.2', 0.05)
+        self.store.incrementar('attempts_2.2.2.2', 0.05)
+        time.sleep(0.1)
+
+        self.assertEqual(self.store.obtener_varios(['attempts_2.2.2.2']), {})
+        self.assertEqual(self.store.incrementar('attempts_2.2.2.2', 60), 1)
+
+    def test_registro_deslizante(self):
+        self.assertFalse(self.store.registrar_evento('log_leve_5.5.5.5', 60, 3))
+        self.assertFalse(self.store.registrar_evento('log_leve_5.5.5.5', 60, 3))
+        self.assertTrue(self.store.registrar_evento('log_leve_5.5.5.5', 60, 3))
+
+        # Al cruzar el umbral el registro se vacía: se empieza de cero
+        self.assertFalse(self.store.registrar_evento('log_leve_5.5.5.5', 60, 3))
+
+    def test_registro_deslizante_olvida_eventos_viejos(self):
+        self.store.registrar_evento('log_leve_6.6.6.6', 0.05, 2)
+        time.sleep(0.1)
+        self.assertFalse(self.store.registrar_evento('log_leve_6.6.6.6', 0.05, 2))
+        self.assertTrue(self.store.registrar_evento('log_leve_6.6.6.6', 0.05, 2))
+
+
+class MemoriaStoreTestCase(ContratoStoreMixin, TestCase):
+
+    def crear_store(self):
+        return MemoriaStore(shards=4)
+
+    def test_incremento_concurrente_es_atomico(self):
+        def golpear():
+            for _ in range(500):
+                self.store.incrementar('attempts_3.3.3.3', 60)
+
+        hilos = [threading.Thread(target=golpear) for _ in range(8)]
+        for h in hilos:
+            h.start()
+        for h in hilos:
+            h.join()
+
+        self.assertEqual(self.store.obtener_varios(['attempts_3.3.3.3']), {'attempts_3.3.3.3': 4000})
+
+    def test_registro_deslizante_concurrente_cruza_una_vez(self):
+        cruces = []
+
+        def golpear():
+            for _ in range(100):
+                if self.store.registrar_evento('log_leve_3.3.3.3', 60, 5):
+                    cruces.append(1)
+
+        hilos = [threading.Thread(target=golpear) for _ in range(8)]
+        for h in hilos:
+            h.start()
+        for h in hilos:
+            h.join()
+
+        # 800 eventos, el registro se vacía en cada cruce: exactamente 800 / 5
+        self.assertEqual(len(cruces), 160)
+
+
+class BaseDatosStoreTestCase(ContratoStoreMixin, TestCase):
+
+    def crear_store(self):
+        return BaseDatosStore()
+
+    def test_un_solo_viaje_por_operacion(self):
+        self.store.PROBABILIDAD_PURGA = 0
+        with self.assertNumQueries(1):
+            self.store.obtener_varios(['block_grave_4.4.4.4', 'block_leve_4.4.4.4'])
+        with self.assertNumQueries(2):
+            # Fila nueva: SELECT + INSERT
+            self.store.registrar_evento('log_leve_4.4.4.4', 60, 5)
+        with self.assertNumQueries(2):
+            # Fila existente: SELECT + UPDATE condicionado a la versión
+            self.store.registrar_evento('log_leve_4.4.4.4', 60, 5)
+
+    def test_contencion_persistente_no_descarta_el_evento(self):
+        # Todos los compare-and-swap pierden: el evento se registra igual con bloqueo de fila
+        with mock.patch.object(self.store, '_intento_cas', return_value=None) as intento:
+            self.assertFalse(self.store.registrar_evento('log_leve_7.7.7.7', 60, 3))
+            self.assertFalse(self.store.registrar_evento('log_leve_7.7.7.7', 60, 3))
+            self.assertEqual(self.store.modelo.objects.get(clave='log_leve_7.7.7.7').eventos.count(',') + 1, 2)
+            self.assertTrue(self.store.registrar_evento('log_leve_7.7.7.7', 60, 3))
+
+        self.assertEqual(intento.call_count, 3 * self.store.REINTENTOS_CAS)
+
+
+class RedisStoreTestCase(ContratoStoreMixin, TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.servidor = FakeRedis().iniciar()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.servidor.detener()
+        super().tearDownClass()
+
+    def crear_store(self):
+        return RedisStore(self.servidor.url)
+
+    def tearDown(self):
+        self.store.cerrar()
+        super().tearDown()
+
+
+class SecurityJailTestCase(TestCase):
+    """
+    Política escalonada (leve -> grave) sobre el store de base de datos.
+    """
+
+    def setUp(self):
+        self.store = BaseDatosStore()
+        self.store.PROBABILIDAD_PURGA = 0
+        set_store(self.store)
+        self.request = RequestFactory().post('/login/', REMOTE_ADDR='10.0.0.7')
+        self.leve, self.grave = NIVELES_POR_DEFECTO
+
+    def tearDown(self):
+        set_store(None)
+
+    def test_verificacion_es_un_solo_viaje(self):
+        with self.assertNumQueries(1):
+            self.assertEqual(SecurityJail.verificar_acceso(self.request), (True, None))
+
+    def test_verificacion_multi_es_un_solo_viaje(self):
+        for _ in range(self.leve.limite):
+            SecurityJail.registrar_fallo(self.request)
+
+        ips = [f'10.0.1.{i}' for i in range(50)] + ['10.0.0.7']
+        with self.assertNumQueries(1):
+            veredictos = SecurityJail.verificar_acceso_multi(ips)
+
+        self.assertEqual(len(veredictos), 51)
+        self.assertTrue(veredictos['10.0.1.3'].permitido)
+        self.assertFalse(veredictos['10.0.0.7'].permitido)
+        self.assertEqual(veredictos['10.0.0.7'].nivel, 'leve')
+        self.assertGreater(veredictos['10.0.0.7'].reintentar_en, 0)
+
+    def test_bloqueo_leve_y_grave(self):
+        for _ in range(self.leve.limite):
+            SecurityJail.registrar_fallo(self.request)
+
+        puede, mensaje = SecurityJail.verificar_acceso(self.request)
+        self.assertFalse(puede)
+        self.assertIn('5 minutos', mensaje)
+
+        # Las reincidencias llevan al bloqueo grave
+        for _ in range(self.grave.limite - 1):
+            self.store.eliminar('block_leve_10.0.0.7')
+            for _ in range(self.leve.limite):
+                SecurityJail.registrar_fallo(self.request)
+
+        puede, mensaje = SecurityJail.verificar_acceso(self.request)
+        self.assertFalse(puede)
+        self.assertIn('24 horas', mensaje)
+
+    def test_login_bloqueado_responde_retry_after(self):
+        for _ in range(self.leve.limite):
+            SecurityJail.registrar_fallo(self.request)
+
+        respuesta = self.client.post('/api/login/', {'documento': '123'}, REMOTE_ADDR='10.0.0.7')
+
+        self.assertEqual(respuesta.status_code, 429)
+        self.assertTrue(0 < int(respuesta['Retry-After']) <= self.leve.castigo)
+
+    def test_fallos_concurrentes_cuentan_un_solo_strike(self):
+        # Con el get_or_set + incr anterior, dos workers podían leer el mismo
+        # valor; ahora solo quien cruza el umbral registra la reincidencia.
+        store = MemoriaStore()
+        set_store(store)
+        barrera = threading.Barrier(8)
+
+        def fallar():
+            barrera.wait()
+            SecurityJail.registrar_fallo(self.request)
+
+        hilos = [threading.Thread(target=fallar) for _ in range(8)]
+        with self.assertLogs('login.utils', level='WARNING') as logs:
+            for h in hilos:
+                h.start()
+            for h in hilos:
+                h.join()
+
+        bloqueos = [linea for linea in logs.output if 'bloqueo leve' in linea]
+        self.assertEqual(len(bloqueos), 1)
+        self.assertFalse(SecurityJail.verificar_acceso(self.request)[0])
+
+
+class RelojFalso:
+    """Reloj manual: los tests avanzan el tiempo sin dormir."""
+
+    def __init__(self):
+        self.ahora = 1_000_000.0
+
+    def __call__(self):
+        return self.ahora
+
+
+class VentanaFijaAnterior:
+    """
+    Modelo de referencia de la política anterior (ventana fija que empieza
+    con el primer fallo y se reinicia al bloquear). Sirve para comparar.
+    """
+
+    def __init__(self, leve, grave):
+        self.leve, self.grave = leve, grave
+        self.intentos = (0, 0.0)   # (conteo, fin de ventana)
+        self.strikes = (0, 0.0)
+        self.fin_leve = self.fin_grave = 0.0
+
+    def permitido(self, t):
+        return t >= self.fin_leve and t >= self.fin_grave
+
+    def registrar_fallo(self, t):
+        conteo, fin = self.intentos
+        if fin <= t:
+            conteo, fin = 0, t + self.leve.ventana
+        conteo += 1
+        self.intentos = (conteo, fin)
+        if conteo < self.leve.limite:
+            return None
+
+        self.fin_leve = t + self.leve.castigo
+        self.intentos = (0, 0.0)
+        strikes, fin = self.strikes
+        if fin <= t:
+            strikes, fin = 0, t + self.grave.ventana
+        strikes += 1
+        self.strikes = (strikes, fin)
+        if strikes >= self.grave.limite:
+            self.fin_grave = t + self.grave.castigo
+            return self.grave
+        return self.leve
+
+
+class LimitadorPropiedadesTestCase(SimpleTestCase):
+    """
+    Propiedades de la ventana deslizante frente a la ventana fija anterior,
+    con un reloj falso y miles de secuencias de ataque aleatorias.
+    """
+
+    SECUENCIAS = 300
+
+    def setUp(self):
+        self.reloj = RelojFalso()
+        self.leve, self.grave = NIVELES_POR_DEFECTO
+
+    def crear_limitador(self):
+        return LimitadorLogin(NIVELES_POR_DEFECTO, MemoriaStore(reloj=self.reloj), reloj=self.reloj)
+
+    def atacar(self, tiempos, permitido, registrar):
+        """Reproduce los intentos: solo cuenta como fallo si no estaba bloqueado."""
+        admitidos, primer_bloqueo = [], None
+        for t in tiempos:
+            self.reloj.ahora = t
+            if not permitido(t):
+                continue
+            admitidos.append(t)
+            if registrar(t) is not None and primer_bloqueo is None:
+                primer_bloqueo = len(admitidos)
+        return admitidos, primer_bloqueo
+
+    def atacar_nuevo(self, tiempos):
+        limitador = self.crear_limitador()
+        return self.atacar(
+            tiempos,
+            lambda t: limitador.verificar('203.0.113.9').permitido,
+            lambda t: limitador.registrar_fallo('203.0.113.9'),
+        )
+
+    def atacar_anterior(self, tiempos):
+        anterior = VentanaFijaAnterior(self.leve, self.grave)
+        return self.atacar(tiempos, anterior.permitido, anterior.registrar_fallo)
+
+    def secuencias(self):
+        azar = random.Random(2024)
+        for _ in range(self.SECUENCIAS):
+            t, tiempos = 1_000_000.0, []
+            for _ in range(azar.randint(5, 60)):
+                # Mezcla de ráfagas (segundos) y pausas largas (minutos)
+                t += azar.choice([azar.uniform(0, 5), azar.uniform(30, 200), azar.uniform(200, 400)])
+                tiempos.append(round(t, 3))
+            yield tiempos
+
+    def test_nunca_bloquea_despues_que_la_ventana_fija(self):
+        for tiempos in self.secuencias():
+            _, nuevo = self.atacar_nuevo(tiempos)
+            _, anterior = self.atacar_anterior(tiempos)
+            if anterior is not None:
+                self.assertIsNotNone(nuevo, tiempos)
+                self.assertLessEqual(nuevo, anterior, tiempos)
+
+    def test_nunca_admite_mas_del_limite_en_una_ventana(self):
+        for tiempos in self.secuencias():
+            admitidos, _ = self.atacar_nuevo(tiempos)
+            for i, inicio in enumerate(admitidos):
+                dentro = [t for t in admitidos[i:] if t < inicio + self.leve.ventana]
+                self.assertLessEqual(len(dentro), self.leve.limite, tiempos)
+
+    def test_rafagas_rapidas_bloquean_igual_que_antes(self):
+        tiempos = [1_000_000.0 + i for i in range(20)]
+        self.assertEqual(self.atacar_nuevo(tiempos), self.atacar_anterior(tiempos))
+
+    def test_rafaga_en_el_borde_de_la_ventana(self):
+        # 1 fallo, y 8 más justo alrededor del fin de la ventana fija
+        base = 1_000_000.0
+        tiempos = [base] + [base + 299 + i * 0.1 for i in range(3)] + [base + 300 + i * 0.1 for i in range(5)]
+
+        admitidos_anterior, _ = self.atacar_anterior(tiempos)
+        admitidos_nuevo, _ = self.atacar_nuevo(tiempos)
+
+        # Antes: 8 intentos en ~1.5 s; ahora se bloquea en el quinto de la ráfaga
+        rafaga_anterior = [t for t in admitidos_anterior if t >= base + 299]
+        rafaga_nueva = [t for t in admitidos_nuevo if t >= base + 299]
+        self.assertEqual(len(rafaga_anterior), 8)
+        self.assertEqual(len(rafaga_nueva), self.leve.limite)
+
+    def test_reincidencias_escalan_a_grave(self):
+        limitador = self.crear_limitador()
+        for _ in range(self.grave.limite):
+            self.reloj.ahora += self.leve.castigo + 1
+            for _ in range(self.leve.limite):
+                nivel = limitador.registrar_fallo('203.0.113.9')
+
+        veredicto = limitador.verificar('203.0.113.9')
+        self.assertEqual(nivel, self.grave)
+        self.assertEqual(veredicto.nivel, 'grave')
+        self.assertEqual(veredicto.reintentar_en, self.grave.castigo)
+
+
+class CacheUsuarioMiddlewareTestCase(TestCase):
+    """
+    CustomAuthMiddleware resuelve request.user desde la caché 'usuarios'
+    (con empresa y cargo) y la caché se invalida cuando el usuario cambia.
+    """
+
+    def setUp(self):
+        caches['usuarios'].clear()
+        self.empresa = Empresa.objects.create(nombre_empresa='Jolifoods', nit='900')
+        self.usuario = Usuario.objects.create(
+            email='cache@test.com', first_name='Ana', numero_documento='777',
+            empresa=self.empresa, cargo=Cargo.objects.create(nombre='Técnico'),
+        )
+
+    def procesar(self, cookies=None):
+        """Pasa un GET por SessionMiddleware + CustomAuthMiddleware y retorna el usuario."""
+        vistos = []
+
+        def vista(request):
+            usuario = request.user
+            if usuario:
+                vistos.append((usuario.first_name, usuario.is_active,
+                               usuario.empresa.nombre_empresa, usuario.cargo.nombre))
+            return HttpResponse()
+
+        request = RequestFactory().get('/')
+        request.COOKIES.update(cookies or {})
+        SessionMiddleware(CustomAuthMiddleware(vista))(request)
+        return vistos[0] if vistos else None
+
+    def iniciar_sesion(self):
+        respuesta = self.client.post('/api/login/', {'documento': '777'})
+        self.assertEqual(respuesta.status_code, 200)
+        return {nombre: cookie.value for nombre, cookie in self.client.cookies.items()}
+
+    @override_settings(SESSION_ENGINE='django.contrib.sessions.backends.signed_cookies')
+    def test_sesion_firmada_y_cache_cero_consultas(self):
+        cookies = self.iniciar_sesion()
+        self.procesar(cookies)  # primera vez: llena la caché
+
+        with self.assertNumQueries(0):
+            self.assertEqual(self.procesar(cookies), ('Ana', True, 'Jolifoods', 'Técnico'))
+
+    def test_sesion_en_bd_solo_consulta_la_sesion(self):
+        cookies = self.iniciar_sesion()
+        self.procesar(cookies)
+
+        with self.assertNumQueries(1):
+            self.procesar(cookies)
+
+    def test_save_invalida_la_cache(self):
+        cookies = self.iniciar_sesion()
+        self.procesar(cookies)
+
+        self.usuario.first_name = 'Ana María'
+        self.usuario.save()
+
+        self.assertEqual(self.procesar(cookies)[0], 'Ana María')
+
+    def test_desactivar_empresa_invalida_empleados(self):
+        cookies = self.iniciar_sesion()
+        self.assertTrue(self.procesar(cookies)[1])
+
+        actualizar_estado_empresa(self.empresa, False)
+
+        self.assertFalse(self.procesar(cookies)[1])
+
+    def test_usuario_borrado_cierra_la_sesion(self):
+        cookies = self.iniciar_sesion()
+        self.procesar(cookies)
+
+        self.usuario.delete()
+
+        self.assertIsNone(self.procesar(cookies))
@@ -4,17 +4,20 @@ login/utils.py
 Utilidades de seguridad para el módulo de autenticación.
 
 Este módulo implementa un mecanismo de **rate limiting escalonado** basado en IP
-(Tiered Rate Limiting) utilizando el backend de **cache de Django**. Su objetivo es
+(Tiered Rate Limiting) sobre un **store de contadores** intercambiable
+(``login/contadores.py``: memoria, base de datos o Redis). Su objetivo es
 mitigar ataques de fuerza bruta durante el proceso de login mediante:
 
-- Conteo de intentos fallidos dentro de una ventana temporal.
+- Conteo de intentos fallidos dentro de una ventana **deslizante** (``login/limitador.py``).
 - Bloqueos temporales (leves) tras exceder un umbral de intentos.
 - Bloqueo prolongado (grave) ante reincidencia.
 
 Características clave
 ---------------------
-- Diseño *stateless*: no persiste información en base de datos.
-- Compatible con distintos backends de cache (memoria local, Redis, Memcached).
+- Un solo viaje al store por verificación (lectura múltiple), también para
+  muchas IPs a la vez (``verificar_acceso_multi``).
+- Store configurable con ``SEGURIDAD_CONTADOR_STORE`` (memoria, bd, redis).
+- Niveles configurables con ``SEGURIDAD_NIVELES`` (leve, grave, ...).
 - Centraliza la política de seguridad para facilitar auditoría y mantenimiento.
 
 Uso típico
@@ -31,9 +34,10 @@ Notas de seguridad
 Escrito por Juan Esteban Osorno Duque 😎
 """
 
-from django.core.cache import cache
 import logging
-from typing import Optional, Tuple
+from typing import Dict, Iterable, Optional, Tuple
+
+from .limitador import LimitadorLogin, Veredicto
 
 logger = logging.getLogger(__name__)
 
@@ -42,38 +46,30 @@ class SecurityJail:
     """
     Gestor de bloqueos escalonados por IP.
 
-    Esta clase encapsula la lógica de control de accesos fallidos al sistema de login.
-    Utiliza la cache de Django para almacenar contadores volátiles y banderas de bloqueo.
+    Fachada sobre ``LimitadorLogin`` (ventana deslizante + niveles). Se
+    mantiene la API de siempre (``verificar_acceso`` / ``registrar_fallo``)
+    para que las vistas no dependan de la implementación.
 
     Flujo general:
     1. Se verifica si la IP está bloqueada (leve o grave).
-    2. En caso de fallo de autenticación, se incrementan los contadores.
+    2. En caso de fallo de autenticación, se registra el evento.
     3. Al superar umbrales, se aplican bloqueos temporales o prolongados.
     """
 
-    # ------------------------------------------------------------------
-    # Configuración de reglas (política de seguridad)
-    # ------------------------------------------------------------------
-
-    #: Número máximo de intentos fallidos permitidos antes del bloqueo leve.
-    MAX_INTENTOS_LEVES: int = 5
-
-    #: Ventana temporal (en segundos) para contar intentos fallidos.
-    TIEMPO_VENTANA_LEVE: int = 300  # 5 minutos
-
-    #: Duración del bloqueo leve (en segundos).
-    TIEMPO_CASTIGO_LEVE: int = 300  # 5 minutos
-
-    #: Número de reincidencias (bloqueos leves) permitidas antes del bloqueo grave.
-    MAX_REINCIDENCIAS: int = 3
-
-    #: Duración del bloqueo grave (en segundos).
-    TIEMPO_CASTIGO_GRAVE: int = 86400  # 24 horas
+    #: Limitador compartido por el proceso (se crea la primera vez que se usa).
+    _limitador: Optional[LimitadorLogin] = None
 
     # ------------------------------------------------------------------
     # Métodos auxiliares
     # ------------------------------------------------------------------
 
+    @classmethod
+    def get_limitador(cls) -> LimitadorLogin:
+        """Retorna el limitador con los niveles de settings."""
+        if cls._limitador is None:
+            cls._limitador = LimitadorLogin()
+        return cls._limitador
+
     @staticmethod
     def get_client_ip(request) -> Optional[str]:
         """
@@ -101,6 +97,21 @@ class SecurityJail:
     # API pública
     # ------------------------------------------------------------------
 
+    @classmethod
+    def verificar(cls, request) -> Veredicto:
+        """
+        Igual que ``verificar_acceso`` pero retorna el ``Veredicto`` completo
+        (incluye ``reintentar_en`` para la cabecera ``Retry-After``).
+        """
+        ip = cls.get_client_ip(request)
+
+        if not ip:
+            # En caso extremo, permitimos el acceso pero dejamos trazabilidad
+            logger.error("No se pudo determinar la IP del cliente.")
+            return Veredicto(True)
+
+        return cls.get_limitador().verificar(ip)
+
     @classmethod
     def verificar_acceso(cls, request) -> Tuple[bool, Optional[str]]:
         """
@@ -117,24 +128,28 @@ class SecurityJail:
             - ``(True, None)`` si el acceso está permitido.
             - ``(False, mensaje)`` si la IP está bloqueada.
         """
-        ip = cls.get_client_ip(request)
+        veredicto = cls.verificar(request)
+        return veredicto.permitido, veredicto.mensaje
 
-        if not ip:
-            # En caso extremo, permitimos el acceso pero dejamos trazabilidad
-            logger.error("No se pudo determinar la IP del cliente.")
-            return True, None
+    @classmethod
+    def verificar_acceso_multi(cls, ips: Iterable[str]) -> Dict[str, Veredicto]:
+        """
+        Verifica muchas IPs con una sola lectura al store.
 
-        # 1. Bloqueo grave (24h)
-        key_grave = f"block_grave_{ip}"
-        if cache.get(key_grave):
-            return False, "IP bloqueada por 24 horas debido a actividad sospechosa."
+        Pensado para proxies o gateways que reenvían varias IPs de clientes
+        y necesitan saber cuáles están bloqueadas sin N consultas.
 
-        # 2. Bloqueo leve
-        key_leve = f"block_leve_{ip}"
-        if cache.get(key_leve):
-            return False, "Demasiados intentos. Espere 5 minutos."
+        Parameters
+        ----------
+        ips : iterable de str
+            Direcciones a verificar (se ignoran vacías y duplicadas).
 
-        return True, None
+        Returns
+        -------
+        dict
+            ``{ip: Veredicto}``.
+        """
+        return cls.get_limitador().verificar_multi(ip for ip in ips if ip)
 
     @classmethod
     def registrar_fallo(cls, request) -> None:
@@ -155,50 +170,13 @@ class SecurityJail:
             logger.error("Intento fallido sin IP identificable.")
             return
 
-        # Keys de cache
-        key_intentos = f"attempts_{ip}"
-        key_reincidencias = f"strikes_{ip}"
-
-        # 1. Incrementar contador de intentos dentro de la ventana
-        intentos = cache.get_or_set(
-            key_intentos,
-            0,
-            timeout=cls.TIEMPO_VENTANA_LEVE,
-        )
-        cache.incr(key_intentos)
-
-        attempts_actuales = intentos + 1
-        logger.warning(
-            "Login fallido desde %s. Intento %s/%s",
-            ip,
-            attempts_actuales,
-            cls.MAX_INTENTOS_LEVES,
-        )
-
-        # 2. Evaluar bloqueo leve
-        if attempts_actuales >= cls.MAX_INTENTOS_LEVES:
-            key_block_leve = f"block_leve_{ip}"
-            cache.set(key_block_leve, True, cls.TIEMPO_CASTIGO_LEVE)
-
-            # Reiniciamos el contador de intentos
-            cache.delete(key_intentos)
-
-            # Registrar reincidencia (strike)
-            strikes = cache.get_or_set(key_reincidencias, 0, timeout=3600)
-            cache.incr(key_reincidencias)
-
-            logger.warning(
-                "IP %s enviada a bloqueo leve. Strike %s/%s",
-                ip,
-                strikes + 1,
-                cls.MAX_REINCIDENCIAS,
-            )
-
-            # 3. Evaluar bloqueo grave
-            if (strikes + 1) >= cls.MAX_REINCIDENCIAS:
-                key_block_grave = f"block_grave_{ip}"
-                cache.set(key_block_grave, True, cls.TIEMPO_CASTIGO_GRAVE)
-                logger.critical(
-                    "IP %s bloqueada por 24 horas (posible fuerza bruta).",
-                    ip,
-                )
+        logger.warning("Login fallido desde %s.", ip)
+
+        nivel = cls.get_limitador().registrar_fallo(ip)
+        if nivel is None:
+            return
+
+        if nivel is cls.get_limitador().niveles[-1]:
+            logger.critical("IP %s bloqueada (nivel %s, posible fuerza bruta).", ip, nivel.nombre)
+        else:
+            logger.warning("IP %s enviada a bloqueo %s.", ip, nivel.nombre)
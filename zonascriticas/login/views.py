@@ -122,13 +122,15 @@ def login_api(request: HttpRequest) -> JsonResponse:
     # --------------------------------------------------------------
     # 1. FASE DE SEGURIDAD: control de abuso por IP
     # --------------------------------------------------------------
-    puede_pasar, mensaje_error = SecurityJail.verificar_acceso(request)
-    if not puede_pasar:
-        # 429 Too Many Requests
-        return JsonResponse(
-            {"status": False, "mensaje": mensaje_error},
+    veredicto = SecurityJail.verificar(request)
+    if not veredicto.permitido:
+        # 429 Too Many Requests (+ Retry-After con los segundos que faltan)
+        respuesta = JsonResponse(
+            {"status": False, "mensaje": veredicto.mensaje},
             status=429,
         )
+        respuesta["Retry-After"] = str(veredicto.reintentar_en)
+        return respuesta
 
     # --------------------------------------------------------------
     # 2. FASE DE VALIDACIÓN: lectura de datos
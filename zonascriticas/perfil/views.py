@@ -6,6 +6,7 @@ from django.http import HttpRequest, HttpResponse, JsonResponse
 from django.views.decorators.http import require_POST
 from django.templatetags.static import static
 from login.decorators import login_custom_required
+from home.imagenes import ColaImagenes
 
 @login_custom_required
 def perfil_view(request: HttpRequest) -> HttpResponse:
@@ -74,6 +75,7 @@ def update_image_api(request: HttpRequest) -> JsonResponse:
         # 2. Asigna y guarda
         user.img = image_file
         user.save(update_fields=['img'])
+        ColaImagenes.encolar(user, 'img')
         
         # 3. Responde con la nueva URL de la imagen
         return JsonResponse({
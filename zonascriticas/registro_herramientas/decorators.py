@@ -1,7 +1,5 @@
 from functools import wraps
-from descargo_responsabilidad.models import RegistroIngreso
 from home.utils import api_response
-from django.db.models import Q
 
 def requiere_ingreso_activo_o_pendiente(view_func):
     """
@@ -10,13 +8,8 @@ def requiere_ingreso_activo_o_pendiente(view_func):
     """
     @wraps(view_func)
     def _wrapped_view(request, *args, **kwargs):
-        # Buscamos un ingreso que sea del usuario y NO esté finalizado
-        ingreso = RegistroIngreso.objects.filter(
-            visitante=request.user
-        ).filter(
-            Q(estado=RegistroIngreso.EstadoOpciones.PENDIENTE_HERRAMIENTAS) | 
-            Q(estado=RegistroIngreso.EstadoOpciones.EN_ZONA)
-        ).first()
+        # El ingreso del usuario que NO esté finalizado (lo carga el middleware una sola vez)
+        ingreso = request.ingreso_activo
 
         if not ingreso:
             return api_response(
@@ -0,0 +1,90 @@
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+import time
+
+from descargo_responsabilidad.models import RegistroIngreso, Ubicacion
+from login.models import Usuario
+from registro_herramientas.models import InventarioHerramienta, HerramientaIngresada
+from registro_herramientas.services import HerramientasService
+
+# Compara el carrito masivo ítem por ítem (agregar_item_al_carrito en bucle, como antes)
+# con el camino por conjuntos de gestion_masiva_carrito.
+#   python manage.py benchmark_carrito --items 500
+# Todo corre dentro de una transacción que se revierte al final: no deja datos.
+
+
+class _Revertir(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = 'Benchmark de gestion_masiva_carrito (bucle vs. por conjuntos)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--items', type=int, default=500, help='Ítems en el carrito')
+
+    def _datos(self, items):
+        visitante = Usuario.objects.create(
+            first_name='Benchmark Carrito', numero_documento='bench-carrito', email='bench-carrito@example.com'
+        )
+        ubicacion = Ubicacion.objects.create(
+            nombre='Zona Benchmark', codigo_qr='BENCH-CARRITO', freshservice_id=-990001
+        )
+        inventario = InventarioHerramienta.objects.bulk_create([
+            InventarioHerramienta(usuario=visitante, nombre=f'Equipo {i}', marca_serial=f'BENCH-{i}')
+            for i in range(items)
+        ])
+
+        def nuevo_ingreso():
+            return RegistroIngreso.objects.create(
+                visitante=visitante, responsable=visitante, ubicacion=ubicacion,
+                estado=RegistroIngreso.EstadoOpciones.PENDIENTE_HERRAMIENTAS
+            )
+        return [item.id for item in inventario], nuevo_ingreso
+
+    def _medir(self, funcion):
+        with CaptureQueriesContext(connection) as consultas:
+            inicio = time.perf_counter()
+            funcion()
+            duracion = time.perf_counter() - inicio
+        return duracion, len(consultas)
+
+    def handle(self, *args, **options):
+        items = max(1, options['items'])
+        self.stdout.write(self.style.WARNING(f'🚀 Carrito de {items} ítems...'))
+        resultados = {}
+
+        try:
+            with transaction.atomic():
+                ids, nuevo_ingreso = self._datos(items)
+
+                # 1. Bucle anterior: get + get_or_create (+ save) por ítem
+                ingreso = nuevo_ingreso()
+                resultados['bucle (agregar)'] = self._medir(
+                    lambda: [HerramientasService.agregar_item_al_carrito(ingreso, i) for i in ids]
+                )
+
+                # 2. Por conjuntos: agregar, sacar la mitad (SALIO), reactivar y remover
+                ingreso = nuevo_ingreso()
+                resultados['masivo (agregar)'] = self._medir(
+                    lambda: HerramientasService.gestion_masiva_carrito(ingreso, ids, 'AGREGAR')
+                )
+                HerramientaIngresada.objects.filter(
+                    registro_ingreso=ingreso, herramienta_inventario_id__in=ids[::2]
+                ).update(estado=HerramientaIngresada.EstadoHerramienta.SALIO)
+                resultados['masivo (reactivar)'] = self._medir(
+                    lambda: HerramientasService.gestion_masiva_carrito(ingreso, ids, 'AGREGAR')
+                )
+                resultados['masivo (remover)'] = self._medir(
+                    lambda: HerramientasService.gestion_masiva_carrito(ingreso, ids, 'REMOVER')
+                )
+                raise _Revertir()
+        except _Revertir:
+            pass
+
+        msg = "\n✅ BENCHMARK FINALIZADO\n----------------------------------------\n"
+        for nombre, (duracion, consultas) in resultados.items():
+            msg += f" 🧰 {nombre:<20} {duracion * 1000:9.1f} ms | {consultas:5d} consultas\n"
+        msg += "----------------------------------------"
+        self.stdout.write(self.style.SUCCESS(msg))
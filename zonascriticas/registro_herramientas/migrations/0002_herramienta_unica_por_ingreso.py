@@ -0,0 +1,34 @@
+# Generated by Django 4.2.25 on 2026-10-18 05:26
+
+from django.db import migrations, models
+from django.db.models import Count, Min
+
+
+def quitar_duplicados(apps, schema_editor):
+    """Si una herramienta quedó dos veces en el mismo ingreso, se conserva el primer registro."""
+    HerramientaIngresada = apps.get_model('registro_herramientas', 'HerramientaIngresada')
+
+    duplicados = HerramientaIngresada.objects.values(
+        'registro_ingreso_id', 'herramienta_inventario_id'
+    ).annotate(total=Count('id'), primero=Min('id')).filter(total__gt=1)
+
+    for grupo in duplicados:
+        HerramientaIngresada.objects.filter(
+            registro_ingreso_id=grupo['registro_ingreso_id'],
+            herramienta_inventario_id=grupo['herramienta_inventario_id'],
+        ).exclude(pk=grupo['primero']).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('registro_herramientas', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(quitar_duplicados, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='herramientaingresada',
+            constraint=models.UniqueConstraint(fields=('registro_ingreso', 'herramienta_inventario'), name='herramienta_unica_por_ingreso'),
+        ),
+    ]
@@ -97,6 +97,13 @@ class HerramientaIngresada(models.Model):
         db_table = 'registros_herramientas_ingreso'
         verbose_name = "Registro de Herramienta"
         verbose_name_plural = "Herramientas Ingresadas"
+        constraints = [
+            # Una herramienta aparece una sola vez por ingreso (el carrito masivo
+            # inserta con bulk_create(ignore_conflicts=True) y se apoya en esto)
+            models.UniqueConstraint(
+                fields=['registro_ingreso', 'herramienta_inventario'], name='herramienta_unica_por_ingreso'
+            ),
+        ]
 
     def __str__(self):
         return f"Ingreso #{self.registro_ingreso.id} - {self.herramienta_inventario.nombre}"
\ No newline at end of file
@@ -3,9 +3,10 @@
 from django.core.exceptions import ValidationError
 from django.db import transaction
 # IMPORTANTE: Importar ProtectedError para manejar borrados seguros
-from django.db.models import ProtectedError
+from django.db.models import ProtectedError, Exists, OuterRef, Subquery
 from .models import InventarioHerramienta, HerramientaIngresada
 from descargo_responsabilidad.models import RegistroIngreso
+from home.imagenes import ColaImagenes, url_miniatura
 
 class HerramientasService:
     
@@ -13,48 +14,55 @@ class HerramientasService:
     def obtener_inventario_usuario(usuario, ingreso_id):
         """
         Devuelve el inventario y marca cuáles ya han sido ingresadas HOY.
+
+        UNA sola consulta sin importar cuántos ítems tenga el catálogo:
+        - 'ingresado': EXISTS sobre los registros INGRESADO de este ingreso.
+        - 'foto_evidencia_dia': SUBQUERY con la foto de evidencia de este ingreso.
+        Después se recorre la lista una vez y se reparte por categoría.
         """
-        items = InventarioHerramienta.objects.filter(usuario=usuario).order_by('-fecha_creacion')
-        
-        # Buscamos los IDs de inventario que YA están en HerramientaIngresada para ESTE ingreso
-        ids_ingresados = HerramientaIngresada.objects.filter(
+        registros_del_ingreso = HerramientaIngresada.objects.filter(
             registro_ingreso_id=ingreso_id,
-            estado=HerramientaIngresada.EstadoHerramienta.INGRESADO
-        ).values_list('herramienta_inventario_id', flat=True)
+            herramienta_inventario_id=OuterRef('pk')
+        )
+
+        items = InventarioHerramienta.objects.filter(usuario=usuario).annotate(
+            ingresado=Exists(registros_del_ingreso.filter(estado=HerramientaIngresada.EstadoHerramienta.INGRESADO)),
+            foto_evidencia_dia=Subquery(registros_del_ingreso.order_by('pk').values('foto_evidencia')[:1])
+        ).order_by('-fecha_creacion')
+
+        # Las rutas de la subquery llegan como texto: armamos la URL con el storage del campo
+        storage_evidencias = HerramientaIngresada._meta.get_field('foto_evidencia').storage
 
-        # Helper para formatear
-        def formatear(item):
-            es_ingresado = item.id in ids_ingresados
-            # Si ya está ingresado, buscamos la foto de evidencia de hoy, si no, la de referencia
+        inventario = {
+            InventarioHerramienta.CategoriaOpciones.HERRAMIENTA: [],
+            InventarioHerramienta.CategoriaOpciones.COMPUTO: [],
+        }
+
+        for item in items:
+            # Si ya está ingresado mostramos la foto de evidencia de hoy, si no, la de referencia
             foto_url = item.foto_referencia.url if item.foto_referencia else None
-            
-            if es_ingresado:
-                # Opcional: Podrías querer mostrar la foto de evidencia del día en lugar de la de referencia
-                evidencia = HerramientaIngresada.objects.filter(
-                    registro_ingreso_id=ingreso_id, 
-                    herramienta_inventario_id=item.id
-                ).first()
-                if evidencia and evidencia.foto_evidencia:
-                    foto_url = evidencia.foto_evidencia.url
-
-            return {
+            miniatura_url = url_miniatura(item.foto_referencia)
+            if item.ingresado and item.foto_evidencia_dia:
+                foto_url = storage_evidencias.url(item.foto_evidencia_dia)
+                miniatura_url = url_miniatura(item.foto_evidencia_dia, storage_evidencias)
+
+            destino = inventario.get(item.categoria)
+            if destino is None:
+                continue
+
+            destino.append({
                 'id': item.id, 
                 'nombre': item.nombre, 
                 'marca': item.marca_serial, 
                 'foto': foto_url,
-                'ingresado': es_ingresado, # FLAG IMPORTANTE
+                'foto_miniatura': miniatura_url,
+                'ingresado': item.ingresado, # FLAG IMPORTANTE
                 'categoria': item.categoria # IMPORTANTE para filtros en JS
-            }
+            })
 
         return {
-            'herramientas': [
-                formatear(i) for i in items 
-                if i.categoria == InventarioHerramienta.CategoriaOpciones.HERRAMIENTA
-            ],
-            'computo': [
-                formatear(i) for i in items 
-                if i.categoria == InventarioHerramienta.CategoriaOpciones.COMPUTO
-            ]
+            'herramientas': inventario[InventarioHerramienta.CategoriaOpciones.HERRAMIENTA],
+            'computo': inventario[InventarioHerramienta.CategoriaOpciones.COMPUTO],
         }
 
     @staticmethod
@@ -81,6 +89,7 @@ class HerramientasService:
             foto_referencia=archivo_foto # Puede ser None si no subió foto base
         )
         nuevo_item.save()
+        ColaImagenes.encolar(nuevo_item, 'foto_referencia')
         return nuevo_item
 
     @staticmethod
@@ -112,6 +121,7 @@ class HerramientasService:
             estado=HerramientaIngresada.EstadoHerramienta.INGRESADO
         )
         registro.save()
+        ColaImagenes.encolar(registro, 'foto_evidencia')
         return registro
 
     @staticmethod
@@ -167,6 +177,8 @@ class HerramientasService:
             item.foto_referencia = archivo_foto
         
         item.save()
+        if archivo_foto:
+            ColaImagenes.encolar(item, 'foto_referencia')
         return item
 
     @staticmethod
@@ -253,24 +265,94 @@ class HerramientasService:
         """
         Procesa una lista de IDs para agregar o quitar masivamente.
         accion: 'AGREGAR' | 'REMOVER'
+
+        Camino por conjuntos (mismas reglas que agregar/remover_item_al_carrito,
+        pero con un número fijo de consultas sin importar el tamaño del carrito):
+        - AGREGAR: 1 SELECT de propiedad (pk__in), 1 SELECT de lo que ya está,
+          1 bulk_create(ignore_conflicts=True) y 1 UPDATE para reactivar los SALIO.
+        - REMOVER: 1 SELECT de lo que está + 1 DELETE.
+
+        Retorna {'exitos', 'errores', 'detalle': {id: resultado}} donde resultado es
+        'agregado' | 'reactivado' | 'sin_cambios' | 'removido' | mensaje de error.
         """
-        resultados = {'exitos': 0, 'errores': 0}
-        
         # Validamos que sea una lista
         if not isinstance(lista_ids, list):
             raise ValidationError("Se esperaba una lista de IDs.")
+        if accion not in ('AGREGAR', 'REMOVER'):
+            raise ValidationError("Acción no válida.")
+
+        detalle = {}
+        ids = []
+        for crudo in lista_ids:
+            try:
+                ids.append(int(crudo))
+            except (TypeError, ValueError):
+                detalle[str(crudo)] = "ID inválido."
+        ids = list(dict.fromkeys(ids))
+
+        estados = HerramientaIngresada.EstadoHerramienta
+
+        with transaction.atomic(): # Todo o nada
+            # Lo que ya está en el carrito de este ingreso (id inventario -> estado)
+            en_carrito = dict(
+                HerramientaIngresada.objects.filter(
+                    registro_ingreso=ingreso_pendiente,
+                    herramienta_inventario_id__in=ids
+                ).values_list('herramienta_inventario_id', 'estado')
+            )
+
+            if accion == 'REMOVER':
+                # Hard delete de la tabla intermedia (idempotente, igual que el unitario)
+                if en_carrito:
+                    HerramientaIngresada.objects.filter(
+                        registro_ingreso=ingreso_pendiente,
+                        herramienta_inventario_id__in=list(en_carrito)
+                    ).delete()
+                for item_id in ids:
+                    detalle[item_id] = 'removido' if item_id in en_carrito else 'sin_cambios'
+
+            else:
+                # 1. Validar propiedad con una sola consulta
+                fotos_referencia = dict(
+                    InventarioHerramienta.objects.filter(
+                        pk__in=ids,
+                        usuario=ingreso_pendiente.visitante
+                    ).values_list('pk', 'foto_referencia')
+                )
+
+                nuevos, reactivar = [], []
+                for item_id in ids:
+                    if item_id not in fotos_referencia:
+                        detalle[item_id] = "El ítem de inventario no existe o no te pertenece."
+                    elif item_id not in en_carrito:
+                        nuevos.append(item_id)
+                        detalle[item_id] = 'agregado'
+                    elif en_carrito[item_id] != estados.INGRESADO:
+                        reactivar.append(item_id)
+                        detalle[item_id] = 'reactivado'
+                    else:
+                        detalle[item_id] = 'sin_cambios'
+
+                # 2. Insertar lo que falta (la foto de referencia sirve de evidencia inicial).
+                # ignore_conflicts + restricción única: si otra petición lo insertó entretanto, no falla.
+                HerramientaIngresada.objects.bulk_create([
+                    HerramientaIngresada(
+                        registro_ingreso=ingreso_pendiente,
+                        herramienta_inventario_id=item_id,
+                        estado=estados.INGRESADO,
+                        observaciones="Ingreso rápido desde panel.",
+                        foto_evidencia=fotos_referencia[item_id] or None,
+                    )
+                    for item_id in nuevos
+                ], batch_size=500, ignore_conflicts=True)
+
+                # 3. Reactivar los que estaban como SALIO
+                if reactivar:
+                    HerramientaIngresada.objects.filter(
+                        registro_ingreso=ingreso_pendiente,
+                        herramienta_inventario_id__in=reactivar
+                    ).update(estado=estados.INGRESADO)
 
-        with transaction.atomic(): # Todo o nada (Opcional, pero recomendado)
-            for item_id in lista_ids:
-                try:
-                    if accion == 'AGREGAR':
-                        # Reutilizamos la lógica unitaria que ya es idempotente
-                        HerramientasService.agregar_item_al_carrito(ingreso_pendiente, item_id)
-                    elif accion == 'REMOVER':
-                        HerramientasService.remover_item_del_carrito(ingreso_pendiente, item_id)
-                    
-                    resultados['exitos'] += 1
-                except Exception:
-                    resultados['errores'] += 1
-                    
-        return resultados
\ No newline at end of file
+        errores = sum(1 for resultado in detalle.values()
+                      if resultado not in ('agregado', 'reactivado', 'sin_cambios', 'removido'))
+        return {'exitos': len(detalle) - errores, 'errores': errores, 'detalle': detalle}
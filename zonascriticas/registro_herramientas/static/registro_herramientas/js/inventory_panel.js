@@ -295,7 +295,7 @@ export class InventoryPanel {
             if (response.item) {
                 const newItem = response.item;
                 if(!newItem.categoria) newItem.categoria = formData.get('categoria');
-                if(!newItem.foto && this.tempImageBlob) newItem.foto = URL.createObjectURL(this.tempImageBlob);
+                if(!newItem.foto && this.tempImageBlob) newItem.foto = newItem.foto_miniatura = URL.createObjectURL(this.tempImageBlob);
 
                 if (this.isEditing) {
                     const index = this.currentInventory.findIndex(i => i.id == this.editingItemId);
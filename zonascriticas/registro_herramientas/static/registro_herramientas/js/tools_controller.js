@@ -249,7 +249,7 @@ class ToolsManager {
             // Actualización optimista local
             this.selectedItem.ingresado = true;
             this.selectedItem.observaciones = observaciones;
-            if (blob) this.selectedItem.foto = URL.createObjectURL(blob);
+            if (blob) this.selectedItem.foto = this.selectedItem.foto_miniatura = URL.createObjectURL(blob);
 
             this.renderMainList();
 
@@ -85,8 +85,10 @@ export const toolsUI = {
      */
     createCompactCard: (item, isSelected) => {
         // Lógica visual idéntica a la anterior pero con clases limpias
-        const imgHtml = item.foto 
-            ? `<img src="${item.foto}" alt="${item.nombre}">` 
+        // En las tarjetas va la miniatura (la foto completa solo en el detalle)
+        const imgSrc = item.foto_miniatura || item.foto;
+        const imgHtml = imgSrc 
+            ? `<img src="${imgSrc}" alt="${item.nombre}" loading="lazy">` 
             : `<div class="icon-placeholder"><i class="fas ${item.categoria === 'COMPUTO' ? 'fa-laptop' : 'fa-tools'}"></i></div>`;
 
         const selectedClass = isSelected ? 'selected' : '';
@@ -125,8 +127,9 @@ export const toolsUI = {
     createMainCard: (item) => {
         // ... (Mantén tu createMainCard actual, ese se ve bien en la pantalla principal)
         const iconClass = item.categoria === 'COMPUTO' ? 'fa-laptop' : 'fa-tools';
-        const imgHtml = item.foto 
-            ? `<img src="${item.foto}" alt="${item.nombre}">` 
+        const imgSrc = item.foto_miniatura || item.foto;
+        const imgHtml = imgSrc 
+            ? `<img src="${imgSrc}" alt="${item.nombre}" loading="lazy">` 
             : `<div class="tool-icon"><i class="fas ${iconClass}"></i></div>`;
 
         const badgeClass = item.categoria === 'COMPUTO' ? 'badge-computo' : 'badge-tool';
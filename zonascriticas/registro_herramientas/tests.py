@@ -1,3 +1,181 @@
+import json
+
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from login.models import Usuario, Cargo
+from descargo_responsabilidad.models import Ubicacion, RegistroIngreso
+from .models import InventarioHerramienta, HerramientaIngresada
+from .services import HerramientasService
+
+
+class IngresoPendienteQueriesTestCase(TestCase):
+    """
+    Con el ingreso PENDIENTE_HERRAMIENTAS, router y vistas de herramientas
+    reutilizan request.ingreso_activo (una sola consulta al ingreso).
+    """
+
+    def setUp(self):
+        cargo = Cargo.objects.create(nombre="Tester")
+        self.visitante = Usuario.objects.create(
+            first_name="Juan Perez", numero_documento="123456789", email="visitante@test.com",
+            cargo=cargo, tipo_documento='CC'
+        )
+        responsable = Usuario.objects.create(
+            first_name="Maria Gomez", numero_documento="987654321", email="responsable@test.com",
+            cargo=cargo, tipo='Administrador', tipo_documento='CC'
+        )
+        ubicacion = Ubicacion.objects.create(nombre="Data Center", codigo_qr="DC-01", ciudad="Bogotá", freshservice_id=1001)
+        self.ingreso = RegistroIngreso.objects.create(
+            visitante=self.visitante, responsable=responsable, ubicacion=ubicacion,
+            modalidad=RegistroIngreso.ModalidadOpciones.CON_EQUIPOS,
+            estado=RegistroIngreso.EstadoOpciones.PENDIENTE_HERRAMIENTAS,
+            fecha_hora_ingreso=timezone.now(),
+        )
+
+        session = self.client.session
+        session['id_usuario_logueado'] = self.visitante.id
+        session.save()
+
+    def test_home_router_pendiente(self):
+        # sesión, usuario, ingreso abierto
+        with self.assertNumQueries(3):
+            response = self.client.get(reverse('dashboard'))
+        self.assertRedirects(response, reverse('registro_herramientas_view'), fetch_redirect_response=False)
+
+    def test_registro_herramientas_view(self):
+        with self.assertNumQueries(3):
+            response = self.client.get(reverse('registro_herramientas_view'))
+        self.assertEqual(response.status_code, 200)
+
+    def test_api_sin_ingreso_abierto(self):
+        # save() (no update()) para que presencia_actual se sincronice
+        self.ingreso.estado = RegistroIngreso.EstadoOpciones.FINALIZADO
+        self.ingreso.save()
+
+        with self.assertNumQueries(3):
+            response = self.client.get(reverse('api_inventario'))
+        self.assertEqual(response.status_code, 403)
+
+
+class InventarioQueriesTestCase(TestCase):
+    """
+    obtener_inventario_usuario: una sola consulta sin importar el tamaño del
+    catálogo ni cuántos ítems ya se ingresaron (antes: 1 + N).
+    """
+
+    def setUp(self):
+        IngresoPendienteQueriesTestCase.setUp(self)
+        categorias = InventarioHerramienta.CategoriaOpciones
+        self.items = [
+            InventarioHerramienta.objects.create(
+                usuario=self.visitante, nombre=f"Item {i}", marca_serial=f"S-{i}",
+                categoria=categorias.COMPUTO if i % 3 == 0 else categorias.HERRAMIENTA,
+                foto_referencia=f"herramientas/referencia/{i}.jpg",
+            )
+            for i in range(30)
+        ]
+        # La mitad ya está ingresada con su foto del día; el ítem 1 salió
+        for item in self.items[:15]:
+            HerramientaIngresada.objects.create(
+                registro_ingreso=self.ingreso, herramienta_inventario=item,
+                foto_evidencia=f"herramientas/evidencias/{item.id}.jpg",
+                estado=(HerramientaIngresada.EstadoHerramienta.SALIO if item is self.items[1]
+                        else HerramientaIngresada.EstadoHerramienta.INGRESADO),
+            )
+
+    def test_una_sola_consulta(self):
+        with self.assertNumQueries(1):
+            inventario = HerramientasService.obtener_inventario_usuario(self.visitante, self.ingreso.id)
+
+        filas = {fila['id']: fila for fila in inventario['herramientas'] + inventario['computo']}
+        self.assertEqual(len(filas), 30)
+        self.assertEqual(len(inventario['computo']), 10)
+
+        self.assertTrue(filas[self.items[0].id]['ingresado'])
+        self.assertTrue(filas[self.items[0].id]['foto'].endswith(f"evidencias/{self.items[0].id}.jpg"))
+
+        self.assertFalse(filas[self.items[1].id]['ingresado'])
+        self.assertTrue(filas[self.items[1].id]['foto'].endswith("referencia/1.jpg"))
+
+        self.assertFalse(filas[self.items[20].id]['ingresado'])
+        self.assertTrue(filas[self.items[20].id]['foto'].endswith("referencia/20.jpg"))
+
+    def test_api_inventario_consultas_constantes(self):
+        # sesión, usuario, ingreso abierto, inventario
+        with self.assertNumQueries(4):
+            response = self.client.get(reverse('api_inventario'))
+        self.assertEqual(response.status_code, 200)
+
+
+class CarritoMasivoTestCase(TestCase):
+    """
+    gestion_masiva_carrito por conjuntos: resultado por id y número de
+    consultas fijo sin importar cuántos ítems lleguen.
+    """
+
+    def setUp(self):
+        IngresoPendienteQueriesTestCase.setUp(self)
+        self.ids = [
+            InventarioHerramienta.objects.create(
+                usuario=self.visitante, nombre=f"Item {i}", marca_serial=f"S-{i}",
+                foto_referencia=f"herramientas/referencia/{i}.jpg" if i % 2 else None,
+            ).id
+            for i in range(60)
+        ]
+        ajeno = Usuario.objects.create(first_name="Otro", numero_documento="555", email="otro@test.com")
+        self.id_ajeno = InventarioHerramienta.objects.create(usuario=ajeno, nombre="Ajeno", marca_serial="X").id
+
+    def test_agregar_reactivar_y_remover(self):
+        primeros = self.ids[:3]
+        HerramientasService.gestion_masiva_carrito(self.ingreso, [primeros[0]], 'AGREGAR')
+        HerramientaIngresada.objects.filter(herramienta_inventario_id=primeros[0]).update(
+            estado=HerramientaIngresada.EstadoHerramienta.SALIO
+        )
+
+        resultado = HerramientasService.gestion_masiva_carrito(
+            self.ingreso, primeros + [str(primeros[1]), self.id_ajeno, 'abc'], 'AGREGAR'
+        )
+
+        self.assertEqual(resultado['detalle'], {
+            primeros[0]: 'reactivado',
+            primeros[1]: 'agregado',
+            primeros[2]: 'agregado',
+            self.id_ajeno: "El ítem de inventario no existe o no te pertenece.",
+            'abc': "ID inválido.",
+        })
+        self.assertEqual((resultado['exitos'], resultado['errores']), (3, 2))
+
+        registros = HerramientaIngresada.objects.filter(registro_ingreso=self.ingreso)
+        self.assertEqual(registros.count(), 3)
+        self.assertFalse(registros.exclude(estado=HerramientaIngresada.EstadoHerramienta.INGRESADO).exists())
+        # La foto de referencia (si hay) queda como evidencia inicial
+        self.assertEqual(registros.get(herramienta_inventario_id=primeros[1]).foto_evidencia.name,
+                         "herramientas/referencia/1.jpg")
+        self.assertFalse(registros.get(herramienta_inventario_id=primeros[2]).foto_evidencia)
+
+        resultado = HerramientasService.gestion_masiva_carrito(self.ingreso, primeros[:2] + [self.ids[10]], 'REMOVER')
+        self.assertEqual(resultado['detalle'], {primeros[0]: 'removido', primeros[1]: 'removido', self.ids[10]: 'sin_cambios'})
+        self.assertEqual(list(registros.values_list('herramienta_inventario_id', flat=True)), [primeros[2]])
+
+    def test_consultas_no_dependen_del_tamano(self):
+        def consultas(ids, accion):
+            with CaptureQueriesContext(connection) as capturadas:
+                HerramientasService.gestion_masiva_carrito(self.ingreso, ids, accion)
+            return len(capturadas)
+
+        pocas = consultas(self.ids[:5], 'AGREGAR')
+        muchas = consultas(self.ids[5:], 'AGREGAR')
+        self.assertEqual(pocas, muchas)
+        self.assertEqual(consultas(self.ids[:5], 'REMOVER'), consultas(self.ids[5:], 'REMOVER'))
 
-# Create your tests here.
+    def test_api_accion_invalida_es_400(self):
+        respuesta = self.client.post(
+            reverse('api_gestion_masiva'), json.dumps({'ids': self.ids[:2], 'accion': 'BORRAR'}),
+            content_type='application/json'
+        )
+        self.assertEqual(respuesta.status_code, 400)
+        self.assertEqual(respuesta.json()['message'], 'Acción no válida.')
@@ -1,4 +1,5 @@
 import json
+from django.core.exceptions import ValidationError
 from django.shortcuts import render, redirect
 from django.http import HttpRequest, HttpResponse
 from django.views.decorators.http import require_GET, require_POST
@@ -9,17 +10,16 @@ from .decorators import requiere_ingreso_pendiente_api
 
 # --- IMPORTACIÓN DEL NÚCLEO ---
 from home.utils import api_response
+from home.imagenes import url_miniatura
 
 # --- VISTA HTML PRINCIPAL (Sin cambios) ---
 @login_custom_required
 def registro_herramientas_view(request: HttpRequest) -> HttpResponse:
     user = request.user
-    ingreso_pendiente = RegistroIngreso.objects.filter(
-        visitante=user,
-        estado=RegistroIngreso.EstadoOpciones.PENDIENTE_HERRAMIENTAS
-    ).first()
+    # Ingreso abierto del middleware: solo sirve si sigue pendiente de herramientas
+    ingreso_pendiente = request.ingreso_activo
 
-    if not ingreso_pendiente:
+    if not ingreso_pendiente or ingreso_pendiente.estado != RegistroIngreso.EstadoOpciones.PENDIENTE_HERRAMIENTAS:
         return redirect('dashboard')
 
     context = {
@@ -58,6 +58,7 @@ def api_crear_inventario(request: HttpRequest) -> HttpResponse:
             'marca': nuevo_item.marca_serial,
             'categoria': nuevo_item.categoria,
             'foto': nuevo_item.foto_referencia.url if nuevo_item.foto_referencia else None,
+            'foto_miniatura': url_miniatura(nuevo_item.foto_referencia),
             'ingresado': False
         }
 
@@ -155,6 +156,7 @@ def api_agregar_carrito(request: HttpRequest, ingreso) -> HttpResponse:
             'marca': item_inv.marca_serial,
             'categoria': item_inv.categoria,
             'foto': foto_url,
+            'foto_miniatura': url_miniatura(item_inv.foto_referencia),
             'ingresado': True,
             'observaciones': registro.observaciones
         }
@@ -183,5 +185,8 @@ def api_gestion_masiva(request: HttpRequest, ingreso) -> HttpResponse:
         )
     except json.JSONDecodeError:
         return api_response(success=False, message='JSON inválido', status_code=400)
+    except ValidationError as e:
+        # Ej: acción desconocida o 'ids' que no es lista
+        return api_response(success=False, message=e.messages[0], status_code=400)
     except Exception as e:
         return api_response(success=False, message=str(e), status_code=500)
\ No newline at end of file
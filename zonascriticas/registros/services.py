@@ -1,35 +1,65 @@
+import base64
+from datetime import datetime
 from django.db.models import Max, Q, Exists, OuterRef, F
 from django.utils import timezone
 from django.db import transaction
-from descargo_responsabilidad.models import RegistroIngreso
+from descargo_responsabilidad.models import RegistroIngreso, PresenciaActual
 from login.models import Usuario
 
 class RegistrosService:
 
     @staticmethod
-    def listar_visitantes_con_estado():
+    def listar_visitantes_con_estado(cursor=None):
         """
         Obtiene usuarios que han ingresado al menos una vez.
         Annotates:
-        - ultima_fecha: La fecha del registro más reciente.
-        - esta_en_zona: Booleano, True si tiene un registro activo AHORA.
+        - ultima_visita: La fecha del registro más reciente.
+        - tiene_ingreso_activo: Booleano, True si tiene un registro activo AHORA.
+
+        Orden estable (-ultima_visita, -id) para paginar por cursor (keyset):
+        si llega ``cursor`` (ver ``codificar_cursor``) solo se devuelven los
+        visitantes que van DESPUÉS de esa fila, sin OFFSET.
         """
-        # Subquery para saber si existe un ingreso activo (Estado = EN_ZONA)
-        ingreso_activo = RegistroIngreso.objects.filter(
-            visitante=OuterRef('pk'),
+        # Subquery para saber si existe un ingreso activo (Estado = EN_ZONA): presencia por PK
+        ingreso_activo = PresenciaActual.objects.filter(
+            pk=OuterRef('pk'),
             estado=RegistroIngreso.EstadoOpciones.EN_ZONA
         )
 
         # Filtramos usuarios que tengan al menos un registro de ingreso (relación inversa 'ingresos_visitante')
+        # El MAX por visitante se resuelve con el índice (id_visitante, fecha_hora_ingreso)
         visitantes = Usuario.objects.filter(
             ingresos_visitante__isnull=False
         ).annotate(
             ultima_visita=Max('ingresos_visitante__fecha_hora_ingreso'),
             tiene_ingreso_activo=Exists(ingreso_activo)
-        ).select_related('empresa').order_by('-ultima_visita') # Ordenar por el que vino más reciente
+        ).select_related('empresa').order_by('-ultima_visita', '-id') # Ordenar por el que vino más reciente
+
+        if cursor:
+            fecha, visitante_id = RegistrosService.decodificar_cursor(cursor)
+            visitantes = visitantes.filter(
+                Q(ultima_visita__lt=fecha) | Q(ultima_visita=fecha, id__lt=visitante_id)
+            )
 
         return visitantes
 
+    @staticmethod
+    def codificar_cursor(visitante) -> str:
+        """Cursor opaco con la posición (ultima_visita, id) de una fila."""
+        texto = f"{visitante.ultima_visita.isoformat()}|{visitante.id}"
+        return base64.urlsafe_b64encode(texto.encode()).decode()
+
+    @staticmethod
+    def decodificar_cursor(cursor: str):
+        """
+        Returns: (datetime, int). Lanza ValueError si el cursor no es válido.
+        """
+        try:
+            fecha, visitante_id = base64.urlsafe_b64decode(cursor.encode()).decode().split('|')
+            return datetime.fromisoformat(fecha), int(visitante_id)
+        except (ValueError, UnicodeDecodeError) as e:
+            raise ValueError("Cursor de paginación inválido.") from e
+
     @staticmethod
     def obtener_historial_usuario(usuario_id):
         """
@@ -4,7 +4,7 @@ export const GridConfig = {
 
     columnaPerfil: (props) => {
         if (!props) return '';
-        const imgUrl = props.visitante_img ? props.visitante_img : '/static/home/img/default_avatar.png';
+        const imgUrl = props.visitante_img_miniatura || props.visitante_img || '/static/home/img/default_avatar.png';
         const empresa = props.empresa || 'Particular';
 
         // Estructura coincidente con CSS registros.css sección 3
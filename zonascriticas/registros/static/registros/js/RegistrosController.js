@@ -92,7 +92,7 @@ export class RegistrosController {
             }
 
             const html = items.map(item => {
-                const img = item.visitante_img || '/static/home/img/default_avatar.png';
+                const img = item.visitante_img_miniatura || item.visitante_img || '/static/home/img/default_avatar.png';
                 const isEnZona = item.estado_actual === 'En Zona';
                 const statusClass = isEnZona ? 'active' : 'inactive';
                 const statusText = isEnZona ? 'En Zona' : item.ultima_visita;
@@ -1,3 +1,84 @@
+import json
+from datetime import timedelta
+
+from django.http import StreamingHttpResponse
 from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from login.models import Usuario, Cargo
+from descargo_responsabilidad.models import Ubicacion, RegistroIngreso
+
+
+class ListarVisitantesPaginadoTestCase(TestCase):
+    """
+    listar_visitantes_api: respuesta en streaming y paginación por cursor
+    (keyset sobre ultima_visita, id) sin saltos ni repetidos.
+    """
+
+    def setUp(self):
+        cargo = Cargo.objects.create(nombre="Tester")
+        self.admin = Usuario.objects.create(
+            first_name="Admin", numero_documento="1", email="admin@test.com", cargo=cargo, tipo='Administrador'
+        )
+        ubicacion = Ubicacion.objects.create(nombre="Data Center", codigo_qr="DC-01", ciudad="Bogotá", freshservice_id=1001)
+
+        base = timezone.now() - timedelta(days=30)
+        # Día de la última visita de cada visitante: 2 y 3 empatan
+        ultimas = [1, 2, 3, 3, 5, 6, 7]
+        self.visitantes = []
+        for i, ultima in enumerate(ultimas):
+            visitante = Usuario.objects.create(
+                first_name=f"Visitante {i}", numero_documento=f"10{i}", email=f"v{i}@test.com", cargo=cargo
+            )
+            self.visitantes.append(visitante)
+            for dias in (0, ultima):
+                ingreso = RegistroIngreso.objects.create(
+                    visitante=visitante, responsable=self.admin, ubicacion=ubicacion,
+                    estado=RegistroIngreso.EstadoOpciones.FINALIZADO,
+                )
+                # fecha_hora_ingreso es auto_now_add: la ajustamos con update()
+                RegistroIngreso.objects.filter(pk=ingreso.pk).update(fecha_hora_ingreso=base + timedelta(days=dias))
+
+        session = self.client.session
+        session['id_usuario_logueado'] = self.admin.id
+        session.save()
+
+    def obtener(self, **params):
+        respuesta = self.client.get(reverse('api_listar_visitantes'), params)
+        self.assertIsInstance(respuesta, StreamingHttpResponse)
+        return json.loads(b''.join(respuesta.streaming_content))
+
+    def test_sin_limite_devuelve_todo_en_orden(self):
+        datos = self.obtener()
+
+        self.assertTrue(datos['success'])
+        self.assertIsNone(datos['siguiente_cursor'])
+        # Más reciente primero; en el empate (2 y 3) va primero el id mayor
+        esperado = [6, 5, 4, 3, 2, 1, 0]
+        self.assertEqual([fila['visitante_id'] for fila in datos['payload']],
+                         [self.visitantes[i].id for i in esperado])
+
+    def test_paginas_por_cursor_cubren_todo_sin_repetir(self):
+        vistos, cursor = [], None
+        while True:
+            params = {'limite': 2}
+            if cursor:
+                params['cursor'] = cursor
+            datos = self.obtener(**params)
+            self.assertLessEqual(len(datos['payload']), 2)
+            vistos += [fila['visitante_id'] for fila in datos['payload']]
+            cursor = datos['siguiente_cursor']
+            if not cursor:
+                break
+
+        self.assertEqual(vistos, [fila['visitante_id'] for fila in self.obtener()['payload']])
+
+    def test_pagina_no_depende_del_tamano_del_historial(self):
+        # sesión, usuario, una sola consulta para la página
+        with self.assertNumQueries(3):
+            self.obtener(limite=3)
 
-# Create your tests here.
+    def test_cursor_invalido(self):
+        respuesta = self.client.get(reverse('api_listar_visitantes'), {'limite': 2, 'cursor': 'no-es-un-cursor'})
+        self.assertEqual(respuesta.status_code, 400)
@@ -7,7 +7,9 @@ from django.views.decorators.http import require_GET, require_POST
 
 # Decoradores y Utils
 from login.decorators import login_custom_required
-from home.utils import api_response
+from home.utils import api_response, api_response_streaming
+from home.imagenes import url_miniatura
+from home.replica import lectura_en_replica
 
 # Servicio
 from .services import RegistrosService
@@ -26,38 +28,77 @@ def registros_view(request: HttpRequest) -> HttpResponse:
     return render(request, 'registros.html', {'imagen_src': imagen_a_mostrar})
 
 
+# Tamaño de los lotes que se leen de la BD mientras se escribe la respuesta
+CHUNK_VISITANTES = 500
+# Máximo de filas por página cuando se usa ?limite=
+LIMITE_MAXIMO_PAGINA = 500
+
+
+def _serializar_visitante(v) -> dict:
+    # Determinamos el estado visual
+    estado_visual = 'En Zona' if v.tiene_ingreso_activo else 'Fuera'
+
+    return {
+        'visitante_id': v.id,
+        'visitante_nombre': v.get_full_name(),
+        'visitante_doc': v.numero_documento,
+        'visitante_img': v.img.url if v.img else None,
+        'visitante_img_miniatura': url_miniatura(v.img),
+        'empresa': v.empresa.nombre_empresa if v.empresa else 'Particular',
+        'ultima_visita': v.ultima_visita.strftime('%d/%m/%Y %I:%M %p') if v.ultima_visita else 'N/A',
+        'estado_actual': estado_visual
+    }
+
+
 @login_custom_required
 @require_GET
+@lectura_en_replica
 def listar_visitantes_api(request: HttpRequest) -> HttpResponse:
     """
     NUEVA API: Devuelve lista de PERSONAS (Visitantes), no de eventos.
+
+    La respuesta se escribe en streaming mientras se leen las filas por lotes.
+    Paginación opcional por cursor (keyset sobre ultima_visita, id):
+        ?limite=100              -> primera página
+        ?limite=100&cursor=<...> -> página siguiente (``siguiente_cursor`` de la anterior)
+    Sin ``limite`` se devuelve el directorio completo (clientes que no paginan).
     """
     try:
-        visitantes_qs = RegistrosService.listar_visitantes_con_estado()
-        
-        data = []
-        for v in visitantes_qs:
-            # Determinamos el estado visual
-            estado_visual = 'En Zona' if v.tiene_ingreso_activo else 'Fuera'
-            
-            data.append({
-                'visitante_id': v.id,
-                'visitante_nombre': v.get_full_name(),
-                'visitante_doc': v.numero_documento,
-                'visitante_img': v.img.url if v.img else None,
-                'empresa': v.empresa.nombre_empresa if v.empresa else 'Particular',
-                'ultima_visita': v.ultima_visita.strftime('%d/%m/%Y %I:%M %p') if v.ultima_visita else 'N/A',
-                'estado_actual': estado_visual
-            })
-
-        return api_response(data=data)
-
+        limite = request.GET.get('limite')
+        limite = min(int(limite), LIMITE_MAXIMO_PAGINA) if limite else None
+        if limite is not None and limite < 1:
+            raise ValueError("El límite debe ser mayor que cero.")
+
+        # El cursor se valida aquí: una vez empieza el streaming ya no hay status 400
+        visitantes_qs = RegistrosService.listar_visitantes_con_estado(cursor=request.GET.get('cursor'))
+    except ValueError as e:
+        return api_response(success=False, message=str(e), status_code=400)
     except Exception as e:
         return api_response(success=False, message=str(e), status_code=500)
 
+    if limite is not None:
+        # Una fila de más nos dice si hay página siguiente
+        visitantes_qs = visitantes_qs[:limite + 1]
+
+    pagina = {'siguiente_cursor': None}
+
+    def filas():
+        emitidos = 0
+        ultimo = None
+        for v in visitantes_qs.iterator(chunk_size=CHUNK_VISITANTES):
+            if limite is not None and emitidos == limite:
+                pagina['siguiente_cursor'] = RegistrosService.codificar_cursor(ultimo)
+                break
+            yield _serializar_visitante(v)
+            emitidos += 1
+            ultimo = v
+
+    return api_response_streaming(filas(), extra=lambda: pagina)
+
 
 @login_custom_required
 @require_GET
+@lectura_en_replica
 def historial_usuario_api(request: HttpRequest, usuario_id: int) -> HttpResponse:
     """
     API PANEL LATERAL: Devuelve el timeline de ingresos de un usuario.
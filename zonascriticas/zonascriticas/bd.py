@@ -0,0 +1,116 @@
+"""
+zonascriticas/zonascriticas/bd.py
+
+Descripción:
+
+Perfil de base de datos para producción (MySQL detrás de gunicorn): conexiones
+persistentes, pool opcional y réplica de lectura, a partir de variables de entorno.
+
+Variables de entorno
+--------------------
+- ``DB_ENGINE``, ``DB_NAME``, ``DB_USER``, ``DB_PASSWORD``, ``DB_HOST``, ``DB_PORT``:
+  las de siempre.
+- ``DB_CONN_MAX_AGE``: segundos que una conexión se reutiliza entre requests
+  (por defecto 60; 0 = una conexión por request).
+- ``DB_CONN_HEALTH_CHECKS``: antes de reutilizar una conexión persistente se
+  verifica que siga viva (por defecto True). Evita el error 'MySQL server has
+  gone away' después de un ``wait_timeout`` del servidor.
+- ``DB_POOL``: ``True`` usa un pool de conexiones compartido por los hilos del
+  proceso (paquete opcional ``django-db-connection-pool``). Con pool,
+  ``CONN_MAX_AGE`` queda en 0: la conexión vuelve al pool al final del request.
+  ``DB_POOL_TAMANO`` y ``DB_POOL_EXTRA`` fijan el tamaño.
+- ``DB_REPLICA_HOST`` / ``DB_REPLICA_NAME``: si alguno existe se agrega el alias
+  ``replica`` (mismos datos que ``default`` salvo lo indicado). Las vistas de
+  listados lo usan a través de ``home/replica.py``.
+"""
+
+import importlib.util
+import os
+from typing import Mapping
+
+from django.core.exceptions import ImproperlyConfigured
+
+ALIAS_REPLICA = 'replica'
+
+#: Backends del paquete opcional de pool, por motor de Django.
+BACKENDS_POOL = {
+    'django.db.backends.mysql': 'dj_db_conn_pool.backends.mysql',
+    'django.db.backends.postgresql': 'dj_db_conn_pool.backends.postgresql',
+}
+
+
+def _bool(valor: str) -> bool:
+    return str(valor).lower() in ('1', 'true', 'si', 'sí', 'yes')
+
+
+def perfil_bases_de_datos(entorno: Mapping[str, str] = os.environ) -> dict:
+    """
+    Arma ``DATABASES`` a partir de las variables de entorno.
+
+    Parameters
+    ----------
+    entorno : Mapping[str, str]
+        Por defecto ``os.environ`` (los tests pasan un diccionario).
+
+    Returns
+    -------
+    dict
+        Con el alias ``default`` y, si se configuró, ``replica``.
+
+    Raises
+    ------
+    ImproperlyConfigured
+        Si se pide ``DB_POOL`` sin el paquete instalado o con un motor sin pool.
+    """
+    motor = entorno.get('DB_ENGINE', 'django.db.backends.sqlite3')
+
+    default = {
+        'ENGINE': motor,
+        'NAME': entorno.get('DB_NAME', 'zonascriticas_db'),
+        'USER': entorno.get('DB_USER', 'usuario_mysql'),
+        'PASSWORD': entorno.get('DB_PASSWORD', ''),
+        'HOST': entorno.get('DB_HOST', 'localhost'),
+        'PORT': entorno.get('DB_PORT', '3306'),
+        'CONN_MAX_AGE': int(entorno.get('DB_CONN_MAX_AGE', '60')),
+        'CONN_HEALTH_CHECKS': _bool(entorno.get('DB_CONN_HEALTH_CHECKS', 'True')),
+    }
+
+    if motor == 'django.db.backends.mysql':
+        default['OPTIONS'] = {
+            'charset': 'utf8mb4',
+            # Sin esto un servidor caído deja el worker colgado hasta el timeout de gunicorn
+            'connect_timeout': int(entorno.get('DB_CONNECT_TIMEOUT', '5')),
+        }
+
+    if _bool(entorno.get('DB_POOL', 'False')):
+        if motor not in BACKENDS_POOL:
+            raise ImproperlyConfigured(f"DB_POOL no está disponible para {motor}.")
+        if importlib.util.find_spec('dj_db_conn_pool') is None:
+            raise ImproperlyConfigured(
+                "DB_POOL=True requiere el paquete django-db-connection-pool "
+                "(pip install django-db-connection-pool[mysql])."
+            )
+        default['ENGINE'] = BACKENDS_POOL[motor]
+        default['CONN_MAX_AGE'] = 0
+        default['POOL_OPTIONS'] = {
+            'POOL_SIZE': int(entorno.get('DB_POOL_TAMANO', '10')),
+            'MAX_OVERFLOW': int(entorno.get('DB_POOL_EXTRA', '10')),
+            'RECYCLE': 3600,
+            'PRE_PING': default['CONN_HEALTH_CHECKS'],
+        }
+
+    bases = {'default': default}
+
+    if entorno.get('DB_REPLICA_HOST') or entorno.get('DB_REPLICA_NAME'):
+        bases[ALIAS_REPLICA] = {
+            **default,
+            'HOST': entorno.get('DB_REPLICA_HOST', default['HOST']),
+            'PORT': entorno.get('DB_REPLICA_PORT', default['PORT']),
+            'NAME': entorno.get('DB_REPLICA_NAME', default['NAME']),
+            'USER': entorno.get('DB_REPLICA_USER', default['USER']),
+            'PASSWORD': entorno.get('DB_REPLICA_PASSWORD', default['PASSWORD']),
+            # En los tests la réplica es la misma BD que default
+            'TEST': {'MIRROR': 'default'},
+        }
+
+    return bases
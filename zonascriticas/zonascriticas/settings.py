@@ -13,6 +13,7 @@ el framework de manera correcta
 from pathlib import Path
 import os
 from dotenv import load_dotenv
+from zonascriticas.bd import perfil_bases_de_datos
 
 # Usamos BASE_DIR para subir hasta la ruta zonascriticas (Esta es la base url)
 BASE_DIR = Path(__file__).resolve().parent.parent # Usamos parent para subir los directorios
@@ -65,6 +66,7 @@ MIDDLEWARE = [
     'django.middleware.csrf.CsrfViewMiddleware',
     #'django.contrib.auth.middleware.AuthenticationMiddleware', 
     'login.middleware.CustomAuthMiddleware', # Este es el middleware personalizado
+    'descargo_responsabilidad.middleware.IngresoActivoMiddleware', # request.ingreso_activo (después de request.user)
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -97,16 +99,12 @@ WSGI_APPLICATION = 'zonascriticas.wsgi.application'
 # Se deja por defecto el localhost para mayor familiaridad si vienes
 # de trabajar proyectos con XAMPP pero si deseas puedes usar la que 
 # trae Django por defecto
-DATABASES = {
-    'default': {
-        'ENGINE': os.getenv('DB_ENGINE', 'django.db.backends.sqlite3'),
-        'NAME': os.getenv('DB_NAME', 'zonascriticas_db'),
-        'USER': os.getenv('DB_USER', 'usuario_mysql'),       
-        'PASSWORD': os.getenv('DB_PASSWORD', ''), 
-        'HOST': os.getenv('DB_HOST', 'localhost'),       
-        'PORT': os.getenv('DB_PORT', '3306'),     
-    }
-}
+# Perfil en zonascriticas/bd.py: conexiones persistentes (DB_CONN_MAX_AGE) con
+# health checks, pool opcional (DB_POOL) y réplica de lectura (DB_REPLICA_HOST/NAME)
+DATABASES = perfil_bases_de_datos()
+
+# Los listados marcados con @lectura_en_replica leen de la réplica (home/replica.py)
+DATABASE_ROUTERS = ['home.replica.RouterReplica']
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
@@ -145,6 +143,28 @@ MEDIA_URL = '/media/'  # URL base para archivos multimedia subidos por usuarios
 # Ruta en el sistema de archivos donde se almacenan los archivos multimedia
 MEDIA_ROOT = BASE_DIR / 'media'  
 
+# Storage de archivos subidos: con deduplicación por contenido (home/almacenamiento.py).
+# MEDIA_DEDUPLICAR=False vuelve al FileSystemStorage normal.
+STORAGES = {
+    'default': {
+        'BACKEND': 'home.almacenamiento.AlmacenamientoDeduplicado'
+        if os.getenv('MEDIA_DEDUPLICAR', 'True') == 'True'
+        else 'django.core.files.storage.FileSystemStorage',
+    },
+    'staticfiles': {
+        'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage',
+    },
+}
+
+# Fotos de evidencia (home/imagenes.py, worker: procesar_imagenes)
+# Formato de salida: 'WEBP' o 'JPEG' (progresivo). Lados en píxeles.
+IMAGENES_FORMATO = os.getenv('IMAGENES_FORMATO', 'WEBP')
+IMAGENES_CALIDAD = int(os.getenv('IMAGENES_CALIDAD', '80'))
+IMAGENES_LADO_MAXIMO = int(os.getenv('IMAGENES_LADO_MAXIMO', '1600'))
+IMAGENES_LADO_MINIATURA = int(os.getenv('IMAGENES_LADO_MINIATURA', '320'))
+# Tope de cada firma PNG decodificada (home.utils.decodificar_imagen_base64)
+FIRMA_MAX_BYTES = int(os.getenv('FIRMA_MAX_BYTES', str(1024 * 1024)))
+
 # --- CONFIGURACIÓN DE CORREO (SMTP) ---
 # Esto conecta Django con las variables de tu .env (Mailtrap por el momento)
 EMAIL_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
@@ -175,14 +195,45 @@ SESSION_COOKIE_SAMESITE = 'Lax'
 SESSION_EXPIRE_AT_BROWSER_CLOSE = True
 
 # 5. Motor de Sesión (Usaremos base de datos por defecto, es seguro)
-SESSION_ENGINE = 'django.contrib.sessions.backends.db'
+# SESSION_MODO='cookie' firma la sesión en la cookie (cero consultas; la sesión solo guarda
+# el id del usuario) y 'cache' la guarda en la caché 'usuarios' (usar una caché compartida
+# como Redis/Memcached si hay varios workers).
+SESSION_MODO = os.getenv('SESSION_MODO', 'bd')
+SESSION_ENGINE = {
+    'bd': 'django.contrib.sessions.backends.db',
+    'cookie': 'django.contrib.sessions.backends.signed_cookies',
+    'cache': 'django.contrib.sessions.backends.cache',
+}[SESSION_MODO]
+SESSION_CACHE_ALIAS = 'usuarios'
 
 # CONFIGURACION PARA MANEJAR EL BLOQUEO DE IPs
+USUARIOS_CACHE_BACKEND = os.getenv('USUARIOS_CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache')
 CACHES = {
     'default': {
         'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
         'LOCATION': 'seguridad_cache', # AQUI COLOCAMOS EL NOMBRE DE LA TABLA
-    }
+    },
+    # Usuarios resueltos por CustomAuthMiddleware (login/cache_usuarios.py).
+    # Por defecto en memoria del proceso; en producción con varios workers apúntalo a
+    # Redis/Memcached con USUARIOS_CACHE_BACKEND y USUARIOS_CACHE_LOCATION.
+    'usuarios': {
+        'BACKEND': USUARIOS_CACHE_BACKEND,
+        'LOCATION': os.getenv('USUARIOS_CACHE_LOCATION', 'usuarios'),
+    },
 }
+USUARIOS_CACHE_ALIAS = 'usuarios'
+# En memoria la invalidación solo llega al worker que hizo el cambio: un usuario desactivado
+# o con otro rol seguiría entrando por los demás workers hasta que venza la entrada.
+# Por eso el TTL por defecto es de segundos; con una caché compartida se invalida en todos.
+USUARIOS_CACHE_TTL = int(os.getenv('USUARIOS_CACHE_TTL', '5' if USUARIOS_CACHE_BACKEND.endswith('LocMemCache') else '300')) # segundos
 # OBSERVACIÓN: Cuando se monte este proyecto en producción se debe ejecutar de nuevo el comando
-# python manage.py createcachetable
\ No newline at end of file
+# python manage.py createcachetable
+
+# Store de contadores de SecurityJail (login/contadores.py):
+# 'memoria' (un solo proceso), 'bd' (tabla contadores_seguridad) o 'redis'
+SEGURIDAD_CONTADOR_STORE = os.getenv('SEGURIDAD_CONTADOR_STORE', 'bd')
+SEGURIDAD_REDIS_URL = os.getenv('SEGURIDAD_REDIS_URL', 'redis://localhost:6379/0')
+# Niveles del limitador de login (login/limitador.py). Vacío = valores por defecto:
+# leve (5 fallos / 5 min -> 5 min) y grave (3 bloqueos leves / 1 h -> 24 h).
+# Ej: [{'nombre': 'leve', 'limite': 5, 'ventana': 300, 'castigo': 300, 'mensaje': '...'}, ...]
+SEGURIDAD_NIVELES = []